@@ -3,7 +3,7 @@
 
 from pydantic_settings import BaseSettings  # Pydantic'in settings sınıfı - environment variables için
 from pydantic import Field  # Field ile default değerler ve validasyon tanımlarız
-from typing import List  # Type hints için - liste tipi
+from typing import Any, List, Dict  # Type hints için - liste ve dict tipi
 
 
 class Settings(BaseSettings):
@@ -22,16 +22,134 @@ class Settings(BaseSettings):
     # OpenRouter API Configuration - AI modelleri için
     OPENROUTER_API_KEY: str = Field(default="")  # OpenRouter API anahtarı - zorunlu
     OPENROUTER_BASE_URL: str = Field(default="https://openrouter.ai/api/v1")  # OpenRouter API base URL
+    OPENROUTER_BASE_URLS: Dict[str, float] = Field(default_factory=dict)  # Birden fazla OpenRouter uyumlu gateway -> ağırlık (doluysa OPENROUTER_BASE_URL yerine)
+
+    # OpenRouter HTTP Client Pool - paylaşılan (uzun ömürlü) bağlantı havuzu ayarları
+    OPENROUTER_HTTP2: bool = Field(default=True)  # HTTP/2 multiplexing - tek TCP/TLS bağlantısı üzerinden paralel istekler
+    OPENROUTER_MAX_CONNECTIONS: int = Field(default=100, ge=1)  # Havuzdaki maksimum eşzamanlı bağlantı sayısı
+    OPENROUTER_MAX_KEEPALIVE_CONNECTIONS: int = Field(default=20, ge=0)  # Boşta açık tutulacak keepalive bağlantı sayısı
+    OPENROUTER_KEEPALIVE_EXPIRY: float = Field(default=60.0, gt=0)  # Boştaki bağlantının kaç saniye sonra kapatılacağı
+    OPENROUTER_CONNECT_TIMEOUT: float = Field(default=5.0, gt=0)  # DNS + TCP + TLS bağlantı kurma timeout'u (saniye)
+    OPENROUTER_POOL_TIMEOUT: float = Field(default=10.0, gt=0)  # Havuzdan boş bağlantı bekleme timeout'u (saniye)
+
+    # Upstream Load Balancing - birden fazla base URL varsa EWMA gecikme + power of two choices
+    UPSTREAM_EWMA_ALPHA: float = Field(default=0.3, gt=0, le=1)  # EWMA katsayısı - yüksek: son isteklere daha duyarlı
+    UPSTREAM_ERROR_HALF_LIFE_SECONDS: float = Field(default=30.0, gt=0)  # Hata oranı cezasının yarılanma süresi - trafik almayan endpoint zamanla tekrar denenir
+    UPSTREAM_EJECT_AFTER_FAILURES: int = Field(default=3, ge=1)  # Kaç ardışık hatada endpoint havuzdan çıkarılır
+    UPSTREAM_EJECT_SECONDS: float = Field(default=10.0, gt=0)  # İlk ejection süresi - sonra tek deneme isteğiyle geri alınır
+    UPSTREAM_EJECT_MAX_SECONDS: float = Field(default=120.0, gt=0)  # Başarısız denemelerde ikiye katlanan sürenin üst sınırı
+
+    # LLM Providers - model ID önekine göre sağlayıcı seçimi (eşleşmeyen modeller OpenRouter'a gider)
+    LLM_PROVIDERS: Dict[str, Dict[str, Any]] = Field(default_factory=dict)  # Önek -> {"type": "openai_compatible", "base_url": "http://127.0.0.1:8080/v1", "api_key": ""} veya {"type": "echo", "models": ["echo"], "chunk_delay": 0.02}
+    
+    # Streaming Timeouts - saniye, 0: sınırsız (model bazında STREAM_TIMEOUT_OVERRIDES ile değiştirilebilir)
+    STREAM_CONNECT_TIMEOUT: float = Field(default=5.0, ge=0)  # Stream isteği için bağlantı kurma timeout'u
+    STREAM_FIRST_TOKEN_TIMEOUT: float = Field(default=30.0, ge=0)  # Gönderimden ilk content parçasına (retry'lar dahil)
+    STREAM_IDLE_TIMEOUT: float = Field(default=20.0, ge=0)  # İki content parçası arası max sessizlik
+    STREAM_TOTAL_TIMEOUT: float = Field(default=300.0, ge=0)  # Stream'in toplam max süresi
+    STREAM_TIMEOUT_OVERRIDES: Dict[str, Dict[str, float]] = Field(default={})  # Model ID / "sağlayıcı/" -> {"first_token": 90, ...}
+    STREAM_CHECKPOINT_INTERVAL_MS: int = Field(default=1000, ge=0)  # Kısmi cevap en fazla bu aralıkla DB'ye yazılır (0: süreye bağlı değil)
+    STREAM_CHECKPOINT_BYTES: int = Field(default=4096, ge=0)  # Son checkpoint'ten beri bu kadar veri birikince yazılır (0: boyuta bağlı değil, ikisi de 0: checkpoint yok)
+    
+    # Model Catalog Cache - /models cevabı bellekte tutulur
+    MODEL_CATALOG_TTL_SECONDS: float = Field(default=300.0, gt=0)  # Katalog bu süre boyunca taze sayılır
+    MODEL_CATALOG_ERROR_RETRY_SECONDS: float = Field(default=10.0, gt=0)  # Başarısız fetch sonrası tekrar deneme aralığı
     
+    # Upstream Retry - geçici hatalarda (429, 502, 503, 504, bağlantı hatası) tekrar deneme
+    UPSTREAM_RETRY_MAX_ATTEMPTS: int = Field(default=3, ge=1)  # İlk deneme dahil toplam deneme sayısı
+    UPSTREAM_RETRY_BASE_DELAY: float = Field(default=0.5, ge=0)  # Exponential backoff temel süresi (saniye)
+    UPSTREAM_RETRY_MAX_DELAY: float = Field(default=8.0, ge=0)  # Backoff üst sınırı (saniye)
+    UPSTREAM_RETRY_AFTER_MAX: float = Field(default=20.0, ge=0)  # Bundan uzun Retry-After'da beklemeden hata dön
+    
+    # Circuit Breaker - model bazında, sürekli hata veren modele istek göndermeyi durdurur
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = Field(default=5, ge=1)  # Kaç ardışık hatada açılır
+    CIRCUIT_BREAKER_RESET_TIMEOUT: float = Field(default=30.0, gt=0)  # Açık kalma süresi (saniye)
+    CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS: int = Field(default=1, ge=1)  # Half-open'da izin verilen deneme isteği
+
+    # Client-side Rate Limiter - upstream'e gitmeden önce token bucket ile sınırla (0 = limitsiz)
+    RATE_LIMIT_ENABLED: bool = Field(default=True)  # Limiter açık mı?
+    RATE_LIMIT_REQUESTS_PER_MINUTE: int = Field(default=0, ge=0)  # API key başına istek/dakika
+    RATE_LIMIT_TOKENS_PER_MINUTE: int = Field(default=0, ge=0)  # API key başına (tahmini) token/dakika
+    RATE_LIMIT_FREE_MODEL_REQUESTS_PER_MINUTE: int = Field(default=20, ge=0)  # ":free" modeller için istek/dakika (OpenRouter free limiti)
+    RATE_LIMIT_MODEL_REQUESTS_PER_MINUTE: int = Field(default=0, ge=0)  # Diğer modeller için istek/dakika
+    RATE_LIMIT_MODEL_TOKENS_PER_MINUTE: int = Field(default=0, ge=0)  # Model başına token/dakika
+    RATE_LIMIT_MODEL_LIMITS: Dict[str, List[int]] = Field(default_factory=dict)  # Model bazında override - JSON: {"model/id": [rpm, tpm]}
+    RATE_LIMIT_MAX_WAIT_SECONDS: float = Field(default=10.0, ge=0)  # Kuyrukta max bekleme - aşılırsa 429 döner
+    RATE_LIMIT_MAX_QUEUE: int = Field(default=100, ge=0)  # Aynı anda kuyrukta bekleyebilecek max istek
+
+    # Admission Control - aynı anda açık upstream çağrısı (stream dahil) sınırı, aşırı yükte erken 503
+    ADMISSION_MAX_IN_FLIGHT: int = Field(default=64, ge=0)  # Process başına max eşzamanlı upstream çağrısı (0: sınırsız)
+    ADMISSION_MAX_QUEUE: int = Field(default=128, ge=0)  # Slot bekleyebilecek max istek - fazlası hemen 503
+    ADMISSION_MAX_WAIT_SECONDS: float = Field(default=5.0, ge=0)  # Kuyrukta max bekleme - aşılırsa 503
+    ADMISSION_RETRY_AFTER_SECONDS: int = Field(default=2, ge=1)  # 503 cevaplarındaki Retry-After
+
+    # Model Fallback - seçilen model ilk token'dan önce hata verirse sıradaki adaya geç
+    MODEL_FALLBACK_ENABLED: bool = Field(default=True)  # Fallback açık mı?
+    MODEL_FALLBACK_CHAINS: Dict[str, List[str]] = Field(default_factory=lambda: {"free": ["free"], "free-vision": ["free-vision"]})  # Model ID veya sınıf (free, free-vision, paid, paid-vision) -> adaylar (model ID veya sınıf)
+    MODEL_FALLBACK_MAX_CANDIDATES: int = Field(default=2, ge=0)  # Seçilen modele ek en fazla kaç aday denenir
+    MODEL_FALLBACK_ATTEMPTS_PER_CANDIDATE: int = Field(default=1, ge=1)  # Son aday dışındakiler için deneme sayısı - retry yerine hızlı geçiş
+
+    # Hedged Requests - ilk token gecikirse ikinci istek gönder, önce token üreten kazanır
+    HEDGE_ENABLED: bool = Field(default=True)  # Hedging özelliği açık mı? (kapalıysa low_latency yok sayılır)
+    HEDGE_BY_DEFAULT: bool = Field(default=False)  # True: tüm stream'ler hedge'li, False: sadece low_latency istekler
+    HEDGE_TARGET: str = Field(default="alternate")  # "alternate": fallback zincirindeki sıradaki model, "same": aynı model
+    HEDGE_DELAY_PERCENTILE: float = Field(default=95.0, gt=0, le=100)  # Hedge gecikmesi = modelin TTFT yüzdeliği
+    HEDGE_INITIAL_DELAY: float = Field(default=2.0, gt=0)  # Yeterli TTFT örneği yokken kullanılan gecikme (saniye)
+    HEDGE_MIN_DELAY: float = Field(default=0.3, ge=0)  # Hedge gecikmesi alt sınırı (saniye)
+    HEDGE_MAX_DELAY: float = Field(default=10.0, gt=0)  # Hedge gecikmesi üst sınırı (saniye)
+    HEDGE_MIN_SAMPLES: int = Field(default=20, ge=1)  # Yüzdelik hesabı için gereken min TTFT örneği
+    HEDGE_SAMPLE_WINDOW: int = Field(default=200, ge=1)  # Model başına tutulan son TTFT örneği
+    HEDGE_BUDGET_PERCENT: float = Field(default=5.0, ge=0, le=100)  # Hedge'ler trafiğin en fazla yüzde kaçı olabilir
+    HEDGE_BUDGET_BURST: float = Field(default=3.0, ge=1)  # Bütçede biriktirilebilecek max hedge hakkı
+
+    # Request Coalescing (singleflight) - eşzamanlı aynı upstream çağrıları tek istekte birleşir
+    SINGLEFLIGHT_COMPLETIONS: bool = Field(default=False)  # Non-streaming completion'larda coalescing (sadece deterministik kullanımda açın)
+
+    # Response Cache - aynı model + mesajlar + parametreler için cevabı upstream'e gitmeden dön (opt-in)
+    RESPONSE_CACHE_ENABLED: bool = Field(default=False)  # Varsayılan davranış - çağrı bazında değiştirilebilir
+    RESPONSE_CACHE_MAX_BYTES: int = Field(default=32 * 1024 * 1024, ge=0)  # Bellek katmanı toplam byte bütçesi (LRU)
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = Field(default=1024 * 1024, ge=0)  # Bundan büyük cevaplar saklanmaz
+    RESPONSE_CACHE_TTL_SECONDS: float = Field(default=86400, ge=0)  # Entry ömrü (0: süresiz)
+    RESPONSE_CACHE_DISK_PATH: str = Field(default="")  # SQLite disk katmanı dosyası (boş: sadece bellek)
+    RESPONSE_CACHE_DISK_MAX_BYTES: int = Field(default=256 * 1024 * 1024, ge=0)  # Disk katmanı toplam byte bütçesi
+
+    # Context Window - geçmiş modelin context_length'ine sığdırılır (system + en yeni mesajlar)
+    CONTEXT_WINDOW_ENABLED: bool = Field(default=True)  # Kapalıysa geçmişin tamamı gönderilir
+    CONTEXT_MAX_PROMPT_TOKENS: int = Field(default=0, ge=0)  # Sabit prompt bütçesi (0: sadece model context'i) - maliyet / gecikme sınırı
+    CONTEXT_COMPLETION_RESERVE_TOKENS: int = Field(default=1024, ge=0)  # Context'ten cevap için ayrılan token
+    CONTEXT_SAFETY_RATIO: float = Field(default=0.9, gt=0, le=1)  # Yaklaşık token sayımının hata payı - context'in bu oranı kullanılır
+
+    # Conversation Compaction - uzun sohbetlerin eski turları arka planda özetlenir ("özet + son turlar" gönderilir) (opt-in)
+    COMPACTION_ENABLED: bool = Field(default=False)  # Açılırsa sohbet içeriği COMPACTION_MODEL'e gider; kapalıysa geçmiş sadece bağlam penceresiyle kırpılır
+    COMPACTION_MODEL: str = Field(default="meta-llama/llama-3.2-3b-instruct:free")  # Özetleyen ucuz / hızlı model
+    COMPACTION_TRIGGER_TOKENS: int = Field(default=6000, ge=1)  # Özetlenmemiş geçmiş bu kadar (yaklaşık) token'ı aşınca özetle
+    COMPACTION_KEEP_RECENT_MESSAGES: int = Field(default=6, ge=0)  # Son N mesaj özetlenmez - aynen gönderilir
+    COMPACTION_MAX_INPUT_TOKENS: int = Field(default=12000, ge=1)  # Tek özetleme isteğindeki max tur token'ı - fazlası sonraki adımda
+
+    # History Cache - sohbet başına upstream'e gönderilmeye hazır geçmiş (her turda tüm mesajlar SELECT edilmez)
+    HISTORY_CACHE_ENABLED: bool = Field(default=True)  # Kapalıysa her tur geçmişi DB'den kurar
+    HISTORY_CACHE_MAX_BYTES: int = Field(default=64 * 1024 * 1024, ge=0)  # Toplam byte bütçesi (LRU)
+    HISTORY_CACHE_MAX_ENTRY_BYTES: int = Field(default=4 * 1024 * 1024, ge=0)  # Bundan büyük sohbetler (örn: çok resimli) cache'lenmez
+
+    # Batch Completions - /api/chat/batch ile toplu, eşzamanlılığı sınırlı işler
+    BATCH_DEFAULT_CONCURRENCY: int = Field(default=4, ge=1)  # İstekte verilmezse iş başına eşzamanlı upstream çağrısı
+    BATCH_MAX_CONCURRENCY: int = Field(default=16, ge=1)  # İş başına izin verilen max eşzamanlılık
+    BATCH_MAX_PROMPTS: int = Field(default=1000, ge=1)  # Bir işteki max prompt sayısı
+
     # Database Configuration - Veritabanı ayarları
     DATABASE_URL: str = Field(default="sqlite+aiosqlite:///./chat_app.db")  # Async SQLite connection string
     
+    # Persistence - mesaj / sohbet yazmaları tek writer task'ında toplanıp birlikte commit edilir (group commit)
+    PERSISTENCE_DURABILITY: str = Field(default="group")  # "sync": her yazma ayrı commit, "group": toplu commit beklenir, "async": beklenmez (write-behind)
+    PERSISTENCE_GROUP_WINDOW_MS: float = Field(default=2.0, ge=0)  # İlk yazmadan sonra aynı commit'e girecek yazmalar için bekleme penceresi
+    PERSISTENCE_GROUP_MAX_WRITES: int = Field(default=256, ge=1)  # Tek commit'teki max yazma sayısı
+    
     # OpenTelemetry Configuration - Observability ayarları
     OTEL_SERVICE_NAME: str = Field(default="madlen-chat-backend")  # Servis adı - Jaeger'da görünecek
     OTEL_TRACES_EXPORTER: str = Field(default="otlp")  # Trace export formatı
     OTEL_EXPORTER_OTLP_ENDPOINT: str = Field(default="localhost:4317")  # Jaeger collector endpoint (gRPC)
     OTEL_EXPORTER_OTLP_PROTOCOL: str = Field(default="grpc")  # OTLP protokol tipi
-    OTEL_METRICS_EXPORTER: str = Field(default="none")  # Metrics şimdilik kapalı
+    OTEL_METRICS_EXPORTER: str = Field(default="none")  # "otlp": metrikleri OTLP collector'a gönder, "none": sadece proses içi
     OTEL_LOGS_EXPORTER: str = Field(default="none")  # Logs şimdilik kapalı
     OTEL_RESOURCE_ATTRIBUTES: str = Field(default="service.version=1.0.0,deployment.environment=dev")  # Servis metadata
     
@@ -2,6 +2,7 @@
 # SQLite veritabanı için async connection setup
 
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker  # SQLAlchemy async komponentleri
+from sqlalchemy import inspect, literal, text  # Eksik sütun kontrolü, ALTER TABLE ve tipli DEFAULT için
 from sqlalchemy.orm import declarative_base  # Model sınıfları için base class
 from app.config import settings  # Ayarlarımızı import ediyoruz
 
@@ -52,9 +53,60 @@ async def init_db():
     Not: Models import edildikten sonra çalışmalı
     """
     # Modelleri import et - Base.metadata.create_all() görebilmesi için gerekli
-    from app.models import Conversation, Message  # noqa: F401 - Import kullanılmıyor gibi görünse de Base.metadata için gerekli
+    from app.models import Conversation, Message, UsageRollup, BatchJob, BatchItem, ConversationSummary  # noqa: F401 - Import kullanılmıyor gibi görünse de Base.metadata için gerekli
     
     async with engine.begin() as conn:  # Connection aç
         # Base'e bağlı tüm model tablolarını oluştur (CREATE TABLE IF NOT EXISTS)
         await conn.run_sync(Base.metadata.create_all)
+        # Mevcut tablolara sonradan eklenen sütunları ekle (create_all var olan tabloyu değiştirmez)
+        await conn.run_sync(_add_missing_columns)
 
+
+def _add_missing_columns(sync_conn) -> None:
+    """
+    Model'de olup veritabanındaki tabloda olmayan sütunları ALTER TABLE ile ekle
+    
+    Migration aracı olmadan basit şema evrimi - sadece sütun ekleme desteklenir.
+    Yeni sütunlar nullable olmalı veya server_default'a sahip olmalı (mevcut satırlar için).
+    """
+    inspector = inspect(sync_conn)
+    dialect = sync_conn.dialect
+    preparer = dialect.identifier_preparer  # Tablo / sütun adları dialect'in quoting kurallarıyla
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            parts = [
+                "ALTER TABLE", preparer.format_table(table),
+                "ADD COLUMN", preparer.format_column(column), column.type.compile(dialect=dialect),
+            ]
+            default = getattr(column.server_default, "arg", None)
+            if isinstance(default, str):  # Sabit varsayılan - mevcut satırlar bu değeri alır
+                parts += ["DEFAULT", _default_literal(column, default, dialect)]
+                if not column.nullable:
+                    parts.append("NOT NULL")
+            sync_conn.execute(text(" ".join(parts)))
+            print(f"🔧 Sütun eklendi: {table.name}.{column.name}")
+
+
+def _default_literal(column, default: str, dialect) -> str:
+    """
+    server_default'u sütunun tipiyle SQL literal'ine çevir - FLOAT sütuna '0' değil 0.0
+
+    Modellerde server_default string olarak yazılır ("0", "complete"); sayısal tiplerde değer
+    önce Python tipine çevrilir, sonra dialect'in literal render'ı ile (quoting / escaping) yazılır.
+    """
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:  # Tipin Python karşılığı yok - string olarak yaz
+        python_type = str
+    if python_type is bool:
+        value = default.strip().lower() in ("1", "true")
+    elif python_type in (int, float):
+        value = python_type(default)
+    else:
+        value = default
+    return str(literal(value, column.type).compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
@@ -14,17 +14,19 @@ class AppException(HTTPException):
         self,
         status_code: int,  # HTTP status code - 400, 404, 500 vb.
         detail: str,  # Hata mesajı - kullanıcıya gösterilecek
-        error_code: str = None  # Custom error code - frontend için (opsiyonel)
+        error_code: str = None,  # Custom error code - frontend için (opsiyonel)
+        headers: dict = None  # Response'a eklenecek header'lar - örn: Retry-After (opsiyonel)
     ):
         """
         Custom exception oluşturucu
-        
+
         Args:
             status_code: HTTP status code
             detail: Kullanıcı dostu hata mesajı
             error_code: Custom error code (örn: "CONVERSATION_NOT_FOUND")
+            headers: Ek response header'ları
         """
-        super().__init__(status_code=status_code, detail=detail)  # HTTPException'ı başlat
+        super().__init__(status_code=status_code, detail=detail, headers=headers)  # HTTPException'ı başlat
         self.error_code = error_code  # Custom error code sakla
 
 
@@ -64,6 +66,42 @@ class MessageNotFoundException(AppException):
         )
 
 
+class GenerationNotFoundException(AppException):
+    """
+    Durdurulmak istenen generation bulunamadığında fırlatılır (ID yok veya stream zaten bitti)
+    HTTP 404 Not Found
+    """
+    
+    def __init__(self, generation_id: str):
+        """
+        Args:
+            generation_id: Bulunamayan generation ID'si
+        """
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,  # 404 Not Found
+            detail=f"Generation {generation_id} bulunamadı veya zaten tamamlandı",  # Kullanıcı dostu mesaj
+            error_code="GENERATION_NOT_FOUND"  # Custom error code
+        )
+
+
+class BatchJobNotFoundException(AppException):
+    """
+    Batch işi bulunamadığında fırlatılır
+    HTTP 404 Not Found
+    """
+    
+    def __init__(self, job_id: int):
+        """
+        Args:
+            job_id: Bulunamayan batch işi ID'si
+        """
+        super().__init__(
+            status_code=status.HTTP_404_NOT_FOUND,  # 404 Not Found
+            detail=f"Batch işi {job_id} bulunamadı",  # Kullanıcı dostu mesaj
+            error_code="BATCH_JOB_NOT_FOUND"  # Custom error code
+        )
+
+
 class OpenRouterAPIException(AppException):
     """
     OpenRouter API hatası - AI servisi ile iletişimde sorun olduğunda
@@ -99,3 +137,42 @@ class ValidationException(AppException):
             error_code="VALIDATION_ERROR"  # Custom error code
         )
 
+
+class RateLimitExceededException(AppException):
+    """
+    Client-side rate limit aşıldı - istek upstream'e gönderilmeden reddedildi
+    HTTP 429 Too Many Requests (+ Retry-After header'ı)
+    """
+    
+    def __init__(self, retry_after: float):
+        """
+        Args:
+            retry_after: Tekrar denemeden önce beklenmesi önerilen süre (saniye)
+        """
+        seconds = int(retry_after) + 1  # Yukarı yuvarla - client erken denemesin
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,  # 429 Too Many Requests
+            detail=f"Çok fazla istek gönderildi. Lütfen {seconds} saniye sonra tekrar deneyin.",  # Kullanıcı dostu mesaj
+            error_code="RATE_LIMIT_EXCEEDED",  # Custom error code
+            headers={"Retry-After": str(seconds)}  # Standart HTTP header - client ne kadar bekleyeceğini bilsin
+        )
+
+
+class ServiceOverloadedException(AppException):
+    """
+    Aşırı yük - upstream slotu yok ve admission kuyruğu dolu / bekleme bütçesi aşıldı
+    HTTP 503 Service Unavailable (+ Retry-After header'ı)
+    """
+    
+    def __init__(self, retry_after: float):
+        """
+        Args:
+            retry_after: Tekrar denemeden önce beklenmesi önerilen süre (saniye)
+        """
+        seconds = max(1, int(retry_after))  # En az 1 saniye
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,  # 503 Service Unavailable
+            detail=f"Sunucu şu an yoğun. Lütfen {seconds} saniye sonra tekrar deneyin.",  # Kullanıcı dostu mesaj
+            error_code="SERVICE_OVERLOADED",  # Custom error code
+            headers={"Retry-After": str(seconds)}  # Standart HTTP header - client ne kadar bekleyeceğini bilsin
+        )
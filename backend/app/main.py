@@ -25,10 +25,39 @@ async def lifespan(app: FastAPI):
     await init_db()  # Veritabanı tablolarını oluştur
     print("✅ Veritabanı hazır")  # Başarı mesajı
     
+    # Mesaj / sohbet yazmaları tek writer task'ı üzerinden (group commit) - ID sayaçları DB'den başlar
+    # Aynı DB'nin writer'ı başka process'teyse burada durur - recovery onun süren stream'lerine dokunmasın
+    from app.services.persistence import persistence
+    await persistence.start()
+    
+    # Önceki process çökerken üretilen cevaplar "streaming" kaldı - kısmi içerik korunur, durum düzeltilir
+    from app.database import AsyncSessionLocal  # Açılış işleri için session
+    from app.services.stream_checkpoint import recover_interrupted_streams
+    async with AsyncSessionLocal() as db:
+        await recover_interrupted_streams(db)
+    
+    # Paylaşılan OpenRouter HTTP client'ını aç - bağlantı havuzu tüm istekler arasında paylaşılır
+    from app.services.openrouter import openrouter_service  # OpenRouter servisi
+    await openrouter_service.start()
+    
+    # Model kataloğunu arka planda ısıt - ilk sayfa yüklemesi upstream'i beklemesin
+    import asyncio  # Arka plan task'ı için
+    catalog_warmup = asyncio.create_task(openrouter_service.catalog.refresh())
+    
+    # Restart öncesi yarım kalan batch işlerini devam ettir - sadece bekleyen prompt'lar çalışır
+    from app.services.batch import batch_runner  # Batch işleri
+    await batch_runner.resume()
+    
     yield  # Uygulama çalışır (bu satır arasında)
     
     # Shutdown - Uygulama kapanırken yapılacaklar
     print("Uygulama kapatılıyor")  # Kapanış mesajı
+    catalog_warmup.cancel()  # Hâlâ sürüyorsa ısıtmayı iptal et
+    await batch_runner.close()  # Çalışan işleri durdur - "running" kalır, sonraki açılışta devam eder
+    from app.services.compaction import compaction_service  # Arka plan sohbet özetleri
+    await compaction_service.close()  # Süren özetlemeleri durdur - sonraki turda tekrar tetiklenir
+    await persistence.close()  # Kuyruktaki yazmaları commit et - write-behind kayıp olmasın
+    await openrouter_service.close()  # Havuzdaki bağlantıları düzgünce kapat
 
 
 # FastAPI uygulaması oluştur
@@ -60,16 +89,19 @@ app.add_middleware(
     allow_credentials=True,  # Cookie ve authentication header'larına izin ver
     allow_methods=["*"],  # Tüm HTTP methodlarına izin ver (GET, POST, PUT, DELETE, vb.)
     allow_headers=["*"],  # Tüm header'lara izin ver
-    expose_headers=["X-Conversation-Id"],  # Custom header'ları frontend'e expose et - browser okuyabilsin
+    expose_headers=["X-Conversation-Id", "X-Next-Cursor", "X-Total-Count", "X-Model-Used", "X-Generation-Id"],  # Custom header'ları frontend'e expose et - browser okuyabilsin
 )
 
 
 # Router'ları ekle - API endpoint'leri
-from app.routers import models_router, chat_router, conversations_router  # Router'ları import et
+from app.routers import models_router, chat_router, conversations_router, admin_router, usage_router, batch_router  # Router'ları import et
 
 app.include_router(models_router)  # Models router'ı ekle - /api/models endpoint'leri
 app.include_router(chat_router)  # Chat router'ı ekle - /api/chat endpoint'leri
 app.include_router(conversations_router)  # Conversations router'ı ekle - /api/conversations endpoint'leri
+app.include_router(admin_router)  # Admin router'ı ekle - /api/admin endpoint'leri
+app.include_router(usage_router)  # Usage router'ı ekle - /api/usage endpoint'leri
+app.include_router(batch_router)  # Batch router'ı ekle - /api/chat/batch endpoint'leri
 
 
 # Root Endpoint - Temel sağlık kontrolü
@@ -93,12 +125,18 @@ async def health_check():
     Sağlık kontrolü endpoint'i
     Uygulamanın ve bağlantıların durumunu kontrol eder
     """
+    from app.services.openrouter import openrouter_service  # OpenRouter servisi - pool istatistikleri için
+    from app.services.batch import batch_runner  # Batch işleri
+    
     return {
         "status": "healthy",  # Genel durum
         "service": settings.OTEL_SERVICE_NAME,  # Servis adı
         "environment": settings.ENV,  # Ortam
         "database": "connected",  # Database durumu (basitleştirilmiş)
         "openrouter": "configured" if settings.OPENROUTER_API_KEY else "not_configured",  # OpenRouter durumu
+        "openrouter_pool": openrouter_service.get_pool_stats(),  # Bağlantı havuzu kullanımı
+        "model_catalog": openrouter_service.catalog.get_stats(),  # Katalog cache durumu
+        "batch": batch_runner.get_stats(),  # Çalışan batch işleri
     }
 
 
@@ -4,6 +4,9 @@
 # Modelleri import et - database.py'nin Base.metadata.create_all() görebilmesi için
 from app.models.conversation import Conversation  # Conversation modelini import et
 from app.models.message import Message  # Message modelini import et
+from app.models.usage_rollup import UsageRollup  # Günlük kullanım özeti modelini import et
+from app.models.batch import BatchJob, BatchItem  # Toplu completion modellerini import et
+from app.models.conversation_summary import ConversationSummary  # Sohbet özeti checkpoint modelini import et
 
 # Public API - bu paketten import edilebilecek sınıflar
-__all__ = ["Conversation", "Message"]  # from app.models import * yapıldığında bunlar import edilir
+__all__ = ["Conversation", "Message", "UsageRollup", "BatchJob", "BatchItem", "ConversationSummary"]  # from app.models import * yapıldığında bunlar import edilir
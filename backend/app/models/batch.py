@@ -0,0 +1,90 @@
+# batch.py - BatchJob ve BatchItem veritabanı modelleri
+# Toplu completion işleri (değerlendirme setleri, toplu özetleme) ve her prompt'un sonucu
+# Sonuçlar tamamlandıkça yazılır - restart sonrası sadece bekleyen prompt'lar tekrar çalışır
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, UniqueConstraint  # SQLAlchemy veri tipleri
+from sqlalchemy.orm import relationship  # İlişkiler için (BatchJob -> BatchItems)
+from sqlalchemy.sql import func  # SQL fonksiyonları (CURRENT_TIMESTAMP için)
+from app.database import Base  # Base class - tüm modeller bundan türer
+
+
+class BatchJob(Base):
+    """
+    BatchJob Model - Bir toplu completion işi
+    Durum: "running" (çalışıyor / restart sonrası devam edecek), "completed", "cancelled",
+    "failed" (beklenmeyen hata - bekleyen prompt'lar çalıştırılmaz)
+    """
+
+    __tablename__ = "batch_jobs"  # Tablo adı
+
+    # Sütunlar (Columns)
+    id = Column(Integer, primary_key=True, index=True)  # Birincil anahtar - otomatik artan ID
+    model = Column(String, nullable=False)  # İstenen model (fallback devreye girerse item'da farklı olabilir)
+    status = Column(String, nullable=False, default="running")  # running / completed / cancelled / failed
+    concurrency = Column(Integer, nullable=False)  # Aynı anda upstream'e giden max istek
+    total = Column(Integer, nullable=False)  # Toplam prompt sayısı
+    completed_count = Column(Integer, nullable=False, default=0)  # Başarıyla biten prompt sayısı
+    failed_count = Column(Integer, nullable=False, default=0)  # Hata ile biten prompt sayısı
+    created_at = Column(
+        DateTime(timezone=True),  # Tarih-saat sütunu - timezone bilgisi ile
+        server_default=func.now(),  # Kayıt oluşturulurken otomatik şu anki zaman
+        nullable=False  # NULL olamaz
+    )  # Oluşturulma zamanı
+    finished_at = Column(DateTime(timezone=True), nullable=True)  # Tamamlanma / iptal zamanı
+
+    # İlişkiler (Relationships)
+    items = relationship(
+        "BatchItem",  # İlişkili model
+        back_populates="job",  # Ters ilişki - BatchItem.job
+        cascade="all, delete-orphan"  # İş silinince prompt'ları da sil
+    )  # Bu işin prompt'ları
+
+    def __repr__(self):
+        """
+        Model'in string temsili - debug için yararlı
+        Örnek: <BatchJob id=1 status=running 12/300>
+        """
+        return f"<BatchJob id={self.id} status={self.status} {self.completed_count + self.failed_count}/{self.total}>"
+
+
+class BatchItem(Base):
+    """
+    BatchItem Model - Toplu işteki tek prompt ve sonucu
+    Durum: "pending" (henüz bitmedi), "completed", "failed"
+    """
+
+    __tablename__ = "batch_items"  # Tablo adı
+    __table_args__ = (UniqueConstraint("job_id", "item_index"),)  # İş içinde her index bir kez
+
+    # Sütunlar (Columns)
+    id = Column(Integer, primary_key=True, index=True)  # Birincil anahtar - otomatik artan ID
+    job_id = Column(
+        Integer,  # Tamsayı tipi
+        ForeignKey("batch_jobs.id", ondelete="CASCADE"),  # İş silinince prompt'lar da silinir
+        nullable=False,  # Her prompt bir işe ait olmalı
+        index=True  # İşin prompt'larını hızlı bulmak için
+    )  # Ait olduğu işin ID'si
+    item_index = Column(Integer, nullable=False)  # İstekteki sırası (0'dan başlar) - sonuçlar bununla eşleşir
+    messages = Column(Text, nullable=False)  # Upstream'e gönderilecek mesajlar (JSON)
+    status = Column(String, nullable=False, default="pending")  # pending / completed / failed
+    content = Column(Text, nullable=True)  # AI cevabı (completed)
+    error = Column(Text, nullable=True)  # Kullanıcı dostu hata mesajı (failed)
+    model_used = Column(String, nullable=True)  # Cevabı veren model (fallback olabilir)
+    prompt_tokens = Column(Integer, nullable=True)  # Gönderilen prompt token sayısı
+    completion_tokens = Column(Integer, nullable=True)  # Üretilen token sayısı
+    cost = Column(Float, nullable=True)  # Maliyet ($)
+    latency_ms = Column(Integer, nullable=True)  # Upstream çağrısının süresi (ms)
+    completed_at = Column(DateTime(timezone=True), nullable=True)  # Sonucun yazıldığı zaman
+
+    # İlişkiler (Relationships)
+    job = relationship(
+        "BatchJob",  # İlişkili model
+        back_populates="items"  # Ters ilişki - BatchJob.items
+    )  # Bu prompt'un ait olduğu iş
+
+    def __repr__(self):
+        """
+        Model'in string temsili - debug için yararlı
+        Örnek: <BatchItem job_id=1 index=3 status=completed>
+        """
+        return f"<BatchItem job_id={self.job_id} index={self.item_index} status={self.status}>"
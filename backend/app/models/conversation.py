@@ -1,7 +1,7 @@
 # conversation.py - Conversation (Sohbet) veritabanı modeli
 # Bu tablo tüm sohbet oturumlarını saklar
 
-from sqlalchemy import Column, Integer, String, DateTime  # SQLAlchemy veri tipleri
+from sqlalchemy import Column, Integer, String, DateTime, Float  # SQLAlchemy veri tipleri
 from sqlalchemy.orm import relationship  # İlişkiler için (Conversation -> Messages)
 from sqlalchemy.sql import func  # SQL fonksiyonları (CURRENT_TIMESTAMP için)
 from app.database import Base  # Base class - tüm modeller bundan türer
@@ -25,6 +25,12 @@ class Conversation(Base):
         nullable=False  # NULL olamaz
     )  # Oluşturulma zamanı - otomatik atanır
     
+    # Kullanım toplamları - her cevap kaydedilirken artırılır (mesaj tablosu taranmaz)
+    # Silinen / düzenlenen mesajların harcaması da dahildir
+    prompt_tokens = Column(Integer, nullable=False, default=0, server_default="0")  # Toplam prompt token
+    completion_tokens = Column(Integer, nullable=False, default=0, server_default="0")  # Toplam completion token
+    cost = Column(Float, nullable=False, default=0.0, server_default="0")  # Toplam maliyet ($)
+    
     # İlişkiler (Relationships)
     messages = relationship(
         "Message",  # İlişkili model - Message modeliyle bağlantı (string olarak - henüz import edilmedi)
@@ -32,6 +38,12 @@ class Conversation(Base):
         cascade="all, delete-orphan"  # Cascade işlemi - conversation silinince tüm messages'ları da sil
     )  # Bu conversation'a ait tüm mesajlar
     
+    summaries = relationship(
+        "ConversationSummary",  # Özet checkpoint'leri (app/services/compaction.py)
+        back_populates="conversation",  # Ters ilişki - ConversationSummary.conversation
+        cascade="all, delete-orphan"  # Conversation silinince özetleri de sil
+    )  # Bu conversation'ın özetleri
+    
     def __repr__(self):
         """
         Model'in string temsili - debug için yararlı
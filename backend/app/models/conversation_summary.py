@@ -0,0 +1,52 @@
+# conversation_summary.py - ConversationSummary (sohbet özeti checkpoint'i) veritabanı modeli
+# Uzun sohbetlerin eski turları arka planda ucuz bir modelle özetlenir (app/services/compaction.py)
+# Upstream'e "özet + özetin kapsamadığı son turlar" gönderilir - prompt maliyeti O(son turlar)
+
+from sqlalchemy import Column, Integer, String, Text, DateTime, Float, ForeignKey, UniqueConstraint  # SQLAlchemy veri tipleri
+from sqlalchemy.orm import relationship  # İlişkiler için (ConversationSummary -> Conversation)
+from sqlalchemy.sql import func  # SQL fonksiyonları (CURRENT_TIMESTAMP için)
+from app.database import Base  # Base class - tüm modeller bundan türer
+
+
+class ConversationSummary(Base):
+    """
+    ConversationSummary Model - Sohbetin last_message_id'ye kadarki kısmının özeti
+    Her yeni özet bir öncekini de kapsar (rolling summary); geçerli olan en büyük last_message_id'li satırdır
+    """
+
+    __tablename__ = "conversation_summaries"  # Tablo adı
+    __table_args__ = (UniqueConstraint("conversation_id", "last_message_id"),)  # Aynı aralık iki kez özetlenmez (idempotent)
+
+    # Sütunlar (Columns)
+    id = Column(Integer, primary_key=True, index=True)  # Birincil anahtar - otomatik artan ID
+    conversation_id = Column(
+        Integer,  # Tamsayı tipi
+        ForeignKey("conversations.id", ondelete="CASCADE"),  # Conversation silinince özetleri de silinir
+        nullable=False,  # NULL olamaz
+        index=True  # Index oluştur - son özetin okunması için
+    )  # Özetlenen sohbet
+    last_message_id = Column(Integer, nullable=False)  # Özetin kapsadığı son mesajın ID'si (dahil)
+    content = Column(Text, nullable=False)  # Özet metni
+    message_count = Column(Integer, nullable=False)  # Kapsanan toplam mesaj sayısı (önceki özetler dahil)
+    model_name = Column(String, nullable=True)  # Özeti üreten model (fallback olabilir)
+    prompt_tokens = Column(Integer, nullable=True)  # Özetleme isteğinin prompt token'ı
+    completion_tokens = Column(Integer, nullable=True)  # Özetin token sayısı
+    cost = Column(Float, nullable=True)  # Özetleme maliyeti ($)
+    created_at = Column(
+        DateTime(timezone=True),  # Tarih-saat sütunu - timezone bilgisi ile
+        server_default=func.now(),  # Kayıt oluşturulurken otomatik şu anki zaman
+        nullable=False  # NULL olamaz
+    )  # Oluşturulma zamanı
+
+    # İlişkiler (Relationships)
+    conversation = relationship(
+        "Conversation",  # İlişkili model
+        back_populates="summaries"  # Ters ilişki - Conversation.summaries
+    )  # Özetin ait olduğu conversation
+
+    def __repr__(self):
+        """
+        Model'in string temsili - debug için yararlı
+        Örnek: <ConversationSummary conversation_id=1 last_message_id=42>
+        """
+        return f"<ConversationSummary conversation_id={self.conversation_id} last_message_id={self.last_message_id}>"
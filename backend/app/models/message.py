@@ -1,7 +1,7 @@
 # message.py - Message (Mesaj) veritabanı modeli
 # Bu tablo tüm sohbet mesajlarını saklar (hem kullanıcı hem AI mesajları)
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey  # SQLAlchemy veri tipleri
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Float  # SQLAlchemy veri tipleri
 from sqlalchemy.orm import relationship  # İlişkiler için (Message -> Conversation)
 from sqlalchemy.sql import func  # SQL fonksiyonları (CURRENT_TIMESTAMP için)
 from app.database import Base  # Base class - tüm modeller bundan türer
@@ -45,6 +45,21 @@ class Message(Base):
         nullable=True  # NULL olabilir - her mesajda resim olmayabilir
     )  # Resim URL'i veya base64 string - vision model'ler için (opsiyonel)
     
+    status = Column(
+        String,  # String tipi
+        nullable=False,  # NULL olamaz
+        default="complete",  # Python tarafı varsayılan
+        server_default="complete"  # Mevcut satırlar (ALTER TABLE ile eklenince) de "complete" olur
+    )  # Cevabın durumu: "streaming" (üretiliyor - kısmi içerik checkpoint'i), "complete" (tam),
+    #   "truncated" (durduruldu / client ayrıldı / process çöktü) veya "error" (timeout / bağlantı koptu)
+    
+    # Kullanım ve maliyet - sadece assistant mesajlarında dolu (upstream usage göndermediyse NULL)
+    prompt_tokens = Column(Integer, nullable=True)  # Gönderilen prompt token sayısı
+    completion_tokens = Column(Integer, nullable=True)  # Üretilen token sayısı
+    cost = Column(Float, nullable=True)  # Maliyet ($) - OpenRouter'ın bildirdiği veya katalog fiyatından hesaplanan
+    latency_ms = Column(Integer, nullable=True)  # İstekten cevabın tamamlanmasına kadar geçen süre (ms)
+    ttft_ms = Column(Integer, nullable=True)  # İstekten ilk token'a kadar geçen süre (ms) - sadece streaming
+    
     timestamp = Column(
         DateTime(timezone=True),  # Tarih-saat sütunu - timezone bilgisi ile
         server_default=func.now(),  # Varsayılan değer - kayıt oluşturulurken otomatik şu anki zaman
@@ -0,0 +1,35 @@
+# usage_rollup.py - UsageRollup (günlük kullanım özeti) veritabanı modeli
+# Her (gün, model) çifti için tek satır - cevaplar kaydedilirken artırılır
+# /api/usage raporları bu tablodan okunur, messages tablosu taranmaz
+
+from sqlalchemy import Column, Integer, String, Float  # SQLAlchemy veri tipleri
+from app.database import Base  # Base class - tüm modeller bundan türer
+
+
+class UsageRollup(Base):
+    """
+    UsageRollup Model - Model başına günlük kullanım toplamları
+    Satırlar INSERT ... ON CONFLICT DO UPDATE ile artırılır (app/services/usage.py)
+    """
+
+    __tablename__ = "usage_rollups"  # Tablo adı
+
+    # Sütunlar (Columns) - (day, model) birleşik birincil anahtar
+    day = Column(String, primary_key=True)  # UTC gün - "YYYY-MM-DD"
+    model = Column(String, primary_key=True)  # Cevabı veren model (fallback olabilir)
+    requests = Column(Integer, nullable=False, default=0)  # Cevap sayısı
+    cached_requests = Column(Integer, nullable=False, default=0)  # Cache / coalescing ile upstream'e gitmeyenler
+    truncated_requests = Column(Integer, nullable=False, default=0)  # Yarıda kesilen cevaplar
+    prompt_tokens = Column(Integer, nullable=False, default=0)  # Toplam prompt token
+    completion_tokens = Column(Integer, nullable=False, default=0)  # Toplam completion token
+    cost = Column(Float, nullable=False, default=0.0)  # Toplam maliyet ($)
+    latency_ms_total = Column(Integer, nullable=False, default=0)  # Ortalama gecikme için toplam (ms)
+    ttft_ms_total = Column(Integer, nullable=False, default=0)  # Ortalama TTFT için toplam (ms)
+    ttft_samples = Column(Integer, nullable=False, default=0)  # TTFT ölçülen cevap sayısı (streaming)
+
+    def __repr__(self):
+        """
+        Model'in string temsili - debug için yararlı
+        Örnek: <UsageRollup day=2024-01-01 model=openai/gpt-4o requests=12>
+        """
+        return f"<UsageRollup day={self.day} model={self.model} requests={self.requests}>"
@@ -4,6 +4,9 @@
 from app.routers.models import router as models_router  # Models router'ı import et
 from app.routers.chat import router as chat_router  # Chat router'ı import et
 from app.routers.conversations import router as conversations_router  # Conversations router'ı import et
+from app.routers.admin import router as admin_router  # Admin router'ı import et
+from app.routers.usage import router as usage_router  # Usage router'ı import et
+from app.routers.batch import router as batch_router  # Batch router'ı import et
 
 # Public API - bu paketten import edilebilecek router'lar
-__all__ = ["models_router", "chat_router", "conversations_router"]  # Export edilen router'lar
+__all__ = ["models_router", "chat_router", "conversations_router", "admin_router", "usage_router", "batch_router"]  # Export edilen router'lar
@@ -0,0 +1,211 @@
+# admin.py - Operasyonel (admin) API endpoint'leri
+# Upstream dayanıklılık katmanının durumunu izleme ve müdahale
+
+from fastapi import APIRouter  # FastAPI routing
+from typing import List, Dict, Any  # Type hints
+from app.services.openrouter import openrouter_service  # OpenRouter servisi
+from app.services.admission import admission  # Global admission control
+from app.services.history_cache import history_cache  # Sohbet geçmişi cache'i
+from app.services.compaction import compaction_service  # Sohbet özetleme istatistikleri
+from app.services.persistence import persistence  # Group commit writer'ı
+from app.exceptions import ValidationException  # Custom exception
+
+
+# Router oluştur - tüm admin endpoint'leri /api/admin prefix'i ile
+router = APIRouter(
+    prefix="/api/admin",  # URL prefix - örn: /api/admin/circuit-breakers
+    tags=["admin"]  # Swagger'da gruplandırma için tag
+)
+
+
+@router.get("/circuit-breakers", response_model=List[Dict[str, Any]])
+async def get_circuit_breakers():
+    """
+    Model bazındaki circuit breaker'ların durumunu listele
+    
+    Açık (open) breaker'lar en üstte döner. Breaker'lar bir modele
+    ilk istek gönderildiğinde oluşturulur.
+    
+    Returns:
+        List[Dict]: Breaker durumları
+        Örnek:
+        [
+            {
+                "model": "mistralai/mistral-7b-instruct:free",
+                "state": "open",
+                "consecutive_failures": 5,
+                "retry_in_seconds": 12.4,
+                "total_failures": 7,
+                "total_rejections": 3
+            }
+        ]
+    """
+    return openrouter_service.breakers.snapshot_all()
+
+
+@router.post("/circuit-breakers/{model_id:path}/reset", response_model=Dict[str, Any])
+async def reset_circuit_breaker(
+    model_id: str  # URL'den gelen model ID - "/" içerdiği için path converter
+):
+    """
+    Bir modelin circuit breaker'ını elle kapat
+    
+    Upstream'in düzeldiği biliniyorsa reset_timeout'u beklemeden trafiği açar.
+    
+    Args:
+        model_id: Model ID - örn: openai/gpt-4o
+        
+    Returns:
+        Dict: Breaker'ın yeni durumu
+    """
+    breaker = openrouter_service.breakers.find(model_id)
+    if breaker is None:
+        raise ValidationException(f"Bu model için circuit breaker yok: {model_id}")
+    
+    breaker.reset()  # Closed durumuna al
+    return breaker.snapshot()
+
+
+@router.get("/rate-limits", response_model=Dict[str, Any])
+async def get_rate_limits():
+    """
+    Client-side rate limiter durumu
+    
+    Kuyrukta bekleyen istek sayısı, kabul/red sayaçları ve model bazındaki
+    bucket'ların kalan hakkı döner.
+    
+    Returns:
+        Dict: Limiter istatistikleri
+    """
+    return openrouter_service.rate_limiter.get_stats()
+
+
+@router.get("/hedging", response_model=Dict[str, Any])
+async def get_hedging_stats():
+    """
+    Hedged request durumu
+    
+    Hedge bütçesi, sonuç sayaçları (hedge kazandı / birincil kazandı / gerek kalmadı)
+    ve model bazında TTFT yüzdelikleri ile hesaplanan hedge gecikmeleri döner.
+    
+    Returns:
+        Dict: Hedging istatistikleri
+    """
+    return {
+        "budget": openrouter_service.hedge_budget.snapshot(),
+        "outcomes": dict(openrouter_service.hedge_outcomes),
+        "ttft": openrouter_service.ttft.snapshot(),
+    }
+
+
+@router.get("/providers", response_model=Dict[str, Any])
+async def get_providers():
+    """
+    LLM sağlayıcıları ve upstream endpoint havuzları
+    
+    Her sağlayıcının model öneki ve (HTTP sağlayıcıları için) endpoint bazında EWMA gecikme,
+    EWMA hata oranı, bekleyen istek sayısı ve havuz durumu (healthy / ejected / probing) döner.
+    
+    Returns:
+        Dict: Varsayılan sağlayıcı ve önek -> sağlayıcı istatistikleri
+    """
+    return openrouter_service.providers.get_stats()
+
+
+@router.get("/admission", response_model=Dict[str, Any])
+async def get_admission_stats():
+    """
+    Global admission control durumu
+    
+    Slot tutan upstream çağrısı sayısı, kuyruk derinliği (interaktif ve batch), kabul edilen /
+    kuyrukta bekleyerek kabul edilen istekler ve sebebe göre (queue_full, wait_timeout)
+    503 ile reddedilen istek sayıları döner.
+    
+    Returns:
+        Dict: Admission istatistikleri
+    """
+    return admission.get_stats()
+
+
+@router.get("/singleflight", response_model=List[Dict[str, Any]])
+async def get_singleflight_stats():
+    """
+    Request coalescing (singleflight) istatistikleri
+    
+    Katalog fetch'i ve (SINGLEFLIGHT_COMPLETIONS açıksa) non-streaming completion'lar için
+    upstream'e giden (leaders), mevcut çağrıya eklenen (shared) ve tüm bekleyenler
+    gittiği için iptal edilen (cancelled) çağrı sayıları döner.
+    
+    Returns:
+        List[Dict]: Her coalescing grubu için istatistik
+    """
+    return [
+        openrouter_service.catalog.flight.get_stats(),
+        openrouter_service.completion_flight.get_stats(),
+    ]
+
+
+@router.get("/response-cache", response_model=Dict[str, Any])
+async def get_response_cache_stats():
+    """
+    Cevap cache'i durumu
+    
+    Bellek / disk katmanlarının doluluğu, katman bazında hit sayıları, miss, eviction
+    ve boyut limiti yüzünden saklanmayan cevap sayısı döner.
+    
+    Returns:
+        Dict: Cache istatistikleri
+    """
+    return openrouter_service.response_cache.get_stats()
+
+
+@router.delete("/response-cache", status_code=204)
+async def clear_response_cache():
+    """
+    Cevap cache'ini boşalt (bellek + disk)
+    
+    Prompt şablonu veya model davranışı değiştiğinde eski cevapları atmak için.
+    """
+    await openrouter_service.response_cache.clear()
+
+
+@router.get("/history-cache", response_model=Dict[str, Any])
+async def get_history_cache_stats():
+    """
+    Sohbet geçmişi cache'i durumu
+    
+    Cache'teki sohbet sayısı, kullanılan byte, hit / miss sayıları ve hit oranı,
+    LRU ile atılan ve düzenleme / silme ile geçersiz kılınan girdiler döner.
+    
+    Returns:
+        Dict: Cache istatistikleri
+    """
+    return history_cache.get_stats()
+
+
+@router.get("/compaction", response_model=Dict[str, Any])
+async def get_compaction_stats():
+    """
+    Sohbet özetleme (compaction) durumu
+    
+    Özetleyen model, çalışan task sayısı, kaydedilen checkpoint'ler, özetlenen mesaj sayısı,
+    düzenleme / silme nedeniyle atılan ve başarısız olan özetlemeler döner.
+    
+    Returns:
+        Dict: Compaction istatistikleri
+    """
+    return compaction_service.get_stats()
+
+
+@router.get("/persistence", response_model=Dict[str, Any])
+async def get_persistence_stats():
+    """
+    Mesaj yazma (write-behind / group commit) durumu
+    
+    Dayanıklılık modu, kuyrukta bekleyen yazmalar, commit başına ortalama / en büyük yazma sayısı
+    ve başarısız yazmalar döner. avg_batch_size 1'e yakınsa commit'ler gruplanmıyor demektir.
+    
+    Returns:
+        Dict: Persistence istatistikleri
+    """
+    return persistence.get_stats()
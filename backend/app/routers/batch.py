@@ -0,0 +1,170 @@
+# batch.py - Toplu completion (batch) API endpoint'leri
+# Offline işler için: yüzlerce prompt tek istekte, sonuçlar bittikçe NDJSON olarak
+
+import json  # NDJSON satırları
+from fastapi import APIRouter, status  # FastAPI routing ve status kodları
+from fastapi.responses import StreamingResponse  # Sonuç stream'i için
+from pydantic import BaseModel, Field, validator  # Request model validasyonu
+from typing import Any, Dict, List, Optional, Union  # Type hints
+from app.config import settings  # Batch limitleri
+from app.services.batch import batch_runner, job_summary  # İş kaydı ve çalıştırıcı
+from app.exceptions import BatchJobNotFoundException, ValidationException  # Custom exception'lar
+
+
+# Router oluştur - tüm batch endpoint'leri /api/chat/batch prefix'i ile
+router = APIRouter(
+    prefix="/api/chat/batch",  # URL prefix - örn: /api/chat/batch/1/results
+    tags=["batch"]  # Swagger'da gruplandırma için tag
+)
+
+
+# Request Models
+class BatchRequest(BaseModel):
+    """
+    Toplu completion isteği
+
+    Her prompt birbirinden bağımsızdır (sohbet geçmişi paylaşılmaz):
+    - string: tek kullanıcı mesajı
+    - liste: OpenRouter formatında tam mesaj listesi (few-shot, çok turlu değerlendirme)
+    """
+    model: str = Field(
+        ...,  # Zorunlu field
+        min_length=1,  # Minimum 1 karakter
+        description="Kullanılacak AI model ID'si"
+    )
+    prompts: List[Union[str, List[Dict[str, Any]]]] = Field(
+        ...,  # Zorunlu field
+        min_items=1,  # En az bir prompt
+        description="Prompt listesi - string veya mesaj listesi"
+    )
+    system_prompt: Optional[str] = Field(
+        None,  # Opsiyonel
+        max_length=10000,  # Maximum 10000 karakter
+        description="Tüm prompt'ların başına eklenen system mesajı"
+    )
+    concurrency: Optional[int] = Field(
+        None,  # Verilmezse BATCH_DEFAULT_CONCURRENCY
+        ge=1,  # En az 1
+        description="Aynı anda upstream'e giden max istek"
+    )
+
+    @validator('model')
+    def model_must_be_valid(cls, v):
+        """
+        Model validation - format kontrolü
+        """
+        if not v or not v.strip():  # Boş veya sadece boşluk
+            raise ValidationException("Model adı boş olamaz")
+        if "/" not in v:  # Model ID formatı kontrolü
+            raise ValidationException("Geçersiz model formatı")
+        return v.strip()  # Baş ve son boşlukları temizle
+
+    @validator('prompts')
+    def prompts_must_be_valid(cls, v):
+        """
+        Prompt validation - sayı limiti ve boş prompt kontrolü
+        """
+        if len(v) > settings.BATCH_MAX_PROMPTS:
+            raise ValidationException(f"Bir işte en fazla {settings.BATCH_MAX_PROMPTS} prompt olabilir")
+        for index, prompt in enumerate(v):
+            if isinstance(prompt, str) and not prompt.strip():
+                raise ValidationException(f"Prompt {index} boş olamaz")
+            if isinstance(prompt, list) and not all(isinstance(m, dict) and "role" in m and "content" in m for m in prompt):
+                raise ValidationException(f"Prompt {index} geçersiz - mesajlarda role ve content olmalı")
+            if isinstance(prompt, list) and not prompt:
+                raise ValidationException(f"Prompt {index} boş olamaz")
+        return v
+
+    @validator('concurrency')
+    def concurrency_within_limit(cls, v):
+        """
+        Eşzamanlılık validation - sunucu limitini aşamaz
+        """
+        if v is not None and v > settings.BATCH_MAX_CONCURRENCY:
+            raise ValidationException(f"Eşzamanlılık en fazla {settings.BATCH_MAX_CONCURRENCY} olabilir")
+        return v
+
+    def to_messages(self) -> List[List[Dict[str, Any]]]:
+        """Her prompt'u upstream mesaj listesine çevir (system_prompt başa eklenir)"""
+        prefix = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        return [
+            prefix + ([{"role": "user", "content": prompt.strip()}] if isinstance(prompt, str) else prompt)
+            for prompt in self.prompts
+        ]
+
+
+@router.post("", status_code=status.HTTP_202_ACCEPTED, response_model=Dict[str, Any])
+async def create_batch(request: BatchRequest):
+    """
+    Toplu completion işi başlat
+
+    Prompt'lar veritabanına yazılır ve arka planda concurrency kadar worker ile çalıştırılır.
+    Rate limiter tüm trafikle paylaşılır; kuyruk dolarsa prompt beklemeye alınır, başarısız sayılmaz.
+    Sonuçlar GET /api/chat/batch/{id}/results ile bittikçe alınır.
+
+    Args:
+        request: Model, prompt'lar, opsiyonel system prompt ve eşzamanlılık
+
+    Returns:
+        Dict: İş durumu (id, total, status, ...)
+    """
+    concurrency = request.concurrency or min(settings.BATCH_DEFAULT_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+    job = await batch_runner.submit(request.model, request.to_messages(), concurrency)
+    return job_summary(job)
+
+
+@router.get("/{job_id}", response_model=Dict[str, Any])
+async def get_batch(job_id: int):
+    """
+    İş durumu - tamamlanan / başarısız / bekleyen prompt sayıları
+
+    Raises:
+        BatchJobNotFoundException: İş yok (404)
+    """
+    job = await batch_runner.get_job(job_id)
+    if job is None:
+        raise BatchJobNotFoundException(job_id)  # 404
+    return job_summary(job)
+
+
+@router.get("/{job_id}/results")
+async def stream_batch_results(job_id: int):
+    """
+    Sonuçları NDJSON olarak stream et - bitiş sırasıyla, her satırda prompt index'i
+
+    Önce kaydedilmiş sonuçlar, sonra iş sürüyorsa yenileri biter bitmez gelir.
+    Bağlantı koparsa tekrar çağrılabilir - iş etkilenmez, sonuçlar veritabanındadır.
+
+    Satır formatları:
+        {"type": "result", "index": 3, "status": "completed", "content": "...", "model": "...", ...}
+        {"type": "result", "index": 7, "status": "failed", "error": "...", ...}
+        {"type": "summary", "id": 1, "status": "completed", "completed": 298, "failed": 2, ...}
+
+    Raises:
+        BatchJobNotFoundException: İş yok (404)
+    """
+    if await batch_runner.get_job(job_id) is None:
+        raise BatchJobNotFoundException(job_id)  # 404 - stream başlamadan
+
+    async def generate():
+        async for line in batch_runner.stream_results(job_id):
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.post("/{job_id}/cancel", response_model=Dict[str, Any])
+async def cancel_batch(job_id: int):
+    """
+    İşi durdur - biten sonuçlar korunur, bekleyen prompt'lar çalıştırılmaz
+
+    Raises:
+        BatchJobNotFoundException: İş yok (404)
+        ValidationException: İş zaten bitmiş (400)
+    """
+    job = await batch_runner.get_job(job_id)
+    if job is None:
+        raise BatchJobNotFoundException(job_id)  # 404
+    if not await batch_runner.cancel(job_id):
+        raise ValidationException(f"Batch işi {job_id} çalışmıyor (durum: {job.status})")
+    return job_summary(await batch_runner.get_job(job_id))
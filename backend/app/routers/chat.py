@@ -1,19 +1,30 @@
 # chat.py - Sohbet (chat) için API endpoint'leri
 # Mesaj gönderme, sohbet geçmişi, vb.
 
-from fastapi import APIRouter, Depends  # FastAPI routing ve dependency
+import time  # Gecikme / TTFT ölçümü için
+import anyio  # Client ayrıldığında kaydetme adımını iptalden korumak için
+from fastapi import APIRouter, Depends, Response  # FastAPI routing, dependency ve response header'ları
 from fastapi.responses import StreamingResponse  # Streaming response için
+from starlette.background import BackgroundTask  # Stream bitince admission slotunu bırakmak için (güvenlik ağı)
 from sqlalchemy.ext.asyncio import AsyncSession  # Database session
 from sqlalchemy import select  # SQL SELECT query için
 from pydantic import BaseModel, Field, validator  # Request/Response model validasyonu için
 from typing import Optional  # Type hints
 from datetime import datetime  # Timestamp için
 from app.database import get_db  # Database session dependency
-from app.models.conversation import Conversation  # Conversation model
 from app.models.message import Message  # Message model
 from app.services.openrouter import openrouter_service  # OpenRouter servisi
+from app.services.stream_timeouts import stream_error_frame  # Stream yarıda kesilince yapılandırılmış hata
+from app.services.stream_checkpoint import StreamAccumulator, stream_status  # Cevap biriktirme + ara kayıt
 from app.services import temporary_sessions  # Temporary session yönetimi - memory'de
-from app.exceptions import ConversationNotFoundException, MessageNotFoundException, ValidationException, OpenRouterAPIException  # Custom exception'lar
+from app.services import generations  # Devam eden stream'ler - stop butonu için
+from app.services.usage import turn_usage, record_usage  # Token kullanımı ve maliyet muhasebesi
+from app.services.history_cache import history_cache, history_message  # Sohbet başına hazır geçmiş cache'i
+from app.services.compaction import compaction_service  # Uzun sohbetlerde "özet + son turlar"
+from app.services.persistence import persistence, utcnow  # Group commit writer'ı + ID dağıtıcı
+from app.services.turn_setup import begin_turn  # Sohbet + kullanıcı mesajı tek yazmada, geçmiş cache'ten
+from app.services.admission import AdmissionTicket, admit_request  # Global admission control - aşırı yükte 503
+from app.exceptions import MessageNotFoundException, ValidationException, OpenRouterAPIException, GenerationNotFoundException  # Custom exception'lar
 
 
 # Router oluştur - tüm chat endpoint'leri /api/chat prefix'i ile
@@ -78,6 +89,10 @@ class ChatRequest(BaseModel):
         max_length=200,  # Maximum 200 karakter
         description="Yeni conversation için başlık (opsiyonel)"
     )
+    low_latency: bool = Field(
+        default=False,  # Varsayılan: normal istek
+        description="İlk token gecikirse ikinci (hedge) istek gönderilsin mi - sadece /stream"
+    )  # Latency-sensitive turlar için hedged request
     
     @validator('message')
     def message_must_not_be_empty(cls, v):
@@ -115,6 +130,8 @@ class ChatResponse(BaseModel):
 @router.post("/send", response_model=ChatResponse)
 async def send_message(
     request: ChatRequest,  # Request body - ChatRequest formatında
+    response: Response,  # Response header'ları için (X-Model-Used)
+    ticket: AdmissionTicket = Depends(admit_request),  # Upstream slotu - DB'den önce alınır, aşırı yükte 503
     db: AsyncSession = Depends(get_db)  # Database session - dependency injection
 ):
     """
@@ -127,7 +144,11 @@ async def send_message(
         
     Returns:
         ChatResponse: AI'ın cevabı
+        
+    Raises:
+        ServiceOverloadedException: Upstream slotu yok ve kuyruk dolu / bekleme bütçesi aşıldı (503)
     """
+    started_at = time.monotonic()  # Gecikme ölçümü - istek alındığı an
     
     # === TEMPORARY MODE KONTROLÜ ===
     if request.is_temporary:
@@ -136,64 +157,19 @@ async def send_message(
         raise ValidationException("Geçici sohbet için /api/chat/stream endpoint'ini kullanın")
     
     # === NORMAL MODE (Database) ===
-    # 1. Conversation kontrolü - var mı yok mu?
-    if request.conversation_id:
-        # Mevcut conversation'ı bul
-        result = await db.execute(
-            select(Conversation).where(Conversation.id == request.conversation_id)
-        )
-        conversation = result.scalar_one_or_none()  # Bulamazsa None döner
-        
-        if not conversation:  # Conversation bulunamadı
-            raise ConversationNotFoundException(request.conversation_id)  # 404 + custom message
-    else:
-        # Yeni conversation oluştur
-        conversation = Conversation(
-            title=request.conversation_title or "Yeni Sohbet",  # Başlık yoksa default
-            model_name=request.model  # Kullanılan model
-        )
-        db.add(conversation)  # Database'e ekle
-        await db.commit()  # Commit et (ID atanır)
-        await db.refresh(conversation)  # Refresh et (created_at gibi alanlar doldurulur)
-    
-    # 2. Kullanıcı mesajını veritabanına kaydet (resim varsa onunla birlikte)
-    user_message = Message(
-        conversation_id=conversation.id,  # Hangi conversation'a ait
-        role="user",  # Kullanıcı mesajı
+    # 1-3. Conversation (yoksa oluştur) + kullanıcı mesajı tek yazmada, geçmiş cache'ten
+    # Sohbet yoksa 404 - varlık kontrolü mesaj INSERT'ünün içinde (ayrı SELECT / refresh yok)
+    # Özetlenmiş sohbette geçmiş: özet + özetin kapsamadığı turlar (multimodal desteği ile)
+    turn = await begin_turn(
+        db,
+        conversation_id=request.conversation_id,  # None: yeni sohbet
+        model=request.model,  # Kullanılan model
         content=request.message,  # Mesaj içeriği
-        model_name=None,  # Kullanıcı mesajında model yok
-        image_url=request.image_url  # Resim URL'i (varsa) - vision model'ler için
-    )
-    db.add(user_message)  # Database'e ekle
-    await db.commit()  # Kaydet
-    
-    # 3. Sohbet geçmişini hazırla - OpenRouter'a gönderilecek (multimodal desteği ile)
-    # Bu conversation'daki tüm mesajları al
-    messages_result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == conversation.id)
-        .order_by(Message.timestamp.asc())  # Eskiden yeniye sırala
+        image_url=request.image_url,  # Resim URL'i (varsa) - vision model'ler için
+        title=request.conversation_title  # Yeni sohbetin başlığı (yoksa default)
     )
-    all_messages = messages_result.scalars().all()  # Tüm mesajları liste olarak al
-    
-    # OpenRouter formatına çevir - resim varsa multimodal format kullan
-    chat_history = []
-    for msg in all_messages:
-        if msg.image_url:
-            # Resimli mesaj - multimodal format (OpenRouter vision model'ler için)
-            chat_history.append({
-                "role": msg.role,  # user veya assistant
-                "content": [
-                    {"type": "text", "text": msg.content},  # Text kısmı
-                    {"type": "image_url", "image_url": {"url": msg.image_url}}  # Resim kısmı
-                ]
-            })
-        else:
-            # Normal mesaj - sadece text
-            chat_history.append({
-                "role": msg.role,
-                "content": msg.content  # Basit string format
-            })
+    conversation_id = turn.conversation_id
+    chat_history = turn.history
     
     # 4. OpenRouter'a gönder - AI cevabını al
     ai_response = await openrouter_service.chat_completion(
@@ -213,22 +189,43 @@ async def send_message(
     if not ai_message_content:  # Boş cevap geldi
         raise OpenRouterAPIException("AI'dan boş cevap alındı")  # 503 + custom message
     
+    # Cevabı veren model - fallback devreye girdiyse seçilen modelden farklıdır
+    model_used = ai_response.get("model_used", request.model)
+    response.headers["X-Model-Used"] = model_used
+    
+    # Token kullanımı, maliyet ve gecikme - cache / coalescing'ten gelen cevap için maliyet 0
+    reused = bool(ai_response.get("cached") or ai_response.get("shared"))
+    usage = turn_usage(
+        ai_response.get("usage"),
+        started_at,
+        pricing=openrouter_service.model_pricing(model_used),
+        billed=not reused,
+    )
+    
     # 5. AI cevabını veritabanına kaydet (model bilgisi ile birlikte)
     ai_message = Message(
-        conversation_id=conversation.id,
+        id=persistence.next_id(Message),
+        conversation_id=conversation_id,
         role="assistant",  # AI mesajı
         content=ai_message_content,
-        model_name=request.model  # Kullanılan model - önemli!
+        model_name=model_used,  # Cevabı veren model - önemli!
+        timestamp=utcnow(),  # Refresh round-trip'i gerekmez
+        **usage  # prompt_tokens, completion_tokens, cost, latency_ms, ttft_ms
     )
-    db.add(ai_message)  # Database'e ekle
-    await db.commit()  # Kaydet
-    await db.refresh(ai_message)  # Timestamp'i al
+    
+    async def save_answer(writer_db: AsyncSession) -> None:
+        writer_db.add(ai_message)
+        await record_usage(writer_db, model_used, usage, conversation_id=ai_message.conversation_id, cached=reused)  # Toplamlar - aynı commit
+    
+    await persistence.write(save_answer, conversation_id)  # Kaydet (group commit)
+    history_cache.append(ai_message)  # Sonraki tur için geçmişe ekle
+    compaction_service.schedule(conversation_id, chat_history)  # Geçmiş eşiği aştıysa arka planda özetle
     
     # 6. Response döndür
     return ChatResponse(
-        conversation_id=conversation.id,
+        conversation_id=conversation_id,
         message=ai_message_content,  # AI'ın cevabı
-        model=request.model,
+        model=model_used,  # Cevabı veren model (fallback olabilir)
         timestamp=ai_message.timestamp
     )
 
@@ -236,6 +233,7 @@ async def send_message(
 @router.post("/stream")
 async def send_message_stream(
     request: ChatRequest,  # Chat isteği
+    ticket: AdmissionTicket = Depends(admit_request),  # Upstream slotu - stream bitene kadar tutulur
     db: AsyncSession = Depends(get_db)  # Database session
 ):
     """
@@ -244,7 +242,10 @@ async def send_message_stream(
     
     Normal mode: Database'e kaydeder
     Temporary mode: Memory'de tutar, database'e yazmaz
+    
+    Aşırı yükte (upstream slotu yok, kuyruk dolu) hiçbir şey yazılmadan 503 + Retry-After döner.
     """
+    started_at = time.monotonic()  # Gecikme / TTFT ölçümü - istek alındığı an
     
     # === TEMPORARY MODE KONTROLÜ ===
     if request.is_temporary:
@@ -268,119 +269,148 @@ async def send_message_stream(
         # Sohbet geçmişini MEMORY'DEN al - database'den DEĞİL
         all_messages = temporary_sessions.get_session_messages(session_id)
         
-        # OpenRouter formatına çevir - memory'deki dict'ler
-        chat_history = []
-        for msg in all_messages:
-            if msg.get("image_url"):  # Resim varsa
-                chat_history.append({
-                    "role": msg["role"],
-                    "content": [
-                        {"type": "text", "text": msg["content"]},
-                        {"type": "image_url", "image_url": {"url": msg["image_url"]}}
-                    ]
-                })
-            else:  # Sadece text
-                chat_history.append({"role": msg["role"], "content": msg["content"]})
+        # OpenRouter formatına çevir - memory'deki dict'ler (resim varsa multimodal)
+        chat_history = [history_message(msg["role"], msg["content"], msg.get("image_url")) for msg in all_messages]
         
     else:
         # NORMAL MODE - Database'e kaydet (eski davranış)
         
-        # Conversation kontrolü - var mı yok mu?
-        if request.conversation_id:
-            result = await db.execute(
-                select(Conversation).where(Conversation.id == request.conversation_id)
-            )
-            conversation = result.scalar_one_or_none()
-            if not conversation:
-                raise ConversationNotFoundException(request.conversation_id)  # 404
-        else:
-            # Yeni conversation oluştur - DATABASE'e
-            conversation = Conversation(
-                title=request.conversation_title or "Yeni Sohbet",
-                model_name=request.model
-            )
-            db.add(conversation)
-            await db.commit()
-            await db.refresh(conversation)
-        
-        session_id = conversation.id  # Normal conversation ID (pozitif)
-        
-        # Kullanıcı mesajını DATABASE'E kaydet
-        user_message = Message(
-            conversation_id=conversation.id,
-            role="user",
+        # Conversation (yoksa oluştur) + kullanıcı mesajı tek yazmada - sohbet yoksa 404
+        # Sohbet geçmişi - cache'ten veya (miss) DATABASE'DEN (özetlenmişse özet + son turlar)
+        turn = await begin_turn(
+            db,
+            conversation_id=request.conversation_id,
+            model=request.model,
             content=request.message,
-            model_name=None,  # Kullanıcı mesajında model yok
-            image_url=request.image_url
+            image_url=request.image_url,
+            title=request.conversation_title
         )
-        db.add(user_message)
-        await db.commit()
-        
-        # Sohbet geçmişini DATABASE'DEN al
-        messages_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == conversation.id)
-            .order_by(Message.timestamp.asc())
-        )
-        all_messages = messages_result.scalars().all()
-        
-        # OpenRouter formatına çevir - database'deki mesajlar
-        chat_history = []
-        for msg in all_messages:
-            if msg.image_url:
-                chat_history.append({
-                    "role": msg.role,
-                    "content": [
-                        {"type": "text", "text": msg.content},
-                        {"type": "image_url", "image_url": {"url": msg.image_url}}
-                    ]
-                })
-            else:
-                chat_history.append({"role": msg.role, "content": msg.content})
-    
-    # 4. Streaming generator fonksiyonu - temporary mode desteği ile
+        session_id = turn.conversation_id  # Normal conversation ID (pozitif)
+        chat_history = turn.history
+    
+    # 4. Upstream stream'ini aç - StreamingResponse'tan ÖNCE
+    # Rate limit kuyruğu burada beklenir; aşılırsa client gerçek bir 429 (+ Retry-After) alır
+    # İlk token'dan önce hata olursa fallback zincirindeki sıradaki modele geçilir
+    upstream = await openrouter_service.open_chat_stream(
+        model=request.model,
+        messages=chat_history,
+        hedge=True if request.low_latency else None  # None: sunucu varsayılanı (HEDGE_BY_DEFAULT)
+    )
+    
+    # Stop butonu bu ID ile POST /api/chat/generations/{id}/cancel çağırır
+    generation_id = generations.register(upstream)
+    
+    # Cevap parçaları - kalıcı sohbette kısmi cevap aralıklarla "streaming" durumuyla DB'ye yazılır
+    response_parts = StreamAccumulator(None if request.is_temporary else session_id)
+    
+    # 5. Streaming generator fonksiyonu - temporary mode desteği ile
     async def generate_stream():
         """AI cevabını parça parça üreten generator - temporary mode destekli"""
-        full_response = ""  # Tüm cevabı biriktir
-        
-        # OpenRouter streaming servisini kullan - chat history'yi gönder
-        async for chunk in openrouter_service.chat_completion_stream(
-            model=request.model,
-            messages=chat_history
-        ):
-            full_response += chunk  # Parçayı biriktir
-            yield chunk  # Frontend'e gönder - kelime kelime
-        
-        # Stream bitti - AI cevabını kaydet (model bilgisi ile)
+        # Açılmış upstream stream'ini oku
+        # Client bağlantıyı kapatırsa generator iki yoldan biriyle biter:
+        # - upstream beklenirken iptal (CancelledError) - ChatStream "cancelled" olarak işaretler
+        # - yield'da askıdayken (send backpressure'da iptal edildi) Starlette generator'ı kapatmaz;
+        #   sonradan GeneratorExit ile kapanır ve upstream iptali görmez
+        # Her iki durumda da upstream sonuna kadar okunmadıysa kısmi cevap "truncated" kaydedilir
+        exhausted = False  # Upstream sonuna kadar okundu mu (normal bitiş / timeout / hata event'i)
+        try:
+            async for chunk in upstream:
+                response_parts.append(chunk)  # Parçayı biriktir - birleştirme checkpoint / kayıtta
+                yield chunk  # Frontend'e gönder - kelime kelime
+                if response_parts.checkpoint_due:  # Çökmede cevabın tamamı kaybolmasın
+                    response_parts.checkpoint(upstream.model)  # Writer'a gider - stream beklemez
+            exhausted = True
+            if upstream.error:  # Timeout / upstream hata event'i ile kesildi - kısmi cevap kaydedilir, hata yapılandırılmış frame ile gider
+                yield stream_error_frame(upstream.error)
+        finally:
+            # İptal durumunda da bağlantı bırakılsın ve kısmi cevap kaydedilsin - iptalden korunan scope
+            with anyio.CancelScope(shield=True):
+                await upstream.aclose()  # Bağlantıyı havuza geri ver
+                generations.unregister(generation_id)
+                if not exhausted and not upstream.cancelled:
+                    print(f"🔌 Client ayrıldı, stream kapatıldı: {upstream.model}")
+                status = stream_status(
+                    upstream.cancelled or not exhausted,  # Yarıda kapatılan generator - upstream iptali görmemiş olabilir
+                    upstream.error is not None or upstream.error_message is not None,
+                )
+                if response_parts or response_parts.checkpoints or status != "truncated":
+                    await save_response(response_parts.content, status)
+                ticket.release()  # Upstream slotunu sıradaki isteğe ver
+    
+    async def save_response(content: str, status: str):
+        """Stream bitti (veya kesildi) - AI cevabını kaydet / checkpoint satırını kapat (model bilgisi ve kullanım ile)"""
+        # Usage son chunk'ta gelir - iptal edilen stream'de yoktur (token sayıları NULL kalır)
+        usage = turn_usage(
+            upstream.usage,
+            started_at,
+            first_token_at=upstream.first_token_at,
+            pricing=openrouter_service.model_pricing(upstream.model),
+            billed=not upstream.cached,
+        )
+        truncated = status != "complete"
         if request.is_temporary:
             # TEMPORARY: Memory'e kaydet - database'e DEĞİL
             temporary_sessions.add_message_to_session(
                 session_id=session_id,  # Temporary session ID
                 role="assistant",  # AI
-                content=full_response,  # AI'ın cevabı
-                model_name=request.model  # Kullanılan model
+                content=content,  # AI'ın cevabı
+                model_name=upstream.model,  # Cevabı veren model (fallback olabilir)
+                status=status,  # complete / truncated / error
+                usage=usage  # Token / maliyet / gecikme
             )
+            # İçerik saklanmaz ama anonim sayaçlar günlük özete eklenir
+            async def save_usage(writer_db: AsyncSession) -> None:
+                await record_usage(writer_db, upstream.model, usage, cached=upstream.cached, truncated=truncated)
+            
+            await persistence.write(save_usage)
         else:
-            # NORMAL: Database'e kaydet
-            ai_message = Message(
-                conversation_id=conversation.id,
-                role="assistant",
-                content=full_response,
-                model_name=request.model  # Kullanılan model - önemli!
-            )
-            db.add(ai_message)
-            await db.commit()
+            # NORMAL: Database'e kaydet - checkpoint yazıldıysa aynı satır son haliyle güncellenir (tek upsert)
+            async def save_usage(writer_db: AsyncSession) -> None:
+                await record_usage(
+                    writer_db, upstream.model, usage, conversation_id=session_id, cached=upstream.cached, truncated=truncated
+                )  # Toplamlar - cevapla aynı commit
+            
+            ai_message = await response_parts.finalize(upstream.model, status, usage, save_usage)  # complete / truncated / error
+            history_cache.append(ai_message)  # Sonraki tur için geçmişe ekle
+            compaction_service.schedule(session_id, chat_history)  # Geçmiş eşiği aştıysa arka planda özetle
     
-    # 5. StreamingResponse döndür - session ID'yi header'a ekle (temporary veya normal)
+    # 6. StreamingResponse döndür - session ID'yi header'a ekle (temporary veya normal)
+    # Slot artık stream'in - generator bitince (veya hiç başlamazsa background task ile) bırakılır
     return StreamingResponse(
         generate_stream(),  # Generator fonksiyon
+        background=BackgroundTask(ticket.hand_off().release),
         media_type="text/plain",  # Plain text stream
         headers={
             "X-Conversation-Id": str(session_id),  # Session ID - temporary ise negatif, normal ise pozitif
+            "X-Model-Used": upstream.model,  # Cevabı veren model - fallback devreye girdiyse seçilenden farklı
+            "X-Generation-Id": generation_id,  # Stop butonu için - /api/chat/generations/{id}/cancel
         }
     )
 
 
+@router.post("/generations/{generation_id}/cancel")
+async def cancel_generation(generation_id: str):
+    """
+    Devam eden streaming cevabı durdur (stop butonu)
+    
+    Upstream okuması hemen kesilir ve bağlantı bırakılır (token ödemesi durur).
+    O ana kadar gelen kısmi cevap stream'i açan istek tarafından "truncated" durumuyla kaydedilir;
+    client'a giden stream normal şekilde biter.
+    
+    Args:
+        generation_id: Stream cevabının X-Generation-Id header'ındaki ID
+        
+    Returns:
+        dict: Durdurulan generation ID'si
+        
+    Raises:
+        GenerationNotFoundException: ID yok veya stream zaten bitti (404)
+    """
+    if not generations.cancel(generation_id):
+        raise GenerationNotFoundException(generation_id)  # 404
+    return {"generation_id": generation_id, "cancelled": True}
+
+
 @router.put("/messages/{message_id}")
 async def edit_message(
     message_id: int,  # URL'den gelen message ID
@@ -405,6 +435,9 @@ async def edit_message(
         dict: Güncellenmiş mesaj bilgisi ve conversation ID
     """
     
+    # Kuyrukta bekleyen yazmalar (bu sohbetin cevabı olabilir) önce commit edilsin
+    await persistence.flush()
+    
     # 1. Mesajı bul
     result = await db.execute(
         select(Message).where(Message.id == message_id)
@@ -434,7 +467,12 @@ async def edit_message(
     for msg in subsequent_messages:
         await db.delete(msg)  # Mesajı sil
     
+    # Düzenlenen mesajı kapsayan özetler eski içeriği anlatıyor - aynı transaction'da sil
+    await compaction_service.discard_from(db, message.conversation_id, message.id)
+    
     await db.commit()  # Değişiklikleri kaydet
+    history_cache.invalidate(message.conversation_id)  # Geçmiş değişti - sonraki tur DB'den kurar
+    compaction_service.invalidate(message.conversation_id)  # Checkpoint'i unut, süren özetleme kaydedilmesin
     await db.refresh(message)  # Mesajı yenile
     
     # 5. Response döndür
@@ -3,7 +3,7 @@
 
 from fastapi import APIRouter, Depends  # FastAPI routing ve dependency
 from sqlalchemy.ext.asyncio import AsyncSession  # Database session
-from sqlalchemy import select, func  # SQL query fonksiyonları
+from sqlalchemy import select, func, delete  # SQL query fonksiyonları
 from sqlalchemy.orm import selectinload  # Eager loading - ilişkili verileri yükle
 from pydantic import BaseModel, Field, validator  # Request/Response model validasyonu
 from typing import List, Optional  # Type hints
@@ -11,6 +11,9 @@ from datetime import datetime  # Timestamp için
 from app.database import get_db  # Database session dependency
 from app.models.conversation import Conversation  # Conversation model
 from app.models.message import Message  # Message model
+from app.services.history_cache import history_cache  # Silinen sohbetin hazır geçmişi
+from app.services.compaction import compaction_service  # Silinen sohbetin özet checkpoint'i
+from app.services.persistence import persistence, utcnow  # Group commit writer'ı + ID dağıtıcı
 from app.exceptions import ConversationNotFoundException, ValidationException  # Custom exception'lar
 
 
@@ -31,6 +34,12 @@ class MessageResponse(BaseModel):
     content: str  # Mesaj içeriği
     model_name: Optional[str] = None  # Bu mesajı oluşturan model (opsiyonel - sadece assistant)
     image_url: Optional[str] = None  # Resim URL (opsiyonel - vision modeller için)
+    status: str = "complete"  # Cevap durumu - "truncated" ise yarıda kesildi
+    prompt_tokens: Optional[int] = None  # Gönderilen prompt token sayısı (sadece assistant)
+    completion_tokens: Optional[int] = None  # Üretilen token sayısı (sadece assistant)
+    cost: Optional[float] = None  # Maliyet ($) (sadece assistant)
+    latency_ms: Optional[int] = None  # Cevabın tamamlanma süresi (ms)
+    ttft_ms: Optional[int] = None  # İlk token süresi (ms) - sadece streaming
     timestamp: datetime  # Mesaj zamanı
     
     class Config:
@@ -60,6 +69,9 @@ class ConversationDetail(BaseModel):
     title: str  # Conversation başlığı
     model_name: str  # Kullanılan model
     created_at: datetime  # Oluşturulma zamanı
+    prompt_tokens: int = 0  # Toplam prompt token (silinen mesajlar dahil)
+    completion_tokens: int = 0  # Toplam completion token (silinen mesajlar dahil)
+    cost: float = 0.0  # Toplam maliyet ($)
     messages: List[MessageResponse]  # Bu conversation'daki tüm mesajlar
     
     class Config:
@@ -208,6 +220,9 @@ async def get_conversation_detail(
         title=conversation.title,
         model_name=conversation.model_name,
         created_at=conversation.created_at,
+        prompt_tokens=conversation.prompt_tokens or 0,  # Biriken kullanım toplamları
+        completion_tokens=conversation.completion_tokens or 0,
+        cost=conversation.cost or 0.0,
         messages=[
             MessageResponse(
                 id=msg.id,
@@ -215,6 +230,12 @@ async def get_conversation_detail(
                 content=msg.content,
                 model_name=msg.model_name,  # Model bilgisini dahil et
                 image_url=msg.image_url,  # Resim URL'i (varsa)
+                status=msg.status,  # complete / truncated
+                prompt_tokens=msg.prompt_tokens,  # Kullanım ve maliyet (assistant mesajları)
+                completion_tokens=msg.completion_tokens,
+                cost=msg.cost,
+                latency_ms=msg.latency_ms,
+                ttft_ms=msg.ttft_ms,
                 timestamp=msg.timestamp
             )
             for msg in sorted_messages
@@ -241,15 +262,14 @@ async def create_conversation(
     """
     # Yeni conversation objesi oluştur
     new_conversation = Conversation(
+        id=persistence.next_id(Conversation),  # ID commit beklemeden atanır
         title=request.title,  # Kullanıcıdan gelen başlık
-        model_name=request.model_name  # Kullanılacak model
-        # created_at otomatik atanır (database default)
+        model_name=request.model_name,  # Kullanılacak model
+        created_at=utcnow()  # Refresh round-trip'i gerekmez
     )
     
-    # Database'e ekle
-    db.add(new_conversation)
-    await db.commit()  # Commit et (ID atanır)
-    await db.refresh(new_conversation)  # Refresh et (created_at gibi alanlar doldurulur)
+    # Database'e ekle - writer'ın group commit'i ile
+    await persistence.wait(persistence.add(new_conversation, conversation_id=new_conversation.id))
     
     # Response döndür (boş mesaj listesi ile)
     return ConversationDetail(
@@ -280,6 +300,8 @@ async def update_conversation(
     Returns:
         ConversationListItem: Güncellenmiş conversation
     """
+    await persistence.flush()  # Sohbet henüz kuyruktaysa önce yazılsın
+    
     # Önce conversation'ın var olup olmadığını kontrol et
     result = await db.execute(
         select(Conversation).where(Conversation.id == conversation_id)
@@ -331,6 +353,8 @@ async def delete_conversation(
     Returns:
         Dict: Başarı mesajı
     """
+    await persistence.flush()  # Kuyrukta bekleyen mesajları silinecek sohbete yazılmasın
+    
     # Önce conversation'ın var olup olmadığını kontrol et
     result = await db.execute(
         select(Conversation).where(Conversation.id == conversation_id)
@@ -343,7 +367,11 @@ async def delete_conversation(
     
     # Conversation'ı sil (cascade ile messages de silinir)
     await db.delete(conversation)  # Silme işlemi
+    # Cascade yüklendikten sonra yazılan streaming checkpoint'i de gitsin (SQLite FK'leri zorlamıyor)
+    await db.execute(delete(Message).where(Message.conversation_id == conversation_id))
     await db.commit()  # Commit et
+    history_cache.invalidate(conversation_id)  # Hazır geçmişi bellekten at
+    compaction_service.invalidate(conversation_id)  # Checkpoint'i unut, süren özetleme kaydedilmesin
     
     # Başarı mesajı döndür
     return {
@@ -1,9 +1,11 @@
 # models.py - AI modelleri için API endpoint'leri
 # OpenRouter'dan mevcut modelleri listeler
 
-from fastapi import APIRouter  # FastAPI routing
-from typing import List, Dict, Any  # Type hints
+import json  # Filtrelenmiş sayfayı serialize etmek için
+from fastapi import APIRouter, Response, Query  # FastAPI routing - Response: hazır JSON body, Query: filtre parametreleri
+from typing import List, Dict, Any, Optional  # Type hints
 from app.services.openrouter import openrouter_service  # OpenRouter servisi
+from app.services.model_catalog import CatalogSnapshot  # Katalog snapshot tipi
 from app.exceptions import OpenRouterAPIException  # Custom exception
 
 
@@ -14,8 +16,58 @@ router = APIRouter(
 )
 
 
+def _query_response(
+    snapshot: CatalogSnapshot,  # Güncel katalog snapshot'ı
+    free: Optional[bool],  # Ücretsiz filtresi
+    provider: Optional[str],
+    vision: Optional[bool],
+    modality: Optional[str],
+    min_context: Optional[int],
+    price: Optional[str],
+    sort: str,
+    cursor: Optional[str],
+    limit: Optional[int],
+) -> Response:
+    """
+    Registry indekslerinden filtrelenmiş/sıralanmış sayfayı JSON response olarak döndür
+    Body liste olarak kalır (geriye dönük uyumlu), sayfalama bilgisi header'larda
+    """
+    page, next_cursor, total = snapshot.registry.query(
+        provider=provider,
+        free=free,
+        vision=vision,
+        modality=modality,
+        min_context=min_context,
+        price_bucket=price,
+        sort=sort,
+        cursor=cursor,
+        limit=limit,
+    )
+    headers = {"X-Total-Count": str(total)}  # Filtreye uyan toplam model sayısı
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor  # Sonraki sayfa için cursor
+    return Response(
+        content=json.dumps(page, ensure_ascii=False).encode("utf-8"),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def _has_query(*params) -> bool:
+    """Herhangi bir filtre/sayfalama parametresi verilmiş mi?"""
+    return any(p is not None for p in params)
+
+
 @router.get("/free", response_model=List[Dict[str, Any]])
-async def get_free_models():
+async def get_free_models(
+    provider: Optional[str] = Query(None, description="Sağlayıcı filtresi - örn: meta-llama"),
+    vision: Optional[bool] = Query(None, description="Görsel input desteği"),
+    modality: Optional[str] = Query(None, description="Input modality - örn: image, audio, file"),
+    min_context: Optional[int] = Query(None, ge=0, description="Minimum context length (token)"),
+    sort: str = Query("name", description="Sıralama: name, context_length, price, id"),
+    cursor: Optional[str] = Query(None, description="Önceki cevaptaki X-Next-Cursor değeri"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Sayfa boyutu"),
+):
     """
     Ücretsiz AI modellerini listele
     
@@ -34,24 +86,41 @@ async def get_free_models():
             }
         ]
     """
-    # OpenRouter servisinden modelleri al
-    models = await openrouter_service.get_models()
+    # Katalog cache'inden snapshot al - upstream'e sadece TTL dolunca (arka planda) gidilir
+    snapshot = await openrouter_service.get_model_catalog()
     
-    # Eğer boş liste dönerse (API hatası durumu)
-    if not models:
+    # Katalog hiç çekilemediyse (API hatası durumu)
+    if snapshot is None or not snapshot.free_models:
         # Custom exception fırlat - 503 Service Unavailable
         raise OpenRouterAPIException("OpenRouter servisine ulaşılamıyor. Lütfen daha sonra tekrar deneyin.")
     
-    return models  # Model listesini döndür
+    # Filtre / sıralama / sayfalama istenmişse indekslerden cevapla
+    if _has_query(provider, vision, modality, min_context, cursor, limit) or sort != "name":
+        return _query_response(snapshot, True, provider, vision, modality, min_context, None, sort, cursor, limit)
+    
+    # Önceden serialize edilmiş body - her istekte JSON'a çevirme maliyeti yok
+    return Response(content=snapshot.free_models_json, media_type="application/json")
 
 
 @router.get("/", response_model=List[Dict[str, Any]])
-async def get_all_models():
+async def get_all_models(
+    free: Optional[bool] = Query(None, description="true: sadece ücretsiz, false: sadece ücretli"),
+    provider: Optional[str] = Query(None, description="Sağlayıcı filtresi - örn: openai"),
+    vision: Optional[bool] = Query(None, description="Görsel input desteği"),
+    modality: Optional[str] = Query(None, description="Input modality - örn: image, audio, file"),
+    min_context: Optional[int] = Query(None, ge=0, description="Minimum context length (token)"),
+    price: Optional[str] = Query(None, description="Fiyat bucket'ı: free, low, mid, high"),
+    sort: str = Query("name", description="Sıralama: name, context_length, price, id"),
+    cursor: Optional[str] = Query(None, description="Önceki cevaptaki X-Next-Cursor değeri"),
+    limit: Optional[int] = Query(None, ge=1, le=500, description="Sayfa boyutu"),
+):
     """
     TÜM AI modellerini listele (ücretsiz + ücretli)
     
     OpenRouter'dan tüm mevcut modelleri fiyat bilgileriyle getirir.
-    Frontend'de dropdown'da filtrelenebilir ve sıralanabilir.
+    Filtre, sıralama ve cursor sayfalama sunucu tarafında, önceden kurulmuş
+    indekslerden yapılır. Sayfalı isteklerde X-Next-Cursor ve X-Total-Count
+    header'ları döner.
     
     Returns:
         List[Dict]: Tüm model listesi (fiyat bilgileriyle)
@@ -72,13 +141,18 @@ async def get_all_models():
             }
         ]
     """
-    # OpenRouter servisinden TÜM modelleri al (free_only=False)
-    models = await openrouter_service.get_models(free_only=False)  # Tüm modeller
+    # Katalog cache'inden snapshot al - free endpoint'i ile aynı snapshot
+    snapshot = await openrouter_service.get_model_catalog()
     
-    # Eğer boş liste dönerse (API hatası durumu)
-    if not models:
+    # Katalog hiç çekilemediyse (API hatası durumu)
+    if snapshot is None or not snapshot.all_models:
         # Custom exception fırlat - 503 Service Unavailable
         raise OpenRouterAPIException("OpenRouter servisine ulaşılamıyor. Lütfen daha sonra tekrar deneyin.")
     
-    return models  # Tüm model listesini döndür
+    # Filtre / sıralama / sayfalama istenmişse indekslerden cevapla
+    if _has_query(free, provider, vision, modality, min_context, price, cursor, limit) or sort != "name":
+        return _query_response(snapshot, free, provider, vision, modality, min_context, price, sort, cursor, limit)
+    
+    # Önceden serialize edilmiş body - tüm modeller
+    return Response(content=snapshot.all_models_json, media_type="application/json")
 
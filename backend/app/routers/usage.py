@@ -0,0 +1,73 @@
+# usage.py - Token kullanımı ve maliyet raporları için API endpoint'leri
+# Kapasite planlaması ve model seçimi (daha ucuz / daha hızlı) için
+
+from fastapi import APIRouter, Depends, Query  # FastAPI routing, dependency ve query parametreleri
+from sqlalchemy.ext.asyncio import AsyncSession  # Database session
+from sqlalchemy import select  # SQL SELECT query için
+from typing import Any, Dict, Optional  # Type hints
+from app.database import get_db  # Database session dependency
+from app.models.conversation import Conversation  # Conversation model
+from app.services.usage import usage_report, conversation_usage  # Rollup raporları
+from app.exceptions import ConversationNotFoundException  # Custom exception
+
+
+# Router oluştur - tüm usage endpoint'leri /api/usage prefix'i ile
+router = APIRouter(
+    prefix="/api/usage",  # URL prefix - örn: /api/usage?days=7
+    tags=["usage"]  # Swagger'da gruplandırma için tag
+)
+
+
+@router.get("", response_model=Dict[str, Any])
+async def get_usage(
+    days: int = Query(30, ge=1, le=366, description="Rapor penceresi (gün, bugün dahil)"),
+    model: Optional[str] = Query(None, description="Sadece bu model - örn: openai/gpt-4o"),
+    db: AsyncSession = Depends(get_db)  # Database session
+):
+    """
+    Token kullanımı, maliyet ve gecikme raporu
+
+    Günlük model özetlerinden (usage_rollups) okunur - her cevap kaydedilirken artırılır,
+    mesaj tablosu taranmaz. Geçici sohbetlerin anonim sayaçları dahildir.
+
+    Args:
+        days: Son kaç gün
+        model: Opsiyonel model filtresi
+
+    Returns:
+        Dict: Toplam, model bazında ve gün bazında özet
+        Örnek:
+        {
+            "from": "2024-01-01",
+            "to": "2024-01-30",
+            "totals": {"requests": 120, "prompt_tokens": 48000, "completion_tokens": 21000,
+                       "cost": 0.42, "avg_latency_ms": 3400, "avg_ttft_ms": 650, ...},
+            "by_model": [{"model": "openai/gpt-4o-mini", ...}],
+            "by_day": [{"day": "2024-01-01", ...}]
+        }
+    """
+    return await usage_report(db, days=days, model=model)
+
+
+@router.get("/conversations/{conversation_id}", response_model=Dict[str, Any])
+async def get_conversation_usage(
+    conversation_id: int,  # URL'den gelen conversation ID
+    db: AsyncSession = Depends(get_db)  # Database session
+):
+    """
+    Tek bir sohbetin biriken kullanım toplamları (silinen / düzenlenen mesajlar dahil)
+
+    Args:
+        conversation_id: Conversation ID
+
+    Returns:
+        Dict: conversation_id, prompt_tokens, completion_tokens, cost
+
+    Raises:
+        ConversationNotFoundException: Conversation yok (404)
+    """
+    result = await db.execute(select(Conversation).where(Conversation.id == conversation_id))
+    conversation = result.scalar_one_or_none()
+    if not conversation:
+        raise ConversationNotFoundException(conversation_id)  # 404
+    return {"conversation_id": conversation.id, **conversation_usage(conversation)}
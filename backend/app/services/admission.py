@@ -0,0 +1,220 @@
+# admission.py - Chat endpoint'leri için global admission control (yük atma)
+# Process'in aynı anda açık tuttuğu upstream çağrısı (stream dahil) sınırlanır:
+# - Boş slot varsa istek hemen kabul edilir
+# - Yoksa sınırlı bir FIFO kuyrukta, en fazla bekleme bütçesi kadar bekler
+# - Kuyruk doluysa veya bütçe aşılırsa istek erkenden 503 + Retry-After ile reddedilir
+#   (veritabanına hiçbir şey yazılmadan, upstream'e gidilmeden)
+# Batch worker'ları arka plan önceliğiyle aynı slotları kullanır: reddedilmez, ama
+# bekleyen interaktif istek varken slot almaz.
+
+import asyncio  # Bekleme kuyruğu (future'lar) ve timeout
+import time  # Kuyruk bekleme süresi (monotonic saat)
+from collections import deque  # FIFO kuyruklar
+from typing import Any, Deque, Dict, Optional  # Type hints
+from opentelemetry import metrics  # Kuyruk derinliği, bekleme süresi, atılan istek metrikleri
+from opentelemetry.metrics import CallbackOptions, Observation  # Observable gauge callback'leri
+from app.config import settings  # Admission ayarları
+from app.exceptions import ServiceOverloadedException  # 503 + Retry-After
+
+
+# Metrics - MeterProvider telemetry.py'de kurulur; kurulmadıysa no-op
+meter = metrics.get_meter(__name__)
+_queue_wait = meter.create_histogram(
+    "admission.queue_wait", unit="s",
+    description="İsteğin admission kuyruğunda beklediği süre (kabul edilen ve atılanlar)",
+)
+_shed = meter.create_counter(
+    "admission.shed", unit="{request}",
+    description="Aşırı yük nedeniyle 503 ile reddedilen istekler",
+)
+
+
+class AdmissionTicket:
+    """
+    Kabul edilmiş bir isteğin slotu - release() birden fazla çağrılabilir
+
+    Streaming'de slot StreamingResponse'a devredilir (hand_off) ve stream bitince bırakılır.
+    """
+
+    __slots__ = ("_controller", "_released", "handed_off", "waited")
+
+    def __init__(self, controller: "AdmissionController", waited: float):
+        self._controller = controller
+        self._released = False
+        self.handed_off = False  # True: slotu artık stream generator'ı bırakacak
+        self.waited = waited  # Kuyrukta beklenen süre (saniye)
+
+    def hand_off(self) -> "AdmissionTicket":
+        """Slotun sahipliğini devret - dependency çıkışında bırakılmaz"""
+        self.handed_off = True
+        return self
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller.release()
+
+
+class AdmissionController:
+    """
+    Global in-flight limiti + sınırlı bekleme kuyruğu
+
+    Slot bırakıldığında doğrudan sıradaki bekleyene devredilir (in_flight azalıp tekrar
+    artmaz) - araya yeni gelen istek giremez, kuyruk adil (FIFO) kalır.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: Optional[int] = None,  # Aynı anda max upstream çağrısı (0: sınırsız)
+        max_queue: Optional[int] = None,  # Kuyrukta bekleyebilecek max interaktif istek
+        max_wait: Optional[float] = None,  # Kuyrukta max bekleme (saniye) - aşılırsa 503
+    ):
+        self.max_in_flight = max_in_flight if max_in_flight is not None else settings.ADMISSION_MAX_IN_FLIGHT
+        self.max_queue = max_queue if max_queue is not None else settings.ADMISSION_MAX_QUEUE
+        self.max_wait = max_wait if max_wait is not None else settings.ADMISSION_MAX_WAIT_SECONDS
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()  # İnteraktif istekler (chat endpoint'leri)
+        self._background: Deque[asyncio.Future] = deque()  # Batch worker'ları - interaktiflerden sonra
+        # İstatistikler - monitoring için
+        self._admitted = 0  # Kabul edilen istekler
+        self._queued = 0  # Kuyrukta bekleyerek kabul edilenler
+        self._shed: Dict[str, int] = {"queue_full": 0, "wait_timeout": 0}
+        meter.create_observable_gauge(
+            "admission.in_flight", callbacks=[self._observe_in_flight], unit="{request}",
+            description="Şu an slot tutan upstream çağrısı sayısı",
+        )
+        meter.create_observable_gauge(
+            "admission.queue_depth", callbacks=[self._observe_queue_depth], unit="{request}",
+            description="Admission kuyruğunda bekleyen istek sayısı",
+        )
+
+    @property
+    def unlimited(self) -> bool:
+        return self.max_in_flight <= 0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters) + len(self._background)
+
+    def _has_free_slot(self, background: bool) -> bool:
+        if self.in_flight >= self.max_in_flight:
+            return False
+        # Kuyrukta bekleyen varsa yeni gelen sıraya girer (öne geçmez)
+        return not self._waiters and (not background or not self._background)
+
+    def _shed_request(self, reason: str, waited: float) -> ServiceOverloadedException:
+        self._shed[reason] += 1
+        _shed.add(1, {"reason": reason})
+        _queue_wait.record(waited, {"outcome": "shed"})
+        print(f"🚦 Yük atıldı ({reason}): {self.in_flight} çalışan, {len(self._waiters)} bekleyen")
+        return ServiceOverloadedException(settings.ADMISSION_RETRY_AFTER_SECONDS)
+
+    async def acquire(self, background: bool = False) -> AdmissionTicket:
+        """
+        Upstream çağrısı için slot al
+
+        Args:
+            background: True - batch worker'ı; reddedilmez, süresiz bekler, interaktiflere öncelik verir
+
+        Returns:
+            AdmissionTicket: İş bitince release() edilmeli
+
+        Raises:
+            ServiceOverloadedException: Kuyruk dolu veya bekleme bütçesi aşıldı (503)
+        """
+        if self.unlimited:
+            return AdmissionTicket(self, 0.0)
+        if self._has_free_slot(background):
+            self.in_flight += 1
+            self._admitted += 1
+            _queue_wait.record(0.0, {"outcome": "admitted"})
+            return AdmissionTicket(self, 0.0)
+
+        if not background and (len(self._waiters) >= self.max_queue or self.max_wait <= 0):
+            raise self._shed_request("queue_full", 0.0)  # Beklemeye değmez - hemen reddet
+
+        waiters = self._background if background else self._waiters
+        future = asyncio.get_running_loop().create_future()
+        waiters.append(future)
+        started = time.monotonic()
+        try:
+            # release() slotu bu future'a devreder - wait_for (asyncio.timeout 3.11+)
+            await asyncio.wait_for(future, None if background else self.max_wait)
+        except asyncio.TimeoutError:
+            waited = time.monotonic() - started
+            if future.done() and not future.cancelled():  # Slot tam timeout anında devredildi
+                return self._admit_queued(waited)
+            self._discard(waiters, future)
+            raise self._shed_request("wait_timeout", waited) from None
+        except asyncio.CancelledError:  # Client beklerken gitti
+            if future.done() and not future.cancelled():
+                self.release()  # Devredilen slotu sıradakine ver
+            else:
+                self._discard(waiters, future)
+            raise
+        return self._admit_queued(time.monotonic() - started)
+
+    def _admit_queued(self, waited: float) -> AdmissionTicket:
+        self._admitted += 1
+        self._queued += 1
+        _queue_wait.record(waited, {"outcome": "admitted"})
+        return AdmissionTicket(self, waited)
+
+    @staticmethod
+    def _discard(waiters: Deque[asyncio.Future], future: asyncio.Future) -> None:
+        try:
+            waiters.remove(future)
+        except ValueError:
+            pass
+
+    def release(self) -> None:
+        """
+        Slotu bırak - önce interaktif, sonra arka plan bekleyenine devret; bekleyen yoksa boşalt
+        """
+        for waiters in (self._waiters, self._background):
+            while waiters:
+                future = waiters.popleft()
+                if not future.done():  # İptal edilmiş / timeout olmuş bekleyenleri atla
+                    future.set_result(None)  # in_flight değişmez - slot devredildi
+                    return
+        self.in_flight = max(0, self.in_flight - 1)
+
+    def _observe_in_flight(self, options: CallbackOptions):
+        yield Observation(self.in_flight)
+
+    def _observe_queue_depth(self, options: CallbackOptions):
+        yield Observation(len(self._waiters), {"priority": "interactive"})
+        yield Observation(len(self._background), {"priority": "background"})
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Admission durumu - monitoring için"""
+        return {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "background_waiting": len(self._background),
+            "admitted": self._admitted,
+            "queued": self._queued,
+            "shed": dict(self._shed),
+        }
+
+
+# Global controller instance - tüm chat endpoint'leri ve batch worker'ları aynı limiti paylaşır
+admission = AdmissionController()
+
+
+async def admit_request():
+    """
+    FastAPI dependency - handler çalışmadan (DB yazımından önce) slot al
+
+    Handler biterken slot bırakılır; streaming endpoint'i ticket.hand_off() ile
+    sahipliği stream generator'ına devreder ve slot stream bitince bırakılır.
+    """
+    ticket = await admission.acquire()
+    try:
+        yield ticket
+    finally:
+        if not ticket.handed_off:
+            ticket.release()
@@ -0,0 +1,325 @@
+# batch.py - Toplu completion işleri (POST /api/chat/batch)
+# Yüzlerce bağımsız prompt tek istekle alınır, iş başına sınırlı sayıda worker ile
+# OpenRouterService üzerinden çalıştırılır (rate limiter, fallback, cache aynen geçerli).
+# Her sonuç biter bitmez veritabanına yazılır ve dinleyen client'lara iletilir:
+# - Sonuçlar bitiş sırasıyla (index'leriyle) NDJSON olarak stream edilir
+# - Restart sonrası "running" işlerin sadece bekleyen prompt'ları tekrar çalışır
+
+import asyncio  # Worker havuzu ve dinleyici kuyrukları
+import json  # Mesajların saklanması
+import time  # Gecikme ölçümü
+from datetime import datetime, timezone  # Bitiş zamanları
+from typing import Any, AsyncGenerator, Dict, List, Optional, Set  # Type hints
+from sqlalchemy import select, update  # Sorgular ve sayaç güncellemeleri
+from app.config import settings  # Batch ayarları
+from app.database import AsyncSessionLocal  # Worker'lar request'ten bağımsız kendi session'larını açar
+from app.models.batch import BatchJob, BatchItem  # İş ve prompt tabloları
+from app.services.openrouter import openrouter_service  # Upstream çağrıları
+from app.services.usage import turn_usage, record_usage  # Kullanım muhasebesi (günlük özetler)
+from app.services.admission import admission  # Global upstream slotları - interaktif isteklerden sonra
+from app.exceptions import RateLimitExceededException  # Kuyruk dolu - bekleyip tekrar dene
+
+
+def job_summary(job: BatchJob) -> Dict[str, Any]:
+    """İş durumu - status endpoint'i ve NDJSON'un son satırı"""
+    return {
+        "id": job.id,
+        "model": job.model,
+        "status": job.status,
+        "concurrency": job.concurrency,
+        "total": job.total,
+        "completed": job.completed_count,
+        "failed": job.failed_count,
+        "pending": job.total - job.completed_count - job.failed_count,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+def item_result(item: BatchItem) -> Dict[str, Any]:
+    """Tek prompt'un sonucu - NDJSON satırı"""
+    return {
+        "type": "result",
+        "index": item.item_index,
+        "status": item.status,
+        "content": item.content,
+        "error": item.error,
+        "model": item.model_used,
+        "prompt_tokens": item.prompt_tokens,
+        "completion_tokens": item.completion_tokens,
+        "cost": item.cost,
+        "latency_ms": item.latency_ms,
+    }
+
+
+class BatchRunner:
+    """
+    Çalışan batch işlerinin kaydı - her iş bir asyncio task'ı, içinde concurrency kadar worker
+
+    Process içi (tek worker varsayımı, generations gibi). İş ve sonuç durumu veritabanındadır;
+    bellekte sadece çalışan task'lar ve sonuç dinleyicilerinin kuyrukları tutulur.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[int, asyncio.Task] = {}  # İş ID -> çalışan task
+        self._listeners: Dict[int, List[asyncio.Queue]] = {}  # İş ID -> sonuç dinleyicileri
+
+    async def submit(self, model: str, prompts: List[List[Dict[str, Any]]], concurrency: int) -> BatchJob:
+        """
+        İşi ve prompt'larını tek transaction'da kaydet, çalıştırmaya başla
+
+        Args:
+            model: Kullanılacak model ID
+            prompts: Her prompt için upstream'e gidecek mesaj listesi
+            concurrency: Aynı anda upstream'e giden max istek
+
+        Returns:
+            BatchJob: Kaydedilen iş
+        """
+        async with AsyncSessionLocal() as db:
+            job = BatchJob(model=model, status="running", concurrency=concurrency, total=len(prompts))
+            db.add(job)
+            await db.flush()  # ID ata - item'lar aynı transaction'da
+            db.add_all([
+                BatchItem(job_id=job.id, item_index=index, messages=json.dumps(messages, ensure_ascii=False))
+                for index, messages in enumerate(prompts)
+            ])
+            await db.commit()
+            await db.refresh(job)
+        self._start(job.id, model, concurrency)
+        print(f"📦 Batch işi başladı: #{job.id} ({job.total} prompt, eşzamanlılık {concurrency})")
+        return job
+
+    def _start(self, job_id: int, model: str, concurrency: int) -> None:
+        task = asyncio.create_task(self._run(job_id, model, concurrency))
+        self._tasks[job_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job_id, None))
+
+    async def resume(self) -> int:
+        """
+        Uygulama açılışında yarım kalan işleri devam ettir - bitmiş prompt'lar tekrar çalışmaz
+
+        Returns:
+            int: Devam ettirilen iş sayısı
+        """
+        async with AsyncSessionLocal() as db:
+            jobs = (await db.execute(select(BatchJob).where(BatchJob.status == "running"))).scalars().all()
+        for job in jobs:
+            self._start(job.id, job.model, job.concurrency)
+        if jobs:
+            print(f"📦 {len(jobs)} yarım batch işi devam ettiriliyor")
+        return len(jobs)
+
+    async def close(self) -> None:
+        """
+        Uygulama kapanıyor - task'ları durdur, işler "running" kalır (sonraki açılışta devam eder)
+        """
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def is_running(self, job_id: int) -> bool:
+        return job_id in self._tasks
+
+    async def cancel(self, job_id: int) -> bool:
+        """
+        İşi durdur - biten sonuçlar korunur, bekleyen prompt'lar çalıştırılmaz
+
+        Returns:
+            bool: True - iş çalışıyordu ve durduruldu
+        """
+        task = self._tasks.get(job_id)
+        if task is None:
+            return False
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await self._finish(job_id, "cancelled")
+        return True
+
+    async def _run(self, job_id: int, model: str, concurrency: int) -> None:
+        """
+        İşi çalıştır - beklenmeyen hatada iş "failed" olarak kapanır ve dinleyicilere bildirilir
+        """
+        try:
+            await self._run_pending(job_id, model, concurrency)
+        except asyncio.CancelledError:  # cancel() / close() - durumu onlar belirler
+            raise
+        except Exception as e:  # DB hatası vb. - iş "running" kalıp dinleyicileri bekletmesin
+            print(f"❌ Batch işi hata ile durdu: #{job_id} ({type(e).__name__}: {e})")
+            try:
+                await self._finish(job_id, "failed")
+            except Exception:
+                self._publish(job_id, None)  # Durum yazılamadı - dinleyiciler yine de bitişi görsün
+
+    async def _run_pending(self, job_id: int, model: str, concurrency: int) -> None:
+        """
+        Bekleyen prompt'ları worker havuzuyla çalıştır
+
+        concurrency kadar worker ortak kuyruktan prompt çeker - yüzlerce prompt için
+        yüzlerce task açılmaz, upstream'e aynı anda en fazla concurrency istek gider.
+        """
+        async with AsyncSessionLocal() as db:
+            pending = (await db.execute(
+                select(BatchItem.id, BatchItem.item_index, BatchItem.messages)
+                .where(BatchItem.job_id == job_id, BatchItem.status == "pending")
+                .order_by(BatchItem.item_index)
+            )).all()
+
+        queue: asyncio.Queue = asyncio.Queue()
+        for row in pending:
+            queue.put_nowait(row)
+
+        async def worker() -> None:
+            while True:
+                try:
+                    row = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await self._process(job_id, model, row.id, json.loads(row.messages))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(concurrency, len(pending)))]
+        try:
+            await asyncio.gather(*workers)
+        except BaseException:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            raise
+        await self._finish(job_id, "completed")
+
+    async def _process(self, job_id: int, model: str, item_id: int, messages: List[Dict[str, Any]]) -> None:
+        """
+        Tek prompt'u çalıştır ve sonucu yaz
+
+        Rate limiter kuyruğu dolarsa prompt başarısız sayılmaz - Retry-After kadar bekleyip
+        tekrar denenir (offline iş, gecikme önemli değil). Global admission slotu arka plan
+        önceliğiyle alınır: batch reddedilmez ama interaktif istekleri de bekletmez.
+        """
+        content = None
+        usage: Dict[str, Any] = {}
+        model_used = model
+        reused = False
+        try:
+            while True:
+                ticket = await admission.acquire(background=True)
+                started_at = time.monotonic()
+                try:
+                    result = await openrouter_service.chat_completion(model=model, messages=messages)
+                    break
+                except RateLimitExceededException as e:
+                    ticket.release()  # Beklerken slotu tutma
+                    ticket = None
+                    await asyncio.sleep(float(e.headers.get("Retry-After", 1)))
+                finally:
+                    if ticket is not None:
+                        ticket.release()
+
+            model_used = result.get("model_used", model)
+            if result.get("error"):
+                status, error = "failed", result.get("message", "AI modelinden cevap alınamadı")
+            else:
+                content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+                status, error = ("completed", None) if content else ("failed", "AI'dan boş cevap alındı")
+                reused = bool(result.get("cached") or result.get("shared"))
+                usage = turn_usage(
+                    result.get("usage"),
+                    started_at,
+                    pricing=openrouter_service.model_pricing(model_used),
+                    billed=not reused,
+                )
+                usage.pop("ttft_ms")  # Non-streaming - TTFT yok
+        except Exception as e:  # Beklenmeyen hata - prompt başarısız sayılır, diğer worker'lar devam eder
+            print(f"❌ Batch prompt'u hata verdi: #{job_id}/{item_id} ({type(e).__name__}: {e})")
+            content, usage = None, {}
+            status, error = "failed", f"Beklenmeyen hata: {type(e).__name__}"
+
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(BatchItem).where(BatchItem.id == item_id).values(
+                    status=status,
+                    content=content,
+                    error=error,
+                    model_used=model_used,
+                    completed_at=datetime.now(timezone.utc),
+                    **usage,
+                )
+            )
+            counter = BatchJob.completed_count if status == "completed" else BatchJob.failed_count
+            await db.execute(update(BatchJob).where(BatchJob.id == job_id).values({counter: counter + 1}))
+            if usage:
+                await record_usage(db, model_used, usage, cached=reused)  # Günlük model özeti - aynı commit
+            await db.commit()
+            item = await db.get(BatchItem, item_id)
+        self._publish(job_id, item_result(item))
+
+    async def _finish(self, job_id: int, status: str) -> None:
+        """İşi kapat ve dinleyicilere bitişi bildir"""
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(BatchJob).where(BatchJob.id == job_id, BatchJob.status == "running")
+                .values(status=status, finished_at=datetime.now(timezone.utc))
+            )
+            await db.commit()
+        self._publish(job_id, None)  # None: iş bitti
+        label = {"completed": "tamamlandı", "failed": "hata ile bitti"}.get(status, "durduruldu")
+        print(f"📦 Batch işi {label}: #{job_id}")
+
+    def _publish(self, job_id: int, result: Optional[Dict[str, Any]]) -> None:
+        for queue in self._listeners.get(job_id, []):
+            queue.put_nowait(result)
+
+    async def get_job(self, job_id: int) -> Optional[BatchJob]:
+        async with AsyncSessionLocal() as db:
+            return await db.get(BatchJob, job_id)
+
+    async def stream_results(self, job_id: int) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        İşin sonuçlarını üret - önce kaydedilmiş olanlar, sonra biten yenileri (bitiş sırasıyla)
+
+        Dinleyici DB okumasından ÖNCE eklenir; arada biten sonuç iki kez gelebilir ama
+        index ile ayıklanır. Son satır işin özetidir ({"type": "summary", ...}).
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.setdefault(job_id, []).append(queue)
+        try:
+            seen: Set[int] = set()
+            async with AsyncSessionLocal() as db:
+                items = (await db.execute(
+                    select(BatchItem)
+                    .where(BatchItem.job_id == job_id, BatchItem.status != "pending")
+                    .order_by(BatchItem.completed_at, BatchItem.id)
+                )).scalars().all()
+            for item in items:
+                seen.add(item.item_index)
+                yield item_result(item)
+
+            while self.is_running(job_id) or not queue.empty():
+                result = await queue.get()
+                if result is None:  # İş bitti
+                    break
+                if result["index"] in seen:
+                    continue
+                seen.add(result["index"])
+                yield result
+
+            job = await self.get_job(job_id)
+            yield {"type": "summary", **job_summary(job)}
+        finally:
+            listeners = self._listeners.get(job_id, [])
+            if queue in listeners:
+                listeners.remove(queue)
+            if not listeners:
+                self._listeners.pop(job_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Çalışan işler ve dinleyiciler - monitoring için"""
+        return {
+            "running_jobs": len(self._tasks),
+            "listeners": sum(len(queues) for queues in self._listeners.values()),
+            "max_concurrency": settings.BATCH_MAX_CONCURRENCY,
+        }
+
+
+# Global runner instance - tüm uygulama boyunca aynı instance
+batch_runner = BatchRunner()
@@ -0,0 +1,333 @@
+# chat_stream.py - Açılmış streaming chat completion objesi
+# Upstream response'unu SSE parser ile okur, content parçalarını üretir
+# ve stream sonunda finish_reason / usage bilgisini tutar
+
+import asyncio  # Idle / total timeout'ları için
+import time  # Flush süresi ölçümü
+import httpx  # Upstream response tipi ve HTTP hataları
+from typing import Dict, Any, List, Optional, AsyncGenerator, AsyncIterator, Awaitable, Callable  # Type hints
+from app.services.sse_parser import SSEParser, StreamDelta, parse_chunk, DONE_SENTINEL  # Byte seviyesinde SSE parser
+from app.services.stream_timeouts import StreamTimeoutError, timeout_error  # Idle / total timeout
+
+
+def stream_error_message(status_code: int) -> str:
+    """
+    Stream açılırken gelen HTTP hatası için kullanıcı dostu mesaj - AI mesajı olarak gösterilir
+    """
+    if status_code == 429:
+        return "⏳ Çok fazla istek gönderildi.\n\nLütfen 1-2 dakika bekleyip tekrar deneyin.\n\nÜcretsiz API kullanımında istek limiti vardır."
+    if status_code == 404:
+        return "❌ Model bulunamadı veya artık kullanılmıyor.\n\nLütfen model dropdown'ından farklı bir model seçin."
+    if status_code == 401:
+        return "🔑 API anahtarı geçersiz.\n\nLütfen backend/.env dosyasındaki OPENROUTER_API_KEY'i kontrol edin."
+    if status_code == 503:
+        return "🔧 AI servisi şu an kullanılamıyor.\n\nLütfen birkaç dakika sonra tekrar deneyin."
+    return f"❌ Beklenmeyen bir hata oluştu (HTTP {status_code}).\n\nLütfen tekrar deneyin veya farklı bir model seçin."
+
+
+def stream_error_status(error: Any) -> int:
+    """Stream içindeki hata event'inin HTTP status'u - OpenRouter {"code": 429, ...} gönderir, yoksa 502"""
+    code = error.get("code") if isinstance(error, dict) else None
+    return code if isinstance(code, int) else 502
+
+
+# Bağlantı koparsa / timeout olursa gösterilen mesaj
+CONNECTION_ERROR_MESSAGE = "❌ Bağlantı hatası oluştu.\n\nİnternet bağlantınızı kontrol edin ve tekrar deneyin."
+
+
+class _StreamCancelled(Exception):
+    """cancel() çağrıldı - stream temiz şekilde bitirilir"""
+
+
+class ChatStream:
+    """
+    Açılmış bir streaming chat completion
+
+    OpenRouterService.open_chat_stream() upstream'den ilk token gelene kadar bekler
+    (prime) ve bu objeyi döndürür. Böylece:
+    - Router rate limit hatalarını StreamingResponse başlamadan gerçek status code ile dönebilir
+    - İlk token'dan önceki hatalarda servis fallback adayına geçebilir
+
+    Kullanım:
+        stream = await openrouter_service.open_chat_stream(model, messages)
+        try:
+            async for chunk in stream:
+                ...
+        finally:
+            await stream.aclose()
+    """
+
+    def __init__(
+        self,
+        model: str,  # İsteğin gittiği model
+        response: Optional[httpx.Response] = None,  # Açık upstream response (body okunmamış)
+        error_message: Optional[str] = None,  # Stream açılamadıysa kullanıcıya gösterilecek mesaj
+        on_close: Optional[Callable[["ChatStream"], None]] = None,  # Kapanışta çağrılır (sayaçlar, limiter)
+        failure_reason: Optional[str] = None,  # Açılamadıysa kısa sebep - span/log için (örn: "http_503")
+        fallback_allowed: bool = False,  # Bu hata sonrası başka modele geçilebilir mi?
+    ):
+        self.model = model
+        self.error_message = error_message
+        self.failure_reason = failure_reason
+        self.fallback_allowed = fallback_allowed
+        self.finish_reason: Optional[str] = None  # Stream sonunda doldurulur
+        self.usage: Optional[Dict[str, Any]] = None  # Token kullanımı (upstream gönderdiyse)
+        self.ttft: Optional[float] = None  # İstek gönderiminden ilk token'a kadar geçen süre (saniye)
+        # Ölçümler (stream_metrics) - zamanlar time.monotonic()
+        self.opened_at = time.monotonic()  # İsteğin gönderilmeye başlandığı an
+        self.headers_at: Optional[float] = None  # Upstream response header'larının geldiği an
+        self.first_token_at: Optional[float] = None  # İlk content parçasının geldiği an
+        self.queue_wait = 0.0  # Rate limiter kuyruğunda beklenen süre
+        self.chunks_received = 0  # Üretilen content parçası sayısı
+        self.bytes_received = 0  # Üretilen content byte'ı (UTF-8)
+        self.flush_seconds = 0.0  # Parçaların tüketici (client'a yazma) tarafından bekletildiği toplam süre
+        self.idle_timeout: float = 0  # İki content parçası arası max sessizlik (0: sınırsız)
+        self.total_timeout: float = 0  # Stream'in toplam max süresi (0: sınırsız)
+        self.deadline: Optional[float] = None  # total_timeout'a göre bitmesi gereken an (loop.time())
+        self.error: Optional[Dict[str, Any]] = None  # Stream yarıda kesildiyse yapılandırılmış hata
+        self.cancelled = False  # Kullanıcı durdurdu veya client bağlantıyı kapattı
+        self._cancel_requested = False  # cancel() çağrıldı
+        self._interrupt: Optional[asyncio.Future] = None  # Şu an beklenen okuma - cancel() bunu tamamlayıp okumayı keser
+        self.response = response
+        self._on_close = on_close
+        self._closed = False
+        self._deltas: Optional[AsyncGenerator[StreamDelta, None]] = None  # Upstream delta kaynağı
+        self._first: Optional[str] = None  # prime() ile okunmuş ilk content parçası
+        self._replay: Optional[List[str]] = None  # Cache'ten oynatılan parçalar (upstream yok)
+        self._recorded: Optional[List[str]] = None  # record() açıksa üretilen parçalar
+        self._on_complete: Optional[Callable[["ChatStream", List[str]], Awaitable[None]]] = None
+        self.cached = False  # Cevap cache'ten mi geliyor?
+    
+    @classmethod
+    def replay(
+        cls,
+        model: str,  # Cevabı üreten model
+        chunks: List[str],  # Saklanan content parçaları
+        finish_reason: Optional[str] = None,
+        usage: Optional[Dict[str, Any]] = None,
+    ) -> "ChatStream":
+        """
+        Cache'teki cevabı aynı parçalarla tekrar oynatan stream - client aynı streaming arayüzünü görür
+        """
+        stream = cls(model)
+        stream._replay = list(chunks)
+        stream.finish_reason = finish_reason
+        stream.usage = usage
+        stream.cached = True
+        return stream
+    
+    def record(self, on_complete: Callable[["ChatStream", List[str]], Awaitable[None]]) -> None:
+        """
+        Üretilen parçaları biriktir - stream hatasız biterse on_complete(stream, chunks) çağrılır
+        (cevap cache'ine yazmak için)
+        """
+        self._recorded = []
+        self._on_complete = on_complete
+
+    @property
+    def failed(self) -> bool:
+        """Stream hiç açılamadı mı? (sadece hata mesajı üretir)"""
+        return self.failure_reason is not None
+    
+    @property
+    def truncated(self) -> bool:
+        """Cevap yarıda mı kaldı? (iptal veya timeout)"""
+        return self.cancelled or self.error is not None
+    
+    def cancel(self) -> None:
+        """
+        Üretimi durdur (stop butonu) - bekleyen okuma hemen biter, stream o ana kadarki
+        parçalarla normal şekilde kapanır ve upstream bağlantısı bırakılır
+        """
+        self._cancel_requested = True
+        if self._interrupt is not None and not self._interrupt.done():
+            self._interrupt.set_result(None)  # Okumayı şimdi kes
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._iterate()
+
+    async def _read_deltas(self) -> AsyncGenerator[StreamDelta, None]:
+        """
+        Ham byte'ları SSE parser'a besle - satır decode + JSON parse tek geçişte
+        """
+        parser = SSEParser()
+        async for raw in self.response.aiter_bytes():
+            for event in parser.feed(raw):
+                if event.data == DONE_SENTINEL:  # OpenRouter stream bitişi
+                    return
+                delta = self._parse_event(event.data)
+                if delta is not None:
+                    yield delta
+        for event in parser.flush():  # Sunucu son boş satırı göndermeden bağlantıyı kapattı
+            if event.data == DONE_SENTINEL:
+                return
+            delta = self._parse_event(event.data)
+            if delta is not None:
+                yield delta
+
+    def _parse_event(self, data: bytes) -> Optional[StreamDelta]:
+        """Event data'sını delta'ya çevir, finish_reason / usage'ı kaydet - bozuk JSON ise None"""
+        delta = parse_chunk(data)  # content / finish_reason / usage
+        if delta is None:  # Bozuk JSON - bu event'i atla
+            return None
+        if delta.finish_reason:
+            self.finish_reason = delta.finish_reason
+        if delta.usage:
+            self.usage = delta.usage
+        return delta
+
+    async def prime(self) -> bool:
+        """
+        İlk content parçasına kadar oku - sonraki iterate bu parçadan devam eder
+
+        Returns:
+            bool: True - stream sağlıklı (ilk token geldi veya stream normal bitti)
+                  False - ilk token'dan önce hata (failure_reason / error_message doldurulur)
+        """
+        self._deltas = self._read_deltas()
+        try:
+            async for delta in self._deltas:
+                if delta.error:  # 200 ile açılıp ilk token'dan önce hata event'i geldi
+                    status_code = stream_error_status(delta.error)
+                    self.failure_reason = f"stream_error_{status_code}"
+                    self.error_message = stream_error_message(status_code)
+                    return False
+                if delta.content:
+                    self._first = delta.content
+                    return True
+        except httpx.HTTPError as e:  # İlk token beklenirken bağlantı koptu / timeout
+            print(f"❌ Streaming Hatası: {e}")  # Detaylı hata logla
+            self.failure_reason = type(e).__name__
+            self.error_message = CONNECTION_ERROR_MESSAGE
+            return False
+        return True  # Boş ama normal biten cevap
+
+    async def _iterate(self) -> AsyncGenerator[str, None]:
+        """
+        Content parçalarını üret - hata durumunda kullanıcı dostu mesaj tek parça olarak gelir
+        """
+        if self._replay is not None:
+            for chunk in self._replay:
+                yield chunk
+            return
+        
+        if self.response is None:
+            if self.error_message:
+                yield self.error_message
+            return
+
+        try:
+            first, self._first = self._first, None
+            if first is not None:
+                if self._recorded is not None:
+                    self._recorded.append(first)
+                self._count(first)
+                flush_start = time.monotonic()
+                yield first  # prime() sırasında okunan ilk token
+                self.flush_seconds += time.monotonic() - flush_start
+            if self._deltas is None:
+                self._deltas = self._read_deltas()
+            while True:
+                try:
+                    delta = await self._next_delta()
+                except StopAsyncIteration:
+                    break
+                if delta.error:  # Stream ortasında hata event'i - kısmi cevap "error" olarak kaydedilir, cache'lenmez
+                    status_code = stream_error_status(delta.error)
+                    print(f"❌ Stream ortasında hata (HTTP {status_code}): {self.model}")
+                    self._on_complete = None
+                    self.finish_reason = "error"
+                    self.error = {
+                        "code": f"stream_error_{status_code}",
+                        "message": stream_error_message(status_code),
+                        "partial": True,  # prime() ilk token'ı garanti eder
+                    }
+                    self.error_message = self.error["message"]
+                    break
+                if delta.content:  # Content varsa
+                    if self._recorded is not None:
+                        self._recorded.append(delta.content)
+                    self._count(delta.content)
+                    flush_start = time.monotonic()
+                    yield delta.content  # Token'ı gönder
+                    self.flush_seconds += time.monotonic() - flush_start  # Client'a yazma / backpressure
+            if self._on_complete is not None:
+                await self._on_complete(self, self._recorded)  # Hatasız bitti - cache'e yaz
+        except _StreamCancelled:  # cancel() - kullanıcı durdurdu
+            print(f"⏹️ Üretim durduruldu: {self.model}")
+            self.cancelled = True
+            self.finish_reason = "cancelled"
+        except asyncio.CancelledError:  # Client bağlantıyı kapattı - task iptal ediliyor
+            print(f"🔌 Client ayrıldı, upstream iptal edildi: {self.model}")
+            self.cancelled = True
+            self.finish_reason = "cancelled"
+            raise
+        except StreamTimeoutError as e:  # Model durdu veya toplam süre aşıldı - kısmi cevap korunur
+            print(f"⏱️ Stream kesildi ({e}): {self.model}")
+            self.finish_reason = "timeout"
+            self.error = timeout_error(e.kind, e.seconds, partial=True)  # prime() ilk token'ı garanti eder
+            self.error_message = self.error["message"]
+        except httpx.HTTPError as e:  # Body okunurken bağlantı koptu / timeout
+            print(f"❌ Streaming Hatası: {e}")  # Detaylı hata logla
+            self.error_message = CONNECTION_ERROR_MESSAGE
+            yield CONNECTION_ERROR_MESSAGE  # Kullanıcı dostu mesaj
+        finally:
+            # İptal sırasında aclose'un await'leri de iptal edilir - bağlantı kapanışını koru
+            await asyncio.shield(self.aclose())
+
+    def _count(self, content: str) -> None:
+        """Chunk / byte sayaçları"""
+        self.chunks_received += 1
+        self.bytes_received += len(content.encode("utf-8"))
+    
+    async def _next_delta(self) -> StreamDelta:
+        """
+        Sıradaki delta'yı idle ve total timeout'larıyla bekle
+
+        Raises:
+            StopAsyncIteration: Stream normal bitti
+            StreamTimeoutError: Idle veya total timeout aşıldı
+            _StreamCancelled: cancel() çağrıldı
+        """
+        if self._cancel_requested:
+            raise _StreamCancelled()
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        kind, limit = "idle", now + self.idle_timeout if self.idle_timeout else None
+        if self.deadline is not None and (limit is None or self.deadline <= limit):
+            kind, limit = "total", self.deadline
+        # asyncio.timeout_at 3.11+ - okuma ayrı task'ta, timeout ve cancel() ile yarışır (3.10 uyumlu)
+        read = asyncio.ensure_future(self._deltas.__anext__())
+        self._interrupt = loop.create_future()
+        try:
+            await asyncio.wait(
+                (read, self._interrupt),
+                timeout=None if limit is None else max(0.0, limit - now),  # limit None ise sadece cancel() için
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+        finally:
+            self._interrupt = None
+            if not read.done():  # Timeout, cancel() veya dış iptal - okumayı kes
+                read.cancel()
+                await asyncio.wait((read,))  # Generator iptali işlesin - aclose() ile çakışmasın
+        if not read.cancelled():
+            return read.result()  # Delta, StopAsyncIteration veya okuma hatası
+        if self._cancel_requested:
+            raise _StreamCancelled()
+        raise StreamTimeoutError(kind, self.idle_timeout if kind == "idle" else self.total_timeout)
+    
+    async def aclose(self) -> None:
+        """
+        Upstream bağlantısını havuza geri ver - birden fazla çağrılabilir
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._deltas is not None:
+                await self._deltas.aclose()  # Askıdaki parser generator'ını kapat
+            if self.response is not None:
+                await self.response.aclose()
+        finally:
+            if self._on_close is not None:
+                self._on_close(self)
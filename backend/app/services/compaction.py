@@ -0,0 +1,300 @@
+# compaction.py - Uzun sohbetler için kayan özet (rolling summary compaction)
+# Bağlam penceresi (context_window.py) sığmayan eski turları atar - bilgi kaybolur. Bunun yerine
+# geçmiş belirli bir büyüklüğü aşınca eski turlar arka planda ucuz bir modelle özetlenir:
+# - Özet, kapsadığı son mesajın ID'siyle checkpoint olarak saklanır (conversation_summaries)
+# - Upstream'e "özet + checkpoint'ten sonraki turlar" gider - prompt maliyeti O(son turlar)
+# - Özetleme istek yolunda değil, cevap kaydedildikten sonra asyncio task'ında çalışır
+# - İdempotent: sohbet başına tek task, aynı aralık için tek satır (UNIQUE + ON CONFLICT DO NOTHING)
+# - Mesaj düzenlenince düzenlenen mesajı kapsayan özetler silinir (eski içerik özetlenmiş olabilir)
+# Process içi task kaydı (tek worker varsayımı, batch / generations gibi).
+
+import asyncio  # Arka plan task'ları
+import time  # Gecikme ölçümü
+from collections import OrderedDict  # Checkpoint cache'i (LRU)
+from typing import Any, Dict, List, Optional  # Type hints
+from sqlalchemy import select, delete  # Checkpoint okuma / silme
+from sqlalchemy.dialects.sqlite import insert  # INSERT ... ON CONFLICT DO NOTHING
+from sqlalchemy.ext.asyncio import AsyncSession  # Database session
+from app.config import settings  # Compaction ayarları
+from app.database import AsyncSessionLocal  # Task request'ten bağımsız kendi session'ını açar
+from app.models.message import Message  # Özetlenecek mesajlar
+from app.models.conversation_summary import ConversationSummary  # Özet checkpoint'leri
+from app.services.history_cache import history_cache  # Özetin kapsamadığı mesajlar
+from app.services.context_window import count_message_tokens  # Tetikleme eşiği (yaklaşık token)
+from app.services.openrouter import openrouter_service  # Özetleme isteği
+from app.services.usage import turn_usage, record_usage  # Özetleme maliyeti sohbetin toplamına eklenir
+from app.services.admission import admission  # Global upstream slotları - interaktif isteklerden sonra
+
+
+CHECKPOINT_CACHE_SIZE = 4096  # Bellekte tutulan sohbet checkpoint'i (yoksa da "özet yok" olarak)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a chat between a user and an AI assistant. "
+    "Merge the previous summary (if any) with the new turns into a single updated summary. "
+    "Keep facts, names, numbers, code identifiers, decisions, user preferences and open questions; "
+    "drop greetings and repetition. Write in the language of the conversation, as concise prose or "
+    "bullet points, at most 300 words. Output only the summary."
+)
+
+
+def summary_message(content: str) -> Dict[str, Any]:
+    """Özet checkpoint'i -> upstream'e gidecek system mesajı"""
+    return {"role": "system", "content": f"Summary of the earlier conversation:\n{content}"}
+
+
+def _transcript_line(message: Message) -> str:
+    speaker = "User" if message.role == "user" else "Assistant"
+    image = " [image]" if message.image_url else ""
+    return f"{speaker}:{image} {message.content}"
+
+
+class _Checkpoint:
+    __slots__ = ("last_message_id", "content", "message_count")
+
+    def __init__(self, last_message_id: int, content: str, message_count: int):
+        self.last_message_id = last_message_id
+        self.content = content
+        self.message_count = message_count
+
+
+class ConversationCompactor:
+    """
+    Sohbet özetleri - geçmişi kurar (history) ve eşik aşılınca özetleme task'ı başlatır (schedule)
+
+    Her sohbetin son checkpoint'i bellekte tutulur ("özet yok" dahil) - turlar checkpoint için
+    DB'ye gitmez. Özetleme sürerken sohbet düzenlenir / silinirse sonuç kaydedilmez.
+    """
+
+    def __init__(self):
+        self._checkpoints: "OrderedDict[int, Optional[_Checkpoint]]" = OrderedDict()  # Sohbet ID -> son checkpoint
+        self._tasks: Dict[int, asyncio.Task] = {}  # Sohbet ID -> çalışan özetleme task'ı
+        self._versions: Dict[int, int] = {}  # Sohbet ID -> task sürerken düzenleme sayacı (task bitince silinir)
+        # İstatistikler - monitoring için
+        self._runs = 0
+        self._compactions = 0
+        self._discarded = 0
+        self._failures = 0
+        self._messages_compacted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.COMPACTION_ENABLED
+
+    async def history(self, db: AsyncSession, conversation_id: int) -> List[Dict[str, Any]]:
+        """
+        Sohbetin upstream'e gidecek geçmişi - özet varsa "özet + sonraki turlar"
+
+        Returns:
+            List[Dict]: OpenRouter formatında mesajlar (kopya liste)
+        """
+        checkpoint = await self.checkpoint(db, conversation_id) if self.enabled else None
+        if checkpoint is None:
+            return await history_cache.load(db, conversation_id)
+        messages = await history_cache.load(db, conversation_id, after_id=checkpoint.last_message_id)
+        messages.insert(0, summary_message(checkpoint.content))
+        return messages
+
+    async def checkpoint(self, db: AsyncSession, conversation_id: int) -> Optional[_Checkpoint]:
+        """Sohbetin geçerli (en son) özeti - bellekte yoksa DB'den bir kez okunur"""
+        if conversation_id in self._checkpoints:
+            self._checkpoints.move_to_end(conversation_id)
+            return self._checkpoints[conversation_id]
+        row = (await db.execute(
+            select(ConversationSummary)
+            .where(ConversationSummary.conversation_id == conversation_id)
+            .order_by(ConversationSummary.last_message_id.desc())
+            .limit(1)
+        )).scalar_one_or_none()
+        checkpoint = _Checkpoint(row.last_message_id, row.content, row.message_count) if row else None
+        if conversation_id not in self._checkpoints:  # Okuma sürerken yeni özet kaydedildiyse onu ezme
+            self._remember(conversation_id, checkpoint)
+        return self._checkpoints.get(conversation_id, checkpoint)
+
+    def start(self, conversation_id: int) -> None:
+        """Yeni oluşturulan sohbet - özet yok (ilk turlarda checkpoint SELECT'i gerekmez)"""
+        self._remember(conversation_id, None)
+
+    def schedule(self, conversation_id: int, history: List[Dict[str, Any]]) -> None:
+        """
+        Gönderilen geçmiş eşiği aştıysa özetleme task'ı başlat - cevap kaydedildikten sonra çağrılır
+
+        Sohbet için zaten çalışan task varsa bir şey yapılmaz (sonraki tur tekrar tetikler).
+
+        Args:
+            conversation_id: Sohbet ID
+            history: Bu turda upstream'e gönderilen geçmiş (özet mesajı dahil)
+        """
+        if not self.enabled or conversation_id in self._tasks:
+            return
+        if sum(count_message_tokens(message) for message in history) < settings.COMPACTION_TRIGGER_TOKENS:
+            return
+        task = asyncio.create_task(self._run(conversation_id))
+        self._tasks[conversation_id] = task
+        task.add_done_callback(lambda _: self._task_done(conversation_id))
+
+    def _task_done(self, conversation_id: int) -> None:
+        """Özetleme bitti - sayaç sadece çalışan task için gerekli, sohbet başına birikmesin"""
+        self._tasks.pop(conversation_id, None)
+        self._versions.pop(conversation_id, None)
+
+    async def discard_from(self, db: AsyncSession, conversation_id: int, message_id: int) -> None:
+        """
+        Mesaj düzenleniyor - bu mesajı kapsayan özetleri sil (commit ETMEZ, çağıranın transaction'ı)
+
+        Commit'ten sonra invalidate() çağrılmalı.
+        """
+        await db.execute(
+            delete(ConversationSummary).where(
+                ConversationSummary.conversation_id == conversation_id,
+                ConversationSummary.last_message_id >= message_id,
+            )
+        )
+
+    def invalidate(self, conversation_id: int) -> None:
+        """Sohbet düzenlendi / silindi - checkpoint'i unut, çalışan özetlemenin sonucu kaydedilmesin"""
+        self._checkpoints.pop(conversation_id, None)
+        if conversation_id in self._tasks:  # Task yoksa eskiyecek sonuç da yok - sayaç tutulmaz
+            self._versions[conversation_id] = self._versions.get(conversation_id, 0) + 1
+
+    async def close(self) -> None:
+        """Uygulama kapanıyor - özetleme task'larını durdur (yarım kalan özet sonraki turda tekrar tetiklenir)"""
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, conversation_id: int) -> None:
+        self._runs += 1
+        try:
+            # Çok uzun sohbet birden fazla adımda özetlenir - her adım COMPACTION_MAX_INPUT_TOKENS kadar
+            while await self._compact(conversation_id):
+                pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # Arka plan işi - hata istek yolunu etkilemez, sonraki tur tekrar dener
+            self._failures += 1
+            print(f"⚠️ Sohbet özetlenemedi (#{conversation_id}): {e}")
+
+    async def _compact(self, conversation_id: int) -> bool:
+        """
+        Checkpoint'ten sonraki eski turları bir önceki özetle birleştirip yeni checkpoint kaydet
+
+        Son COMPACTION_KEEP_RECENT_MESSAGES mesaj özetlenmez; kapsanan aralık asistan mesajıyla biter
+        (kalan turlar kullanıcı mesajıyla başlar).
+
+        Returns:
+            bool: True - checkpoint kaydedildi ve özetlenecek mesaj hâlâ eşiğin üstünde
+        """
+        version = self._versions.get(conversation_id, 0)
+        async with AsyncSessionLocal() as db:
+            checkpoint = await self.checkpoint(db, conversation_id)
+            after_id = checkpoint.last_message_id if checkpoint else 0
+            rows = (await db.execute(
+                select(Message)
+                .where(Message.conversation_id == conversation_id, Message.id > after_id)
+                .order_by(Message.timestamp.asc(), Message.id.asc())
+            )).scalars().all()
+
+        tokens = [count_message_tokens({"content": row.content}) for row in rows]
+        if sum(tokens) < settings.COMPACTION_TRIGGER_TOKENS:
+            return False  # Başka bir task / önceki adım zaten özetlemiş
+        candidates = rows[:max(len(rows) - settings.COMPACTION_KEEP_RECENT_MESSAGES, 0)]
+        covered: List[Message] = []
+        budget = settings.COMPACTION_MAX_INPUT_TOKENS
+        for row, row_tokens in zip(candidates, tokens):
+            if covered and row_tokens > budget:
+                break
+            covered.append(row)
+            budget -= row_tokens
+        while covered and covered[-1].role != "assistant":
+            covered.pop()
+        if not covered:
+            return False
+
+        transcript = "\n\n".join(_transcript_line(row) for row in covered)
+        previous = f"Previous summary:\n{checkpoint.content}\n\n" if checkpoint else ""
+        prompt = [
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {"role": "user", "content": f"{previous}New turns:\n{transcript}"},
+        ]
+
+        ticket = await admission.acquire(background=True)  # Özetleme interaktif istekleri bekletmez
+        started_at = time.monotonic()
+        try:
+            result = await openrouter_service.chat_completion(model=settings.COMPACTION_MODEL, messages=prompt)
+        finally:
+            ticket.release()
+        content = (result.get("choices") or [{}])[0].get("message", {}).get("content", "") if not result.get("error") else ""
+        if not content or not content.strip():
+            self._failures += 1
+            print(f"⚠️ Sohbet özetlenemedi (#{conversation_id}): {result.get('message', 'boş özet')}")
+            return False
+        if self._versions.get(conversation_id, 0) != version:
+            self._discarded += 1  # Özetleme sürerken sohbet düzenlendi / silindi
+            return False
+
+        model_used = result.get("model_used", settings.COMPACTION_MODEL)
+        reused = bool(result.get("cached") or result.get("shared"))
+        usage = turn_usage(
+            result.get("usage"),
+            started_at,
+            pricing=openrouter_service.model_pricing(model_used),
+            billed=not reused,
+        )
+        new_checkpoint = _Checkpoint(
+            covered[-1].id,
+            content.strip(),
+            (checkpoint.message_count if checkpoint else 0) + len(covered),
+        )
+        async with AsyncSessionLocal() as db:
+            inserted = await db.execute(
+                insert(ConversationSummary).values(
+                    conversation_id=conversation_id,
+                    last_message_id=new_checkpoint.last_message_id,
+                    content=new_checkpoint.content,
+                    message_count=new_checkpoint.message_count,
+                    model_name=model_used,
+                    prompt_tokens=usage["prompt_tokens"],
+                    completion_tokens=usage["completion_tokens"],
+                    cost=usage["cost"],
+                ).on_conflict_do_nothing(  # Aynı aralık zaten özetlendi - tekrar yazma / tekrar ödeme kaydetme
+                    index_elements=[ConversationSummary.conversation_id, ConversationSummary.last_message_id]
+                )
+            )
+            if inserted.rowcount:
+                await record_usage(db, model_used, usage, conversation_id=conversation_id, cached=reused)  # Aynı commit
+            await db.commit()
+        if self._versions.get(conversation_id, 0) != version:
+            self._discarded += 1
+            return False
+
+        self._remember(conversation_id, new_checkpoint)
+        self._compactions += 1
+        self._messages_compacted += len(covered)
+        print(f"🗜️ Sohbet özetlendi (#{conversation_id}): {len(covered)} mesaj -> checkpoint {new_checkpoint.last_message_id}")
+        remaining = sum(row_tokens for row, row_tokens in zip(rows, tokens) if row.id > new_checkpoint.last_message_id)
+        return remaining >= settings.COMPACTION_TRIGGER_TOKENS
+
+    def _remember(self, conversation_id: int, checkpoint: Optional[_Checkpoint]) -> None:
+        self._checkpoints[conversation_id] = checkpoint
+        self._checkpoints.move_to_end(conversation_id)
+        while len(self._checkpoints) > CHECKPOINT_CACHE_SIZE:
+            self._checkpoints.popitem(last=False)  # En uzun süredir kullanılmayan
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Özetleme istatistikleri - monitoring için"""
+        return {
+            "enabled": self.enabled,
+            "model": settings.COMPACTION_MODEL,
+            "running": len(self._tasks),
+            "runs": self._runs,
+            "compactions": self._compactions,
+            "messages_compacted": self._messages_compacted,
+            "discarded": self._discarded,
+            "failures": self._failures,
+            "cached_checkpoints": len(self._checkpoints),
+        }
+
+
+# Global compactor instance - tüm chat endpoint'leri aynı kaydı paylaşır
+compaction_service = ConversationCompactor()
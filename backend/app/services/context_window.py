@@ -0,0 +1,138 @@
+# context_window.py - Token bütçeli bağlam penceresi
+# Uzun sohbetlerde geçmişin tamamı upstream'e gönderilirse model context'ini aşar (400) veya
+# her turda on binlerce prompt token'ı ödenir. Pencere modelin katalogdaki context_length'ine
+# (ve opsiyonel sabit bütçeye) göre kurulur:
+# - System mesajları her zaman kalır
+# - En yeni mesajlardan geriye doğru bütçe dolana kadar eklenir
+# - Sığmayan eski mesajlar çıkarılır, yerine tek satırlık bir not konur
+# Token sayımı yaklaşıktır (kelime parçaları) ve metin bazında cache'lenir - her turda aynı
+# geçmiş mesajları tekrar sayılmaz.
+
+import re  # Kelime / noktalama parçaları
+from functools import lru_cache  # Metin başına token sayısı cache'i
+from typing import Any, Dict, List, Optional  # Type hints
+from app.config import settings  # Bütçe ayarları
+
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")  # Kelimeler ve tek tek noktalama işaretleri
+MESSAGE_OVERHEAD_TOKENS = 4  # Mesaj başına rol / format yükü
+IMAGE_TOKENS = 850  # Resim parçası başına kaba maliyet (yüksek çözünürlüklü tek görsel)
+
+
+@lru_cache(maxsize=16384)
+def count_text_tokens(text: str) -> int:
+    """
+    Metnin yaklaşık token sayısı - BPE tokenizer'lara yakın, çok daha hızlı
+
+    Kısa kelimeler ~1 token, uzun kelimeler ~4 karakterde bir token, her noktalama 1 token.
+    """
+    return sum((len(piece) + 3) // 4 for piece in _PIECE_RE.findall(text))
+
+
+def count_message_tokens(message: Dict[str, Any]) -> int:
+    """Tek mesajın yaklaşık token sayısı (multimodal içerik dahil)"""
+    content = message.get("content")
+    tokens = MESSAGE_OVERHEAD_TOKENS
+    if isinstance(content, str):
+        tokens += count_text_tokens(content)
+    elif isinstance(content, list):  # Multimodal - text parçaları + görseller
+        for part in content:
+            if not isinstance(part, dict):
+                continue
+            if part.get("type") == "image_url":
+                tokens += IMAGE_TOKENS
+            else:
+                tokens += count_text_tokens(part.get("text", ""))
+    return tokens
+
+
+class ContextWindow:
+    """
+    Upstream'e gidecek mesajlar ve pencere istatistikleri (span'e yazılır)
+    """
+
+    __slots__ = ("messages", "budget", "tokens", "original_tokens", "dropped_messages")
+
+    def __init__(self, messages: List[Dict[str, Any]], budget: Optional[int], tokens: int,
+                 original_tokens: int, dropped_messages: int = 0):
+        self.messages = messages
+        self.budget = budget  # None: sınır yok (context_length bilinmiyor, sabit bütçe yok)
+        self.tokens = tokens  # Gönderilen mesajların yaklaşık token'ı
+        self.original_tokens = original_tokens  # Geçmişin tamamı
+        self.dropped_messages = dropped_messages
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.original_tokens - self.tokens
+
+    def span_attributes(self) -> Dict[str, Any]:
+        attributes = {
+            "context.tokens": self.tokens,
+            "context.tokens_saved": self.tokens_saved,
+            "context.dropped_messages": self.dropped_messages,
+        }
+        if self.budget is not None:
+            attributes["context.budget"] = self.budget
+        return attributes
+
+
+def context_budget(context_length: Optional[int]) -> Optional[int]:
+    """
+    Prompt için token bütçesi - model context'i (tokenizer hata payı ve cevap payı düşülmüş)
+    ve CONTEXT_MAX_PROMPT_TOKENS'tan küçük olanı
+
+    Returns:
+        int veya None (sınır yok)
+    """
+    budgets = []
+    if context_length:
+        budgets.append(int(context_length * settings.CONTEXT_SAFETY_RATIO) - settings.CONTEXT_COMPLETION_RESERVE_TOKENS)
+    if settings.CONTEXT_MAX_PROMPT_TOKENS:
+        budgets.append(settings.CONTEXT_MAX_PROMPT_TOKENS)
+    return max(min(budgets), 0) if budgets else None
+
+
+def assemble_context(messages: List[Dict[str, Any]], context_length: Optional[int] = None) -> ContextWindow:
+    """
+    Geçmişi bütçeye sığdır - system mesajları + sığan en yeni mesajlar
+
+    Son mesaj (kullanıcının sorusu) bütçeyi tek başına aşsa bile gönderilir. Pencere asistan
+    mesajıyla başlamaz (bazı modeller kullanıcıyla başlayan sıra bekler).
+
+    Args:
+        messages: OpenRouter formatında tam geçmiş
+        context_length: Modelin context uzunluğu (katalogdan; bilinmiyorsa None)
+
+    Returns:
+        ContextWindow: Gönderilecek mesajlar ve istatistikler
+    """
+    counts = [count_message_tokens(message) for message in messages]
+    total = sum(counts)
+    budget = context_budget(context_length) if settings.CONTEXT_WINDOW_ENABLED else None
+    if budget is None or total <= budget:
+        return ContextWindow(messages, budget, total, total)
+
+    system = [i for i, message in enumerate(messages) if message.get("role") == "system"]
+    rest = [i for i, message in enumerate(messages) if message.get("role") != "system"]
+    used = sum(counts[i] for i in system)
+    kept: List[int] = []
+    for i in reversed(rest):
+        if kept and used + counts[i] > budget:
+            break
+        kept.append(i)
+        used += counts[i]
+    kept.reverse()
+    while len(kept) > 1 and messages[kept[0]].get("role") == "assistant":
+        used -= counts[kept.pop(0)]
+
+    dropped = len(rest) - len(kept)
+    window = [messages[i] for i in system]
+    if dropped:
+        note = {
+            "role": "system",
+            "content": f"[Earlier conversation truncated: {dropped} older messages omitted to fit the context window]",
+        }
+        window.append(note)
+        used += count_message_tokens(note)
+    window.extend(messages[i] for i in kept)
+    return ContextWindow(window, budget, used, total, dropped)
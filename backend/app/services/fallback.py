@@ -0,0 +1,94 @@
+# fallback.py - Model fallback zincirleri
+# Seçilen model ilk token'dan önce hata verirse (404, 429, 5xx, breaker açık, bağlantı hatası)
+# sıradaki aday modele geçilir. Zincirler model ID'si veya yetenek sınıfı ("free-vision" gibi)
+# bazında tanımlanır; sınıf adayları katalogdaki indeksli registry'den çözülür.
+
+from typing import List, Dict, Any, Optional  # Type hints
+from app.config import settings  # Zincir ayarları
+from app.services.model_registry import ModelRegistry  # Yetenek sınıfı -> model listesi
+
+
+# Bir sonraki adaya geçilmesini gerektiren upstream status code'ları
+# 4xx'lerden sadece "bu model şu an cevap veremez" anlamına gelenler (401 gibi hatalar her modelde aynıdır)
+FALLBACK_STATUS_CODES = frozenset({404, 429, 500, 502, 503, 504})
+
+# Yetenek sınıfları - ModelRegistry.query filtreleri
+CAPABILITY_CLASSES: Dict[str, Dict[str, Any]] = {
+    "free": {"free": True},  # Ücretsiz modeller
+    "free-vision": {"free": True, "vision": True},  # Görsel destekleyen ücretsiz modeller
+    "paid": {"free": False},  # Ücretli modeller
+    "paid-vision": {"free": False, "vision": True},  # Görsel destekleyen ücretli modeller
+    "vision": {"vision": True},  # Görsel destekleyen tüm modeller
+}
+
+
+def needs_vision(messages: List[Dict[str, Any]]) -> bool:
+    """
+    İstekte görsel var mı? - Varsa fallback adayları da vision desteklemeli
+    """
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list) and any(
+            isinstance(part, dict) and part.get("type") == "image_url" for part in content
+        ):
+            return True
+    return False
+
+
+def request_class(model: str, vision: bool, registry: Optional[ModelRegistry] = None) -> str:
+    """
+    İsteğin yetenek sınıfı - modelin ücret durumu + görsel ihtiyacı
+
+    Returns:
+        str: "free", "free-vision", "paid" veya "paid-vision"
+    """
+    info = registry.get(model) if registry is not None else None
+    is_free = info["is_free"] if info is not None else model.endswith(":free")  # Katalog yoksa ID'den tahmin
+    return ("free" if is_free else "paid") + ("-vision" if vision else "")
+
+
+def resolve_chain(
+    model: str,  # Kullanıcının seçtiği model
+    messages: List[Dict[str, Any]],  # Sohbet geçmişi - görsel ihtiyacı için
+    registry: Optional[ModelRegistry] = None,  # Katalog registry'si (yoksa sınıf adayları atlanır)
+) -> List[str]:
+    """
+    Denenecek model listesi - ilk eleman her zaman seçilen model
+
+    Zincir önceliği: MODEL_FALLBACK_CHAINS[model] > MODEL_FALLBACK_CHAINS[yetenek sınıfı]
+    Zincirdeki her eleman ya model ID'si ya da CAPABILITY_CLASSES'taki bir sınıf adıdır;
+    sınıflar registry'den context length'e göre (büyükten küçüğe) genişletilir.
+
+    Returns:
+        List[str]: [seçilen model, fallback adayları...] - en fazla 1 + MODEL_FALLBACK_MAX_CANDIDATES
+    """
+    if not settings.MODEL_FALLBACK_ENABLED:
+        return [model]
+
+    vision = needs_vision(messages)
+    chains = settings.MODEL_FALLBACK_CHAINS
+    entries = chains.get(model) or chains.get(request_class(model, vision, registry)) or []
+
+    candidates = [model]
+    limit = 1 + settings.MODEL_FALLBACK_MAX_CANDIDATES
+    for entry in entries:
+        if entry in CAPABILITY_CLASSES:
+            if registry is None:
+                continue  # Katalog henüz yok - sınıf çözülemez
+            filters = dict(CAPABILITY_CLASSES[entry])
+            if vision:
+                filters["vision"] = True  # Görselli istek görselsiz modele düşmesin
+            page, _, _ = registry.query(**filters, sort="context_length")
+            ids = [item["id"] for item in page]
+        else:
+            info = registry.get(entry) if registry is not None else None
+            if vision and info is not None and not info["supportsVision"]:
+                continue  # Açıkça yazılmış ama görsel desteklemeyen model
+            ids = [entry]
+
+        for candidate in ids:
+            if candidate not in candidates:
+                candidates.append(candidate)
+                if len(candidates) >= limit:
+                    return candidates
+    return candidates
@@ -0,0 +1,55 @@
+# generations.py - Devam eden streaming cevapların kaydı
+# Her açık stream bir generation ID alır (X-Generation-Id header'ı). Stop butonu
+# POST /api/chat/generations/{id}/cancel ile bu ID üzerinden üretimi durdurur.
+
+import uuid  # Tahmin edilemeyen generation ID'leri için
+from typing import Dict, Optional  # Type hints
+from app.services.chat_stream import ChatStream  # Açılmış stream objesi
+
+
+# Generation ID -> açık stream (process içi - tek worker varsayımı, temporary_sessions gibi)
+_generations: Dict[str, ChatStream] = {}
+
+
+def register(stream: ChatStream) -> str:
+    """
+    Açılmış stream'i kaydet
+
+    Args:
+        stream: open_chat_stream() ile açılmış stream
+
+    Returns:
+        str: Generation ID - client'a X-Generation-Id header'ı ile gönderilir
+    """
+    generation_id = uuid.uuid4().hex  # Başka kullanıcının stream'i tahmin edilip durdurulamasın
+    _generations[generation_id] = stream
+    return generation_id
+
+
+def unregister(generation_id: str) -> None:
+    """Stream bitti - kaydı sil (birden fazla çağrılabilir)"""
+    _generations.pop(generation_id, None)
+
+
+def get(generation_id: str) -> Optional[ChatStream]:
+    """Devam eden stream'i döndür (yoksa None)"""
+    return _generations.get(generation_id)
+
+
+def cancel(generation_id: str) -> bool:
+    """
+    Üretimi durdur
+
+    Returns:
+        bool: True - stream bulundu ve durduruldu, False - ID yok veya stream zaten bitti
+    """
+    stream = _generations.get(generation_id)
+    if stream is None:
+        return False
+    stream.cancel()  # Bekleyen okuma hemen biter, router kısmi cevabı kaydeder
+    return True
+
+
+def active_count() -> int:
+    """Şu an devam eden generation sayısı"""
+    return len(_generations)
@@ -0,0 +1,103 @@
+# hedging.py - Time-to-first-token kuyruğunu kesmek için hedged request desteği
+# Birincil istek model için tipik (p95) ilk token süresini aşarsa ikinci bir istek gönderilir;
+# hangisi önce token üretirse o kazanır. Ek yük, trafiğin belli bir yüzdesiyle sınırlanır.
+
+from collections import deque  # Model başına son TTFT örnekleri
+from typing import Dict, Any, Deque, Optional  # Type hints
+from app.config import settings  # Hedging ayarları
+
+
+class TTFTTracker:
+    """
+    Model başına son N isteğin time-to-first-token (TTFT) örnekleri
+    Hedge gecikmesi bu örneklerin yüzdelik dilimiyle (varsayılan p95) belirlenir
+    """
+
+    def __init__(self, window: int = None):
+        self.window = window if window is not None else settings.HEDGE_SAMPLE_WINDOW
+        self._samples: Dict[str, Deque[float]] = {}  # Model ID -> son TTFT'ler (saniye)
+
+    def record(self, model: str, seconds: float) -> None:
+        """Başarılı bir stream'in ilk token süresini kaydet"""
+        samples = self._samples.get(model)
+        if samples is None:
+            samples = self._samples[model] = deque(maxlen=self.window)
+        samples.append(seconds)
+
+    def percentile(self, model: str, percentile: float) -> Optional[float]:
+        """
+        Model için TTFT yüzdelik değeri
+
+        Returns:
+            float: Saniye veya None (yeterli örnek yoksa)
+        """
+        samples = self._samples.get(model)
+        if not samples or len(samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)  # Pencere küçük (varsayılan 200) - sıralama ucuz
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100.0))
+        return ordered[index]
+
+    def hedge_delay(self, model: str) -> float:
+        """
+        Birincil isteğin hedge gönderilmeden önce bekleyeceği süre
+        Yeterli örnek yoksa HEDGE_INITIAL_DELAY kullanılır; sonuç [min, max] aralığına sıkıştırılır
+        """
+        delay = self.percentile(model, settings.HEDGE_DELAY_PERCENTILE)
+        if delay is None:
+            delay = settings.HEDGE_INITIAL_DELAY
+        return min(settings.HEDGE_MAX_DELAY, max(settings.HEDGE_MIN_DELAY, delay))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Model bazında örnek sayısı ve p50/p95 - admin endpoint'i için"""
+        result = {}
+        for model, samples in self._samples.items():
+            ordered = sorted(samples)
+            result[model] = {
+                "samples": len(ordered),
+                "p50_seconds": round(ordered[len(ordered) // 2], 3),
+                "p95_seconds": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+                "hedge_delay_seconds": round(self.hedge_delay(model), 3),
+            }
+        return result
+
+
+class HedgeBudget:
+    """
+    Hedge bütçesi - hedge isteklerini trafiğin belli bir yüzdesiyle sınırlar
+
+    Her hedge'e uygun istek bütçeye percent/100 token ekler, her hedge 1 token harcar.
+    Böylece upstream yavaşladığında hedge'ler yükü katlayamaz (retry budget mantığı).
+    """
+
+    def __init__(self, percent: float = None, max_tokens: float = None):
+        self.percent = percent if percent is not None else settings.HEDGE_BUDGET_PERCENT
+        self.max_tokens = max_tokens if max_tokens is not None else settings.HEDGE_BUDGET_BURST
+        self._tokens = self.max_tokens  # Başlangıçta küçük bir burst'e izin ver
+        self.requests = 0  # Hedge'e uygun istek sayısı
+        self.hedges = 0  # Gönderilen hedge sayısı
+        self.denied = 0  # Bütçe yetmediği için gönderilmeyen hedge sayısı
+
+    def deposit(self) -> None:
+        """Hedge'e uygun yeni bir istek geldi"""
+        self.requests += 1
+        self._tokens = min(self.max_tokens, self._tokens + self.percent / 100.0)
+
+    def try_spend(self) -> bool:
+        """Hedge göndermek için bütçeden 1 token harca - yetmezse False"""
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            self.hedges += 1
+            return True
+        self.denied += 1
+        return False
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Bütçe durumu - admin endpoint'i için"""
+        return {
+            "percent": self.percent,
+            "tokens": round(self._tokens, 2),
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "denied": self.denied,
+        }
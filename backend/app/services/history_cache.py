@@ -0,0 +1,242 @@
+# history_cache.py - Sohbet başına upstream'e gönderilmeye hazır geçmiş cache'i
+# Her turda sohbetin tüm mesajlarını SELECT edip ORM objelerinden tekrar liste kurmak yerine
+# liste bellekte tutulur ve her yeni mesaj commit edildikten sonra sonuna eklenir:
+# - Cache miss: mesajlar bir kez DB'den okunur, liste kurulur ve saklanır
+# - Mesaj düzenleme / sohbet silme: o sohbetin girdisi silinir (sonraki tur DB'den kurar)
+# - Byte bütçeli LRU - en uzun süredir kullanılmayan sohbet önce atılır
+# - Özetlenmiş (compaction) sohbetlerde sadece özetin kapsamadığı mesajlar tutulur
+# Process içi cache (tek worker varsayımı, generations / batch gibi).
+
+from bisect import bisect_right  # Özetin kapsadığı mesajları baştan kesmek için
+from collections import OrderedDict  # LRU sırası
+from typing import Any, Dict, List, Optional, Set  # Type hints
+from opentelemetry import metrics  # Hit / miss metrikleri
+from sqlalchemy import select  # Cache miss'te geçmişin okunması
+from sqlalchemy.ext.asyncio import AsyncSession  # Database session
+from app.config import settings  # Cache ayarları
+from app.models.message import Message  # Message model
+
+
+# Metrics - MeterProvider telemetry.py'de kurulur; kurulmadıysa no-op
+meter = metrics.get_meter(__name__)
+_lookups = meter.create_counter(
+    "history_cache.lookups", unit="{lookup}",
+    description="Sohbet geçmişi cache'i aramaları (result=hit/miss)",
+)
+
+ENTRY_OVERHEAD_BYTES = 64  # Mesaj başına dict / liste yükü - kaba tahmin
+
+
+def history_message(role: str, content: str, image_url: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Tek mesajı OpenRouter formatına çevir - resim varsa multimodal format
+
+    Args:
+        role: user veya assistant
+        content: Mesaj metni
+        image_url: Resim URL'i veya base64 (vision model'ler için)
+    """
+    if image_url:
+        return {
+            "role": role,
+            "content": [
+                {"type": "text", "text": content},  # Text kısmı
+                {"type": "image_url", "image_url": {"url": image_url}},  # Resim kısmı
+            ],
+        }
+    return {"role": role, "content": content}  # Basit string format
+
+
+def message_size(message: Message) -> int:
+    """Mesajın cache'te kapladığı yaklaşık byte"""
+    return len(message.content or "") + len(message.image_url or "") + ENTRY_OVERHEAD_BYTES
+
+
+class _Entry:
+    __slots__ = ("messages", "ids", "sizes", "size", "after_id")
+
+    def __init__(self, after_id: int = 0):
+        self.messages: List[Dict[str, Any]] = []  # Upstream'e gidecek liste
+        self.ids: List[int] = []  # Mesaj ID'leri (artan) - sıra dışı ekleme tespiti ve kesme için
+        self.sizes: List[int] = []  # Mesaj başına yaklaşık byte
+        self.size = 0  # Yaklaşık byte
+        self.after_id = after_id  # Girdi bu ID'den sonraki mesajları içerir (0: tüm geçmiş)
+
+    @property
+    def last_id(self) -> int:
+        return self.ids[-1] if self.ids else self.after_id
+
+    def add(self, message_id: int, message: Dict[str, Any], size: int) -> None:
+        self.messages.append(message)
+        self.ids.append(message_id)
+        self.sizes.append(size)
+        self.size += size
+
+    def trim(self, after_id: int) -> int:
+        """after_id'ye kadarki (özetlenmiş) mesajları at - serbest kalan byte'ı döndür"""
+        count = bisect_right(self.ids, after_id)
+        freed = sum(self.sizes[:count])
+        del self.messages[:count], self.ids[:count], self.sizes[:count]
+        self.size -= freed
+        self.after_id = after_id
+        return freed
+
+
+class HistoryCache:
+    """
+    Sohbet ID -> hazır geçmiş listesi, byte bütçeli LRU
+
+    Eklemeler mesaj DB'ye commit edildikten sonra yapılır; cache'te olmayan sohbete ekleme
+    yapılmaz (sonraki okuma DB'den kurar). Miss sırasında aynı sohbete yazılırsa okunan
+    liste saklanmaz - eski veri cache'e girmez.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_entry_bytes: Optional[int] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.HISTORY_CACHE_MAX_BYTES
+        self.max_entry_bytes = max_entry_bytes if max_entry_bytes is not None else settings.HISTORY_CACHE_MAX_ENTRY_BYTES
+        self._entries: "OrderedDict[int, _Entry]" = OrderedDict()  # En son kullanılan sonda
+        self._bytes = 0
+        self._loading: Dict[int, int] = {}  # Sohbet ID -> devam eden DB okuması sayısı
+        self._stale: Set[int] = set()  # Okuma sürerken yazılan sohbetler
+        # İstatistikler - monitoring için
+        self._hits = 0
+        self._misses = 0
+        self._appends = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return settings.HISTORY_CACHE_ENABLED and self.max_bytes > 0
+
+    async def load(self, db: AsyncSession, conversation_id: int, after_id: int = 0) -> List[Dict[str, Any]]:
+        """
+        Sohbetin upstream'e gidecek geçmişi - cache'ten veya (miss) DB'den
+
+        Args:
+            db: Database session (sadece miss'te kullanılır)
+            conversation_id: Sohbet ID
+            after_id: Sadece bu ID'den sonraki mesajlar (özet checkpoint'i - 0: tüm geçmiş)
+
+        Returns:
+            List[Dict]: OpenRouter formatında mesajlar (kopya liste - caller ekleme yapabilir)
+        """
+        entry = self._entries.get(conversation_id) if self.enabled else None
+        if entry is not None and after_id < entry.after_id:
+            entry = None  # Girdi daha yeni bir özete göre kesilmiş (özet silindi) - DB'den kur
+        if entry is not None:
+            if after_id > entry.after_id:
+                self._bytes -= entry.trim(after_id)  # Yeni özetin kapsadığı mesajlar bellekten çıkar
+            self._entries.move_to_end(conversation_id)  # LRU - en son kullanılan
+            self._hits += 1
+            _lookups.add(1, {"result": "hit"})
+            return list(entry.messages)
+
+        self._misses += 1
+        _lookups.add(1, {"result": "miss"})
+        self._loading[conversation_id] = self._loading.get(conversation_id, 0) + 1
+        try:
+            messages_result = await db.execute(
+                select(Message)
+                .where(Message.conversation_id == conversation_id, Message.id > after_id)
+                .order_by(Message.timestamp.asc(), Message.id.asc())  # Eskiden yeniye sırala
+            )
+            all_messages = messages_result.scalars().all()
+        finally:
+            self._loading[conversation_id] -= 1
+            stale = conversation_id in self._stale
+            if not self._loading[conversation_id]:
+                del self._loading[conversation_id]
+                self._stale.discard(conversation_id)
+
+        entry = _Entry(after_id)
+        for msg in all_messages:
+            entry.add(msg.id, history_message(msg.role, msg.content, msg.image_url), message_size(msg))
+        if self.enabled and not stale:
+            self._store(conversation_id, entry)
+        return list(entry.messages)
+
+    def contains(self, conversation_id: int) -> bool:
+        """Sohbetin hazır geçmişi cache'te mi (sonraki load() DB'ye gitmez)"""
+        return self.enabled and conversation_id in self._entries
+
+    def start(self, conversation_id: int) -> None:
+        """Yeni oluşturulan sohbet - boş geçmişle başlat (ilk turda SELECT gerekmez)"""
+        if self.enabled:
+            self._store(conversation_id, _Entry())
+
+    def append(self, message: Message) -> None:
+        """
+        Commit edilmiş mesajı sohbetin geçmişine ekle - sohbet cache'te değilse bir şey yapmaz
+
+        Sıra dışı gelen mesaj (eşzamanlı iki tur) girdiyi geçersiz kılar - sıra DB'den tekrar kurulur.
+        """
+        conversation_id = message.conversation_id
+        self._mark_stale(conversation_id)
+        entry = self._entries.get(conversation_id)
+        if entry is None:
+            return
+        if message.id <= entry.last_id:
+            self.invalidate(conversation_id)
+            return
+        size = message_size(message)
+        entry.add(message.id, history_message(message.role, message.content, message.image_url), size)
+        self._bytes += size
+        self._appends += 1
+        if entry.size > self.max_entry_bytes:
+            self.invalidate(conversation_id)  # Tek sohbet bütçeyi yemesin
+            return
+        self._entries.move_to_end(conversation_id)
+        self._evict()
+
+    def invalidate(self, conversation_id: int) -> None:
+        """Sohbetin girdisini sil - mesaj düzenlendi / silindi"""
+        self._mark_stale(conversation_id)
+        entry = self._entries.pop(conversation_id, None)
+        if entry is not None:
+            self._bytes -= entry.size
+            self._invalidations += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def _mark_stale(self, conversation_id: int) -> None:
+        if conversation_id in self._loading:
+            self._stale.add(conversation_id)  # Devam eden okumanın sonucu saklanmasın
+
+    def _store(self, conversation_id: int, entry: _Entry) -> None:
+        old = self._entries.pop(conversation_id, None)  # Yerine koyma - geçersiz kılma sayılmaz
+        if old is not None:
+            self._bytes -= old.size
+        if entry.size > self.max_entry_bytes:
+            return
+        self._entries[conversation_id] = entry
+        self._bytes += entry.size
+        self._evict()
+
+    def _evict(self) -> None:
+        while self._bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)  # En uzun süredir kullanılmayan
+            self._bytes -= entry.size
+            self._evictions += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Cache istatistikleri - monitoring için"""
+        lookups = self._hits + self._misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": round(self._hits / lookups, 3) if lookups else None,
+            "appends": self._appends,
+            "evictions": self._evictions,
+            "invalidations": self._invalidations,
+        }
+
+
+# Global cache instance - tüm chat endpoint'leri aynı cache'i paylaşır
+history_cache = HistoryCache()
@@ -0,0 +1,220 @@
+# load_balancer.py - Aynı sağlayıcının birden fazla base URL'i arasında gecikme duyarlı yük dengeleme
+# Bölgesel proxy'ler, self-hosted mirror'lar gibi OpenAI uyumlu gateway'ler tek havuzda toplanır:
+# - Her endpoint için EWMA gecikme ve EWMA hata oranı tutulur
+# - Her istekte ağırlığa göre rastgele iki sağlıklı endpoint seçilir, skoru düşük olan kazanır
+#   (power of two choices - en iyi endpoint'e sürü halinde yığılmayı önler)
+# - Art arda hata veren endpoint havuzdan çıkarılır (ejection); süre dolunca tek deneme
+#   isteğiyle (probe) geri alınır - başarısızsa daha uzun süre dışarıda kalır
+
+import random  # Ağırlıklı rastgele seçim
+import time  # Gecikme ölçümü ve ejection süreleri (monotonic saat)
+from typing import Any, Dict, List, Optional, Union  # Type hints
+from opentelemetry import metrics  # Endpoint bazında gecikme ve ejection metrikleri
+from app.config import settings  # Load balancer ayarları
+
+
+# Metrics - MeterProvider telemetry.py'de kurulur; kurulmadıysa no-op
+meter = metrics.get_meter(__name__)
+_latency = meter.create_histogram(
+    "upstream.endpoint.latency", unit="s",
+    description="Endpoint'e gönderilen isteğin cevap header'larına kadar geçen süre",
+)
+_ejections = meter.create_counter(
+    "upstream.endpoint.ejections", unit="{ejection}",
+    description="Art arda hata nedeniyle havuzdan çıkarılan endpoint'ler",
+)
+
+# Endpoint sağlığını bozan status kodları - 429 key bazında limittir, endpoint'in suçu değil
+ENDPOINT_FAILURE_STATUS_CODES = frozenset({500, 502, 503, 504})
+
+
+class UpstreamEndpoint:
+    """
+    Havuzdaki tek base URL ve sağlık istatistikleri
+    """
+
+    def __init__(self, url: str, weight: float = 1.0):
+        self.url = url.rstrip("/")
+        self.weight = max(weight, 0.01)  # 0 ağırlık seçilemez olur - en az çok küçük pay
+        self.ewma_latency: Optional[float] = None  # Saniye - ilk örneğe kadar None
+        self.ewma_error = 0.0  # 0..1 - son isteklerin hata oranı (zamanla söner - bkz. error_rate)
+        self.error_updated_at = time.monotonic()  # ewma_error'ın son güncellendiği an
+        self.in_flight = 0  # Cevap header'ı beklenen istekler
+        self.consecutive_failures = 0
+        self.ejected_until: Optional[float] = None  # Havuz dışı ise dönüş zamanı (monotonic)
+        self.eject_count = 0  # Art arda ejection sayısı - süre her seferinde ikiye katlanır
+        self.probing = False  # Ejection sonrası deneme isteği sürüyor
+        # İstatistikler - monitoring için
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def state(self, now: float) -> str:
+        """healthy / ejected / probing (süre doldu, deneme isteği bekleniyor)"""
+        if self.ejected_until is None:
+            return "healthy"
+        if now < self.ejected_until:
+            return "ejected"
+        return "probing"
+
+    def error_rate(self, now: float, half_life: float) -> float:
+        """
+        Sönümlenmiş hata oranı - trafik almayan endpoint'in cezası zamanla azalır,
+        böylece hata verip seçilmez hale gelen endpoint sonunda tekrar denenir
+        """
+        return self.ewma_error * 0.5 ** ((now - self.error_updated_at) / half_life)
+
+    def score(self, now: float, default_latency: float, half_life: float) -> float:
+        """
+        Düşük daha iyi - beklenen gecikme x (bekleyen istek + 1) / ağırlık, hata oranıyla cezalı
+        """
+        latency = self.ewma_latency if self.ewma_latency is not None else default_latency
+        return latency * (self.in_flight + 1) / self.weight * (1.0 + 4.0 * self.error_rate(now, half_life))
+
+    def to_dict(self, now: float, half_life: float) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "state": self.state(now),
+            "ewma_latency_ms": round(self.ewma_latency * 1000, 1) if self.ewma_latency is not None else None,
+            "ewma_error_rate": round(self.error_rate(now, half_life), 3),
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.consecutive_failures,
+            "ejected_for_seconds": round(self.ejected_until - now, 1) if self.ejected_until and self.ejected_until > now else 0,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+        }
+
+
+class UpstreamPool:
+    """
+    Ağırlıklı endpoint havuzu - pick() ile seç, record() ile sonucu bildir
+
+    Tek endpoint'li havuzda seçim maliyeti yoktur; ejection yine uygulanmaz (gidecek başka yer yok).
+    Tüm endpoint'ler havuz dışıysa en erken dönecek olan seçilir - istek hiç gönderilmemekten iyidir.
+    """
+
+    def __init__(
+        self,
+        endpoints: Dict[str, float],  # URL -> ağırlık
+        alpha: Optional[float] = None,  # EWMA yumuşatma katsayısı (yüksek: son örnekler daha etkili)
+        eject_after: Optional[int] = None,  # Kaç ardışık hatada havuzdan çıkarılır
+        eject_seconds: Optional[float] = None,  # İlk ejection süresi
+        eject_max_seconds: Optional[float] = None,  # Art arda ejection'larda üst sınır
+        error_half_life: Optional[float] = None,  # Hata oranının yarılanma süresi (saniye)
+    ):
+        self.endpoints = [UpstreamEndpoint(url, weight) for url, weight in endpoints.items()]
+        self.alpha = alpha if alpha is not None else settings.UPSTREAM_EWMA_ALPHA
+        self.eject_after = eject_after if eject_after is not None else settings.UPSTREAM_EJECT_AFTER_FAILURES
+        self.eject_seconds = eject_seconds if eject_seconds is not None else settings.UPSTREAM_EJECT_SECONDS
+        self.eject_max_seconds = eject_max_seconds if eject_max_seconds is not None else settings.UPSTREAM_EJECT_MAX_SECONDS
+        self.error_half_life = error_half_life if error_half_life is not None else settings.UPSTREAM_ERROR_HALF_LIFE_SECONDS
+
+    @property
+    def primary(self) -> UpstreamEndpoint:
+        return self.endpoints[0]
+
+    def pick(self) -> UpstreamEndpoint:
+        """
+        İsteğin gideceği endpoint'i seç ve in-flight sayacını artır - sonuç record() ile bildirilmeli
+        """
+        endpoint = self._choose()
+        endpoint.in_flight += 1
+        endpoint.requests += 1
+        return endpoint
+
+    def _choose(self) -> UpstreamEndpoint:
+        if len(self.endpoints) == 1:
+            return self.endpoints[0]
+        now = time.monotonic()
+        healthy: List[UpstreamEndpoint] = []
+        for endpoint in self.endpoints:
+            state = endpoint.state(now)
+            if state == "probing" and not endpoint.probing:
+                endpoint.probing = True  # Süresi dolan endpoint'e tek deneme isteği
+                return endpoint
+            if state == "healthy":
+                healthy.append(endpoint)
+        if not healthy:
+            return min(self.endpoints, key=lambda e: e.ejected_until or 0.0)  # En erken dönecek olan
+        if len(healthy) == 1:
+            return healthy[0]
+        # Henüz ölçülmemiş endpoint en iyi bilinen gecikmeyle yarışır - yeni / geri dönen endpoint denenir
+        measured = [e.ewma_latency for e in healthy if e.ewma_latency is not None]
+        default_latency = min(measured) if measured else 1.0
+        first, second = self._two_choices(healthy)
+        first_score = first.score(now, default_latency, self.error_half_life)
+        second_score = second.score(now, default_latency, self.error_half_life)
+        return first if first_score <= second_score else second
+
+    @staticmethod
+    def _two_choices(candidates: List[UpstreamEndpoint]) -> List[UpstreamEndpoint]:
+        """Ağırlıklı, tekrarsız iki rastgele endpoint"""
+        first = random.choices(candidates, weights=[e.weight for e in candidates])[0]
+        rest = [e for e in candidates if e is not first]
+        second = random.choices(rest, weights=[e.weight for e in rest])[0]
+        return [first, second]
+
+    def record(self, endpoint: UpstreamEndpoint, latency: Optional[float], ok: bool) -> None:
+        """
+        İsteğin sonucunu işle - EWMA'ları güncelle, gerekirse havuzdan çıkar / geri al
+
+        Args:
+            endpoint: pick() ile seçilen endpoint
+            latency: Cevap header'larına kadar geçen süre (iptal edilen isteklerde None - örnek sayılmaz)
+            ok: False - bağlantı hatası veya endpoint hatası (5xx)
+        """
+        endpoint.in_flight = max(0, endpoint.in_flight - 1)
+        probe = endpoint.probing
+        endpoint.probing = False
+        if latency is None:  # İptal - sağlık hakkında bilgi yok
+            return
+
+        if ok:
+            _latency.record(latency, {"endpoint": endpoint.url})
+            endpoint.ewma_latency = latency if endpoint.ewma_latency is None \
+                else self.alpha * latency + (1 - self.alpha) * endpoint.ewma_latency
+        now = time.monotonic()
+        endpoint.ewma_error = self.alpha * (0.0 if ok else 1.0) \
+            + (1 - self.alpha) * endpoint.error_rate(now, self.error_half_life)
+        endpoint.error_updated_at = now
+
+        if ok:
+            endpoint.consecutive_failures = 0
+            if endpoint.ejected_until is not None and (probe or now >= endpoint.ejected_until):
+                print(f"✅ Upstream endpoint havuza geri alındı: {endpoint.url}")
+                endpoint.ejected_until = None
+                endpoint.eject_count = 0
+            return
+
+        endpoint.failures += 1
+        endpoint.consecutive_failures += 1
+        if len(self.endpoints) > 1 and (probe or endpoint.consecutive_failures >= self.eject_after):
+            self._eject(endpoint)
+
+    def _eject(self, endpoint: UpstreamEndpoint) -> None:
+        duration = min(self.eject_seconds * (2 ** endpoint.eject_count), self.eject_max_seconds)
+        endpoint.eject_count += 1
+        endpoint.ejections += 1
+        endpoint.ejected_until = time.monotonic() + duration
+        _ejections.add(1, {"endpoint": endpoint.url})
+        print(f"🚫 Upstream endpoint {duration:.0f}s havuz dışı: {endpoint.url} ({endpoint.consecutive_failures} ardışık hata)")
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Endpoint bazında durum - monitoring için"""
+        now = time.monotonic()
+        return [endpoint.to_dict(now, self.error_half_life) for endpoint in self.endpoints]
+
+
+def parse_endpoints(base_url: Union[str, List[str], Dict[str, float]]) -> Dict[str, float]:
+    """
+    Ayardaki base URL(ler)i URL -> ağırlık sözlüğüne çevir
+
+    Kabul edilen biçimler: "http://a/v1", ["http://a/v1", "http://b/v1"], {"http://a/v1": 3, "http://b/v1": 1}
+    """
+    if isinstance(base_url, str):
+        return {base_url: 1.0}
+    if isinstance(base_url, dict):
+        return {url: float(weight) for url, weight in base_url.items()}
+    return {url: 1.0 for url in base_url}
@@ -0,0 +1,188 @@
+# model_catalog.py - OpenRouter model kataloğu cache katmanı
+# Katalog bir kez çekilir, işlenir ve tüm istekler aynı snapshot'tan beslenir
+# TTL dolunca arka planda yenilenir (stale-while-revalidate), upstream çökerse eski veri sunulur
+
+import asyncio  # Arka plan yenileme task'ı için
+import json  # Hazır JSON response body'leri için
+import time  # Snapshot yaşı (monotonic saat)
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Tuple  # Type hints
+from app.config import settings  # TTL ayarları
+from app.services.model_registry import ModelRegistry  # İndeksli model kaydı
+from app.services.singleflight import SingleFlight  # Eşzamanlı fetch'leri tek istekte birleştir
+
+
+# Fetcher imzası: (etag, last_modified) -> (status_code, raw_models | None, etag, last_modified)
+# status_code 304 ise raw_models None döner (katalog değişmemiş)
+CatalogFetcher = Callable[
+    [Optional[str], Optional[str]],
+    Awaitable[Tuple[int, Optional[List[Dict[str, Any]]], Optional[str], Optional[str]]]
+]
+
+
+class CatalogSnapshot:
+    """
+    Kataloğun belirli bir andaki işlenmiş hali
+    Free ve full görünümler aynı snapshot'tan üretilir, JSON body'ler önceden hazırlanır
+    """
+
+    def __init__(
+        self,
+        raw_models: List[Dict[str, Any]],  # Upstream'den gelen ham liste
+        etag: Optional[str] = None,  # Conditional fetch için ETag
+        last_modified: Optional[str] = None,  # Conditional fetch için Last-Modified
+    ):
+        self.raw_models = raw_models
+        self.registry = ModelRegistry(raw_models)  # İndeksler snapshot başına bir kez kurulur
+        self.all_models = self.registry.models  # Tüm modeller (ücretsiz + ücretli)
+        self.free_models = [self.all_models[pos] for pos in sorted(self.registry.free)]  # Sadece ücretsizler
+        # Serialize edilmiş body'ler - her istekte yeniden JSON'a çevirmemek için
+        self.all_models_json = json.dumps(self.all_models, ensure_ascii=False).encode("utf-8")
+        self.free_models_json = json.dumps(self.free_models, ensure_ascii=False).encode("utf-8")
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()  # Son başarılı doğrulama zamanı (200 veya 304)
+
+    @property
+    def age(self) -> float:
+        """Snapshot yaşı (saniye)"""
+        return time.monotonic() - self.fetched_at
+
+
+class ModelCatalog:
+    """
+    Model kataloğu cache'i - TTL + stale-while-revalidate + conditional fetch
+
+    - İlk istek kataloğu senkron çeker (başka seçenek yok)
+    - TTL içinde: snapshot direkt döner (upstream'e gidilmez)
+    - TTL dolmuş: eski snapshot hemen döner, yenileme arka planda yapılır
+    - Upstream hatası: eski snapshot sunulmaya devam eder
+    """
+
+    def __init__(
+        self,
+        fetcher: CatalogFetcher,  # Upstream'den kataloğu çeken fonksiyon
+        ttl: float = None,  # Snapshot'ın taze sayılacağı süre (saniye)
+        error_retry: float = None,  # Başarısız yenilemeden sonra tekrar deneme aralığı (saniye)
+    ):
+        self._fetcher = fetcher
+        self.ttl = ttl if ttl is not None else settings.MODEL_CATALOG_TTL_SECONDS
+        self.error_retry = error_retry if error_retry is not None else settings.MODEL_CATALOG_ERROR_RETRY_SECONDS
+        self._snapshot: Optional[CatalogSnapshot] = None  # Güncel snapshot
+        self.flight = SingleFlight("model_catalog")  # Aynı anda tek fetch - thundering herd'ü önler
+        self._refresh_task: Optional[asyncio.Task] = None  # Arka plan yenileme task'ı
+        self._last_failure_at: Optional[float] = None  # Son başarısız fetch zamanı
+        # İstatistikler - monitoring için
+        self._hits = 0  # Taze snapshot'tan sunulan istekler
+        self._stale_hits = 0  # Eski snapshot'tan sunulan istekler
+        self._fetches = 0  # Upstream'e giden fetch sayısı
+        self._not_modified = 0  # 304 ile biten fetch sayısı
+        self._failures = 0  # Başarısız fetch sayısı
+
+    @property
+    def current(self) -> Optional[CatalogSnapshot]:
+        """
+        Eldeki snapshot - fetch tetiklemez (yaşı ne olursa olsun)
+        Sıcak yolda katalogda lookup yapmak isteyen servisler için (örn: fallback zinciri)
+        """
+        return self._snapshot
+
+    async def get_snapshot(self) -> Optional[CatalogSnapshot]:
+        """
+        Güncel katalog snapshot'ını döndür
+
+        Returns:
+            CatalogSnapshot veya None (hiç başarılı fetch olmadıysa)
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            # Soğuk başlangıç - kataloğu senkron çek
+            return await self.refresh()
+
+        if snapshot.age < self.ttl:
+            self._hits += 1  # Taze - direkt dön
+            return snapshot
+
+        # TTL dolmuş - eskiyi hemen sun, arka planda yenile
+        self._stale_hits += 1
+        self._schedule_refresh()
+        return snapshot
+
+    def _schedule_refresh(self) -> None:
+        """
+        Arka planda tek bir yenileme task'ı başlat (zaten çalışıyorsa yenisini açma)
+        """
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return  # Zaten yenileniyor
+        if self._last_failure_at is not None and time.monotonic() - self._last_failure_at < self.error_retry:
+            return  # Upstream az önce hata verdi - rate limit'i yakmamak için bekle
+        self._refresh_task = asyncio.create_task(self.refresh())
+
+    async def refresh(self) -> Optional[CatalogSnapshot]:
+        """
+        Kataloğu upstream'den yenile - ETag / Last-Modified varsa conditional request atar
+        Hata durumunda mevcut (eski) snapshot korunur
+
+        Eşzamanlı çağrılar (aynı anda açılan sekmeler, arka plan yenilemesi) tek bir
+        upstream fetch'ini paylaşır; çağıranlardan biri iptal edilse de fetch diğerleri için sürer.
+
+        Returns:
+            CatalogSnapshot veya None
+        """
+        current = self._snapshot
+        if current is not None and current.age < self.ttl:
+            return current  # Başka bir çağrı az önce yeniledi
+        # Hiç veri yok ve upstream az önce hata verdi - bekleyen istekler art arda fetch atmasın
+        if current is None and self._last_failure_at is not None \
+                and time.monotonic() - self._last_failure_at < self.error_retry:
+            return None
+
+        snapshot, _ = await self.flight.do("models", self._fetch)
+        return snapshot
+
+    async def _fetch(self) -> Optional[CatalogSnapshot]:
+        """
+        Tek bir upstream fetch'i - refresh() singleflight üzerinden çağırır
+        """
+        current = self._snapshot
+        self._fetches += 1
+        try:
+            status_code, raw_models, etag, last_modified = await self._fetcher(
+                current.etag if current else None,  # If-None-Match
+                current.last_modified if current else None,  # If-Modified-Since
+            )
+        except Exception as e:  # Network, timeout, 5xx vb. - eski veriyle devam
+            self._failures += 1
+            self._last_failure_at = time.monotonic()
+            print(f"⚠️ Model kataloğu yenilenemedi, eski veri kullanılıyor: {e}")
+            return current
+
+        self._last_failure_at = None  # Başarılı - hata durumunu temizle
+        if status_code == 304 and current is not None:
+            # Katalog değişmemiş - sadece tazelik zamanını güncelle
+            self._not_modified += 1
+            current.fetched_at = time.monotonic()
+            return current
+
+        if raw_models is None:
+            return current  # Beklenmeyen boş cevap - eskiyle devam
+
+        self._snapshot = CatalogSnapshot(raw_models, etag=etag, last_modified=last_modified)
+        return self._snapshot
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Cache istatistikleri - monitoring için
+        """
+        snapshot = self._snapshot
+        return {
+            "cached": snapshot is not None,  # Snapshot var mı?
+            "age_seconds": round(snapshot.age, 1) if snapshot else None,  # Snapshot yaşı
+            "ttl_seconds": self.ttl,
+            "models_count": len(snapshot.all_models) if snapshot else 0,
+            "hits": self._hits,
+            "stale_hits": self._stale_hits,
+            "fetches": self._fetches,
+            "not_modified": self._not_modified,
+            "failures": self._failures,
+            "coalesced": self.flight.get_stats()["shared"],  # Paylaşılan fetch'e eklenen çağrılar
+        }
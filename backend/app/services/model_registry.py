@@ -0,0 +1,278 @@
+# model_registry.py - İndeksli model kaydı
+# Her katalog snapshot'ı için bir kez kurulur; filtre, sıralama ve sayfalama
+# istekleri önceden hesaplanmış indekslerden cevaplanır (her istekte liste taranmaz)
+
+import base64  # Cursor'ı URL-safe string'e çevirmek için
+import bisect  # Context length eşiği için ikili arama
+from typing import List, Dict, Any, Optional, Set, Tuple  # Type hints
+from app.exceptions import ValidationException  # Geçersiz cursor / sort için
+
+
+# Sıralama seçenekleri - her biri için sıralı pozisyon listesi önceden hesaplanır
+SORT_KEYS = ("name", "context_length", "price", "id")
+
+# Fiyat bucket'ları - 1M token başına ortalama $ üst sınırları (free ayrı bucket)
+PRICE_BUCKETS = (("low", 1.0), ("mid", 10.0), ("high", float("inf")))
+
+# architecture bilgisi olmayan eski katalog kayıtları için vision tahmini
+_VISION_KEYWORDS = ("vision", "image", "visual", "multimodal", "gpt-4o", "gpt-4-turbo", "claude-3")
+
+
+def _parse_modalities(model: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    """
+    Katalogdaki architecture alanından input/output modality'leri çıkar
+
+    OpenRouter iki format kullanır:
+    - architecture.input_modalities / output_modalities: ["text", "image"]
+    - architecture.modality: "text+image->text"
+
+    Returns:
+        Tuple: (input_modalities, output_modalities) - bilgi yoksa boş listeler
+    """
+    architecture = model.get("architecture") or {}
+    inputs = architecture.get("input_modalities")
+    outputs = architecture.get("output_modalities")
+    if inputs or outputs:
+        return list(inputs or []), list(outputs or [])
+
+    modality = architecture.get("modality")  # Örn: "text+image->text"
+    if modality and "->" in modality:
+        left, right = modality.split("->", 1)
+        return [m for m in left.split("+") if m], [m for m in right.split("+") if m]
+
+    return [], []
+
+
+def _price_bucket(is_free: bool, avg_per_million: float) -> str:
+    """
+    Ortalama fiyatı bucket adına çevir (free, low, mid, high)
+    """
+    if is_free:
+        return "free"
+    for name, upper in PRICE_BUCKETS:
+        if avg_per_million <= upper:
+            return name
+    return "high"
+
+
+def process_model(model: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Tek bir ham OpenRouter modelini frontend formatına çevir
+
+    Args:
+        model: OpenRouter /models cevabındaki tek kayıt
+
+    Returns:
+        Dict: İşlenmiş model (fiyat float, ücretsiz/vision/provider bilgisi ile)
+    """
+    # Fiyat bilgilerini al (string olarak gelir, float'a çevir)
+    pricing = model.get("pricing", {})  # Pricing objesi
+    prompt_price = float(pricing.get("prompt", "0"))  # Prompt token başına ücret ($)
+    completion_price = float(pricing.get("completion", "0"))  # Completion token başına ücret ($)
+
+    # Ücretsiz model kontrolü
+    is_free = (prompt_price == 0 and completion_price == 0)  # Her ikisi de 0 ise ücretsiz
+
+    # Ortalama maliyet hesapla (prompt + completion ortalaması)
+    avg_cost = (prompt_price + completion_price) / 2 if not is_free else 0
+
+    # Modality bilgisi - katalogdaki architecture alanından
+    input_modalities, output_modalities = _parse_modalities(model)
+    if input_modalities:
+        supports_vision = "image" in input_modalities  # Görsel input kabul ediyor mu?
+    else:
+        # architecture bilgisi yok - eski keyword tahminine düş
+        haystack = " ".join(
+            (model.get("description", ""), model.get("id", ""), model.get("name", ""))
+        ).lower()
+        supports_vision = any(keyword in haystack for keyword in _VISION_KEYWORDS)
+
+    model_id = model.get("id") or ""
+    return {
+        "id": model.get("id"),  # Model ID - örn: "mistralai/mistral-7b-instruct"
+        "name": model.get("name", model.get("id")),  # Model adı - yoksa ID kullan
+        "description": model.get("description", ""),  # Model açıklaması
+        "context_length": model.get("context_length") or 4096,  # Max token sayısı
+        "pricing": {
+            "prompt": prompt_price,  # Prompt token başına ücret ($)
+            "completion": completion_price,  # Completion token başına ücret ($)
+            "average": avg_cost,  # Ortalama maliyet ($)
+        },  # Fiyat bilgileri
+        "is_free": is_free,  # Ücretsiz mi?
+        "supportsVision": supports_vision,  # Vision desteği var mı?
+        "provider": model_id.split("/", 1)[0] if "/" in model_id else model_id,  # Örn: "openai"
+        "input_modalities": input_modalities,  # Örn: ["text", "image"]
+        "output_modalities": output_modalities,  # Örn: ["text"]
+        "price_bucket": _price_bucket(is_free, avg_cost * 1_000_000),  # free / low / mid / high
+    }
+
+
+class ModelRegistry:
+    """
+    Katalog snapshot'ı üzerine kurulan indeksli model kaydı
+
+    İndeksler (model pozisyonları üzerinden):
+    - provider -> pozisyon kümesi
+    - free / paid kümeleri
+    - input modality -> pozisyon kümesi (vision = "image")
+    - price bucket -> pozisyon kümesi
+    - context length'e göre sıralı pozisyonlar (min_context için bisect)
+    - her sıralama anahtarı için önceden sıralanmış pozisyon listesi
+    """
+
+    def __init__(self, raw_models: List[Dict[str, Any]]):
+        """
+        Args:
+            raw_models: OpenRouter /models cevabındaki "data" listesi
+        """
+        self.models: List[Dict[str, Any]] = [process_model(m) for m in raw_models]
+        self.by_id: Dict[str, int] = {}  # Model ID -> pozisyon
+        self.by_provider: Dict[str, Set[int]] = {}
+        self.by_input_modality: Dict[str, Set[int]] = {}
+        self.by_price_bucket: Dict[str, Set[int]] = {}
+        self.free: Set[int] = set()
+        self.paid: Set[int] = set()
+
+        for pos, model in enumerate(self.models):
+            self.by_id[model["id"]] = pos
+            self.by_provider.setdefault(model["provider"], set()).add(pos)
+            self.by_price_bucket.setdefault(model["price_bucket"], set()).add(pos)
+            (self.free if model["is_free"] else self.paid).add(pos)
+            for modality in model["input_modalities"]:
+                self.by_input_modality.setdefault(modality, set()).add(pos)
+            if model["supportsVision"]:
+                # Keyword fallback ile vision bulunan modeller de image indeksine girsin
+                self.by_input_modality.setdefault("image", set()).add(pos)
+
+        # Vision kümeleri - vision=false filtresi için tümleyen de önceden hesaplanır
+        self.vision: Set[int] = set(self.by_input_modality.get("image", set()))
+        self.no_vision: Set[int] = set(range(len(self.models))) - self.vision
+
+        # Context length - artan sıra + paralel değer listesi (bisect için)
+        self._by_context_asc = sorted(range(len(self.models)), key=lambda p: self.models[p]["context_length"])
+        self._context_values = [self.models[p]["context_length"] for p in self._by_context_asc]
+
+        # Sıralama anahtarları - her biri bir kere sıralanır
+        self.sort_orders: Dict[str, List[int]] = {
+            "name": sorted(range(len(self.models)), key=lambda p: (str(self.models[p]["name"]).lower(), p)),
+            "context_length": list(reversed(self._by_context_asc)),  # En büyük context önce
+            "price": sorted(range(len(self.models)), key=lambda p: (self.models[p]["pricing"]["average"], p)),
+            "id": sorted(range(len(self.models)), key=lambda p: (str(self.models[p]["id"]), p)),
+        }
+        # Sıralama içindeki sıra numarası - cursor'dan devam etmek için O(1) lookup
+        self._rank: Dict[str, Dict[str, int]] = {
+            key: {self.models[p]["id"]: rank for rank, p in enumerate(order)}
+            for key, order in self.sort_orders.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.models)
+
+    def get(self, model_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Model ID ile tek model bul - O(1)
+        """
+        pos = self.by_id.get(model_id)
+        return self.models[pos] if pos is not None else None
+
+    def _min_context(self, min_context: int) -> Set[int]:
+        """
+        context_length >= min_context olan pozisyonlar - bisect ile
+        """
+        start = bisect.bisect_left(self._context_values, min_context)
+        return set(self._by_context_asc[start:])
+
+    @staticmethod
+    def encode_cursor(sort: str, last_id: str) -> str:
+        """
+        Sayfalama cursor'ı oluştur - sıralama anahtarı + son dönen model ID
+        """
+        return base64.urlsafe_b64encode(f"{sort}|{last_id}".encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[str, str]:
+        """
+        Cursor'ı çöz
+
+        Raises:
+            ValidationException: Cursor bozuksa
+        """
+        try:
+            sort, last_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|", 1)
+        except (ValueError, UnicodeError):
+            raise ValidationException("Geçersiz sayfalama cursor'ı")
+        return sort, last_id
+
+    def query(
+        self,
+        provider: Optional[str] = None,  # Örn: "openai"
+        free: Optional[bool] = None,  # True: sadece ücretsiz, False: sadece ücretli
+        vision: Optional[bool] = None,  # True: görsel input destekleyenler
+        modality: Optional[str] = None,  # Input modality - örn: "image", "audio", "file"
+        min_context: Optional[int] = None,  # Minimum context length
+        price_bucket: Optional[str] = None,  # free / low / mid / high
+        sort: str = "name",  # Sıralama anahtarı
+        cursor: Optional[str] = None,  # Önceki sayfanın next_cursor'ı
+        limit: Optional[int] = None,  # Sayfa boyutu (None: hepsi)
+    ) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+        """
+        İndekslerden filtrele, sırala ve sayfala
+
+        Returns:
+            Tuple: (sayfadaki modeller, sonraki sayfa cursor'ı veya None, filtreye uyan toplam)
+
+        Raises:
+            ValidationException: Geçersiz sort veya cursor
+        """
+        if sort not in self.sort_orders:
+            raise ValidationException(f"Geçersiz sıralama: {sort} (seçenekler: {', '.join(SORT_KEYS)})")
+
+        # Filtre kümelerini topla - None olanlar filtre değil
+        filters: List[Set[int]] = []
+        if provider is not None:
+            filters.append(self.by_provider.get(provider, set()))
+        if free is not None:
+            filters.append(self.free if free else self.paid)
+        if vision is not None:
+            filters.append(self.vision if vision else self.no_vision)
+        if modality is not None:
+            filters.append(self.by_input_modality.get(modality, set()))
+        if price_bucket is not None:
+            filters.append(self.by_price_bucket.get(price_bucket, set()))
+        if min_context is not None:
+            filters.append(self._min_context(min_context))
+
+        # Kesişim - en küçük kümeden başla
+        candidates: Optional[Set[int]] = None
+        for index_set in sorted(filters, key=len):
+            candidates = set(index_set) if candidates is None else candidates & index_set
+            if not candidates:
+                break
+        total = len(self.models) if candidates is None else len(candidates)
+
+        # Cursor'dan başlangıç noktası - sıralama içindeki pozisyon
+        order = self.sort_orders[sort]
+        start = 0
+        if cursor:
+            cursor_sort, last_id = self.decode_cursor(cursor)
+            if cursor_sort != sort:
+                raise ValidationException("Cursor farklı bir sıralamaya ait")
+            rank = self._rank[sort].get(last_id)
+            if rank is None:
+                raise ValidationException("Cursor'daki model artık katalogda yok")
+            start = rank + 1
+
+        # Sıralı listede ilerle, kümede olanları al
+        page: List[Dict[str, Any]] = []
+        next_cursor = None
+        for rank in range(start, len(order)):
+            pos = order[rank]
+            if candidates is not None and pos not in candidates:
+                continue
+            if limit is not None and len(page) >= limit:
+                # Bir sonraki eşleşme var - cursor son dönen modeli gösterir
+                next_cursor = self.encode_cursor(sort, page[-1]["id"])
+                break
+            page.append(self.models[pos])
+
+        return page, next_cursor, total
@@ -1,10 +1,34 @@
 # openrouter.py - OpenRouter API client servisi
-# OpenRouter API ile iletişim kuran servis sınıfı
+# OpenRouter API ile iletişim kuran servis sınıfı - istekler model önekine göre seçilen sağlayıcıya gider
+# (OpenRouter, OpenAI uyumlu yerel sunucu, echo - bkz. providers.py)
 
+import asyncio  # Retry backoff beklemesi ve hedge yarışı için
+import time  # TTFT ölçümü için
 import httpx  # Async HTTP client - OpenRouter API çağrıları için
-from typing import List, Dict, Any, Optional, AsyncGenerator  # Type hints
+from contextlib import contextmanager  # In-flight istek sayacı için
+from typing import List, Dict, Any, Optional, AsyncGenerator, Iterator, Tuple, Union  # Type hints
 from opentelemetry import trace  # OpenTelemetry tracing - custom span'ler için
 from app.config import settings  # Ayarlardan API key alacağız
+from app.services.model_catalog import ModelCatalog, CatalogSnapshot  # Model kataloğu cache'i
+from app.services.chat_stream import ChatStream, stream_error_message, CONNECTION_ERROR_MESSAGE  # Açılmış stream objesi
+from app.services.resilience import (  # Retry + circuit breaker
+    RetryPolicy,
+    CircuitBreakerRegistry,
+    CircuitOpenError,
+    parse_retry_after,
+    RETRYABLE_STATUS_CODES,
+    BREAKER_FAILURE_STATUS_CODES,
+)
+from app.services.rate_limiter import RateLimiter, RateLimitTimeout, estimate_tokens  # Client-side rate limiter
+from app.services.fallback import resolve_chain, FALLBACK_STATUS_CODES  # Model fallback zincirleri
+from app.services.hedging import TTFTTracker, HedgeBudget  # Hedged request gecikmesi ve bütçesi
+from app.services.singleflight import SingleFlight, canonical_key  # Aynı eşzamanlı istekleri birleştirme
+from app.services.response_cache import ResponseCache, cache_key  # Tekrarlanan prompt'lar için cevap cache'i
+from app.services.stream_timeouts import StreamTimeouts, TIMEOUT_MESSAGES  # Connect / TTFT / idle / total timeout'ları
+from app.services.stream_metrics import finish_stream_span, record_rate_limit_wait  # Stream span'i ve histogramlar
+from app.services.providers import build_providers, request_timeout, LLMProvider  # Model önekine göre sağlayıcı (OpenRouter / yerel / echo)
+from app.services.context_window import assemble_context, ContextWindow  # Token bütçeli bağlam penceresi
+from app.exceptions import RateLimitExceededException  # Kuyrukta bekleme süresi aşılınca 429
 
 # Tracer oluştur - bu servis için custom span'ler oluşturmak üzere
 tracer = trace.get_tracer(__name__)
@@ -20,119 +44,522 @@ class OpenRouterService:
         """
         Servis başlatıcı - API ayarlarını yükle
         """
-        self.api_key = settings.OPENROUTER_API_KEY  # .env'den API key al
-        self.base_url = settings.OPENROUTER_BASE_URL  # Base URL (https://openrouter.ai/api/v1)
-        self.headers = {
-            "Authorization": f"Bearer {self.api_key}",  # Bearer token ile yetkilendirme
-            "Content-Type": "application/json",  # JSON formatında veri gönderiyoruz
-        }  # Her request'te kullanılacak header'lar
+        # Sağlayıcılar - model ID önekine göre OpenRouter, OpenAI uyumlu yerel sunucu veya echo
+        # Her HTTP sağlayıcısının paylaşılan client'ı lifespan'de start() ile açılır, close() ile kapanır
+        # Her istekte yeni client açmak DNS + TCP + TLS handshake maliyeti demek
+        self.providers = build_providers()
+        self._upstream_models: Optional[List[Dict[str, Any]]] = None  # Son OpenRouter listesi - 304'te ek modellerle birleşir
+        self._extra_models: List[Dict[str, Any]] = []  # Ek sağlayıcıların son model listesi
+        self._in_flight = 0  # Şu an devam eden upstream istek sayısı
+        self._requests_total = 0  # Başlangıçtan beri gönderilen toplam istek sayısı
+        
+        # Model kataloğu cache'i - /models her sayfa yüklemesinde upstream'e gitmesin
+        self.catalog = ModelCatalog(fetcher=self._fetch_models)
+        
+        # Dayanıklılık katmanı - geçici hatalarda retry, sürekli hata veren modelde circuit breaker
+        self.retry_policy = RetryPolicy()
+        self.breakers = CircuitBreakerRegistry()
+        
+        # Client-side rate limiter - upstream 429 vermeden önce kendi kuyruğumuzda beklet
+        self.rate_limiter = RateLimiter()
+        
+        # Hedged requests - ilk token p95'i aşarsa ikinci istek; bütçe trafiğin yüzdesiyle sınırlı
+        self.ttft = TTFTTracker()
+        self.hedge_budget = HedgeBudget()
+        # Request coalescing - aynı anda gelen birebir aynı non-streaming istekler tek upstream çağrısı
+        self.completion_flight = SingleFlight("chat_completion")
+        # Cevap cache'i - aynı model + mesajlar + parametreler için upstream'e tekrar gitme (opt-in)
+        self.response_cache = ResponseCache()
+        
+        self.hedge_outcomes: Dict[str, int] = {
+            "not_needed": 0,  # Birincil gecikmeden önce token üretti
+            "primary_won": 0,  # Hedge gönderildi ama birincil önce token üretti
+            "hedge_won": 0,  # Hedge önce token üretti
+            "budget_exhausted": 0,  # Gecikme aşıldı ama bütçe / rate limit hedge'e izin vermedi
+        }
     
-    async def get_models(self, free_only: bool = True) -> List[Dict[str, Any]]:
+    async def start(self) -> None:
+        """
+        Sağlayıcıların paylaşılan HTTP client'larını aç - uygulama başlarken (lifespan) bir kez çağrılır
+        """
+        await self.providers.start()  # Yeni havuzlu client'lar
+        self.response_cache.open()  # Ayarlıysa disk katmanını aç
+    
+    async def close(self) -> None:
+        """
+        Sağlayıcıların HTTP client'larını kapat - uygulama kapanırken (lifespan) çağrılır
+        Havuzlardaki tüm bağlantılar düzgünce kapatılır
+        """
+        await self.providers.close()  # Bağlantıları kapat
+        self.response_cache.close()  # Disk katmanı bağlantısını kapat
+    
+    def provider_for(self, model: str) -> LLMProvider:
+        """Modeli sunan sağlayıcı - önek eşleşmezse OpenRouter"""
+        return self.providers.resolve(model)
+    
+    def _limit_key(self, model: str) -> str:
+        """Rate limiter anahtarı - OpenRouter için API key, diğer sağlayıcılar için kendi anahtarları"""
+        return self.providers.resolve(model).rate_limit_key
+    
+    @contextmanager
+    def _track_request(self) -> Iterator[None]:
+        """
+        Upstream isteği süresince in-flight sayacını tut - pool istatistikleri için
         """
-        OpenRouter'dan AI modellerini listele
+        self._in_flight += 1  # İstek başladı
+        self._requests_total += 1  # Toplam sayaç
+        try:
+            yield
+        finally:
+            self._in_flight -= 1  # İstek bitti (başarılı veya hatalı)
+    
+    async def _acquire_rate_limit(self, model: str, estimated_tokens: int, max_wait: Optional[float] = None) -> float:
+        """
+        Rate limiter'dan izin al - gerekirse kuyrukta bekle
         
         Args:
-            free_only: True ise sadece ücretsiz modeller, False ise tüm modeller
+            model: Model ID
+            estimated_tokens: Tahmini prompt token sayısı
+            max_wait: Max bekleme (None: ayardaki değer, 0: beklemeden dene - fallback adayları için)
         
         Returns:
-            List[Dict]: Model listesi - her model bir dictionary
+            float: Kuyrukta beklenen süre (saniye)
+        
+        Raises:
+            RateLimitExceededException: Max bekleme süresi / kuyruk kapasitesi aşıldı (429)
+        """
+        span = trace.get_current_span()
+        try:
+            waited = await self.rate_limiter.acquire(self._limit_key(model), model, estimated_tokens, max_wait=max_wait)
+        except RateLimitTimeout as e:
+            span.set_attribute("openrouter.rate_limited", True)
+            span.set_attribute("openrouter.rate_limit_scope", e.scope)  # Hangi limit doldu
+            print(f"⏳ Rate limit aşıldı ({e.scope}), istek gönderilmedi: {model}")
+            raise RateLimitExceededException(e.retry_after)
+        record_rate_limit_wait(model, waited)  # Model bazında kuyruk süresi histogramı
+        if waited:
+            span.set_attribute("openrouter.rate_limit_wait_seconds", waited)  # Kuyrukta beklenen süre
+        return waited
+    
+    def _reconcile_usage(self, model: str, estimated_tokens: int, usage: Optional[Dict[str, Any]]) -> None:
+        """
+        Gerçek token kullanımını rate limiter'a bildir (tahmin ile fark bucket'a yansır)
         """
-        # Custom span oluştur - bu işlemi trace et
-        with tracer.start_as_current_span("openrouter.get_models") as span:
-            # Span'e attribute ekle - debug için yararlı
+        total = (usage or {}).get("total_tokens")
+        if isinstance(total, int):
+            self.rate_limiter.reconcile_tokens(self._limit_key(model), model, estimated_tokens, total)
+    
+    def _fallback_chain(self, model: str, messages: List[Dict[str, Any]]) -> List[str]:
+        """
+        Denenecek modeller - [seçilen model, fallback adayları...]
+        Katalog eldeyse yetenek sınıfları registry'den çözülür (fetch tetiklenmez)
+        """
+        snapshot = self.catalog.current
+        return resolve_chain(model, messages, snapshot.registry if snapshot is not None else None)
+    
+    def model_pricing(self, model: str) -> Optional[Dict[str, float]]:
+        """
+        Modelin token başı fiyatları - upstream cost göndermezse maliyet bununla hesaplanır
+        Katalog henüz çekilmediyse veya model yoksa None (fetch tetiklenmez)
+        """
+        snapshot = self.catalog.current
+        entry = snapshot.registry.get(model) if snapshot is not None else None
+        return entry["pricing"] if entry is not None else None
+    
+    def model_context_length(self, model: str) -> Optional[int]:
+        """
+        Modelin context uzunluğu (token) - katalog henüz çekilmediyse veya model yoksa None
+        """
+        snapshot = self.catalog.current
+        entry = snapshot.registry.get(model) if snapshot is not None else None
+        return entry["context_length"] if entry is not None else None
+    
+    def _context_window(self, model: str, messages: List[Dict[str, Any]]) -> ContextWindow:
+        """
+        Geçmişi adayın context'ine sığdır - fallback adayı daha küçük context'li olabilir
+        """
+        window = assemble_context(messages, self.model_context_length(model))
+        if window.dropped_messages:
+            print(f"✂️ Bağlam kırpıldı ({model}): {window.dropped_messages} eski mesaj, ~{window.tokens_saved} token")
+        return window
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        Bağlantı havuzu kullanım istatistikleri - health/monitoring için
+        
+        Returns:
+            Dict: Açık, boşta, aktif bağlantı sayıları ve istek sayaçları
+        """
+        stats: Dict[str, Any] = {
+            "http2_enabled": settings.OPENROUTER_HTTP2,  # HTTP/2 ayarı
+            "max_connections": settings.OPENROUTER_MAX_CONNECTIONS,  # Havuz limiti (sağlayıcı başına)
+            "max_keepalive_connections": settings.OPENROUTER_MAX_KEEPALIVE_CONNECTIONS,
+            "in_flight_requests": self._in_flight,  # Devam eden istek sayısı
+            "requests_total": self._requests_total,  # Toplam istek sayısı
+            **self.providers.default.get_pool_stats(),  # OpenRouter havuzu: açık, boşta, HTTP/2, kuyruktaki
+        }
+        # Ek HTTP sağlayıcılarının havuzları (yerel inference sunucuları)
+        extra = {p.name: p.get_pool_stats() for p in self.providers.extra if hasattr(p, "get_pool_stats")}
+        if extra:
+            stats["providers"] = extra
+        return stats
+    
+    async def _fetch_models(
+        self,
+        etag: Optional[str] = None,  # Önceki cevabın ETag'i - If-None-Match için
+        last_modified: Optional[str] = None  # Önceki cevabın Last-Modified'ı - If-Modified-Since için
+    ) -> Tuple[int, Optional[List[Dict[str, Any]]], Optional[str], Optional[str]]:
+        """
+        Ham kataloğu çek (ModelCatalog fetcher'ı) - OpenRouter + ek sağlayıcıların modelleri
+        OpenRouter destekliyorsa conditional request atar - hiçbir liste değişmemişse 304 döner
+        
+        Args:
+            etag: Önceki ETag (opsiyonel)
+            last_modified: Önceki Last-Modified (opsiyonel)
+            
+        Returns:
+            Tuple: (status_code, ham model listesi veya None, yeni etag, yeni last_modified)
+            
+        Raises:
+            httpx.HTTPError: Network veya 4xx/5xx hatalarında - catalog eski veriyle devam eder
+        """
+        with tracer.start_as_current_span("openrouter.fetch_models") as span:
             span.set_attribute("openrouter.endpoint", "/models")  # Hangi endpoint çağrıldı
-            span.set_attribute("openrouter.free_only", free_only)  # Sadece ücretsiz mi?
+            span.set_attribute("openrouter.conditional", bool(etag or last_modified))  # Conditional mı?
             
-            async with httpx.AsyncClient() as client:  # Async HTTP client aç
+            with self._track_request():  # Pool istatistikleri için sayaç
+                # Ek sağlayıcılar (yerel sunucu, echo) OpenRouter ile paralel - erişilemeyen atlanır
+                extra_task = asyncio.ensure_future(self.providers.list_extra_models())
                 try:
-                    # OpenRouter models endpoint'ine GET request
-                    response = await client.get(
-                        f"{self.base_url}/models",  # https://openrouter.ai/api/v1/models
-                        headers=self.headers,  # Authorization header ile
-                        timeout=10.0  # 10 saniye timeout
-                    )
-                    response.raise_for_status()  # 4xx veya 5xx hatalarında exception fırlat
-                    
-                    # Response'u JSON'a çevir
-                    data = response.json()
-                    all_models = data.get("data", [])  # "data" anahtarındaki model listesi
-                    
-                    # Modelleri işle - fiyat bilgilerini ekle
-                    processed_models = []
-                    for model in all_models:
-                        # Fiyat bilgilerini al (string olarak gelir, float'a çevir)
-                        pricing = model.get("pricing", {})  # Pricing objesi
-                        prompt_price = float(pricing.get("prompt", "0"))  # Prompt başına ücret ($)
-                        completion_price = float(pricing.get("completion", "0"))  # Completion başına ücret ($)
-                        
-                        # Ücretsiz model kontrolü
-                        is_free = (prompt_price == 0 and completion_price == 0)  # Her ikisi de 0 ise ücretsiz
-                        
-                        # Eğer sadece ücretsiz modeller istenmişse ve model ücretliyse, atla
-                        if free_only and not is_free:
-                            continue  # Bu modeli listeye ekleme
-                        
-                        # Ortalama maliyet hesapla (prompt + completion ortalaması, 1M token için)
-                        avg_cost = (prompt_price + completion_price) / 2 if not is_free else 0  # $/1M token
-                        
-                        # Vision desteği kontrolü (description veya id'de "vision" geçiyor mu?)
-                        description = model.get("description", "").lower()  # Açıklama (küçük harf)
-                        model_id = model.get("id", "").lower()  # Model ID (küçük harf)
-                        model_name = model.get("name", "").lower()  # Model adı (küçük harf)
-                        
-                        # Vision keyword'lerini ara
-                        supports_vision = any(
-                            keyword in description or keyword in model_id or keyword in model_name
-                            for keyword in ["vision", "image", "visual", "multimodal", "gpt-4o", "gpt-4-turbo", "claude-3"]
-                        )  # Vision desteği var mı?
-                        
-                        # Model bilgilerini ekle
-                        processed_models.append({
-                            "id": model.get("id"),  # Model ID - örn: "mistralai/mistral-7b-instruct"
-                            "name": model.get("name", model.get("id")),  # Model adı - yoksa ID kullan
-                            "description": model.get("description", ""),  # Model açıklaması
-                            "context_length": model.get("context_length", 4096),  # Max token sayısı
-                            "pricing": {
-                                "prompt": prompt_price,  # Prompt başına ücret ($/1M token)
-                                "completion": completion_price,  # Completion başına ücret ($/1M token)
-                                "average": avg_cost,  # Ortalama maliyet ($/1M token)
-                            },  # Fiyat bilgileri
-                            "is_free": is_free,  # Ücretsiz mi?
-                            "supportsVision": supports_vision,  # Vision desteği var mı?
-                        })
-                    
-                    # Span'e sonuç bilgisi ekle
-                    span.set_attribute("openrouter.models_count", len(processed_models))  # Kaç model döndü
-                    span.set_attribute("openrouter.status", "success")  # İşlem başarılı
-                    
-                    return processed_models  # Model listesini döndür
-                    
+                    status_code, upstream_models, etag, last_modified = \
+                        await self.providers.default.list_models(etag, last_modified)
                 except httpx.HTTPError as e:  # HTTP hataları (network, timeout, vb.)
+                    extra_models = await extra_task
                     # Span'e hata bilgisi ekle
                     span.set_attribute("openrouter.status", "error")  # İşlem hatalı
                     span.set_attribute("error.message", str(e))  # Hata mesajı
                     span.record_exception(e)  # Exception'ı trace'e kaydet
                     
                     print(f"❌ OpenRouter API Hatası: {e}")  # Hata mesajını logla
-                    return []  # Boş liste döndür - frontend'e hata gösterme yerine
+                    if self._upstream_models is None and extra_models:
+                        # Hiç OpenRouter kataloğu yok (örn: çevrimdışı) - yerel modellerle başla
+                        self._extra_models = extra_models
+                        return 200, extra_models, None, None
+                    raise  # Catalog yakalayıp eski snapshot'la devam eder
+                extra_models = await extra_task
+                
+                if status_code == 304 and self._upstream_models is not None:
+                    if extra_models == self._extra_models:
+                        span.set_attribute("openrouter.status", "not_modified")  # Katalog değişmemiş
+                        return 304, None, etag, last_modified
+                    upstream_models = self._upstream_models  # Sadece ek sağlayıcılar değişti
+                elif status_code == 304:
+                    # Restart sonrası ilk fetch'te 304 gelmez (etag yok) - savunmacı
+                    return 304, None, etag, last_modified
+                
+                self._upstream_models = upstream_models
+                self._extra_models = extra_models
+                all_models = upstream_models + extra_models
+                span.set_attribute("openrouter.models_count", len(all_models))  # Kaç model döndü
+                span.set_attribute("openrouter.extra_models_count", len(extra_models))  # Ek sağlayıcılardan
+                span.set_attribute("openrouter.status", "success")  # İşlem başarılı
+                return 200, all_models, etag, last_modified
+    
+    async def get_model_catalog(self) -> Optional[CatalogSnapshot]:
+        """
+        Cache'lenmiş model kataloğu snapshot'ını döndür
+        Free ve full görünümler aynı snapshot'tan sunulur
+        
+        Returns:
+            CatalogSnapshot veya None (katalog hiç çekilemediyse)
+        """
+        with tracer.start_as_current_span("openrouter.get_model_catalog") as span:
+            snapshot = await self.catalog.get_snapshot()
+            span.set_attribute("openrouter.catalog_cached", snapshot is not None)  # Snapshot var mı?
+            if snapshot is not None:
+                span.set_attribute("openrouter.catalog_age_seconds", snapshot.age)  # Snapshot yaşı
+            return snapshot
+    
+    async def get_models(self, free_only: bool = True) -> List[Dict[str, Any]]:
+        """
+        AI modellerini listele - katalog cache'inden
+        
+        Args:
+            free_only: True ise sadece ücretsiz modeller, False ise tüm modeller
+        
+        Returns:
+            List[Dict]: Model listesi - her model bir dictionary (katalog yoksa boş liste)
+        """
+        snapshot = await self.get_model_catalog()
+        if snapshot is None:
+            return []  # Boş liste döndür - router 503'e çevirir
+        return snapshot.free_models if free_only else snapshot.all_models
+    
+    async def _send_with_resilience(
+        self,
+        model: str,  # Breaker anahtarı - model ID
+        payload: Dict[str, Any],  # /chat/completions body'si
+        stream: bool,  # True: sadece header'lar okunur, body caller tarafından stream edilir
+        timeout: Union[float, httpx.Timeout],  # İstek timeout'u (saniye veya ayrıntılı httpx.Timeout)
+        max_attempts: Optional[int] = None,  # Deneme sayısı override'ı (None: retry policy)
+    ) -> httpx.Response:
+        """
+        /chat/completions isteğini retry ve circuit breaker ile gönder
+        
+        - Breaker açıksa upstream'e hiç gitmeden CircuitOpenError fırlatır
+        - 429/502/503/504 ve bağlantı hatalarında exponential backoff + jitter ile tekrar dener
+        - Retry-After header'ı varsa ona uyar (çok uzunsa beklemez, hatayı döndürür)
+        - Stream modunda retry sadece header'lar gelene kadar (ilk byte'tan önce) yapılır;
+          body okunmaya başladıktan sonra hiçbir zaman tekrar denenmez
+        
+        Returns:
+            httpx.Response: Son denemenin cevabı (hatalı status olabilir - caller raise_for_status yapar)
+            Stream modunda caller response.aclose() çağırmalıdır
+            
+        Raises:
+            CircuitOpenError: Model için breaker açık
+            httpx.HTTPError: Son denemede bağlantı/timeout hatası
+        """
+        breaker = self.breakers.get(model)
+        provider = self.providers.resolve(model)
+        span = trace.get_current_span()  # Aktif span - retry ve breaker bilgisi buraya yazılır
+        span.set_attribute("llm.provider", provider.name)  # İsteği hangi sağlayıcı karşıladı
+        if max_attempts is None:
+            max_attempts = self.retry_policy.max_attempts
+        attempt = 0
+        
+        while True:
+            if not breaker.allow_request():
+                span.set_attribute("openrouter.circuit_state", breaker.state)
+                raise CircuitOpenError(model, breaker.retry_in)  # Fail fast
+            attempt += 1
+            outcome_recorded = False  # Half-open deneme slotu iptalde geri verilsin
+            try:
+                try:
+                    # Modelin sağlayıcısına gönder - OpenRouter, yerel sunucu veya echo
+                    send = provider.stream if stream else provider.complete
+                    response = await send(payload, timeout)
+                except httpx.TransportError as e:  # Bağlantı / timeout hatası
+                    breaker.record_failure()
+                    outcome_recorded = True
+                    delay = self.retry_policy.compute_delay(attempt)
+                    if attempt >= max_attempts or delay is None:
+                        span.set_attribute("openrouter.attempts", attempt)
+                        span.set_attribute("openrouter.circuit_state", breaker.state)
+                        raise
+                    span.add_event("openrouter.retry", {
+                        "attempt": attempt, "reason": type(e).__name__, "delay_seconds": delay,
+                    })
+                    await asyncio.sleep(delay)
+                    continue
+                
+                status_code = response.status_code
+                # Upstream'in bildirdiği kalan limitle bucket'ları senkronla
+                self.rate_limiter.update_from_headers(provider.rate_limit_key, model, status_code, response.headers)
+                if status_code in BREAKER_FAILURE_STATUS_CODES:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()  # 2xx veya istemci hatası - upstream ayakta
+                outcome_recorded = True
+                
+                if status_code in RETRYABLE_STATUS_CODES and attempt < max_attempts \
+                        and breaker.state != breaker.OPEN:
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    delay = self.retry_policy.compute_delay(attempt, retry_after)
+                    if delay is not None:
+                        await response.aclose()  # Bağlantıyı havuza geri ver
+                        span.add_event("openrouter.retry", {
+                            "attempt": attempt, "status_code": status_code, "delay_seconds": delay,
+                            "retry_after": retry_after if retry_after is not None else -1.0,
+                        })
+                        await asyncio.sleep(delay)
+                        continue
+                
+                span.set_attribute("openrouter.attempts", attempt)  # Kaç denemede bitti
+                span.set_attribute("openrouter.circuit_state", breaker.state)  # Breaker'ın son durumu
+                return response
+            finally:
+                if not outcome_recorded:
+                    breaker.release_trial()  # İptal edildi - half-open slotunu geri ver
+    
+    async def _complete_candidate(
+        self,
+        model: str,  # Denenen model
+        messages: List[Dict[str, str]],  # Sohbet geçmişi
+        stream: bool,  # Payload'daki stream bayrağı
+        estimated_tokens: int,  # Rate limiter tahmini - usage ile düzeltilir
+        max_attempts: Optional[int],  # Bu aday için deneme sayısı (None: retry policy)
+    ) -> Dict[str, Any]:
+        """
+        Tek bir modele non-streaming chat completion isteği gönder
+        
+        Returns:
+            Dict: Model'in cevabı veya hata dict'i ({"error": True, "message": ..., "status_code": ...})
+        """
+        span = trace.get_current_span()  # chat_completion span'i
+        window = self._context_window(model, messages)
+        span.set_attributes(window.span_attributes())  # Gönderilen / kırpılan token'lar
+        with self._track_request():  # Pool istatistikleri için sayaç
+            try:
+                # Request payload oluştur
+                payload = {
+                    "model": model,  # Hangi model kullanılacak
+                    "messages": window.messages,  # Bütçeye sığdırılmış sohbet geçmişi
+                    "stream": stream,  # Streaming aktif mi?
+                    "usage": {"include": True},  # Cevapta token kullanımı + maliyet (cost) gelsin
+                }
+                
+                # OpenRouter chat completion endpoint'ine POST request - retry + circuit breaker ile
+                response = await self._send_with_resilience(
+                    model,
+                    payload,
+                    stream=False,  # Body tamamen okunur
+                    timeout=request_timeout(60.0),  # 60 saniye read timeout (AI cevabı için daha uzun) - connect / pool ayarlardan
+                    max_attempts=max_attempts,
+                )
+                response.raise_for_status()  # Hata varsa exception fırlat
+                
+                # Response'u JSON'a çevir
+                result = response.json()
+                self._reconcile_usage(model, estimated_tokens, result.get("usage"))  # Gerçek kullanım
+                
+                # Span'e başarı bilgisi ekle
+                span.set_attribute("openrouter.status", "success")  # İşlem başarılı
+                # AI cevabının uzunluğu
+                if "choices" in result and len(result["choices"]) > 0:
+                    content = result["choices"][0].get("message", {}).get("content", "")
+                    span.set_attribute("openrouter.response_length", len(content))  # Cevap uzunluğu
+                
+                return result  # Sonucu döndür
+                
+            except httpx.HTTPStatusError as e:  # HTTP status hataları (404, 429, 500 vb.)
+                # Span'e hata bilgisi ekle
+                span.set_attribute("openrouter.status", "error")  # İşlem hatalı
+                span.set_attribute("error.message", str(e))  # Hata mesajı
+                span.set_attribute("error.status_code", e.response.status_code)  # HTTP status code
+                span.record_exception(e)  # Exception'ı trace'e kaydet
+                
+                # Kullanıcı dostu hata mesajı oluştur - status code'a göre
+                status_code = e.response.status_code
+                
+                if status_code == 429:
+                    user_message = "Çok fazla istek gönderildi. Lütfen 1-2 dakika bekleyip tekrar deneyin."
+                elif status_code == 404:
+                    user_message = "Model bulunamadı. Lütfen farklı bir model seçin."
+                elif status_code == 401:
+                    user_message = "API anahtarı geçersiz. Lütfen backend .env dosyasını kontrol edin."
+                elif status_code == 503:
+                    user_message = "AI servisi şu an kullanılamıyor. Lütfen daha sonra tekrar deneyin."
+                else:
+                    user_message = f"Bir hata oluştu (Kod: {status_code}). Lütfen tekrar deneyin."
+                
+                print(f"❌ Chat Completion Hatası ({status_code}): {e}")  # Detaylı hata logla
+                
+                # Hata durumunda user-friendly mesaj döndür
+                return {
+                    "error": True,  # Hata bayrağı
+                    "message": user_message,  # Kullanıcı dostu mesaj
+                    "status_code": status_code  # Status code
+                }
+                
+            except httpx.HTTPError as e:  # Diğer HTTP hataları (timeout, connection vb.)
+                # Span'e hata bilgisi ekle
+                span.set_attribute("openrouter.status", "error")
+                span.set_attribute("error.message", str(e))
+                span.record_exception(e)
+                
+                print(f"❌ Chat Completion Hatası: {e}")  # Hata logla
+                
+                # Hata durumunda user-friendly mesaj döndür
+                return {
+                    "error": True,  # Hata bayrağı
+                    "message": "Bağlantı hatası. İnternet bağlantınızı kontrol edin ve tekrar deneyin.",
+                    "details": str(e)
+                }
+                
+            except CircuitOpenError as e:  # Model için breaker açık - upstream'e hiç gidilmedi
+                span.set_attribute("openrouter.status", "circuit_open")
+                print(f"⛔ Circuit breaker açık, istek gönderilmedi: {model}")
+                return {
+                    "error": True,  # Hata bayrağı
+                    "message": f"Bu model şu an yanıt vermiyor. Lütfen {int(e.retry_in) + 1} saniye sonra tekrar deneyin veya farklı bir model seçin.",
+                    "status_code": 503  # Service Unavailable
+                }
     
     async def chat_completion(
         self,
         model: str,  # Kullanılacak model ID - örn: "mistralai/mistral-7b-instruct"
         messages: List[Dict[str, str]],  # Sohbet geçmişi - [{"role": "user", "content": "..."}]
-        stream: bool = False  # Streaming mode - True ise cevabı parça parça al
+        stream: bool = False,  # Streaming mode - True ise cevabı parça parça al
+        coalesce: Optional[bool] = None,  # Aynı eşzamanlı istekleri birleştir - None: SINGLEFLIGHT_COMPLETIONS
+        cache: Optional[bool] = None  # Cevap cache'i kullanılsın mı - None: RESPONSE_CACHE_ENABLED
     ) -> Dict[str, Any]:
         """
         OpenRouter'a chat completion isteği gönder
         Model'den cevap al (streaming veya normal)
         
+        Seçilen model 404/429/5xx, bağlantı hatası veya açık breaker ile cevap veremezse
+        fallback zincirindeki sıradaki modele geçilir. Cevabı veren model "model_used"
+        anahtarına yazılır.
+        
+        coalesce açıksa aynı model + mesajlarla eşzamanlı gelen çağrılar (double-submit,
+        client retry'ları) tek bir upstream isteğini paylaşır. Sadece deterministik
+        (aynı girdiye aynı cevabın kabul edilebildiği) çağrılarda açılmalıdır.
+        cache açıksa başarılı cevaplar saklanır ve aynı istek upstream'e gitmeden cevaplanır.
+        
         Args:
             model: Kullanılacak AI model ID
             messages: Sohbet mesajları - format: [{"role": "user/assistant", "content": "..."}]
             stream: Streaming mode aktif mi?
+            coalesce: Eşzamanlı aynı istekler birleştirilsin mi
+            cache: Cevap cache'ten okunsun / cache'e yazılsın mı
             
         Returns:
-            Dict: Model'in cevabı veya hata mesajı
+            Dict: Model'in cevabı (+ "model_used"; cache'ten geldiyse "cached", başka isteğin
+                  sonucu paylaşıldıysa "shared") veya son adayın hata mesajı
+            
+        Raises:
+            RateLimitExceededException: Rate limiter kuyruğunda max bekleme aşıldı (429)
+        """
+        span = trace.get_current_span()
+        if coalesce is None:
+            coalesce = settings.SINGLEFLIGHT_COMPLETIONS
+        if cache is None:
+            cache = self.response_cache.enabled
+        
+        key = None
+        if cache:
+            key = cache_key(model, messages, {"stream": stream})
+            cached = await self.response_cache.get(key)
+            span.set_attribute("openrouter.cache", "hit" if cached is not None else "miss")
+            if cached is not None:
+                cached["cached"] = True  # Upstream'e gidilmedi - kullanım muhasebesinde maliyet 0
+                return cached  # Her çağrıda yeni decode edilmiş dict - paylaşım sorunu yok
+        
+        if coalesce:
+            flight_key = canonical_key("/chat/completions", {"model": model, "messages": messages, "stream": stream})
+            result, shared = await self.completion_flight.do(
+                flight_key, lambda: self._chat_completion(model, messages, stream)
+            )
+            span.set_attribute("openrouter.coalesced", shared)  # Başka isteğin sonucu mu?
+            result = dict(result)  # Her bekleyene kendi kopyası - biri değiştirirse diğerleri etkilenmesin
+            if shared:
+                result["shared"] = True  # Upstream maliyeti ilk isteğe yazıldı - bu kopya için maliyet 0
+        else:
+            result = await self._chat_completion(model, messages, stream)
+        
+        if key is not None and not result.get("error") and not result.get("shared"):
+            await self.response_cache.put(key, result)  # Sadece başarılı cevaplar saklanır (paylaşılanı lider yazdı)
+        return result
+    
+    async def _chat_completion(
+        self,
+        model: str,  # Kullanılacak model ID
+        messages: List[Dict[str, str]],  # Sohbet geçmişi
+        stream: bool  # Payload'daki stream bayrağı
+    ) -> Dict[str, Any]:
+        """
+        chat_completion gövdesi - fallback zinciri ile tek bir upstream çağrısı (coalescing'siz)
         """
         # Custom span oluştur - AI completion işlemini trace et
         with tracer.start_as_current_span("openrouter.chat_completion") as span:
@@ -141,159 +568,415 @@ class OpenRouterService:
             span.set_attribute("openrouter.message_count", len(messages))  # Kaç mesaj gönderildi
             span.set_attribute("openrouter.stream", stream)  # Streaming mode var mı
             
-            async with httpx.AsyncClient() as client:  # Async HTTP client aç
+            estimated_tokens = estimate_tokens(messages)  # Token/dakika limiti için kaba tahmin
+            candidates = self._fallback_chain(model, messages)  # [seçilen model, adaylar...]
+            span.set_attribute("openrouter.fallback_candidates", len(candidates) - 1)
+            
+            result: Dict[str, Any] = {}
+            for index, candidate in enumerate(candidates):
+                last = index == len(candidates) - 1
                 try:
-                    # Request payload oluştur
-                    payload = {
-                        "model": model,  # Hangi model kullanılacak
-                        "messages": messages,  # Sohbet geçmişi
-                        "stream": stream,  # Streaming aktif mi?
-                    }
-                    
-                    # OpenRouter chat completion endpoint'ine POST request
-                    response = await client.post(
-                        f"{self.base_url}/chat/completions",  # https://openrouter.ai/api/v1/chat/completions
-                        headers=self.headers,  # Authorization header
-                        json=payload,  # Request body - JSON formatında
-                        timeout=60.0  # 60 saniye timeout (AI cevabı için daha uzun)
-                    )
-                    response.raise_for_status()  # Hata varsa exception fırlat
-                    
-                    # Response'u JSON'a çevir
-                    result = response.json()
-                    
-                    # Span'e başarı bilgisi ekle
-                    span.set_attribute("openrouter.status", "success")  # İşlem başarılı
-                    # AI cevabının uzunluğu
-                    if "choices" in result and len(result["choices"]) > 0:
-                        content = result["choices"][0].get("message", {}).get("content", "")
-                        span.set_attribute("openrouter.response_length", len(content))  # Cevap uzunluğu
-                    
-                    return result  # Sonucu döndür
-                    
-                except httpx.HTTPStatusError as e:  # HTTP status hataları (404, 429, 500 vb.)
-                    # Span'e hata bilgisi ekle
-                    span.set_attribute("openrouter.status", "error")  # İşlem hatalı
-                    span.set_attribute("error.message", str(e))  # Hata mesajı
-                    span.set_attribute("error.status_code", e.response.status_code)  # HTTP status code
-                    span.record_exception(e)  # Exception'ı trace'e kaydet
-                    
-                    # Kullanıcı dostu hata mesajı oluştur - status code'a göre
-                    status_code = e.response.status_code
-                    
-                    if status_code == 429:
-                        user_message = "Çok fazla istek gönderildi. Lütfen 1-2 dakika bekleyip tekrar deneyin."
-                    elif status_code == 404:
-                        user_message = "Model bulunamadı. Lütfen farklı bir model seçin."
-                    elif status_code == 401:
-                        user_message = "API anahtarı geçersiz. Lütfen backend .env dosyasını kontrol edin."
-                    elif status_code == 503:
-                        user_message = "AI servisi şu an kullanılamıyor. Lütfen daha sonra tekrar deneyin."
-                    else:
-                        user_message = f"Bir hata oluştu (Kod: {status_code}). Lütfen tekrar deneyin."
-                    
-                    print(f"❌ Chat Completion Hatası ({status_code}): {e}")  # Detaylı hata logla
-                    
-                    # Hata durumunda user-friendly mesaj döndür
-                    return {
-                        "error": True,  # Hata bayrağı
-                        "message": user_message,  # Kullanıcı dostu mesaj
-                        "status_code": status_code  # Status code
-                    }
-                    
-                except httpx.HTTPError as e:  # Diğer HTTP hataları (timeout, connection vb.)
-                    # Span'e hata bilgisi ekle
-                    span.set_attribute("openrouter.status", "error")
-                    span.set_attribute("error.message", str(e))
-                    span.record_exception(e)
-                    
-                    print(f"❌ Chat Completion Hatası: {e}")  # Hata logla
-                    
-                    # Hata durumunda user-friendly mesaj döndür
-                    return {
-                        "error": True,  # Hata bayrağı
-                        "message": "Bağlantı hatası. İnternet bağlantınızı kontrol edin ve tekrar deneyin.",
-                        "details": str(e)
-                    }
+                    # Son aday dışındakiler kuyrukta beklemez - başka model hazırken bekletmeye değmez
+                    await self._acquire_rate_limit(candidate, estimated_tokens, max_wait=None if last else 0)
+                except RateLimitExceededException:
+                    if last:
+                        raise
+                    span.add_event("openrouter.fallback", {"from": candidate, "reason": "rate_limited"})
+                    continue
+                
+                result = await self._complete_candidate(
+                    candidate,
+                    messages,
+                    stream,
+                    estimated_tokens,
+                    max_attempts=None if last else settings.MODEL_FALLBACK_ATTEMPTS_PER_CANDIDATE,
+                )
+                if not result.get("error"):
+                    result["model_used"] = candidate  # Cevabı veren model - router kaydeder
+                    span.set_attribute("openrouter.model_used", candidate)
+                    span.set_attribute("openrouter.fallback_count", index)  # Kaç aday atlandı
+                    return result
+                
+                status_code = result.get("status_code")
+                if status_code is not None and status_code not in FALLBACK_STATUS_CODES:
+                    break  # 401, 400 gibi hatalar her modelde aynı - fallback anlamsız
+                if not last:
+                    print(f"↪️ Fallback: {candidate} cevap veremedi ({status_code or 'bağlantı'}), sıradaki aday deneniyor")
+                    span.add_event("openrouter.fallback", {
+                        "from": candidate, "reason": f"http_{status_code}" if status_code else "connection",
+                    })
+            
+            return result  # Son denenen adayın hatası
+    
+    async def _open_candidate(
+        self,
+        model: str,  # Denenen model
+        messages: List[Dict[str, str]],  # Sohbet geçmişi
+        estimated_tokens: int,  # Rate limiter tahmini - usage ile düzeltilir
+        max_attempts: Optional[int],  # Bu aday için deneme sayısı (None: retry policy)
+    ) -> ChatStream:
+        """
+        Tek bir modele stream isteği gönder ve ilk token'a kadar oku (prime)
+        
+        Model bazındaki streaming timeout'ları burada uygulanır: connect httpx'e verilir,
+        first_token gönderim + retry'lar + prime'ı kapsar, idle / total ChatStream'e aktarılır.
+        Her deneme stream kapanana kadar açık kalan bir "openrouter.stream" span'i alır
+        (TTFT, süre, chunk, byte, token/saniye, kuyruk ve flush süreleri).
+        
+        Returns:
+            ChatStream: Sağlıklı stream veya failed=True olan hata stream'i
+        """
+        span = trace.get_current_span()  # open_chat_stream span'i
+        window = self._context_window(model, messages)  # Geçmiş modelin context'ine sığdırılır
+        
+        # Request payload - stream=True ile
+        payload = {
+            "model": model,
+            "messages": window.messages,
+            "stream": True,  # Streaming mode aktif
+            "usage": {"include": True},  # Son chunk'ta token kullanımı + maliyet (cost) gelsin
+        }
+        
+        # In-flight sayacı stream kapanana kadar açık kalır
+        self._in_flight += 1
+        self._requests_total += 1
+        
+        # Stream span'i prime'dan sonra da açık kalır - on_close'da ölçümlerle bitirilir
+        stream_span = tracer.start_span(
+            "openrouter.stream",
+            attributes={"openrouter.model": model, **window.span_attributes()},  # context.tokens_saved vb.
+        )
+        
+        def on_close(closed: ChatStream) -> None:
+            self._in_flight -= 1  # Stream bitti (başarılı, hatalı veya iptal)
+            self._reconcile_usage(model, estimated_tokens, closed.usage)
+            finish_stream_span(closed, stream_span)
+        
+        timeouts = StreamTimeouts.for_model(model)
+        stream = ChatStream(model, on_close=on_close)
+        stream.idle_timeout = timeouts.idle
+        stream.total_timeout = timeouts.total
+        loop = asyncio.get_running_loop()
+        if timeouts.total:
+            stream.deadline = loop.time() + timeouts.total
+        first_token_at = loop.time() + timeouts.first_token if timeouts.first_token else None
+        if stream.deadline is not None and (first_token_at is None or stream.deadline < first_token_at):
+            first_token_at = stream.deadline
+        # Socket seviyesindeki read timeout uygulama seviyesindekilerden önce tetiklenmesin
+        read_timeout = max(timeouts.first_token, timeouts.idle) or None
+        http_timeout = httpx.Timeout(
+            read_timeout,
+            connect=timeouts.connect or None,
+            pool=settings.OPENROUTER_POOL_TIMEOUT,
+        )
+        
+        async def open_and_prime() -> bool:
+            # Streaming request - retry sadece header'lar gelene kadar (ilk byte'tan önce)
+            with trace.use_span(stream_span, end_on_exit=False):  # Retry event'leri / HTTPX span'i buraya
+                stream.response = await self._send_with_resilience(
+                    model, payload, stream=True, timeout=http_timeout, max_attempts=max_attempts
+                )
+            stream.headers_at = time.monotonic()  # Upstream kuyruğu = gönderim -> header
+            return stream.response.is_error or await stream.prime()
+        
+        stream.opened_at = time.monotonic()  # TTFT ölçümü - gönderimden ilk token'a
+        try:
+            # Gönderim + retry'lar + ilk token tek süre içinde (wait_for: asyncio.timeout_at 3.11+)
+            first_token_wait = None if first_token_at is None else max(0.0, first_token_at - loop.time())
+            primed = await asyncio.wait_for(open_and_prime(), first_token_wait)
+            if stream.response.is_error:  # HTTP status hataları (404, 429, 500 vb.)
+                status_code = stream.response.status_code
+                stream.failure_reason = f"http_{status_code}"
+                await stream.aclose()  # Bağlantıyı havuza geri ver
+                span.set_attribute("error.status_code", status_code)
+                print(f"❌ Streaming Hatası ({status_code}): {model}")  # Detaylı hata logla (backend console)
+                return ChatStream(
+                    model,
+                    error_message=stream_error_message(status_code),
+                    failure_reason=f"http_{status_code}",
+                    fallback_allowed=status_code in FALLBACK_STATUS_CODES,
+                )
+            
+            if not primed:  # İlk token'dan önce stream içinde hata
+                await stream.aclose()
+                return ChatStream(
+                    model,
+                    error_message=stream.error_message,
+                    failure_reason=stream.failure_reason,
+                    fallback_allowed=True,
+                )
+            stream.first_token_at = time.monotonic()
+            stream.ttft = stream.first_token_at - stream.opened_at
+            self.ttft.record(model, stream.ttft)  # Hedge gecikmesi (p95) bu örneklerden hesaplanır
+            return stream
+        
+        except httpx.HTTPError as e:  # Bağlantı / timeout hatası (retry'lar tükendi)
+            stream.failure_reason = type(e).__name__
+            await stream.aclose()
+            span.record_exception(e)
+            print(f"❌ Streaming Hatası: {e}")  # Detaylı hata logla
+            return ChatStream(
+                model,
+                error_message=CONNECTION_ERROR_MESSAGE,
+                failure_reason=type(e).__name__,
+                fallback_allowed=True,
+            )
+        except CircuitOpenError as e:  # Model için breaker açık - upstream'e hiç gidilmedi
+            stream.failure_reason = "circuit_open"
+            await stream.aclose()
+            print(f"⛔ Circuit breaker açık, stream gönderilmedi: {model}")
+            return ChatStream(
+                model,
+                error_message=f"⛔ Bu model şu an yanıt vermiyor.\n\nLütfen {int(e.retry_in) + 1} saniye sonra tekrar deneyin veya farklı bir model seçin.",
+                failure_reason="circuit_open",
+                fallback_allowed=True,
+            )
+        except asyncio.TimeoutError:  # İlk token first_token süresi içinde gelmedi - başka modele geçilebilir
+            stream.failure_reason = "first_token_timeout"
+            await stream.aclose()
+            seconds = timeouts.first_token
+            span.add_event("openrouter.stream_timeout", {"model": model, "kind": "first_token", "seconds": seconds})
+            print(f"⏱️ İlk token {seconds} saniyede gelmedi: {model}")
+            return ChatStream(
+                model,
+                error_message=TIMEOUT_MESSAGES["first_token"],
+                failure_reason="first_token_timeout",
+                fallback_allowed=True,
+            )
+        except BaseException:  # İptal (client gitti) - bağlantıyı bırak ve yukarı ilet
+            await stream.aclose()
+            raise
+    
+    async def _discard_attempt(self, task: "asyncio.Task[ChatStream]") -> None:
+        """
+        Kaybeden / artık gereksiz deneme task'ını iptal et ve bağlantısını havuza geri ver
+        """
+        if not task.done():
+            task.cancel()  # _open_candidate iptalde kendi bağlantısını kapatır
+        try:
+            stream = await task
+        except BaseException:  # CancelledError veya beklenmeyen hata - bağlantı zaten kapandı
+            return
+        await stream.aclose()  # İptalden önce tamamlanmıştı - açık stream'i kapat
+    
+    async def _open_hedged(
+        self,
+        model: str,  # Birincil model
+        alternate: str,  # Hedge isteğinin gideceği model (aynı model olabilir)
+        messages: List[Dict[str, str]],  # Sohbet geçmişi
+        estimated_tokens: int,  # Rate limiter tahmini
+        max_attempts: Optional[int],  # Birincil için deneme sayısı
+    ) -> ChatStream:
+        """
+        Birincil isteği gönder; modelin p95 TTFT'si içinde ilk token gelmezse ikinci bir
+        istek (hedge) gönder. Hangisi önce sağlıklı token üretirse o kazanır, diğeri iptal
+        edilir ve bağlantısı serbest bırakılır. Hedge'ler HedgeBudget ile sınırlıdır.
+        
+        Returns:
+            ChatStream: Kazanan stream veya (ikisi de başarısızsa) birincilin hata stream'i
+        """
+        span = trace.get_current_span()
+        self.hedge_budget.deposit()  # Bu istek bütçeye hak ekler
+        delay = self.ttft.hedge_delay(model)
+        span.set_attribute("openrouter.hedge_delay_seconds", delay)
+        
+        primary = asyncio.create_task(self._open_candidate(model, messages, estimated_tokens, max_attempts))
+        tasks = [primary]  # finally'de iptal edilip kapatılacak denemeler (döndürülen hariç)
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:  # Birincil gecikmeden önce cevap verdi (veya hata verdi)
+                self._record_hedge_outcome(span, "not_needed")
+                tasks.remove(primary)
+                return primary.result()
+            
+            # Gecikme aşıldı - bütçe ve rate limiter izin veriyorsa hedge gönder
+            allowed = self.hedge_budget.try_spend()
+            if allowed:
+                try:
+                    await self.rate_limiter.acquire(self._limit_key(alternate), alternate, estimated_tokens, max_wait=0)
+                except RateLimitTimeout:
+                    allowed = False
+            if not allowed:
+                self._record_hedge_outcome(span, "budget_exhausted")
+                tasks.remove(primary)
+                return await primary
+            
+            print(f"🏁 Hedge: {model} {delay:.2f}s içinde token üretmedi, {alternate} modeline ikinci istek gönderiliyor")
+            span.add_event("openrouter.hedge_sent", {"model": alternate, "delay_seconds": delay})
+            hedge = asyncio.create_task(self._open_candidate(alternate, messages, estimated_tokens, 1))
+            tasks.append(hedge)
+            
+            # Önce sağlıklı token üreten kazanır - başarısız olan diğerini bekler
+            pending = {primary, hedge}
+            failures: Dict["asyncio.Task[ChatStream]", ChatStream] = {}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in (primary, hedge):  # Aynı anda bitenlerde birincil öncelikli
+                    if task not in done:
+                        continue
+                    stream = task.result()
+                    if stream.failed:
+                        failures[task] = stream
+                        continue
+                    hedge_won = task is hedge
+                    self._record_hedge_outcome(span, "hedge_won" if hedge_won else "primary_won")
+                    span.add_event("openrouter.hedge_won" if hedge_won else "openrouter.hedge_lost", {
+                        "winner": stream.model, "loser": model if hedge_won else alternate,
+                    })
+                    tasks.remove(task)  # Kazanan finally'de kapatılmasın
+                    return stream
+            
+            # İkisi de başarısız - birincilin hatasıyla devam (fallback zinciri sıradakini dener)
+            self._record_hedge_outcome(span, "primary_won")
+            tasks.remove(primary)
+            return failures[primary]
+        finally:
+            for task in tasks:
+                await self._discard_attempt(task)  # Kaybeden / iptal edilen denemeler
+    
+    def _record_hedge_outcome(self, span: trace.Span, outcome: str) -> None:
+        """Hedge sonucunu sayaca ve span'e yaz"""
+        self.hedge_outcomes[outcome] += 1
+        span.set_attribute("openrouter.hedge_outcome", outcome)
+    
+    async def open_chat_stream(
+        self,
+        model: str,  # Kullanılacak model ID
+        messages: List[Dict[str, str]],  # Sohbet geçmişi
+        hedge: Optional[bool] = None,  # Hedged request - None: HEDGE_BY_DEFAULT
+        cache: Optional[bool] = None,  # Cevap cache'i - None: RESPONSE_CACHE_ENABLED
+    ) -> ChatStream:
+        """
+        Streaming chat completion'ı aç - upstream'den ilk token gelene kadar bekler
+        
+        Rate limiter bu aşamada çalışır: kuyrukta max bekleme aşılırsa exception fırlar ve
+        router henüz StreamingResponse dönmediği için client gerçek bir 429 alır.
+        Seçilen model ilk token'dan önce hata verirse fallback zincirindeki sıradaki modele
+        şeffaf şekilde geçilir; cevabı veren model ChatStream.model'dedir.
+        Tüm adaylar başarısızsa son hatanın mesajını üreten bir ChatStream döner - eski
+        davranışla aynı şekilde kullanıcıya AI mesajı olarak gösterilir.
+        Hedge açıksa seçilen model p95 TTFT içinde token üretmezse ikinci istek gönderilir.
+        Cache açıksa saklanan cevap upstream'e gitmeden aynı parçalarla tekrar oynatılır;
+        hatasız biten yeni stream'ler cache'e yazılır.
+        
+        Args:
+            model: Kullanılacak AI model ID
+            messages: Sohbet mesajları
+            hedge: Hedged request kullanılsın mı (latency-sensitive istekler için)
+            cache: Cevap cache'ten okunsun / cache'e yazılsın mı
+            
+        Returns:
+            ChatStream: Async iterate edilebilir stream (caller aclose() çağırmalı)
+            
+        Raises:
+            RateLimitExceededException: Rate limiter kuyruğunda max bekleme aşıldı (429)
+        """
+        with tracer.start_as_current_span("openrouter.open_chat_stream") as span:
+            span.set_attribute("openrouter.model", model)  # Hangi model seçildi
+            span.set_attribute("openrouter.message_count", len(messages))  # Kaç mesaj gönderildi
+            
+            key = None
+            if self.response_cache.enabled if cache is None else cache:
+                key = cache_key(model, messages, {"stream": True})
+                cached = await self.response_cache.get(key)
+                span.set_attribute("openrouter.cache", "hit" if cached is not None else "miss")
+                if cached is not None:  # Upstream'e gitme - aynı parçaları tekrar oynat
+                    return ChatStream.replay(cached["model"], cached["chunks"], cached.get("finish_reason"), cached.get("usage"))
+            
+            estimated_tokens = estimate_tokens(messages)  # Token/dakika limiti için kaba tahmin
+            candidates = self._fallback_chain(model, messages)  # [seçilen model, adaylar...]
+            span.set_attribute("openrouter.fallback_candidates", len(candidates) - 1)
+            hedge = settings.HEDGE_ENABLED and (settings.HEDGE_BY_DEFAULT if hedge is None else hedge)
+            span.set_attribute("openrouter.hedge", hedge)
+            
+            stream: Optional[ChatStream] = None
+            for index, candidate in enumerate(candidates):
+                last = index == len(candidates) - 1
+                try:
+                    # Son aday dışındakiler kuyrukta beklemez - başka model hazırken bekletmeye değmez
+                    queue_wait = await self._acquire_rate_limit(candidate, estimated_tokens, max_wait=None if last else 0)
+                except RateLimitExceededException:
+                    if last:
+                        raise
+                    span.add_event("openrouter.fallback", {"from": candidate, "reason": "rate_limited"})
+                    continue
+                
+                max_attempts = None if last else settings.MODEL_FALLBACK_ATTEMPTS_PER_CANDIDATE
+                if hedge and index == 0:
+                    # Hedge hedefi: zincirdeki sıradaki model ("alternate") veya aynı model ("same")
+                    alternate = candidates[1] if settings.HEDGE_TARGET == "alternate" and len(candidates) > 1 else candidate
+                    stream = await self._open_hedged(candidate, alternate, messages, estimated_tokens, max_attempts)
+                else:
+                    stream = await self._open_candidate(candidate, messages, estimated_tokens, max_attempts)
+                stream.queue_wait = queue_wait  # Stream span'ine rate limiter kuyruğu olarak yazılır
+                if not stream.failed:
+                    span.set_attribute("openrouter.status", "streaming")
+                    span.set_attribute("openrouter.model_used", candidate)
+                    span.set_attribute("openrouter.fallback_count", index)  # Kaç aday atlandı
+                    if key is not None:
+                        stream.record(lambda done, chunks: self._store_stream(key, done, chunks))
+                    return stream
+                
+                if not stream.fallback_allowed:
+                    break  # 401, 400 gibi hatalar her modelde aynı - fallback anlamsız
+                if not last:
+                    print(f"↪️ Fallback: {candidate} cevap veremedi ({stream.failure_reason}), sıradaki aday deneniyor")
+                    span.add_event("openrouter.fallback", {"from": candidate, "reason": stream.failure_reason})
+            
+            span.set_attribute("openrouter.status", "error")
+            return stream  # Son denenen adayın hata stream'i
+    
+    async def _store_stream(self, key: str, stream: ChatStream, chunks: List[str]) -> None:
+        """Hatasız biten stream'i cache'e yaz - replay için parçalar aynen saklanır"""
+        await self.response_cache.put(key, {
+            "model": stream.model,  # Cevabı üreten model (fallback / hedge olmuş olabilir)
+            "chunks": chunks,
+            "finish_reason": stream.finish_reason,
+            "usage": stream.usage,
+        })
     
     async def chat_completion_stream(
         self,
         model: str,  # Kullanılacak model ID
-        messages: List[Dict[str, str]]  # Sohbet geçmişi
+        messages: List[Dict[str, str]],  # Sohbet geçmişi
+        stream_info: Optional[Dict[str, Any]] = None,  # Opsiyonel - stream sonunda finish_reason/usage buraya yazılır
+        hedge: Optional[bool] = None,  # Hedged request - None: HEDGE_BY_DEFAULT
+        cache: Optional[bool] = None  # Cevap cache'i - None: RESPONSE_CACHE_ENABLED
     ) -> AsyncGenerator[str, None]:
         """
         OpenRouter'dan streaming chat completion
-        Model'in cevabını parça parça (token token) al
+        Model'in cevabını parça parça (token token) al - open_chat_stream üzerinde ince sarmalayıcı
         
         Args:
             model: Kullanılacak AI model ID
             messages: Sohbet mesajları
+            stream_info: Verilirse "finish_reason", "usage" (ve kesildiyse "error") anahtarları doldurulur
+            hedge: İlk token gecikirse ikinci istek gönderilsin mi
+            cache: Cevap cache'ten okunsun / cache'e yazılsın mı
             
         Yields:
             str: Model'in cevabının parçaları (token'lar)
         """
-        async with httpx.AsyncClient() as client:  # Async HTTP client aç
-            try:
-                # Request payload - stream=True ile
-                payload = {
-                    "model": model,
-                    "messages": messages,
-                    "stream": True,  # Streaming mode aktif
-                }
-                
-                # Streaming request - response'u parça parça oku
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/chat/completions",
-                    headers=self.headers,
-                    json=payload,
-                    timeout=60.0
-                ) as response:
-                    response.raise_for_status()  # Hata kontrolü
-                    
-                    # Response'u satır satır oku (Server-Sent Events formatında gelir)
-                    async for line in response.aiter_lines():
-                        if line.strip():  # Boş satırları atla
-                            # "data: " prefix'ini kaldır
-                            if line.startswith("data: "):
-                                data = line[6:]  # "data: " kısmını kes
-                                
-                                # Stream sonu kontrolü
-                                if data == "[DONE]":  # OpenRouter stream bitişi
-                                    break  # Döngüden çık
-                                
-                                # JSON parse et ve content'i yield et
-                                try:
-                                    import json  # JSON parse için
-                                    chunk = json.loads(data)  # JSON'a çevir
-                                    # Delta içindeki content'i al
-                                    content = chunk.get("choices", [{}])[0].get("delta", {}).get("content", "")
-                                    if content:  # Content varsa
-                                        yield content  # Token'ı gönder
-                                except json.JSONDecodeError:  # JSON parse hatası
-                                    continue  # Bu satırı atla, devam et
-                                    
-            except httpx.HTTPStatusError as e:  # HTTP status hataları (404, 429, 500 vb.)
-                # Kullanıcı dostu hata mesajı oluştur - status code'a göre
-                status_code = e.response.status_code  # HTTP status code
-                
-                if status_code == 429:
-                    error_msg = "⏳ Çok fazla istek gönderildi.\n\nLütfen 1-2 dakika bekleyip tekrar deneyin.\n\nÜcretsiz API kullanımında istek limiti vardır."
-                elif status_code == 404:
-                    error_msg = "❌ Model bulunamadı veya artık kullanılmıyor.\n\nLütfen model dropdown'ından farklı bir model seçin."
-                elif status_code == 401:
-                    error_msg = "🔑 API anahtarı geçersiz.\n\nLütfen backend/.env dosyasındaki OPENROUTER_API_KEY'i kontrol edin."
-                elif status_code == 503:
-                    error_msg = "🔧 AI servisi şu an kullanılamıyor.\n\nLütfen birkaç dakika sonra tekrar deneyin."
-                else:
-                    error_msg = f"❌ Beklenmeyen bir hata oluştu (HTTP {status_code}).\n\nLütfen tekrar deneyin veya farklı bir model seçin."
-                
-                print(f"❌ Streaming Hatası ({status_code}): {e}")  # Detaylı hata logla (backend console)
-                yield error_msg  # Kullanıcı dostu hata mesajı - AI mesajı olarak gösterilecek
-                
-            except httpx.HTTPError as e:  # Diğer HTTP hataları (timeout, connection vb.)
-                print(f"❌ Streaming Hatası: {e}")  # Detaylı hata logla
-                yield "❌ Bağlantı hatası oluştu.\n\nİnternet bağlantınızı kontrol edin ve tekrar deneyin."  # Kullanıcı dostu mesaj
+        try:
+            stream = await self.open_chat_stream(model, messages, hedge=hedge, cache=cache)
+        except RateLimitExceededException as e:  # Generator içinde status code dönemeyiz - mesaj olarak ilet
+            yield f"⏳ {e.detail}"
+            return
+        
+        try:
+            async for chunk in stream:
+                yield chunk
+            if stream.error:  # Timeout ile kesildi - kısmi cevabın ardından kullanıcı dostu mesaj
+                yield f"\n\n{stream.error['message']}"
+        finally:
+            await stream.aclose()  # Bağlantıyı havuza geri ver
+            if stream_info is not None:
+                if stream.finish_reason:
+                    stream_info["finish_reason"] = stream.finish_reason
+                if stream.usage:
+                    stream_info["usage"] = stream.usage
+                if stream.error:
+                    stream_info["error"] = stream.error
 
 
 # Singleton instance - uygulama boyunca tek bir instance kullanılır
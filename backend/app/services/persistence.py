@@ -0,0 +1,291 @@
+# persistence.py - Write-behind mesaj / sohbet kaydı ve group commit
+# Bir chat turu eskiden 3-4 ayrı commit yapıyordu (sohbet, refresh, kullanıcı mesajı, cevap) -
+# SQLite'ta her commit bir fsync. Artık yazmalar tek bir arka plan writer task'ının kuyruğuna girer:
+# - Writer kuyruktakileri birkaç ms'lik pencerede toplayıp tek transaction'da commit eder (group commit)
+# - ID'ler process içinde dağıtılır (MAX(id)'den devam) - request yolu ID için commit beklemez
+# - Dayanıklılık modu (PERSISTENCE_DURABILITY):
+#     sync  - her yazma ayrı commit, request commit'i bekler (eski davranış)
+#     group - yazmalar toplu commit edilir, request kendi yazmasının commit'ini bekler
+#     async - request beklemez (write-behind); çökmede son pencere kaybolabilir, okumalar ms'ler geride kalabilir
+# - Kapanışta (lifespan) kuyruk boşaltılır
+# Tek writer olduğu için yazmalar sırayla uygulanır - aynı turun mesajları asla yer değiştirmez.
+# Process içi ID dağıtımı tek worker varsayımına dayanır (batch / generations gibi): SQLite dosyasının
+# yanındaki kilit (<db>.writer.lock) ikinci bir process'in (uvicorn --workers N) writer'ı başlatmasını engeller.
+# Ordering / batching / hata davranışı kontrolü: scripts/check_persistence.py
+
+import asyncio  # Writer task'ı ve kuyruk
+import os  # Kilit dosyasının yolu
+import time  # Commit süresi ölçümü
+from datetime import datetime, timezone  # Yazmadan önce atanan zaman damgaları
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Type  # Type hints
+from opentelemetry import metrics  # Group commit metrikleri
+from sqlalchemy import select, func  # Açılışta MAX(id)
+from sqlalchemy.engine import make_url  # DATABASE_URL'den SQLite dosyası
+from sqlalchemy.ext.asyncio import AsyncSession  # Database session
+from app.config import settings  # Dayanıklılık ayarları
+from app.database import AsyncSessionLocal  # Writer kendi session'ını açar
+from app.models.conversation import Conversation  # ID dağıtılan tablolar
+from app.models.message import Message
+from app.services.history_cache import history_cache  # Yazılamayan sohbetin hazır geçmişi geçersiz
+
+try:
+    import fcntl  # Tek writer kilidi (POSIX)
+except ImportError:  # Windows - kilit yok, tek worker kuralı sadece dokümante
+    fcntl = None
+
+
+# Metrics - MeterProvider telemetry.py'de kurulur; kurulmadıysa no-op
+meter = metrics.get_meter(__name__)
+_batch_size = meter.create_histogram(
+    "persistence.commit.batch_size", unit="{write}",
+    description="Tek commit'te uygulanan yazma sayısı",
+)
+_commit_latency = meter.create_histogram(
+    "persistence.commit.latency", unit="s",
+    description="Yazmaların uygulanıp commit edilmesi için geçen süre",
+)
+
+DURABILITY_MODES = ("sync", "group", "async")
+
+WriteOp = Callable[[AsyncSession], Awaitable[Any]]  # Writer'ın session'ında çalışır - commit ETMEZ
+
+
+def writer_lock_path() -> Optional[str]:
+    """
+    Writer kilidinin yolu - sadece dosya tabanlı SQLite (bellek içi / sunucu DB'lerinde None)
+    """
+    url = make_url(settings.DATABASE_URL)
+    if url.get_backend_name() != "sqlite" or not url.database or url.database == ":memory:":
+        return None
+    return os.path.abspath(url.database) + ".writer.lock"
+
+
+def utcnow() -> datetime:
+    """
+    Şu anki zaman - SQLite CURRENT_TIMESTAMP (server_default) ile aynı biçimde (naive UTC)
+
+    Satırlar kuyrukta beklerken oluşturulma zamanı yazma anına kaymasın diye request'te atanır.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class _Write:
+    __slots__ = ("op", "future", "conversation_id")
+
+    def __init__(self, op: WriteOp, future: asyncio.Future, conversation_id: Optional[int]):
+        self.op = op
+        self.future = future
+        self.conversation_id = conversation_id
+
+
+class PersistenceWriter:
+    """
+    Tek writer task'ı + ID dağıtıcı
+
+    submit() yazmayı kuyruğa koyar ve commit'te tamamlanan bir future döndürür; wait() moda göre
+    bu future'ı bekler (async modda beklemez). Toplu commit'teki bir yazma hata verirse transaction
+    geri alınır ve yazmalar tek tek tekrar uygulanır - sadece hatalı yazmanın future'ı hata alır.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None  # start()'ta oluşturulur (event loop)
+        self._task: Optional[asyncio.Task] = None
+        self._next_ids: Dict[str, int] = {}  # Tablo adı -> sıradaki ID
+        self._lock_file = None  # Açık tutulan kilit dosyası - process bitince OS bırakır
+        # İstatistikler - monitoring için
+        self._writes = 0
+        self._commits = 0
+        self._failures = 0
+        self._max_batch = 0
+
+    @property
+    def mode(self) -> str:
+        mode = settings.PERSISTENCE_DURABILITY
+        return mode if mode in DURABILITY_MODES else "group"
+
+    async def start(self) -> None:
+        """
+        ID sayaçlarını DB'den başlat ve writer task'ını çalıştır - uygulama açılışında bir kez
+
+        Raises:
+            RuntimeError: Aynı veritabanının writer'ı başka bir process'te çalışıyor
+        """
+        self._acquire_lock()
+        async with AsyncSessionLocal() as db:
+            for model in (Conversation, Message):
+                max_id = (await db.execute(select(func.max(model.id)))).scalar()
+                self._next_ids[model.__tablename__] = (max_id or 0) + 1
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        print(f"💾 Persistence writer başladı (dayanıklılık: {self.mode})")
+
+    async def close(self) -> None:
+        """Uygulama kapanıyor - kuyruktaki tüm yazmaları commit et, writer'ı durdur"""
+        if self._task is not None:
+            await self.flush()
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._lock_file is not None:
+            self._lock_file.close()  # Kilit bırakılır
+            self._lock_file = None
+
+    def _acquire_lock(self) -> None:
+        """
+        Veritabanı başına tek writer - ikinci bir process'in MAX(id)'den dağıttığı ID'ler bu process'inkilerle
+        çakışır (IntegrityError / yanlış sohbete yazılan mesajlar). Kilit alınamazsa açılış durur.
+        """
+        path = writer_lock_path()
+        if path is None or fcntl is None or self._lock_file is not None:
+            return
+        lock_file = open(path, "a")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Veritabanının writer'ı başka bir process'te çalışıyor ({path}). "
+                "ID'ler process içinde dağıtıldığı için tek worker gerekir (uvicorn --workers 1)"
+            ) from None
+        self._lock_file = lock_file
+
+    def next_id(self, model: Type[Any]) -> int:
+        """
+        Tablonun sıradaki ID'si - commit beklemeden (artan, process içinde tekil)
+
+        Bu tablolara yapılan tüm INSERT'ler ID'yi buradan almalı (DB'nin ataması çakışır).
+        """
+        table = model.__tablename__
+        if table not in self._next_ids:
+            raise RuntimeError("Persistence writer başlatılmadı (persistence.start())")
+        value = self._next_ids[table]
+        self._next_ids[table] = value + 1
+        return value
+
+    def submit(self, op: WriteOp, conversation_id: Optional[int] = None) -> asyncio.Future:
+        """
+        Yazmayı writer kuyruğuna koy
+
+        Args:
+            op: Writer'ın session'ında çalışacak yazma (commit ETMEZ)
+            conversation_id: Yazma başarısız olursa hazır geçmişi geçersiz kılınacak sohbet
+
+        Returns:
+            asyncio.Future: Yazma commit edilince op'un dönüş değeriyle tamamlanır (hata verirse exception taşır)
+        """
+        if self._queue is None:
+            raise RuntimeError("Persistence writer başlatılmadı (persistence.start())")
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_consume_error)  # async modda kimse beklemez - "never retrieved" uyarısı olmasın
+        self._queue.put_nowait(_Write(op, future, conversation_id))
+        return future
+
+    async def wait(self, future: asyncio.Future) -> Any:
+        """
+        Moda göre yazmanın commit'ini bekle - async modda beklemez (None döner)
+
+        Client beklerken ayrılsa bile yazma iptal edilmez (shield).
+        """
+        if self.mode != "async":
+            return await asyncio.shield(future)
+        return None
+
+    async def write(self, op: WriteOp, conversation_id: Optional[int] = None) -> Any:
+        """submit() + wait() - tek adımlık yazmalar için"""
+        return await self.wait(self.submit(op, conversation_id))
+
+    def add(self, *objects: Any, conversation_id: Optional[int] = None) -> asyncio.Future:
+        """ORM objelerini ekleyen yazma - submit() kısayolu"""
+        async def op(db: AsyncSession) -> None:
+            db.add_all(objects)
+        return self.submit(op, conversation_id)
+
+    async def flush(self) -> None:
+        """
+        Kuyruktaki (ve commit edilmekte olan) tüm yazmalar bitene kadar bekle
+
+        Kuyruğa henüz yazılmamış sohbeti güncelleyen / silen / okuyan işlemlerden önce çağrılır.
+        """
+        if self._queue is not None:
+            await self._queue.join()  # Bekleyen yoksa hemen döner
+
+    async def _run(self) -> None:
+        """Writer döngüsü - ilk yazma geldikten sonra pencere boyunca toplanır, tek commit"""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            if self.mode != "sync":
+                deadline = loop.time() + settings.PERSISTENCE_GROUP_WINDOW_MS / 1000
+                while len(batch) < settings.PERSISTENCE_GROUP_MAX_WRITES:
+                    try:
+                        batch.append(self._queue.get_nowait())  # Zaten bekleyenler - beklemeden
+                        continue
+                    except asyncio.QueueEmpty:
+                        pass
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:  # 3.10: TimeoutError ile aynı sınıf değil
+                        break
+            try:
+                await self._apply(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _apply(self, batch: List[_Write]) -> None:
+        """Yazmaları tek transaction'da uygula; hata olursa tek tek tekrar dene"""
+        started = time.monotonic()
+        try:
+            async with AsyncSessionLocal() as db:
+                results = [await write.op(db) for write in batch]  # RETURNING değerleri çağırana döner
+                await db.commit()
+        except Exception as e:
+            if len(batch) == 1:
+                self._fail(batch[0], e)
+                return
+            for write in batch:  # Hatalı yazmayı ayıkla - diğerleri yine kaydedilir
+                await self._apply([write])
+            return
+
+        self._writes += len(batch)
+        self._commits += 1
+        self._max_batch = max(self._max_batch, len(batch))
+        _batch_size.record(len(batch), {"mode": self.mode})
+        _commit_latency.record(time.monotonic() - started, {"mode": self.mode})
+        for write, result in zip(batch, results):
+            if not write.future.done():
+                write.future.set_result(result)
+
+    def _fail(self, write: _Write, error: Exception) -> None:
+        self._failures += 1
+        print(f"❌ Yazma başarısız (sohbet #{write.conversation_id}): {error}")
+        if write.conversation_id is not None:
+            history_cache.invalidate(write.conversation_id)  # Cache'teki geçmiş DB'den farklı olabilir
+        if not write.future.done():
+            write.future.set_exception(error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Writer durumu - monitoring için"""
+        return {
+            "mode": self.mode,
+            "running": self._task is not None,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "writes": self._writes,
+            "commits": self._commits,
+            "avg_batch_size": round(self._writes / self._commits, 2) if self._commits else None,
+            "max_batch_size": self._max_batch,
+            "failures": self._failures,
+            "group_window_ms": settings.PERSISTENCE_GROUP_WINDOW_MS,
+        }
+
+
+def _consume_error(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        future.exception()  # Hata _fail()'de loglandı
+
+
+# Global writer instance - tüm request'ler aynı kuyruğu paylaşır
+persistence = PersistenceWriter()
@@ -0,0 +1,480 @@
+# providers.py - LLM sağlayıcı (backend) soyutlaması
+# OpenRouterService upstream'e doğrudan değil, model ID önekine göre seçilen sağlayıcı üzerinden gider:
+# - OpenRouter: varsayılan - eşleşmeyen tüm modeller
+# - OpenAI uyumlu sunucu: llama.cpp / vLLM / Ollama gibi yerel inference kutusu (örn: "local/")
+# - Echo: process içi sahte sağlayıcı - ağ yok, son kullanıcı mesajını geri yazar (demo, yük testi)
+# Tüm sağlayıcılar OpenAI /chat/completions formatında httpx.Response döndürür; böylece retry,
+# circuit breaker, rate limiter, fallback, hedging ve SSE parse katmanları aynen çalışır.
+
+import asyncio  # Echo stream'inde parça arası bekleme
+from abc import ABC, abstractmethod  # Sağlayıcı arayüzü
+import json  # Echo cevap gövdeleri
+import time  # Endpoint gecikmesi ve echo cevaplarının "created" alanı
+import uuid  # Echo generation ID'leri
+import httpx  # Async HTTP client + process içi MockTransport
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union  # Type hints
+from opentelemetry import trace  # Seçilen endpoint span'e yazılır
+from app.config import settings  # Sağlayıcı ve havuz ayarları
+from app.services.load_balancer import UpstreamPool, parse_endpoints, ENDPOINT_FAILURE_STATUS_CODES  # Çoklu base URL
+from app.services.rate_limiter import estimate_tokens  # Echo usage bilgisi
+
+
+# list_models dönüşü - ModelCatalog fetcher imzasıyla aynı:
+# (status_code, ham model listesi | None, etag, last_modified) - 304 ise liste None
+ModelList = Tuple[int, Optional[List[Dict[str, Any]]], Optional[str], Optional[str]]
+
+
+def request_timeout(seconds: float) -> httpx.Timeout:
+    """
+    İstek bazında read/write timeout - connect ve pool client ayarlarında kalır
+
+    Düz float verilirse httpx client'ın Timeout'unu tamamen ezer (connect / pool da o değer olur).
+    """
+    return httpx.Timeout(
+        seconds,
+        connect=settings.OPENROUTER_CONNECT_TIMEOUT,
+        pool=settings.OPENROUTER_POOL_TIMEOUT,
+    )
+
+
+class LLMProvider(ABC):
+    """
+    Sağlayıcı arayüzü - list_models, complete, stream (alt sınıflar üçünü de uygulamalı)
+
+    complete() gövdesi okunmuş, stream() sadece header'ları okunmuş cevap döndürür
+    (stream gövdesi ChatStream tarafından okunur, caller aclose() çağırır).
+    Hatalı status kodları exception değildir - retry / fallback kararını servis verir.
+    """
+
+    def __init__(self, name: str, prefix: str = ""):
+        self.name = name  # Log / metrik / span'lerde görünen ad
+        self.prefix = prefix  # Model ID öneki - örn: "local/" ("" : varsayılan sağlayıcı)
+
+    def upstream_model(self, model: str) -> str:
+        """Katalogdaki model ID'sini sağlayıcının beklediği ID'ye çevir (önek atılır)"""
+        if self.prefix and model.startswith(self.prefix):
+            return model[len(self.prefix):]
+        return model
+
+    @property
+    def rate_limit_key(self) -> str:
+        """Rate limiter bucket anahtarı - her sağlayıcının limiti ayrı"""
+        return f"provider:{self.name}"
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    @abstractmethod
+    async def list_models(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> ModelList:
+        """Model kataloğu - etag / last_modified ile koşullu istek (değişmediyse 304)"""
+
+    @abstractmethod
+    async def complete(self, payload: Dict[str, Any], timeout: Union[float, httpx.Timeout]) -> httpx.Response:
+        """Non-streaming /chat/completions - gövdesi okunmuş cevap"""
+
+    @abstractmethod
+    async def stream(self, payload: Dict[str, Any], timeout: Union[float, httpx.Timeout]) -> httpx.Response:
+        """Streaming /chat/completions - sadece header'ları okunmuş cevap (caller aclose() çağırır)"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"name": self.name, "prefix": self.prefix, "type": type(self).__name__}
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    OpenAI uyumlu HTTP sunucusu - /models ve /chat/completions (SSE)
+
+    llama.cpp (llama-server), vLLM, Ollama, LM Studio gibi yerel sunucular için.
+    Kendi bağlantı havuzu vardır; katalogdaki ID'ler önekle ("local/llama-3-8b"),
+    upstream'e giden ID'ler öneksiz gönderilir. Birden fazla base URL verilirse (mirror'lar,
+    bölgesel gateway'ler) her istek UpstreamPool'un seçtiği endpoint'e gider.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        prefix: str,
+        base_url: Union[str, List[str], Dict[str, float]],  # Örn: http://127.0.0.1:8080/v1 veya {url: ağırlık}
+        api_key: str = "",  # Yerel sunucular genelde key istemez
+        http2: bool = False,  # Yerel sunucular HTTP/1.1 konuşur
+        transport: Optional[httpx.AsyncBaseTransport] = None,  # Process içi sağlayıcılar için
+    ):
+        super().__init__(name, prefix)
+        self.pool = UpstreamPool(parse_endpoints(base_url))  # Tek URL'de seçim maliyeti yok
+        self.base_url = self.pool.primary.url  # İlk endpoint - rate limit anahtarı ve loglar için
+        self.api_key = api_key
+        self.http2 = http2
+        self.transport = transport
+        self.headers = {"Content-Type": "application/json"}  # Her request'te kullanılacak header'lar
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"  # Bearer token ile yetkilendirme
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _create_client(self) -> httpx.AsyncClient:
+        """
+        Bağlantı havuzlu, uzun ömürlü HTTP client oluştur
+
+        Returns:
+            httpx.AsyncClient: HTTP/2 (h2 kuruluysa) ve keepalive ayarlı client
+        """
+        http2 = self.http2  # HTTP/2 isteniyor mu?
+        if http2:
+            try:
+                import h2  # noqa: F401 - httpx HTTP/2 için h2 paketine ihtiyaç duyar
+            except ImportError:
+                print("⚠️ h2 paketi kurulu değil - HTTP/1.1 ile devam ediliyor (pip install httpx[http2])")
+                http2 = False  # HTTP/1.1'e düş
+
+        return httpx.AsyncClient(
+            http2=http2,  # HTTP/2 multiplexing - tek bağlantıda paralel stream'ler
+            transport=self.transport,  # None: gerçek ağ
+            limits=httpx.Limits(
+                max_connections=settings.OPENROUTER_MAX_CONNECTIONS,  # Maksimum eşzamanlı bağlantı
+                max_keepalive_connections=settings.OPENROUTER_MAX_KEEPALIVE_CONNECTIONS,  # Boşta tutulan bağlantı
+                keepalive_expiry=settings.OPENROUTER_KEEPALIVE_EXPIRY,  # Boştaki bağlantının ömrü
+            ),
+            timeout=httpx.Timeout(
+                60.0,  # Varsayılan read/write timeout - istek bazında override edilir
+                connect=settings.OPENROUTER_CONNECT_TIMEOUT,  # Bağlantı kurma timeout'u
+                pool=settings.OPENROUTER_POOL_TIMEOUT,  # Havuzdan bağlantı bekleme timeout'u
+            ),
+            headers=self.headers,  # Authorization ve Content-Type her istekte otomatik eklenir
+        )
+
+    async def start(self) -> None:
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()  # Yeni havuzlu client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()  # Havuzdaki bağlantıları kapat
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Paylaşılan HTTP client
+        Lifespan dışında (script, shell) kullanılırsa ilk erişimde oluşturulur
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = self._create_client()  # Lazy oluşturma
+        return self._client
+
+    @property
+    def rate_limit_key(self) -> str:
+        return f"provider:{self.name}:{self.base_url}"
+
+    def prepare_payload(self, payload: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        """
+        OpenRouter formatındaki body'yi sağlayıcıya uyarla
+
+        - Model ID öneksiz gönderilir
+        - OpenRouter'a özel "usage" alanı yerine OpenAI'ın stream_options'ı (stream'de usage için)
+        """
+        body = {key: value for key, value in payload.items() if key != "usage"}
+        body["model"] = self.upstream_model(payload["model"])
+        if stream:
+            body["stream_options"] = {"include_usage": True}
+        return body
+
+    def normalize_model(self, model: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        /models kaydını katalog formatına çevir - önekli ID, ücretsiz fiyat
+        Yerel modeller ücretsizdir: free görünümünde listelenir ve maliyet 0 yazılır
+        """
+        model_id = f"{self.prefix}{model.get('id', '')}"
+        return {
+            "id": model_id,
+            "name": model.get("name") or model_id,
+            "description": model.get("description") or f"{self.name} üzerinde çalışan yerel model",
+            "context_length": model.get("context_length") or model.get("max_model_len") or 4096,
+            "pricing": {"prompt": "0", "completion": "0"},
+            "architecture": model.get("architecture") or {"input_modalities": ["text"], "output_modalities": ["text"]},
+        }
+
+    async def list_models(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> ModelList:
+        """
+        Sağlayıcının modellerini çek (conditional request yok - yerel liste küçük)
+
+        Raises:
+            httpx.HTTPError: Network veya 4xx/5xx hatalarında
+        """
+        response = await self._request("GET", "/models", timeout=request_timeout(10.0))
+        response.raise_for_status()  # 4xx veya 5xx hatalarında exception fırlat
+        models = [self.normalize_model(model) for model in response.json().get("data", []) if model.get("id")]
+        return response.status_code, models, None, None
+
+    async def _request(self, method: str, path: str, stream: bool = False, **kwargs: Any) -> httpx.Response:
+        """
+        İsteği havuzun seçtiği endpoint'e gönder ve sonucu (gecikme, sağlık) havuza bildir
+
+        Gecikme cevap header'larına kadar ölçülür; bağlantı hataları ve 5xx endpoint hatası sayılır.
+        """
+        endpoint = self.pool.pick()
+        trace.get_current_span().set_attribute("llm.endpoint", endpoint.url)  # İsteği hangi endpoint karşıladı
+        started = time.monotonic()
+        latency: Optional[float] = None  # None kalırsa (iptal) örnek sayılmaz
+        ok = False
+        try:
+            request = self.client.build_request(method, f"{endpoint.url}{path}", **kwargs)
+            response = await self.client.send(request, stream=stream)
+            latency = time.monotonic() - started
+            ok = response.status_code not in ENDPOINT_FAILURE_STATUS_CODES
+            return response
+        except httpx.TransportError:  # Bağlantı / timeout hatası - endpoint'in sağlığına yazılır
+            latency = time.monotonic() - started
+            raise
+        finally:
+            self.pool.record(endpoint, latency, ok)
+
+    async def _send(self, payload: Dict[str, Any], stream: bool, timeout: Union[float, httpx.Timeout]) -> httpx.Response:
+        return await self._request(
+            "POST",
+            "/chat/completions",
+            stream=stream,
+            json=self.prepare_payload(payload, stream),  # Request body - JSON formatında
+            timeout=timeout,
+        )
+
+    async def complete(self, payload: Dict[str, Any], timeout: Union[float, httpx.Timeout]) -> httpx.Response:
+        return await self._send(payload, False, timeout)
+
+    async def stream(self, payload: Dict[str, Any], timeout: Union[float, httpx.Timeout]) -> httpx.Response:
+        return await self._send(payload, True, timeout)
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        Bağlantı havuzu durumu - health/monitoring için
+
+        Returns:
+            Dict: Açık, boşta, HTTP/2 ve kuyruktaki bağlantı sayıları
+        """
+        stats: Dict[str, Any] = {
+            "started": self._client is not None and not self._client.is_closed,  # Client açık mı?
+            "connections": 0,  # Havuzdaki açık bağlantılar
+            "idle_connections": 0,  # Boşta bekleyen bağlantılar
+            "http2_connections": 0,  # HTTP/2 ile kurulmuş bağlantılar
+            "queued_requests": 0,  # Havuzdan bağlantı bekleyen istekler
+        }
+
+        # httpcore havuzuna eriş - public API yok, bu yüzden savunmacı şekilde oku
+        transport = getattr(self._client, "_transport", None) if self._client else None
+        pool = getattr(transport, "_pool", None)
+        if pool is None:
+            return stats  # Client henüz açılmadı (veya process içi transport)
+
+        connections = list(getattr(pool, "connections", []))  # Havuzdaki bağlantılar
+        stats["connections"] = len(connections)
+        stats["idle_connections"] = sum(1 for conn in connections if conn.is_idle())
+        stats["http2_connections"] = sum(1 for conn in connections if "HTTP/2" in conn.info())
+        stats["queued_requests"] = sum(
+            1 for req in getattr(pool, "_requests", []) if req.connection is None
+        )  # Henüz bağlantı atanmamış istekler
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**super().get_stats(), "endpoints": self.pool.get_stats(), "pool": self.get_pool_stats()}
+
+
+class OpenRouterProvider(OpenAICompatibleProvider):
+    """
+    OpenRouter - varsayılan sağlayıcı
+
+    Body olduğu gibi gider (model ID'leri zaten OpenRouter formatında), /models
+    conditional request (ETag / Last-Modified) ile çekilir.
+    """
+
+    def __init__(self):
+        super().__init__(
+            name="openrouter",
+            prefix="",
+            base_url=settings.OPENROUTER_BASE_URLS or settings.OPENROUTER_BASE_URL,  # Gateway havuzu veya tek URL
+            api_key=settings.OPENROUTER_API_KEY,  # .env'den API key al
+            http2=settings.OPENROUTER_HTTP2,  # HTTP/2 multiplexing
+        )
+        self.headers["Authorization"] = f"Bearer {self.api_key}"  # Key boş olsa da header gider (upstream 401 döner)
+
+    @property
+    def rate_limit_key(self) -> str:
+        return self.api_key  # Upstream limitleri key bazında - header senkronu da bu anahtarla
+
+    def prepare_payload(self, payload: Dict[str, Any], stream: bool) -> Dict[str, Any]:
+        return payload
+
+    async def list_models(self, etag: Optional[str] = None, last_modified: Optional[str] = None) -> ModelList:
+        """
+        OpenRouter /models - upstream destekliyorsa değişmemiş katalog için 304 döner
+
+        Raises:
+            httpx.HTTPError: Network veya 4xx/5xx hatalarında
+        """
+        # Conditional request header'ları
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        response = await self._request(
+            "GET",
+            "/models",  # https://openrouter.ai/api/v1/models
+            headers=headers,  # Conditional header'lar (varsa)
+            timeout=request_timeout(10.0)  # 10 saniye read timeout - kullanıcı isteğini bloklamıyor
+        )
+        if response.status_code == 304:
+            return 304, None, etag, last_modified  # Katalog değişmemiş
+        response.raise_for_status()  # 4xx veya 5xx hatalarında exception fırlat
+        return (
+            response.status_code,
+            response.json().get("data", []),  # "data" anahtarındaki model listesi
+            response.headers.get("etag"),  # Sonraki conditional request için
+            response.headers.get("last-modified"),
+        )
+
+
+class EchoProvider(OpenAICompatibleProvider):
+    """
+    Process içi sahte sağlayıcı - son kullanıcı mesajını kelime kelime geri yazar
+
+    Ağa çıkmaz (httpx.MockTransport); cevaplar gerçek sağlayıcılarla aynı JSON / SSE
+    formatında olduğu için servis katmanının tamamı (retry, stream parse, usage) çalışır.
+    """
+
+    def __init__(self, name: str, prefix: str, models: Optional[List[str]] = None, chunk_delay: float = 0.0):
+        super().__init__(name, prefix, base_url=f"http://{name}.invalid/v1", transport=httpx.MockTransport(self._handle))
+        self.models = models or ["echo"]  # Katalogda görünecek model adları (öneksiz)
+        self.chunk_delay = chunk_delay  # Stream parçaları arası bekleme (saniye) - gerçekçi yük testi için
+
+    @property
+    def rate_limit_key(self) -> str:
+        return f"provider:{self.name}"
+
+    async def _handle(self, request: httpx.Request) -> httpx.Response:
+        """MockTransport handler - /models ve /chat/completions"""
+        if request.url.path.endswith("/models"):
+            return httpx.Response(200, json={"data": [
+                {"id": model, "name": f"Echo ({model})", "context_length": 32768} for model in self.models
+            ]})
+        body = json.loads(request.content or b"{}")
+        if body.get("model") not in self.models:
+            return httpx.Response(404, json={"error": {"code": 404, "message": "model not found"}})
+
+        prompt = next(
+            (m.get("content") for m in reversed(body.get("messages", [])) if m.get("role") == "user"), ""
+        )
+        if not isinstance(prompt, str):  # Çok parçalı (görsel) içerik - sadece metin kısımları
+            prompt = " ".join(part.get("text", "") for part in prompt if isinstance(part, dict))
+        reply = prompt or "..."
+        usage = {
+            "prompt_tokens": estimate_tokens(body.get("messages", [])),
+            "completion_tokens": max(1, len(reply) // 4),
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        generation_id = f"gen-echo-{uuid.uuid4().hex[:12]}"
+        base = {"id": generation_id, "object": "chat.completion", "created": int(time.time()), "model": body["model"]}
+
+        if not body.get("stream"):
+            return httpx.Response(200, json={
+                **base,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": reply}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        return httpx.Response(
+            200,
+            headers={"content-type": "text/event-stream"},
+            content=self._sse(base, reply, usage),
+        )
+
+    async def _sse(self, base: Dict[str, Any], reply: str, usage: Dict[str, int]) -> AsyncIterator[bytes]:
+        """Cevabı kelime parçaları halinde OpenAI SSE formatında üret"""
+        def event(delta: Dict[str, Any], finish_reason: Optional[str] = None, **extra: Any) -> bytes:
+            chunk = {**base, "object": "chat.completion.chunk",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}], **extra}
+            return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        words = reply.split(" ")
+        for index, word in enumerate(words):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            yield event({"content": word if index == 0 else f" {word}"})
+        yield event({}, "stop", usage=usage)
+        yield b"data: [DONE]\n\n"
+
+
+class ProviderRegistry:
+    """
+    Model ID önekine göre sağlayıcı seçimi - en uzun eşleşen önek kazanır, yoksa varsayılan
+    """
+
+    def __init__(self, default: LLMProvider, routes: Optional[Dict[str, LLMProvider]] = None):
+        self.default = default  # Eşleşmeyen tüm modeller (OpenRouter)
+        self.routes = dict(sorted((routes or {}).items(), key=lambda item: -len(item[0])))  # Uzun önek önce
+
+    @property
+    def extra(self) -> List[LLMProvider]:
+        """Varsayılan dışındaki sağlayıcılar"""
+        return list(self.routes.values())
+
+    def resolve(self, model: str) -> LLMProvider:
+        for prefix, provider in self.routes.items():
+            if model.startswith(prefix):
+                return provider
+        return self.default
+
+    async def start(self) -> None:
+        for provider in [self.default, *self.extra]:
+            await provider.start()
+
+    async def close(self) -> None:
+        for provider in [self.default, *self.extra]:
+            await provider.close()
+
+    async def list_extra_models(self) -> List[Dict[str, Any]]:
+        """
+        Ek sağlayıcıların modelleri - erişilemeyen sağlayıcı atlanır (katalog yine de yenilenir)
+        """
+        results = await asyncio.gather(*(p.list_models() for p in self.extra), return_exceptions=True)
+        models: List[Dict[str, Any]] = []
+        for provider, result in zip(self.extra, results):
+            if isinstance(result, BaseException):
+                print(f"⚠️ {provider.name} sağlayıcısının modelleri alınamadı: {result}")
+                continue
+            models.extend(result[1] or [])
+        return models
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "default": self.default.get_stats(),
+            "routes": {prefix: provider.get_stats() for prefix, provider in self.routes.items()},
+        }
+
+
+def build_provider(prefix: str, spec: Dict[str, Any]) -> LLMProvider:
+    """
+    LLM_PROVIDERS kaydından sağlayıcı oluştur
+
+    Args:
+        prefix: Model ID öneki - örn: "local/"
+        spec: {"type": "openai_compatible", "base_url": URL | [URL] | {URL: ağırlık}, "api_key": ...} veya {"type": "echo", ...}
+
+    Raises:
+        ValueError: Bilinmeyen tip veya eksik base_url
+    """
+    kind = spec.get("type", "openai_compatible")
+    name = spec.get("name") or prefix.strip("/:") or kind
+    if kind == "echo":
+        return EchoProvider(name, prefix, models=spec.get("models"), chunk_delay=float(spec.get("chunk_delay", 0)))
+    if kind == "openai_compatible":
+        if not spec.get("base_url"):
+            raise ValueError(f"LLM_PROVIDERS[{prefix!r}]: base_url zorunlu (URL, URL listesi veya {{URL: ağırlık}})")
+        return OpenAICompatibleProvider(name, prefix, spec["base_url"], api_key=spec.get("api_key", ""))
+    raise ValueError(f"LLM_PROVIDERS[{prefix!r}]: bilinmeyen sağlayıcı tipi {kind!r}")
+
+
+def build_providers() -> ProviderRegistry:
+    """Ayarlardaki sağlayıcıları kur - OpenRouter her zaman varsayılandır"""
+    routes = {prefix: build_provider(prefix, spec) for prefix, spec in settings.LLM_PROVIDERS.items()}
+    return ProviderRegistry(OpenRouterProvider(), routes)
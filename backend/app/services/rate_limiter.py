@@ -0,0 +1,362 @@
+# rate_limiter.py - Giden OpenRouter trafiği için client-side rate limiter
+# API key ve model bazında token bucket (istek/dakika + token/dakika)
+# İstekler reddedilmek üzere gönderilmez; sınırlı ve adil (FIFO) bir kuyrukta bekler,
+# max bekleme süresi aşılırsa kendi 429'umuzu hızlıca döneriz
+
+import asyncio  # Kuyruk (FIFO lock) ve bekleme için
+import hashlib  # API key'i loglanabilir parmak izine çevirmek için
+import time  # Bucket dolum hesabı (monotonic saat)
+from typing import Dict, Any, Optional, Tuple, List, Mapping  # Type hints
+from app.config import settings  # Limit ayarları
+
+
+class TokenBucket:
+    """
+    Klasik token bucket - dakika başına kapasite, saniye başına sürekli dolum
+    rate_per_minute <= 0 ise limitsizdir
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.rate_per_minute = rate_per_minute
+        self.capacity = float(rate_per_minute)  # Bir dakikalık burst'e izin ver
+        self.tokens = self.capacity  # Başlangıçta dolu
+        self._refill_per_second = rate_per_minute / 60.0
+        self._updated = time.monotonic()
+        self._paused_until = 0.0  # Upstream "sıfırlanana kadar bekle" dediyse
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate_per_minute <= 0
+
+    def _refill(self) -> None:
+        """Geçen süre kadar token ekle (kapasiteyi aşmadan)"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self._refill_per_second)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """
+        amount kadar token almak için beklenmesi gereken süre (saniye) - 0 ise hemen alınabilir
+        """
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        paused = max(0.0, self._paused_until - time.monotonic())
+        amount = min(amount, self.capacity)  # Kapasiteden büyük istek sonsuza kadar beklemesin
+        if self.tokens >= amount:
+            return paused
+        return max(paused, (amount - self.tokens) / self._refill_per_second)
+
+    def take(self, amount: float) -> None:
+        """Token düş - wait_time() 0 döndükten sonra çağrılır; borca (negatif) düşebilir"""
+        if not self.unlimited:
+            self._refill()
+            self.tokens -= amount
+
+    def sync(self, remaining: Optional[float], reset_in: Optional[float]) -> None:
+        """
+        Upstream rate-limit header'larına göre bucket'ı güncelle
+
+        Args:
+            remaining: Upstream'in bildirdiği kalan hak
+            reset_in: Limitin sıfırlanmasına kalan süre (saniye)
+        """
+        if self.unlimited:
+            return
+        self._refill()
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))  # Upstream daha azını biliyorsa ona uy
+        if remaining is not None and remaining <= 0 and reset_in:
+            self.pause(reset_in)
+
+    def pause(self, seconds: float) -> None:
+        """Bucket'ı belirli süre kapat (429 + Retry-After veya remaining=0)"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class RateLimitTimeout(Exception):
+    """
+    Max bekleme süresi veya kuyruk kapasitesi aşıldı - istek upstream'e gönderilmedi
+    """
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit aşıldı: {scope}")
+        self.scope = scope  # Hangi limit: "key" veya "model:<id>" veya "queue"
+        self.retry_after = retry_after  # Client'a önerilecek bekleme (saniye)
+
+
+def _parse_reset(value: Optional[str]) -> Optional[float]:
+    """
+    Reset header'ını "kaç saniye sonra" değerine çevir
+
+    Desteklenen formatlar:
+    - OpenRouter: epoch milisaniye ("1735689600000")
+    - Epoch saniye ("1735689600")
+    - OpenAI: süre ("1s", "6m0s", "250ms")
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        # OpenAI süre formatı - "1m30s", "250ms"
+        total, digits = 0.0, ""
+        units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+        i = 0
+        while i < len(value):
+            ch = value[i]
+            if ch.isdigit() or ch == ".":
+                digits += ch
+                i += 1
+                continue
+            unit = "ms" if value[i:i + 2] == "ms" else ch
+            if unit not in units or not digits:
+                return None
+            total += float(digits) * units[unit]
+            digits = ""
+            i += len(unit)
+        return total
+    now = time.time()
+    if number > 1e12:  # Epoch milisaniye
+        return max(0.0, number / 1000.0 - now)
+    if number > 1e9:  # Epoch saniye
+        return max(0.0, number - now)
+    return max(0.0, number)  # Direkt saniye
+
+
+def _to_float(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """
+    API key ve model bazında rate limiter
+
+    Her istek iki bucket'tan da geçmelidir:
+    - key bucket'ları: o API key'in toplam istek/dakika ve token/dakika limiti
+    - model bucket'ları: o modelin istek/dakika ve token/dakika limiti (örn: :free modeller 20 rpm)
+
+    Aynı (key, model) için bekleyenler FIFO lock ile sıraya girer - önce gelen önce gider.
+    """
+
+    def __init__(
+        self,
+        max_wait: float = None,  # Kuyrukta en fazla bekleme (saniye) - aşılırsa RateLimitTimeout
+        max_queue: int = None,  # Aynı anda bekleyebilecek en fazla istek
+    ):
+        self.max_wait = max_wait if max_wait is not None else settings.RATE_LIMIT_MAX_WAIT_SECONDS
+        self.max_queue = max_queue if max_queue is not None else settings.RATE_LIMIT_MAX_QUEUE
+        self._key_buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}  # key -> (istek, token)
+        self._model_buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}  # model -> (istek, token)
+        self._queues: Dict[Tuple[str, str], asyncio.Lock] = {}  # (key, model) -> FIFO lock
+        self._waiting = 0  # Şu an kuyrukta bekleyen istek sayısı
+        self._queue_waiters: Dict[Tuple[str, str], int] = {}  # (key, model) -> kuyruktaki istek sayısı
+        # İstatistikler
+        self._admitted = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        """API key'in kısa parmak izi - key'in kendisi loglara/metriklere düşmesin"""
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+    @staticmethod
+    def model_limits(model: str) -> Tuple[int, int]:
+        """
+        Model için (istek/dakika, token/dakika) limitleri
+        Öncelik: RATE_LIMIT_MODEL_LIMITS'teki tam eşleşme > :free varsayılanı > genel varsayılan
+        """
+        override = settings.RATE_LIMIT_MODEL_LIMITS.get(model)
+        if override:
+            rpm = override[0] if len(override) > 0 else 0
+            tpm = override[1] if len(override) > 1 else 0
+            return int(rpm), int(tpm)
+        if model.endswith(":free"):
+            return settings.RATE_LIMIT_FREE_MODEL_REQUESTS_PER_MINUTE, settings.RATE_LIMIT_MODEL_TOKENS_PER_MINUTE
+        return settings.RATE_LIMIT_MODEL_REQUESTS_PER_MINUTE, settings.RATE_LIMIT_MODEL_TOKENS_PER_MINUTE
+
+    def _buckets(self, key_id: str, model: str) -> List[Tuple[str, TokenBucket, TokenBucket]]:
+        """(scope adı, istek bucket'ı, token bucket'ı) listesi - yoksa oluşturulur"""
+        key_pair = self._key_buckets.get(key_id)
+        if key_pair is None:
+            key_pair = self._key_buckets[key_id] = (
+                TokenBucket(settings.RATE_LIMIT_REQUESTS_PER_MINUTE),
+                TokenBucket(settings.RATE_LIMIT_TOKENS_PER_MINUTE),
+            )
+        model_pair = self._model_buckets.get(model)
+        if model_pair is None:
+            rpm, tpm = self.model_limits(model)
+            model_pair = self._model_buckets[model] = (TokenBucket(rpm), TokenBucket(tpm))
+        return [("key", *key_pair), (f"model:{model}", *model_pair)]
+
+    async def acquire(self, api_key: str, model: str, estimated_tokens: int = 0, max_wait: float = None) -> float:
+        """
+        İstek için izin al - gerekirse FIFO kuyrukta bekle
+
+        Args:
+            api_key: İsteğin gideceği API key
+            model: Model ID
+            estimated_tokens: Tahmini prompt token sayısı (token/dakika limiti için)
+            max_wait: Bu istek için max bekleme (None: limiter varsayılanı, 0: hiç bekleme)
+
+        Returns:
+            float: Kuyrukta beklenen süre (saniye)
+
+        Raises:
+            RateLimitTimeout: Kuyruk dolu veya max bekleme süresi aşılacak
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return 0.0
+
+        key_id = self.key_id(api_key)
+        buckets = self._buckets(key_id, model)
+
+        # Hızlı yol - kuyrukta kimse yok ve bucket'lar müsait
+        # queue.locked() yetmez: lock bırakıldığı an uyandırılan bekleyen henüz çalışmamıştır, araya girilirdi
+        queue_id = (key_id, model)
+        queue = self._queues.get(queue_id)
+        if queue is None:
+            queue = self._queues[queue_id] = asyncio.Lock()  # asyncio.Lock FIFO sırasıyla uyandırır
+        if not self._queue_waiters.get(queue_id) and self._ready(buckets, estimated_tokens) == 0:
+            self._take(buckets, estimated_tokens)
+            self._admitted += 1
+            return 0.0
+
+        if self._waiting >= self.max_queue:
+            self._rejected += 1
+            raise RateLimitTimeout("queue", 1.0)  # Kuyruk dolu - hemen reddet
+        if max_wait == 0:
+            # Beklemesiz deneme (örn: fallback adayı) - sırada biri varsa veya bucket boşsa hemen reddet
+            self._rejected += 1
+            raise RateLimitTimeout(self._blocking_scope(buckets, estimated_tokens), self._ready(buckets, estimated_tokens))
+
+        start = time.monotonic()
+        deadline = start + (self.max_wait if max_wait is None else max_wait)
+        self._waiting += 1
+        self._queue_waiters[queue_id] = self._queue_waiters.get(queue_id, 0) + 1
+        try:
+            async with queue:  # Sıra bize gelene kadar bekle (FIFO)
+                while True:
+                    wait = self._ready(buckets, estimated_tokens)
+                    if wait == 0:
+                        self._take(buckets, estimated_tokens)
+                        break
+                    remaining = deadline - time.monotonic()
+                    if wait > remaining:
+                        # Beklesek de yetişmeyecek - hemen reddet (boşuna bekletme)
+                        self._rejected += 1
+                        raise RateLimitTimeout(self._blocking_scope(buckets, estimated_tokens), wait)
+                    await asyncio.sleep(wait)
+        finally:
+            self._waiting -= 1
+            remaining_waiters = self._queue_waiters[queue_id] - 1
+            if remaining_waiters:
+                self._queue_waiters[queue_id] = remaining_waiters
+            else:
+                del self._queue_waiters[queue_id]
+
+        waited = time.monotonic() - start
+        self._admitted += 1
+        self._total_wait += waited
+        return waited
+
+    @staticmethod
+    def _ready(buckets, estimated_tokens: int) -> float:
+        """Tüm bucket'lar için gereken en uzun bekleme"""
+        return max(
+            max(req.wait_time(1), tok.wait_time(estimated_tokens) if estimated_tokens else 0.0)
+            for _, req, tok in buckets
+        )
+
+    @staticmethod
+    def _take(buckets, estimated_tokens: int) -> None:
+        for _, req, tok in buckets:
+            req.take(1)
+            if estimated_tokens:
+                tok.take(estimated_tokens)
+
+    @staticmethod
+    def _blocking_scope(buckets, estimated_tokens: int) -> str:
+        """En uzun bekleten bucket'ın scope adı - hata mesajı için"""
+        return max(
+            buckets,
+            key=lambda b: max(b[1].wait_time(1), b[2].wait_time(estimated_tokens) if estimated_tokens else 0.0),
+        )[0]
+
+    def reconcile_tokens(self, api_key: str, model: str, estimated_tokens: int, actual_tokens: int) -> None:
+        """
+        Gerçek token kullanımı belli olunca tahmini farkı bucket'lara yansıt
+        """
+        diff = actual_tokens - estimated_tokens
+        if not settings.RATE_LIMIT_ENABLED or diff == 0:
+            return
+        for _, _, tok in self._buckets(self.key_id(api_key), model):
+            tok.take(diff)  # Negatif fark token iade eder
+
+    def update_from_headers(self, api_key: str, model: str, status_code: int, headers: Mapping[str, str]) -> None:
+        """
+        Upstream rate-limit header'larından bucket'ları güncelle
+
+        Desteklenen header'lar:
+        - OpenRouter: X-RateLimit-Remaining / X-RateLimit-Reset (istek limiti)
+        - OpenAI uyumlu: x-ratelimit-remaining-requests / -tokens, x-ratelimit-reset-requests / -tokens
+        - 429 + Retry-After: model bucket'ı o süre boyunca kapatılır
+        """
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        (_, key_req, key_tok), (_, model_req, _) = self._buckets(self.key_id(api_key), model)
+
+        remaining = _to_float(headers.get("x-ratelimit-remaining-requests") or headers.get("x-ratelimit-remaining"))
+        reset_in = _parse_reset(headers.get("x-ratelimit-reset-requests") or headers.get("x-ratelimit-reset"))
+        if remaining is not None or reset_in is not None:
+            key_req.sync(remaining, reset_in)
+
+        remaining_tokens = _to_float(headers.get("x-ratelimit-remaining-tokens"))
+        if remaining_tokens is not None:
+            key_tok.sync(remaining_tokens, _parse_reset(headers.get("x-ratelimit-reset-tokens")))
+
+        if status_code == 429:
+            retry_after = _to_float(headers.get("retry-after"))
+            model_req.pause(retry_after if retry_after is not None else reset_in or 1.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Limiter istatistikleri - admin endpoint'i için
+        """
+        return {
+            "enabled": settings.RATE_LIMIT_ENABLED,
+            "waiting": self._waiting,  # Şu an kuyrukta bekleyen
+            "max_queue": self.max_queue,
+            "max_wait_seconds": self.max_wait,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "avg_wait_seconds": round(self._total_wait / self._admitted, 3) if self._admitted else 0.0,
+            "models": {
+                model: {
+                    "requests_per_minute": req.rate_per_minute,
+                    "requests_available": None if req.unlimited else round(max(req.tokens, 0.0), 2),
+                    "tokens_per_minute": tok.rate_per_minute,
+                }
+                for model, (req, tok) in self._model_buckets.items()
+            },
+        }
+
+
+def estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    """
+    Mesaj listesinin kaba token tahmini (~4 karakter = 1 token)
+    Token/dakika limiti için yeterince iyi; gerçek değer usage ile sonradan düzeltilir
+    """
+    chars = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):  # Multimodal - sadece text parçaları
+            chars += sum(len(part.get("text", "")) for part in content if isinstance(part, dict))
+    return chars // 4 + 4 * len(messages)  # Mesaj başına rol/format overhead'i
@@ -0,0 +1,244 @@
+# resilience.py - Upstream çağrıları için dayanıklılık katmanı
+# Exponential backoff + jitter ile sınırlı retry, Retry-After desteği
+# ve model bazında circuit breaker (closed / open / half-open)
+
+import random  # Jitter için
+import time  # Breaker zamanlamaları (monotonic saat)
+from email.utils import parsedate_to_datetime  # Retry-After HTTP-date formatı için
+from datetime import datetime, timezone  # Retry-After HTTP-date hesaplaması
+from typing import Dict, Any, Optional, List  # Type hints
+from app.config import settings  # Retry ve breaker ayarları
+
+
+# Tekrar denenebilir HTTP status code'ları - geçici upstream sorunları
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+# Breaker'ın hata saydığı status code'lar - 4xx (401, 404 vb.) istemci hatasıdır, modeli "down" yapmaz
+BREAKER_FAILURE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Retry-After header'ını saniyeye çevir
+
+    İki format desteklenir:
+    - Saniye: "Retry-After: 120"
+    - HTTP-date: "Retry-After: Wed, 21 Oct 2015 07:28:00 GMT"
+
+    Returns:
+        float: Beklenecek saniye (negatifse 0) veya None (header yoksa / bozuksa)
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))  # Saniye formatı
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)  # HTTP-date formatı
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+
+
+class RetryPolicy:
+    """
+    Sınırlı retry politikası - exponential backoff + full jitter
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = None,  # İlk deneme dahil toplam deneme sayısı
+        base_delay: float = None,  # İlk retry için temel bekleme (saniye)
+        max_delay: float = None,  # Backoff üst sınırı (saniye)
+        max_retry_after: float = None,  # Bundan uzun Retry-After gelirse bekleme, hatayı döndür
+    ):
+        self.max_attempts = max_attempts if max_attempts is not None else settings.UPSTREAM_RETRY_MAX_ATTEMPTS
+        self.base_delay = base_delay if base_delay is not None else settings.UPSTREAM_RETRY_BASE_DELAY
+        self.max_delay = max_delay if max_delay is not None else settings.UPSTREAM_RETRY_MAX_DELAY
+        self.max_retry_after = max_retry_after if max_retry_after is not None else settings.UPSTREAM_RETRY_AFTER_MAX
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None) -> Optional[float]:
+        """
+        Bir sonraki denemeden önce beklenecek süre
+
+        Args:
+            attempt: Biten denemenin sırası (1'den başlar)
+            retry_after: Upstream'in Retry-After değeri (saniye, varsa)
+
+        Returns:
+            float: Bekleme süresi veya None (Retry-After çok uzun - retry yapılmamalı)
+        """
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None  # Kullanıcıyı bu kadar bekletmeye değmez
+            return retry_after  # Upstream'in istediği kadar bekle
+        # Full jitter: [0, min(max_delay, base * 2^(attempt-1))]
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """
+    Tek bir model için circuit breaker
+
+    - closed: İstekler geçer, ardışık hatalar sayılır
+    - open: Eşik aşıldı - reset_timeout boyunca istekler upstream'e gitmeden reddedilir
+    - half_open: Süre doldu - sınırlı sayıda deneme isteğine izin verilir;
+      başarılıysa closed, başarısızsa tekrar open
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,  # Model ID - admin endpoint'inde görünür
+        failure_threshold: int = None,  # Kaç ardışık hatada açılacak
+        reset_timeout: float = None,  # Açık kalma süresi (saniye)
+        half_open_max_calls: int = None,  # Half-open'da eşzamanlı deneme isteği sayısı
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold if failure_threshold is not None else settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout if reset_timeout is not None else settings.CIRCUIT_BREAKER_RESET_TIMEOUT
+        self.half_open_max_calls = half_open_max_calls if half_open_max_calls is not None else settings.CIRCUIT_BREAKER_HALF_OPEN_MAX_CALLS
+        self._state = self.CLOSED
+        self._consecutive_failures = 0  # Ardışık hata sayısı
+        self._opened_at: Optional[float] = None  # Açıldığı an (monotonic)
+        self._half_open_in_flight = 0  # Half-open'daki aktif deneme istekleri
+        self._total_failures = 0  # İstatistik
+        self._total_rejections = 0  # Breaker açıkken reddedilen istekler
+
+    @property
+    def state(self) -> str:
+        """
+        Güncel durum - open süresi dolmuşsa half_open'a geçer
+        """
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_in_flight = 0
+        return self._state
+
+    @property
+    def retry_in(self) -> float:
+        """
+        Açık breaker'ın half-open'a geçmesine kalan süre (saniye)
+        """
+        if self._state != self.OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow_request(self) -> bool:
+        """
+        Bu istek upstream'e gidebilir mi?
+        Half-open'da izin verilen her istek bir deneme slotu tüketir
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return True
+        if state == self.HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+            self._half_open_in_flight += 1
+            return True
+        self._total_rejections += 1
+        return False
+
+    def record_success(self) -> None:
+        """
+        Upstream cevap verdi - breaker'ı kapat
+        """
+        self._consecutive_failures = 0
+        if self._state != self.CLOSED:
+            print(f"✅ Circuit breaker kapandı: {self.name}")
+        self._state = self.CLOSED
+        self._half_open_in_flight = 0
+
+    def record_failure(self) -> None:
+        """
+        Upstream hatası - eşik aşıldıysa veya half-open denemesi başarısızsa breaker'ı aç
+        """
+        self._consecutive_failures += 1
+        self._total_failures += 1
+        if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            if self._state != self.OPEN:
+                print(f"⚠️ Circuit breaker açıldı: {self.name} ({self._consecutive_failures} ardışık hata)")
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._half_open_in_flight = 0
+
+    def release_trial(self) -> None:
+        """
+        Sonucu belirlenmeden biten (iptal edilen) half-open denemesinin slotunu geri ver
+        """
+        if self._state == self.HALF_OPEN and self._half_open_in_flight > 0:
+            self._half_open_in_flight -= 1
+
+    def reset(self) -> None:
+        """
+        Breaker'ı elle kapat - admin endpoint'i için
+        """
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._half_open_in_flight = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Breaker durumu - admin endpoint'i ve span'ler için
+        """
+        return {
+            "model": self.name,
+            "state": self.state,
+            "consecutive_failures": self._consecutive_failures,
+            "retry_in_seconds": round(self.retry_in, 1),
+            "total_failures": self._total_failures,
+            "total_rejections": self._total_rejections,
+        }
+
+
+class CircuitBreakerRegistry:
+    """
+    Model ID -> CircuitBreaker eşlemesi - breaker'lar ilk kullanımda oluşturulur
+    """
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, model: str) -> CircuitBreaker:
+        """
+        Model için breaker'ı döndür (yoksa oluştur)
+        """
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(model)
+        return breaker
+
+    def find(self, model: str) -> Optional[CircuitBreaker]:
+        """
+        Var olan breaker'ı döndür (oluşturmadan)
+        """
+        return self._breakers.get(model)
+
+    def snapshot_all(self) -> List[Dict[str, Any]]:
+        """
+        Tüm breaker'ların durumu - açık olanlar önce
+        """
+        order = {CircuitBreaker.OPEN: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.CLOSED: 2}
+        return sorted(
+            (breaker.snapshot() for breaker in self._breakers.values()),
+            key=lambda item: (order[item["state"]], item["model"]),
+        )
+
+
+class CircuitOpenError(Exception):
+    """
+    Model için breaker açık - istek upstream'e gönderilmedi
+    """
+
+    def __init__(self, model: str, retry_in: float):
+        super().__init__(f"Circuit breaker açık: {model}")
+        self.model = model
+        self.retry_in = retry_in  # Half-open'a kalan süre (saniye)
@@ -0,0 +1,313 @@
+# response_cache.py - Chat completion cevap cache'i
+# Aynı model + normalize edilmiş mesaj geçmişi + üretim parametreleri için upstream'e
+# tekrar gitmeden önceki cevabı döner. İki katman:
+# - Bellek: toplam byte bütçesiyle sınırlı LRU (entry sayısı değil, boyut önemli)
+# - Disk (opsiyonel): SQLite dosyası - restart sonrası da kalır, kendi byte bütçesi var
+# Streaming cevaplar chunk listesi olarak saklanır ve aynı parçalarla tekrar oynatılır.
+
+import asyncio  # Disk işlemlerini thread'e taşımak için
+import json  # orjson yoksa fallback
+import sqlite3  # Disk katmanı - stdlib, ek bağımlılık yok
+import threading  # Disk bağlantısını thread'ler arasında korumak için
+import time  # TTL hesabı
+from collections import OrderedDict  # LRU sırası
+from typing import Any, Dict, List, Optional, Tuple  # Type hints
+from opentelemetry import metrics  # Hit/miss/eviction sayaçları
+from app.config import settings  # Cache ayarları
+from app.services.singleflight import canonical_key  # Canonical hash
+
+try:
+    import orjson  # Hızlı JSON (opsiyonel bağımlılık)
+    _dumps = orjson.dumps  # bytes döner
+    _loads = orjson.loads
+except ImportError:  # orjson kurulu değil - stdlib'e düş
+    def _dumps(value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    _loads = json.loads
+
+
+# Metrics - MeterProvider telemetry.py'de kurulur; kurulmadıysa no-op
+meter = metrics.get_meter(__name__)
+_lookups = meter.create_counter(
+    "response_cache.lookups",
+    description="Cevap cache'i sorguları (result: hit/miss, tier: memory/disk)",
+)
+_evictions = meter.create_counter(
+    "response_cache.evictions",
+    description="Byte bütçesi aşıldığı için cache'ten atılan entry sayısı",
+)
+
+
+def normalize_messages(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Mesaj geçmişini cache anahtarı için normalize et
+    Sadece role + content tutulur; metin içeriğinin baş/son boşlukları anahtarı değiştirmez
+    """
+    normalized = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            content = content.strip()
+        normalized.append({"role": message.get("role"), "content": content})
+    return normalized
+
+
+def cache_key(model: str, messages: List[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Cache anahtarı - model + normalize mesajlar + üretim parametreleri (stream, temperature...)
+
+    Args:
+        model: İstenen model ID (fallback olsa bile istenen model)
+        messages: Sohbet geçmişi
+        params: Cevabı etkileyen diğer payload alanları
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    return canonical_key("response_cache", {
+        "model": model,
+        "messages": normalize_messages(messages),
+        "params": params or {},
+    })
+
+
+class MemoryTier:
+    """
+    Byte bütçeli LRU - toplam boyut max_bytes'ı aşarsa en eski kullanılan entry'ler atılır
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0  # Şu anki toplam boyut
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()  # key -> (blob, expires_at)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Entry'yi döndür ve en yeni kullanılan yap - süresi dolduysa sil"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        blob, expires_at = entry
+        if expires_at and expires_at <= time.time():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)  # LRU sırasını güncelle
+        return blob
+
+    def put(self, key: str, blob: bytes, expires_at: float) -> int:
+        """
+        Entry ekle ve bütçeye sığana kadar LRU'dan at
+
+        Returns:
+            int: Atılan entry sayısı
+        """
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (blob, expires_at)
+        self.bytes += len(blob)
+        evicted = 0
+        while self.bytes > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            evicted += 1
+        return evicted
+
+    def _remove(self, key: str) -> None:
+        blob, _ = self._entries.pop(key)
+        self.bytes -= len(blob)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.bytes = 0
+
+
+class DiskTier:
+    """
+    SQLite tabanlı kalıcı katman - restart sonrası da cevaplar kullanılabilir
+
+    Metodlar senkron; ResponseCache bunları asyncio.to_thread ile çağırır ki event loop bloklanmasın.
+    Toplam boyut max_bytes'ı aşarsa en eski erişilen entry'ler silinir.
+    """
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()  # Tek bağlantı, birden fazla worker thread
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)  # Autocommit
+        self._conn.execute("PRAGMA journal_mode=WAL")  # Okuma/yazma birbirini bloklamasın
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,"
+            " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_response_cache_accessed ON response_cache (accessed_at)")
+        self.bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        """Entry'yi döndür ve erişim zamanını güncelle - süresi dolduysa sil"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, size FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at, size = row
+            if expires_at and expires_at <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self.bytes -= size
+                return None
+            self._conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return bytes(value), expires_at
+
+    def put(self, key: str, blob: bytes, expires_at: float) -> int:
+        """
+        Entry yaz ve bütçeye sığana kadar en eski erişilenleri sil
+
+        Returns:
+            int: Silinen entry sayısı
+        """
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM response_cache WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, size, expires_at, accessed_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), expires_at, time.time()),
+            )
+            self.bytes += len(blob) - (old[0] if old else 0)
+            evicted = 0
+            while self.bytes > self.max_bytes:
+                row = self._conn.execute(
+                    "SELECT key, size FROM response_cache ORDER BY accessed_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    break
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (row[0],))
+                self.bytes -= row[1]
+                evicted += 1
+            return evicted
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache")
+            self.bytes = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    İki katmanlı cevap cache'i (bellek LRU + opsiyonel SQLite)
+
+    Kullanım:
+        key = cache_key(model, messages, {"stream": False})
+        cached = await response_cache.get(key)
+        if cached is None:
+            result = ...  # upstream
+            await response_cache.put(key, result)
+    """
+
+    def __init__(self):
+        self.enabled = settings.RESPONSE_CACHE_ENABLED  # Varsayılan davranış (çağrı bazında değiştirilebilir)
+        self.ttl = settings.RESPONSE_CACHE_TTL_SECONDS  # 0: süresiz
+        self.max_entry_bytes = settings.RESPONSE_CACHE_MAX_ENTRY_BYTES
+        self.memory = MemoryTier(settings.RESPONSE_CACHE_MAX_BYTES)
+        self.disk: Optional[DiskTier] = None  # open() ile açılır
+        # İstatistikler
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+        self.evictions = {"memory": 0, "disk": 0}
+        self.skipped = 0  # Entry limiti aşıldığı için saklanmayan cevap
+
+    def open(self) -> None:
+        """Disk katmanını aç (RESPONSE_CACHE_DISK_PATH boşsa sadece bellek kullanılır)"""
+        if settings.RESPONSE_CACHE_DISK_PATH and self.disk is None:
+            try:
+                self.disk = DiskTier(settings.RESPONSE_CACHE_DISK_PATH, settings.RESPONSE_CACHE_DISK_MAX_BYTES)
+                print(f"✅ Cevap cache'i disk katmanı açıldı: {settings.RESPONSE_CACHE_DISK_PATH}")
+            except sqlite3.Error as e:  # Dosya açılamadı - bellek katmanıyla devam et
+                print(f"⚠️ Cevap cache'i disk katmanı açılamadı, sadece bellek kullanılacak: {e}")
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+            self.disk = None
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Önce bellek, sonra disk - diskte bulunan entry belleğe alınır
+
+        Returns:
+            Dict: Saklanan cevap veya None
+        """
+        blob = self.memory.get(key)
+        tier = "memory"
+        if blob is None and self.disk is not None:
+            try:
+                row = await asyncio.to_thread(self.disk.get, key)
+            except sqlite3.Error as e:
+                print(f"⚠️ Cevap cache'i disk okuma hatası: {e}")
+                row = None
+            if row is not None:
+                blob, expires_at = row
+                tier = "disk"
+                self._record_evictions("memory", self.memory.put(key, blob, expires_at))  # Belleğe terfi
+        if blob is None:
+            self.misses += 1
+            _lookups.add(1, {"result": "miss"})
+            return None
+        self.hits[tier] += 1
+        _lookups.add(1, {"result": "hit", "tier": tier})
+        return _loads(blob)
+
+    async def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Cevabı iki katmana da yaz (write-through) - entry limiti aşılırsa saklama"""
+        blob = _dumps(value)
+        if len(blob) > self.max_entry_bytes or len(blob) > self.memory.max_bytes:
+            self.skipped += 1
+            return
+        expires_at = time.time() + self.ttl if self.ttl else 0.0
+        self._record_evictions("memory", self.memory.put(key, blob, expires_at))
+        if self.disk is not None:
+            try:
+                self._record_evictions("disk", await asyncio.to_thread(self.disk.put, key, blob, expires_at))
+            except sqlite3.Error as e:
+                print(f"⚠️ Cevap cache'i disk yazma hatası: {e}")
+
+    def _record_evictions(self, tier: str, count: int) -> None:
+        if count:
+            self.evictions[tier] += count
+            _evictions.add(count, {"tier": tier})
+
+    async def clear(self) -> None:
+        """Tüm katmanları boşalt"""
+        self.memory.clear()
+        if self.disk is not None:
+            await asyncio.to_thread(self.disk.clear)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Cache istatistikleri - admin endpoint'i için
+        """
+        lookups = self.misses + sum(self.hits.values())
+        return {
+            "enabled": self.enabled,
+            "memory": {"entries": len(self.memory), "bytes": self.memory.bytes, "max_bytes": self.memory.max_bytes},
+            "disk": (
+                {"path": self.disk.path, "entries": self.disk.count(), "bytes": self.disk.bytes, "max_bytes": self.disk.max_bytes}
+                if self.disk is not None else None
+            ),
+            "hits": dict(self.hits),
+            "misses": self.misses,
+            "hit_rate": round(sum(self.hits.values()) / lookups, 3) if lookups else None,
+            "evictions": dict(self.evictions),
+            "skipped": self.skipped,
+        }
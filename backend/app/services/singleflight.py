@@ -0,0 +1,117 @@
+# singleflight.py - Eşzamanlı aynı upstream çağrılarını tek istekte birleştirme
+# Aynı anahtarla gelen çağrılar tek bir in-flight task'ı paylaşır; sonuç (veya hata)
+# tüm bekleyenlere dağıtılır. Upstream çağrısı sadece TÜM bekleyenler gittiğinde iptal edilir.
+
+import asyncio  # Paylaşılan task ve shield için
+import hashlib  # Canonical anahtar hash'i
+import json  # Payload'ı canonical forma çevirmek için
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar  # Type hints
+
+
+T = TypeVar("T")
+
+
+def canonical_key(endpoint: str, payload: Any) -> str:
+    """
+    Endpoint + payload için canonical hash - dict anahtar sırası ve boşluklar sonucu değiştirmez
+
+    Args:
+        endpoint: Upstream endpoint - örn: "/chat/completions"
+        payload: JSON'a çevrilebilir request body'si
+
+    Returns:
+        str: SHA-256 hex digest
+    """
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{endpoint}\n{body}".encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """Tek bir in-flight çağrı - task ve bekleyen sayısı"""
+
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Task[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Request coalescing - aynı anahtarla eşzamanlı gelen çağrılar tek upstream çağrısını paylaşır
+
+    - İlk gelen çağrı fonksiyonu bir task olarak başlatır (leader)
+    - Sonradan gelenler aynı task'ı bekler (asyncio.shield ile - biri iptal edilirse task etkilenmez)
+    - Bekleyenlerden biri iptal edilirse sadece o bekleyen çıkar; son bekleyen de giderse task iptal edilir
+    - Task bitince anahtar silinir - sonuç cache'lenmez, sonraki çağrı yeni istek atar
+
+    Kullanım:
+        flight = SingleFlight("catalog")
+        result, shared = await flight.do(key, lambda: fetch())
+    """
+
+    def __init__(self, name: str):
+        self.name = name  # İstatistiklerde görünür
+        self._calls: Dict[str, _Call] = {}  # Anahtar -> in-flight çağrı
+        # İstatistikler
+        self._leaders = 0  # Upstream'e giden çağrı sayısı
+        self._shared = 0  # Mevcut çağrıya eklenen (upstream'e gitmeyen) çağrı sayısı
+        self._cancelled = 0  # Tüm bekleyenler gittiği için iptal edilen upstream çağrısı
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Anahtar için in-flight çağrı varsa onu bekle, yoksa fn() ile başlat
+
+        Args:
+            key: Coalescing anahtarı (örn: canonical_key(...))
+            fn: Upstream çağrısını yapan coroutine fonksiyonu
+
+        Returns:
+            Tuple: (sonuç, shared) - shared True ise başka bir çağrının sonucu paylaşıldı
+
+        Raises:
+            Upstream çağrısının exception'ı tüm bekleyenlere aynen iletilir
+        """
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = _Call(asyncio.create_task(fn()))
+            self._calls[key] = call
+            self._leaders += 1
+            call.task.add_done_callback(lambda task, k=key, c=call: self._on_done(k, c))
+        else:
+            self._shared += 1
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task), shared
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                # Son bekleyen de iptal edildi - upstream çağrısına artık gerek yok
+                self._cancelled += 1
+                call.task.cancel()
+                self._forget(key, call)
+
+    def _forget(self, key: str, call: _Call) -> None:
+        """Anahtarı sadece hâlâ bu çağrıya aitse sil (yeni bir çağrı başlamış olabilir)"""
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _on_done(self, key: str, call: _Call) -> None:
+        """Task bitti - anahtarı serbest bırak ve exception'ı 'okundu' işaretle (asyncio uyarısı çıkmasın)"""
+        self._forget(key, call)
+        if not call.task.cancelled():
+            call.task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Coalescing istatistikleri - admin endpoint'i için
+        """
+        return {
+            "name": self.name,
+            "in_flight": len(self._calls),  # Şu an devam eden benzersiz çağrı
+            "leaders": self._leaders,
+            "shared": self._shared,
+            "cancelled": self._cancelled,
+        }
@@ -0,0 +1,178 @@
+# sse_parser.py - Streaming chat completion için byte seviyesinde SSE parser
+# Server-Sent Events spesifikasyonuna göre ham byte buffer'larını event'lere böler
+# ve her event'in data'sından delta, finish_reason ve usage bilgisini çıkarır
+#
+# Bu döngü her token için, her eşzamanlı stream'de çalışır - bu yüzden:
+# - aiter_lines yerine aiter_bytes (decode + satır bölme tek geçişte)
+# - orjson (kuruluysa) - stdlib json'dan belirgin şekilde hızlı
+# - .get(..., [{}]) zinciri yerine direkt index erişimi (ara dict/list oluşturmaz)
+
+import json  # orjson yoksa fallback
+from typing import List, Dict, Any, Optional, NamedTuple  # Type hints
+
+try:
+    import orjson  # Hızlı JSON decoder (opsiyonel bağımlılık)
+    _json_loads = orjson.loads  # bytes'ı direkt parse eder
+    _JSONDecodeError = orjson.JSONDecodeError  # json.JSONDecodeError'dan türer
+except ImportError:  # orjson kurulu değil - stdlib'e düş
+    _json_loads = json.loads  # Python 3.6+ bytes kabul eder
+    _JSONDecodeError = json.JSONDecodeError
+
+
+# Stream sonu işareti - OpenAI/OpenRouter formatı
+DONE_SENTINEL = b"[DONE]"
+
+
+class SSEEvent(NamedTuple):
+    """
+    Tek bir SSE event'i - boş satırla biten alan grubu
+    """
+    event: Optional[bytes]  # "event:" alanı (yoksa None - varsayılan "message")
+    data: bytes  # "data:" satırları "\n" ile birleştirilmiş
+    id: Optional[bytes]  # "id:" alanı (varsa)
+
+
+class StreamDelta(NamedTuple):
+    """
+    Tek bir chat completion chunk'ından çıkarılan bilgiler
+    """
+    content: Optional[str]  # choices[0].delta.content
+    finish_reason: Optional[str]  # choices[0].finish_reason (son chunk'ta dolu)
+    usage: Optional[Dict[str, Any]]  # Token kullanımı (genelde son chunk'ta)
+    error: Optional[Dict[str, Any]]  # Stream ortasında gelen hata objesi (varsa)
+
+
+# NamedTuple'ın Python seviyesindeki __new__'unu atla - sıcak döngüde ~2x hızlı oluşturma
+_new_tuple = tuple.__new__
+
+
+class SSEParser:
+    """
+    Artımlı (incremental) SSE parser - ham byte chunk'ları besle, tamamlanan event'leri al
+
+    Spesifikasyon desteği:
+    - Satır sonları: CRLF, LF veya tek CR (chunk sınırına denk gelen CR dahil)
+    - Çok satırlı "data:" alanları ("\\n" ile birleştirilir)
+    - ":" ile başlayan yorum satırları (OpenRouter keepalive: ": OPENROUTER PROCESSING")
+    - "event:" ve "id:" alanları; "retry:" ve bilinmeyen alanlar yok sayılır
+
+    Kullanım:
+        parser = SSEParser()
+        async for raw in response.aiter_bytes():
+            for event in parser.feed(raw):
+                ...
+    """
+
+    __slots__ = ("_buffer", "_data", "_event", "_id")
+
+    def __init__(self):
+        self._buffer = b""  # Henüz satır sonu gelmemiş yarım satır
+        self._data: List[bytes] = []  # Mevcut event'in data satırları
+        self._event: Optional[bytes] = None  # Mevcut event tipi
+        self._id: Optional[bytes] = None  # Mevcut event id'si
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        """
+        Yeni byte'ları ekle ve tamamlanan event'leri döndür
+
+        Args:
+            chunk: Network'ten gelen ham byte'lar (satır ortasında bölünmüş olabilir)
+
+        Returns:
+            List[SSEEvent]: Bu chunk ile tamamlanan event'ler (boş olabilir)
+        """
+        buffer = self._buffer + chunk if self._buffer else chunk
+        if b"\r" in buffer:
+            # Sondaki tek CR bir sonraki chunk'ın LF'si ile CRLF olabilir - beklet
+            if buffer.endswith(b"\r"):
+                self._buffer = b"\r"
+                buffer = buffer[:-1]
+            else:
+                self._buffer = b""
+            buffer = buffer.replace(b"\r\n", b"\n").replace(b"\r", b"\n")  # Tüm satır sonlarını LF'e çevir
+            lines = buffer.split(b"\n")
+            self._buffer = lines.pop() + self._buffer  # Son parça tamamlanmamış satır
+        else:
+            lines = buffer.split(b"\n")
+            self._buffer = lines.pop()  # Son parça tamamlanmamış satır
+
+        events: List[SSEEvent] = []
+        for line in lines:
+            if not line:
+                # Boş satır - event'i dispatch et
+                if self._data:
+                    events.append(_new_tuple(SSEEvent, (self._event, b"\n".join(self._data), self._id)))
+                self._data = []
+                self._event = None
+                continue
+
+            if line[0] == 58:  # ":" - yorum satırı, yok say
+                continue
+
+            # "alan: değer" - ilk ":" den böl, değerin başındaki tek boşluğu at
+            colon = line.find(b":")
+            if colon == -1:
+                field, value = line, b""  # Sadece alan adı
+            else:
+                field = line[:colon]
+                value = line[colon + 2:] if line[colon + 1:colon + 2] == b" " else line[colon + 1:]
+
+            if field == b"data":
+                self._data.append(value)
+            elif field == b"event":
+                self._event = value
+            elif field == b"id":
+                self._id = value
+            # "retry" ve bilinmeyen alanlar - spesifikasyona göre yok sayılır
+
+        return events
+
+    def flush(self) -> List[SSEEvent]:
+        """
+        Stream kapandığında buffer'da kalan son event'i döndür
+        (Sunucu son boş satırı göndermeden bağlantıyı kapattıysa)
+        """
+        events = self.feed(b"\n\n") if (self._buffer or self._data) else []
+        self._buffer = b""
+        return events
+
+
+def parse_chunk(data: bytes) -> Optional[StreamDelta]:
+    """
+    Chat completion chunk'ının data alanından delta bilgisini çıkar
+
+    Args:
+        data: SSE event'inin data alanı (JSON byte'ları)
+
+    Returns:
+        StreamDelta veya None (JSON bozuksa veya tanınmayan formatsa)
+    """
+    try:
+        chunk = _json_loads(data)
+    except (_JSONDecodeError, ValueError):  # Bozuk JSON - bu chunk'ı atla
+        return None
+    if type(chunk) is not dict:
+        return None
+
+    error = chunk.get("error")  # Stream ortasında hata (OpenRouter: {"error": {...}})
+    usage = chunk.get("usage")  # Son chunk'ta token kullanımı
+
+    content = None
+    finish_reason = None
+    choices = chunk.get("choices")
+    if choices:
+        if type(choices) is not list:
+            return None
+        choice = choices[0]
+        if type(choice) is not dict:  # {"choices": ["x"]} - tanınmayan format
+            return None
+        finish_reason = choice.get("finish_reason")
+        delta = choice.get("delta")
+        if delta:
+            if type(delta) is not dict:  # {"choices": [{"delta": "x"}]}
+                return None
+            content = delta.get("content")
+            if content is not None and type(content) is not str:
+                return None
+
+    return _new_tuple(StreamDelta, (content, finish_reason, usage, error))
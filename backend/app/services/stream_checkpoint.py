@@ -0,0 +1,170 @@
+# stream_checkpoint.py - Streaming cevabın biriktirilmesi ve DB'ye ara kaydı (checkpoint)
+# - Parçalar listede biriktirilir ("".join) - full_response += chunk uzun cevaplarda O(n²)
+# - Kalıcı sohbetlerde kısmi cevap belirli aralıklarla (STREAM_CHECKPOINT_INTERVAL_MS / _BYTES)
+#   "streaming" durumuyla tek upsert ile yazılır - process çökerse cevabın o ana kadarki kısmı kalır
+# - Checkpoint'ler persistence writer'ına gider, stream'i bekletmez (aynı anda en fazla bir tane)
+# - Stream bitince aynı satır son içerik, durum ve kullanım bilgisiyle aynı upsert ile kapatılır
+# - Upsert sadece sohbet hâlâ varsa satır ekler - stream sürerken silinen sohbete yetim mesaj yazılmaz
+# - Açılışta "streaming" kalmış satırlar (çökme) "truncated" olarak işaretlenir
+
+import asyncio  # Bekleyen checkpoint yazması
+import time  # Checkpoint aralığı (monotonic saat)
+from typing import Any, Dict, List, Optional  # Type hints
+from sqlalchemy import update, select, literal  # Açılışta yarım kalan cevaplar + koşullu INSERT
+from sqlalchemy.dialects.sqlite import insert  # INSERT ... ON CONFLICT DO UPDATE (upsert)
+from sqlalchemy.ext.asyncio import AsyncSession  # Database session
+from app.config import settings  # Checkpoint ayarları
+from app.models.conversation import Conversation  # Sohbet hâlâ var mı (INSERT ... SELECT)
+from app.models.message import Message  # Assistant mesajı
+from app.services.persistence import persistence, utcnow, WriteOp  # Group commit writer'ı
+
+
+def stream_status(cancelled: bool, failed: bool) -> str:
+    """
+    Biten stream'in mesaj durumu
+
+    Args:
+        cancelled: Kullanıcı durdurdu / client ayrıldı
+        failed: Upstream hatası (timeout, bağlantı koptu)
+
+    Returns:
+        str: "truncated", "error" veya "complete"
+    """
+    if cancelled:
+        return "truncated"
+    if failed:
+        return "error"
+    return "complete"
+
+
+class StreamAccumulator:
+    """
+    Streaming cevabın parçaları - opsiyonel olarak kalıcı sohbetin assistant mesajına checkpoint'lenir
+
+    conversation_id None ise (geçici sohbet) sadece biriktirir; DB'ye hiçbir şey yazmaz.
+    Mesaj ID'si baştan alınır - ilk yazma satırı oluşturur, sonrakiler aynı satırı günceller.
+    """
+
+    def __init__(self, conversation_id: Optional[int] = None):
+        self.conversation_id = conversation_id
+        self.message_id: Optional[int] = persistence.next_id(Message) if conversation_id is not None else None
+        self.timestamp = utcnow()  # Yazma anı değil cevabın başladığı an - kullanıcı mesajından sonra
+        self._parts: List[str] = []
+        self._length = 0  # Toplam karakter
+        self._checkpointed_length = 0  # Son checkpoint'teki karakter
+        self._checkpointed_at = time.monotonic()
+        self._pending: Optional[asyncio.Future] = None  # Commit edilmemiş checkpoint yazması
+        self.checkpoints = 0
+
+    def append(self, chunk: str) -> None:
+        self._parts.append(chunk)
+        self._length += len(chunk)
+
+    @property
+    def content(self) -> str:
+        """Birleştirilmiş cevap - parçalar tek string'e indirgenir (sonraki çağrılar ucuz)"""
+        if len(self._parts) > 1:
+            self._parts = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def __bool__(self) -> bool:
+        return self._length > 0
+
+    @property
+    def checkpoint_due(self) -> bool:
+        """Kalıcı sohbet ve son checkpoint'ten beri yeterli süre / veri birikti mi?"""
+        if self.conversation_id is None or self._length == self._checkpointed_length:
+            return False
+        if self._pending is not None and not self._pending.done():
+            return False  # Önceki checkpoint hâlâ kuyrukta - yazıldığında en güncel içeriği alır
+        interval_ms = settings.STREAM_CHECKPOINT_INTERVAL_MS
+        if interval_ms and (time.monotonic() - self._checkpointed_at) * 1000 >= interval_ms:
+            return True
+        size = settings.STREAM_CHECKPOINT_BYTES
+        # Karakter sayısı byte için alt sınır - her parçada encode etmemek için yeterli
+        return bool(size) and self._length - self._checkpointed_length >= size
+
+    def checkpoint(self, model: str) -> None:
+        """Kısmi cevabı "streaming" durumuyla yazmak için writer'a gönder - beklemez"""
+        values = {"model_name": model, "status": "streaming"}
+
+        async def op(db: AsyncSession) -> None:
+            await self._upsert(db, values)
+
+        self._pending = persistence.submit(op, self.conversation_id)
+        self._checkpointed_length = self._length
+        self._checkpointed_at = time.monotonic()
+        self.checkpoints += 1
+
+    async def finalize(self, model: str, status: str, usage: Dict[str, Any], extra: Optional[WriteOp] = None) -> Message:
+        """
+        Son içeriği model, durum ve kullanım bilgisiyle yaz - dayanıklılık moduna göre commit'i bekler
+
+        Args:
+            model: Cevabı veren model (fallback / hedge olabilir)
+            status: complete / truncated / error
+            usage: turn_usage() çıktısı
+            extra: Aynı transaction'da çalışacak ek yazma (kullanım toplamları)
+
+        Returns:
+            Message: Kaydedilen mesaj (session'a bağlı değil - history cache'e eklemek için)
+        """
+        values = {"model_name": model, "status": status, **usage}
+
+        async def op(db: AsyncSession) -> None:
+            await self._upsert(db, values)
+            if extra is not None:
+                await extra(db)
+
+        await persistence.write(op, self.conversation_id)
+        return Message(
+            id=self.message_id,
+            conversation_id=self.conversation_id,
+            role="assistant",
+            content=self.content,
+            timestamp=self.timestamp,
+            **values,
+        )
+
+    async def _upsert(self, db: AsyncSession, values: Dict[str, Any]) -> None:
+        """
+        Tek ifade: satır yoksa INSERT, varsa içerik ve verilen sütunları UPDATE
+        İçerik yazma anında okunur - kuyrukta beklerken gelen parçalar da yazılır.
+
+        INSERT ... SELECT ... FROM conversations WHERE id = ? - sohbet stream sırasında silindiyse
+        satır eklenmez (SQLite foreign key'leri zorlamıyor; yetim satır yeniden kullanılan ID'ye bağlanırdı).
+        """
+        content = self.content
+        table = Message.__table__
+        columns = {
+            "id": literal(self.message_id),
+            "conversation_id": Conversation.id,
+            "role": literal("assistant"),
+            "content": literal(content, table.c.content.type),
+            "timestamp": literal(self.timestamp, table.c.timestamp.type),
+            **{name: literal(value, table.c[name].type) for name, value in values.items()},
+        }
+        source = select(*columns.values()).where(Conversation.id == self.conversation_id)
+        statement = insert(Message).from_select(list(columns), source)
+        await db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[Message.id],
+                set_={"content": content, **values},
+            )
+        )
+
+
+async def recover_interrupted_streams(db: AsyncSession) -> int:
+    """
+    Uygulama açılışı - önceki process'te "streaming" kalmış cevapları "truncated" yap
+
+    Returns:
+        int: İşaretlenen mesaj sayısı
+    """
+    result = await db.execute(
+        update(Message).where(Message.status == "streaming").values(status="truncated")
+    )
+    await db.commit()
+    if result.rowcount:
+        print(f"🔧 {result.rowcount} yarım kalmış streaming cevap 'truncated' olarak işaretlendi")
+    return result.rowcount
@@ -0,0 +1,130 @@
+# stream_metrics.py - Streaming completion'lar için span + histogram enstrümantasyonu
+# Her upstream stream denemesi stream kapanana kadar açık kalan bir span alır. Span'e ve
+# model etiketli histogramlara aynı sayılar yazılır:
+# - rate limiter kuyruğu, upstream kuyruğu (gönderim -> header), TTFT, toplam süre
+# - chunk sayısı, byte, token/saniye
+# - flush süresi: chunk'ların client'a yazılırken bekletildiği (backpressure) toplam süre
+
+import time  # Süre hesapları (monotonic saat)
+from typing import Optional  # Type hints
+from opentelemetry import metrics, trace  # Histogramlar ve span
+from opentelemetry.trace import Status, StatusCode  # Hatalı stream'lerde span durumu
+from app.services.chat_stream import ChatStream  # Ölçülen stream objesi
+
+
+# Metrics - MeterProvider telemetry.py'de kurulur; kurulmadıysa no-op
+meter = metrics.get_meter(__name__)
+_rate_limit_wait = meter.create_histogram(
+    "openrouter.rate_limit.wait", unit="s",
+    description="İsteğin client-side rate limiter kuyruğunda beklediği süre",
+)
+_upstream_queue = meter.create_histogram(
+    "chat_stream.upstream_queue", unit="s",
+    description="Stream isteğinin gönderiminden response header'larına kadar geçen süre (retry'lar dahil)",
+)
+_ttft = meter.create_histogram(
+    "chat_stream.ttft", unit="s",
+    description="Stream isteğinin gönderiminden ilk content parçasına kadar geçen süre",
+)
+_duration = meter.create_histogram(
+    "chat_stream.duration", unit="s",
+    description="Stream isteğinin gönderiminden kapanışına kadar geçen toplam süre",
+)
+_flush = meter.create_histogram(
+    "chat_stream.flush_time", unit="s",
+    description="Chunk'ların client'a yazılırken beklediği toplam süre (sunucu tarafı flush / backpressure)",
+)
+_throughput = meter.create_histogram(
+    "chat_stream.tokens_per_second", unit="{token}/s",
+    description="İlk token'dan stream sonuna kadar üretim hızı",
+)
+_chunks = meter.create_histogram(
+    "chat_stream.chunks", unit="{chunk}",
+    description="Stream başına content parçası sayısı",
+)
+_bytes = meter.create_histogram(
+    "chat_stream.bytes", unit="By",
+    description="Stream başına üretilen content byte'ı (UTF-8)",
+)
+
+
+def record_rate_limit_wait(model: str, seconds: float) -> None:
+    """Rate limiter kuyruğunda beklenen süreyi kaydet (bekleme olmasa da - dağılım için 0 önemli)"""
+    _rate_limit_wait.record(seconds, {"model": model})
+
+
+def stream_outcome(stream: ChatStream) -> str:
+    """Stream nasıl bitti - span ve histogram etiketi"""
+    if stream.failed:
+        return "failed"
+    if stream.cancelled:
+        return "cancelled"
+    if stream.error is not None:
+        return "timeout"
+    if stream.first_token_at is None:
+        return "abandoned"  # İlk token'dan önce bırakıldı (örn: hedge yarışını kaybetti)
+    return "completed"
+
+
+def completion_tokens(stream: ChatStream) -> "tuple[Optional[int], bool]":
+    """
+    Üretilen token sayısı - upstream usage gönderdiyse o, yoksa byte'tan kaba tahmin
+
+    Returns:
+        Tuple: (token sayısı veya None, tahmin mi)
+    """
+    tokens = (stream.usage or {}).get("completion_tokens")
+    if isinstance(tokens, int):
+        return tokens, False
+    if stream.bytes_received:
+        return max(1, stream.bytes_received // 4), True  # ~4 byte/token (rate_limiter.estimate_tokens ile aynı)
+    return None, True
+
+
+def finish_stream_span(stream: ChatStream, span: trace.Span) -> None:
+    """
+    Stream kapandı - ölçümleri span'e ve histogramlara yaz, span'i bitir
+
+    Args:
+        stream: Kapanan stream (opened_at / first_token_at dolu olmalı)
+        span: _open_candidate'te başlatılan "openrouter.stream" span'i
+    """
+    closed_at = time.monotonic()
+    outcome = stream_outcome(stream)
+    labels = {"model": stream.model, "outcome": outcome}
+    duration = closed_at - stream.opened_at
+
+    span.set_attribute("stream.outcome", outcome)
+    span.set_attribute("stream.duration_seconds", round(duration, 4))
+    span.set_attribute("stream.chunks", stream.chunks_received)
+    span.set_attribute("stream.bytes", stream.bytes_received)
+    span.set_attribute("stream.flush_seconds", round(stream.flush_seconds, 4))
+    span.set_attribute("stream.rate_limit_wait_seconds", round(stream.queue_wait, 4))
+    _duration.record(duration, labels)
+
+    if stream.headers_at is not None:
+        upstream_queue = stream.headers_at - stream.opened_at
+        span.set_attribute("stream.upstream_queue_seconds", round(upstream_queue, 4))
+        _upstream_queue.record(upstream_queue, labels)
+
+    if stream.first_token_at is not None:
+        span.set_attribute("stream.ttft_seconds", round(stream.ttft, 4))
+        _ttft.record(stream.ttft, labels)
+        _chunks.record(stream.chunks_received, labels)
+        _bytes.record(stream.bytes_received, labels)
+        _flush.record(stream.flush_seconds, labels)
+
+        tokens, estimated = completion_tokens(stream)
+        generation_time = closed_at - stream.first_token_at
+        if tokens and generation_time > 0:
+            tokens_per_second = tokens / generation_time
+            span.set_attribute("stream.completion_tokens", tokens)
+            span.set_attribute("stream.tokens_estimated", estimated)  # usage yoksa byte'tan tahmin
+            span.set_attribute("stream.tokens_per_second", round(tokens_per_second, 2))
+            _throughput.record(tokens_per_second, labels)
+
+    if stream.finish_reason:
+        span.set_attribute("stream.finish_reason", stream.finish_reason)
+    if outcome in ("failed", "timeout"):
+        span.set_status(Status(StatusCode.ERROR, stream.failure_reason or (stream.error or {}).get("code")))
+    span.end()
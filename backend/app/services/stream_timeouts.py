@@ -0,0 +1,101 @@
+# stream_timeouts.py - Streaming completion'lar için ayrı timeout politikası
+# Tek bir düz timeout yerine dört ayrı süre:
+# - connect: DNS + TCP + TLS bağlantı kurma
+# - first_token: istek gönderiminden ilk content parçasına (retry'lar dahil)
+# - idle: iki content parçası arasındaki max sessizlik (SSE keep-alive yorumları saymaz)
+# - total: stream'in toplam max süresi
+# Her biri model bazında override edilebilir (örn: uzun düşünen reasoning modelleri).
+
+import json  # Yapılandırılmış hata frame'i
+from typing import Any, Dict, Optional  # Type hints
+from app.config import settings  # Timeout ayarları
+
+
+# Yapılandırılmış hata frame'inin başlangıç işareti (ASCII record separator)
+# text/plain stream'de normal metinde geçmez - frontend bu işaretten sonrasını JSON olarak okur
+STREAM_ERROR_SEPARATOR = "\x1e"
+
+# Timeout türüne göre kullanıcıya gösterilen mesaj
+TIMEOUT_MESSAGES = {
+    "first_token": "⏱️ Model zamanında yanıt vermedi.\n\nLütfen tekrar deneyin veya farklı bir model seçin.",
+    "idle": "⏱️ Model yanıt üretmeyi durdurdu, cevap yarıda kesildi.\n\nLütfen tekrar deneyin.",
+    "total": "⏱️ Cevap izin verilen maksimum süreyi aştı ve yarıda kesildi.",
+}
+
+
+class StreamTimeouts:
+    """
+    Bir model için geçerli streaming timeout'ları (saniye, 0: sınırsız)
+    """
+
+    __slots__ = ("connect", "first_token", "idle", "total")
+
+    def __init__(self, connect: float, first_token: float, idle: float, total: float):
+        self.connect = connect
+        self.first_token = first_token
+        self.idle = idle
+        self.total = total
+
+    @classmethod
+    def for_model(cls, model: str) -> "StreamTimeouts":
+        """
+        Varsayılanları STREAM_TIMEOUT_OVERRIDES ile birleştir
+
+        Override anahtarı tam model ID'si ("deepseek/deepseek-r1:free") veya
+        sağlayıcı prefix'i ("deepseek/") olabilir - tam eşleşme önceliklidir.
+        """
+        values = {
+            "connect": settings.STREAM_CONNECT_TIMEOUT,
+            "first_token": settings.STREAM_FIRST_TOKEN_TIMEOUT,
+            "idle": settings.STREAM_IDLE_TIMEOUT,
+            "total": settings.STREAM_TOTAL_TIMEOUT,
+        }
+        overrides = settings.STREAM_TIMEOUT_OVERRIDES
+        provider = model.split("/", 1)[0] + "/"
+        for key in (provider, model):  # Önce sağlayıcı, sonra tam ID (üzerine yazar)
+            for name, seconds in (overrides.get(key) or {}).items():
+                if name in values:
+                    values[name] = float(seconds)
+        return cls(**values)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class StreamTimeoutError(Exception):
+    """
+    Stream bir timeout'a takıldı - kind: "first_token" / "idle" / "total"
+    """
+
+    def __init__(self, kind: str, seconds: float):
+        self.kind = kind
+        self.seconds = seconds
+        super().__init__(f"Stream {kind} timeout ({seconds}s)")
+
+
+def timeout_error(kind: str, seconds: float, partial: bool) -> Dict[str, Any]:
+    """
+    Client'a gönderilecek yapılandırılmış hata
+
+    Args:
+        kind: Timeout türü
+        seconds: Aşılan süre
+        partial: Kesilmeden önce cevap üretilmiş miydi (kısmi cevap kaydedildi)
+
+    Returns:
+        Dict: {"code", "message", "timeout_seconds", "partial"}
+    """
+    return {
+        "code": f"stream_{kind}_timeout",
+        "message": TIMEOUT_MESSAGES[kind],
+        "timeout_seconds": seconds,
+        "partial": partial,
+    }
+
+
+def stream_error_frame(error: Optional[Dict[str, Any]]) -> str:
+    """
+    Stream sonuna eklenen hata frame'i - "\\x1e" + JSON
+    Frontend işaretten önceki metni cevap, sonrasını hata olarak işler
+    """
+    return STREAM_ERROR_SEPARATOR + json.dumps({"error": error}, ensure_ascii=False)
@@ -2,7 +2,7 @@
 # Database'e kaydetmeden memory'de temporary chat session'ları tutar
 # Server restart olduğunda kaybolur - bu istenen davranış
 
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -32,7 +32,7 @@ def create_temporary_session() -> int:
     return session_id  # Session ID döndür
 
 
-def add_message_to_session(session_id: int, role: str, content: str, model_name: str = None, image_url: str = None) -> None:
+def add_message_to_session(session_id: int, role: str, content: str, model_name: str = None, image_url: str = None, status: str = "complete", usage: Optional[Dict[str, Any]] = None) -> None:
     """
     Temporary session'a mesaj ekle
     
@@ -42,6 +42,8 @@ def add_message_to_session(session_id: int, role: str, content: str, model_name:
         content: Mesaj içeriği
         model_name: Kullanılan model adı (opsiyonel - assistant mesajlarında dolu)
         image_url: Resim URL (opsiyonel)
+        status: Cevap durumu - "complete", "truncated" (durduruldu) veya "error" (timeout / bağlantı koptu)
+        usage: Token / maliyet / gecikme bilgisi (opsiyonel - assistant mesajlarında dolu)
     """
     # Session mevcut değilse oluştur
     if session_id not in _temporary_sessions:
@@ -52,6 +54,7 @@ def add_message_to_session(session_id: int, role: str, content: str, model_name:
         "role": role,  # user veya assistant
         "content": content,  # Mesaj içeriği
         "timestamp": datetime.utcnow().isoformat(),  # ISO format timestamp
+        "status": status,  # complete / truncated / error
     }
     
     # Model adı varsa ekle (assistant mesajlarında dolu)
@@ -62,6 +65,10 @@ def add_message_to_session(session_id: int, role: str, content: str, model_name:
     if image_url:
         message["image_url"] = image_url  # Resim URL'i ekle
     
+    # Kullanım bilgisi varsa ekle (prompt_tokens, completion_tokens, cost, latency_ms, ttft_ms)
+    if usage:
+        message.update(usage)
+    
     # Session'a mesaj ekle
     _temporary_sessions[session_id].append(message)
 
@@ -0,0 +1,120 @@
+# turn_setup.py - Kalıcı sohbette bir turun başlangıcı: sohbet (gerekirse) + kullanıcı mesajı + geçmiş
+# Eskiden: sohbet SELECT'i (veya add + commit + refresh), kullanıcı mesajı için ayrı add + commit,
+# sonra geçmişin tamamı için SELECT. Artık:
+# - Yeni sohbet ve kullanıcı mesajı aynı transaction'da (writer'ın group commit'i) INSERT edilir
+# - Sohbetin varlığı ayrı bir SELECT ile kontrol edilmez: mesaj
+#   INSERT INTO messages ... SELECT ... FROM conversations WHERE id = ? RETURNING id ile eklenir -
+#   satır dönmezse sohbet yok (404)
+# - ID ve zaman damgaları önceden atandığı için refresh yok; geçmiş cache'ten (compaction_service.history)
+# Tur başına DB çağrısı karşılaştırması: scripts/bench_turn_setup.py
+
+import asyncio  # Yazmanın sonucunu (RETURNING) beklemek için
+from typing import Any, Dict, List, Optional  # Type hints
+from sqlalchemy import insert, select, literal  # INSERT ... SELECT ... RETURNING
+from sqlalchemy.ext.asyncio import AsyncSession  # Database session
+from app.models.conversation import Conversation  # Sohbet tablosu
+from app.models.message import Message  # Mesaj tablosu
+from app.services.persistence import persistence, utcnow  # Group commit writer'ı + ID dağıtıcı
+from app.services.history_cache import history_cache  # Sohbet başına hazır geçmiş
+from app.services.compaction import compaction_service  # Özet + son turlar
+from app.exceptions import ConversationNotFoundException  # 404
+
+
+class Turn:
+    """
+    Başlatılmış tur - router'ın upstream isteği ve cevap kaydı için ihtiyaç duyduğu her şey
+    """
+
+    __slots__ = ("conversation_id", "user_message", "history")
+
+    def __init__(self, conversation_id: int, user_message: Message, history: List[Dict[str, Any]]):
+        self.conversation_id = conversation_id  # Yeni sohbette önceden atanan ID
+        self.user_message = user_message  # Session'a bağlı değil - ID ve timestamp dolu
+        self.history = history  # Upstream'e gidecek mesajlar (özet + son turlar, kullanıcı mesajı dahil)
+
+
+async def begin_turn(
+    db: AsyncSession,
+    conversation_id: Optional[int],  # None: yeni sohbet oluştur
+    model: str,  # Seçilen model - yeni sohbetin model_name'i
+    content: str,  # Kullanıcı mesajı
+    image_url: Optional[str] = None,  # Resim (vision model'ler için)
+    title: Optional[str] = None,  # Yeni sohbetin başlığı
+) -> Turn:
+    """
+    Sohbeti (gerekirse) ve kullanıcı mesajını tek yazmada kaydet, upstream'e gidecek geçmişi döndür
+
+    Dayanıklılık modu "async" ise ve sohbetin varlığı zaten biliniyorsa (yeni / hazır geçmişi cache'te)
+    commit beklenmez; geçmiş DB'den okunacaksa mesajın commit edilmiş olması beklenir.
+
+    Args:
+        db: Request'in session'ı (sadece geçmiş cache'te değilse okuma için)
+
+    Returns:
+        Turn: Sohbet ID'si, kullanıcı mesajı ve geçmiş
+
+    Raises:
+        ConversationNotFoundException: conversation_id verilmiş ama sohbet yok (404)
+    """
+    now = utcnow()
+    conversation_values = None
+    if conversation_id is None:
+        conversation_id = persistence.next_id(Conversation)
+        conversation_values = {
+            "id": conversation_id,
+            "title": title or "Yeni Sohbet",  # Başlık yoksa default
+            "model_name": model,
+            "created_at": now,
+        }
+
+    user_message = Message(
+        id=persistence.next_id(Message),  # Commit beklemeden - geçmiş cache'i sırayı ID'den bilir
+        conversation_id=conversation_id,
+        role="user",
+        content=content,
+        model_name=None,  # Kullanıcı mesajında model yok
+        image_url=image_url,
+        status="complete",
+        timestamp=now,
+    )
+    statement = _insert_if_conversation_exists(user_message)
+
+    async def save_turn(writer_db: AsyncSession) -> Optional[int]:
+        if conversation_values is not None:
+            await writer_db.execute(insert(Conversation).values(**conversation_values))
+        return (await writer_db.execute(statement)).scalar_one_or_none()  # Sohbet yoksa satır dönmez
+
+    saved = persistence.submit(save_turn, conversation_id)
+    if conversation_values is not None:
+        history_cache.start(conversation_id)  # Boş geçmiş - ilk turda SELECT gerekmez
+        compaction_service.start(conversation_id)  # Özet yok - checkpoint SELECT'i gerekmez
+
+    known = conversation_values is not None or persistence.mode == "async"
+    if known and history_cache.contains(conversation_id):
+        await persistence.wait(saved)  # async modda beklemez - silme işlemi cache'i de geçersiz kılar
+    elif await asyncio.shield(saved) is None:  # Client ayrılsa bile yazma iptal edilmez
+        raise ConversationNotFoundException(conversation_id)
+
+    history_cache.append(user_message)  # Cache'teki geçmişin sonuna ekle (cache'te yoksa bir şey yapmaz)
+    # Cache'te varsa DB'ye gidilmez; yoksa mesajlar bir kez okunup cache'e konur
+    history = await compaction_service.history(db, conversation_id)
+    return Turn(conversation_id, user_message, history)
+
+
+def _insert_if_conversation_exists(message: Message):
+    """
+    Mesajı sadece sohbeti varsa ekleyen tek ifade - varlık kontrolü için ayrı SELECT yok:
+    INSERT INTO messages (...) SELECT ?, conversations.id, ... FROM conversations WHERE id = ? RETURNING id
+    """
+    columns = {
+        "id": literal(message.id),
+        "conversation_id": Conversation.id,
+        "role": literal(message.role),
+        "content": literal(message.content, Message.content.type),
+        "model_name": literal(None, Message.model_name.type),
+        "image_url": literal(message.image_url, Message.image_url.type),
+        "status": literal(message.status),
+        "timestamp": literal(message.timestamp, Message.timestamp.type),
+    }
+    source = select(*columns.values()).where(Conversation.id == message.conversation_id)
+    return insert(Message).from_select(list(columns), source).returning(Message.id)
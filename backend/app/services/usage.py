@@ -0,0 +1,183 @@
+# usage.py - Token kullanımı ve maliyet muhasebesi
+# Her assistant cevabı için upstream'in usage bilgisinden mesaj sütunları üretilir ve
+# aynı transaction içinde iki toplam artırılır:
+# - conversations: sohbet başına toplam token / maliyet
+# - usage_rollups: (gün, model) başına istek, token, maliyet, gecikme toplamları
+# Raporlar bu toplamlardan okunur - messages tablosu hiçbir zaman taranmaz.
+
+import time  # Gecikme hesapları (monotonic saat)
+from datetime import datetime, timedelta, timezone  # UTC gün anahtarı
+from typing import Any, Dict, Optional  # Type hints
+from sqlalchemy import select, update, func  # Toplam güncelleme ve rapor sorguları
+from sqlalchemy.dialects.sqlite import insert  # INSERT ... ON CONFLICT DO UPDATE (upsert)
+from sqlalchemy.ext.asyncio import AsyncSession  # Database session
+from app.models.conversation import Conversation  # Sohbet toplamları
+from app.models.usage_rollup import UsageRollup  # Günlük model toplamları
+
+
+def _ms(seconds: Optional[float]) -> Optional[int]:
+    return int(round(seconds * 1000)) if seconds is not None else None
+
+
+def turn_usage(
+    usage: Optional[Dict[str, Any]],  # Upstream'in usage objesi (yoksa None)
+    started_at: float,  # İsteğin alındığı an (time.monotonic())
+    first_token_at: Optional[float] = None,  # İlk token'ın geldiği an - sadece streaming
+    pricing: Optional[Dict[str, float]] = None,  # Katalogdaki token başı fiyatlar ({"prompt", "completion"})
+    billed: bool = True,  # Upstream'e gerçekten gidildi mi? (cache / coalescing ise maliyet 0)
+) -> Dict[str, Any]:
+    """
+    Bir cevabın Message sütunlarına yazılacak kullanım bilgisi
+
+    Maliyet önceliği: OpenRouter'ın bildirdiği "cost" -> katalog fiyatı x token -> None.
+    Token sayıları upstream göndermediyse (örn: iptal edilen stream) None kalır - tahmin yazılmaz.
+
+    Returns:
+        Dict: prompt_tokens, completion_tokens, cost, latency_ms, ttft_ms
+    """
+    usage = usage or {}
+    prompt_tokens = usage.get("prompt_tokens") if isinstance(usage.get("prompt_tokens"), int) else None
+    completion_tokens = usage.get("completion_tokens") if isinstance(usage.get("completion_tokens"), int) else None
+
+    cost = usage.get("cost") if isinstance(usage.get("cost"), (int, float)) else None
+    if cost is None and pricing and prompt_tokens is not None and completion_tokens is not None:
+        cost = prompt_tokens * pricing.get("prompt", 0) + completion_tokens * pricing.get("completion", 0)
+    if not billed:
+        cost = 0.0  # Cevap saklanmış bir sonuçtan geldi - yeni harcama yok
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost": float(cost) if cost is not None else None,
+        "latency_ms": _ms(time.monotonic() - started_at),
+        "ttft_ms": _ms(first_token_at - started_at) if first_token_at is not None else None,
+    }
+
+
+def _today() -> str:
+    """Rollup gün anahtarı - UTC"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+async def record_usage(
+    db: AsyncSession,
+    model: str,  # Cevabı veren model (fallback olabilir)
+    fields: Dict[str, Any],  # turn_usage() çıktısı
+    conversation_id: Optional[int] = None,  # Kalıcı sohbet - None ise (geçici sohbet) sadece rollup
+    cached: bool = False,  # Cevap cache / coalescing ile mi geldi
+    truncated: bool = False,  # Cevap yarıda mı kesildi
+) -> None:
+    """
+    Sohbet toplamlarını ve günlük model özetini artır - commit ETMEZ
+
+    Çağıran, cevap mesajıyla aynı commit'te kaydeder; böylece toplamlar mesajlarla tutarlı kalır.
+    Geçici sohbetlerde içerik saklanmaz ama anonim sayaçlar rollup'a eklenir (kapasite planı için).
+    """
+    prompt_tokens = fields.get("prompt_tokens") or 0
+    completion_tokens = fields.get("completion_tokens") or 0
+    cost = fields.get("cost") or 0.0
+
+    if conversation_id is not None:
+        await db.execute(
+            update(Conversation)
+            .where(Conversation.id == conversation_id)
+            .values(
+                prompt_tokens=Conversation.prompt_tokens + prompt_tokens,
+                completion_tokens=Conversation.completion_tokens + completion_tokens,
+                cost=Conversation.cost + cost,
+            )
+        )
+
+    ttft_ms = fields.get("ttft_ms")
+    increments = {
+        "requests": 1,
+        "cached_requests": int(cached),
+        "truncated_requests": int(truncated),
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "cost": cost,
+        "latency_ms_total": fields.get("latency_ms") or 0,
+        "ttft_ms_total": ttft_ms or 0,
+        "ttft_samples": int(ttft_ms is not None),
+    }
+    statement = insert(UsageRollup).values(day=_today(), model=model, **increments)
+    await db.execute(
+        statement.on_conflict_do_update(  # Satır varsa tek UPDATE ile artır - okuma yok
+            index_elements=[UsageRollup.day, UsageRollup.model],
+            set_={name: getattr(UsageRollup, name) + statement.excluded[name] for name in increments},
+        )
+    )
+
+
+def _summary(row: Any) -> Dict[str, Any]:
+    """Toplam satırı -> rapor formatı (ortalamalar dahil)"""
+    requests = row.requests or 0
+    ttft_samples = row.ttft_samples or 0
+    return {
+        "requests": requests,
+        "cached_requests": row.cached_requests or 0,
+        "truncated_requests": row.truncated_requests or 0,
+        "prompt_tokens": row.prompt_tokens or 0,
+        "completion_tokens": row.completion_tokens or 0,
+        "cost": round(row.cost or 0.0, 8),
+        "avg_latency_ms": round(row.latency_ms_total / requests) if requests else None,
+        "avg_ttft_ms": round(row.ttft_ms_total / ttft_samples) if ttft_samples else None,
+    }
+
+
+async def usage_report(db: AsyncSession, days: int = 30, model: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Son N günün kullanım raporu - toplam, model bazında ve gün bazında
+
+    Sorgular sadece usage_rollups üzerinde çalışır (en fazla gün x model satır).
+
+    Args:
+        days: Rapor penceresi (bugün dahil)
+        model: Verilirse sadece bu model
+
+    Returns:
+        Dict: {"from", "to", "totals", "by_model", "by_day"}
+    """
+    start = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+    columns = [
+        func.sum(UsageRollup.requests).label("requests"),
+        func.sum(UsageRollup.cached_requests).label("cached_requests"),
+        func.sum(UsageRollup.truncated_requests).label("truncated_requests"),
+        func.sum(UsageRollup.prompt_tokens).label("prompt_tokens"),
+        func.sum(UsageRollup.completion_tokens).label("completion_tokens"),
+        func.sum(UsageRollup.cost).label("cost"),
+        func.sum(UsageRollup.latency_ms_total).label("latency_ms_total"),
+        func.sum(UsageRollup.ttft_ms_total).label("ttft_ms_total"),
+        func.sum(UsageRollup.ttft_samples).label("ttft_samples"),
+    ]
+    conditions = [UsageRollup.day >= start]
+    if model:
+        conditions.append(UsageRollup.model == model)
+
+    totals = (await db.execute(select(*columns).where(*conditions))).one()
+    by_model = await db.execute(
+        select(UsageRollup.model, *columns).where(*conditions)
+        .group_by(UsageRollup.model).order_by(func.sum(UsageRollup.cost).desc(), UsageRollup.model)
+    )
+    by_day = await db.execute(
+        select(UsageRollup.day, *columns).where(*conditions)
+        .group_by(UsageRollup.day).order_by(UsageRollup.day)
+    )
+
+    return {
+        "from": start,
+        "to": _today(),
+        "totals": _summary(totals),
+        "by_model": [{"model": row.model, **_summary(row)} for row in by_model],
+        "by_day": [{"day": row.day, **_summary(row)} for row in by_day],
+    }
+
+
+def conversation_usage(conversation: Conversation) -> Dict[str, Any]:
+    """Sohbetin biriken kullanım toplamları (conversations sütunlarından)"""
+    return {
+        "prompt_tokens": conversation.prompt_tokens or 0,
+        "completion_tokens": conversation.completion_tokens or 0,
+        "cost": round(conversation.cost or 0.0, 8),
+    }
+
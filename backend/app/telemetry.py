@@ -2,10 +2,14 @@
 # Distributed tracing için OpenTelemetry kurulumu ve Jaeger entegrasyonu
 
 from opentelemetry import trace  # Tracing API - span oluşturma için
+from opentelemetry import metrics  # Metrics API - sayaç/histogram için
 from opentelemetry.sdk.trace import TracerProvider  # Tracer provider - merkezi trace yönetimi
 from opentelemetry.sdk.trace.export import BatchSpanProcessor  # Span'leri batch halinde gönder
+from opentelemetry.sdk.metrics import MeterProvider  # Meter provider - merkezi metrik yönetimi
+from opentelemetry.sdk.metrics.export import PeriodicExportingMetricReader  # Metrikleri periyodik gönder
 from opentelemetry.sdk.resources import Resource, SERVICE_NAME  # Servis metadata
 from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter  # Jaeger'a gRPC ile span gönder
+from opentelemetry.exporter.otlp.proto.grpc.metric_exporter import OTLPMetricExporter  # Collector'a gRPC ile metrik gönder
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor  # FastAPI otomatik instrumentation
 from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor  # HTTPX otomatik instrumentation
 # SQLAlchemy instrumentation - şimdilik kapalı (çok fazla span yaratıyor)
@@ -55,6 +59,16 @@ def setup_telemetry():
     # 5. Global tracer provider'ı ayarla - uygulama genelinde kullanılsın
     trace.set_tracer_provider(tracer_provider)
     
+    # 5b. Meter Provider - cache hit/miss gibi sayaçlar için
+    # OTEL_METRICS_EXPORTER=otlp ise metrikler collector'a gönderilir (Jaeger metrik almaz -
+    # OTel Collector / Prometheus gerekir); aksi halde sayaçlar proses içinde kalır
+    metric_readers = []
+    if settings.OTEL_METRICS_EXPORTER == "otlp":
+        metric_readers.append(PeriodicExportingMetricReader(
+            OTLPMetricExporter(endpoint=settings.OTEL_EXPORTER_OTLP_ENDPOINT, insecure=True, timeout=10),
+        ))
+    metrics.set_meter_provider(MeterProvider(resource=resource, metric_readers=metric_readers))
+    
     # 6. Otomatik instrumentation'ları ekle
     # Bu instrumentation'lar otomatik olarak span oluşturur
     
@@ -92,3 +106,20 @@ def get_tracer(name: str = __name__):
     """
     return trace.get_tracer(name)  # Global tracer provider'dan tracer al
 
+
+def get_meter(name: str = __name__):
+    """
+    Meter al - custom metrikler (counter, histogram) için
+    
+    Kullanım:
+        meter = get_meter("my_service")
+        counter = meter.create_counter("my_counter")
+        counter.add(1, {"result": "hit"})
+    
+    Args:
+        name: Meter adı (genelde module adı)
+        
+    Returns:
+        Meter: OpenTelemetry meter instance
+    """
+    return metrics.get_meter(name)  # Global meter provider'dan meter al
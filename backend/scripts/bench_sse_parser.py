@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# bench_sse_parser.py - Streaming parser micro-benchmark
+# Eski (aiter_lines + döngü içi import json + .get zinciri) ve yeni (byte seviyesinde
+# SSEParser + parse_chunk) yolun chunk başına maliyetini karşılaştırır
+# Kullanım: python scripts/bench_sse_parser.py [chunk_sayısı]
+
+import os
+import sys
+import time
+
+# backend/ klasörünü import path'ine ekle - app paketine erişmek için
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from httpx._decoders import TextDecoder, LineDecoder  # httpx'in aiter_lines içinde kullandığı decoder'lar
+from app.services.sse_parser import SSEParser, parse_chunk, DONE_SENTINEL, _json_loads
+
+
+def build_stream(chunk_count: int) -> list:
+    """
+    Gerçekçi bir OpenRouter stream'i üret - network'ten gelen byte parçaları
+    Her token bir SSE event'i; arada keepalive yorumları; event'ler rastgele sınırlarda bölünür
+    """
+    events = []
+    for i in range(chunk_count):
+        if i % 50 == 0:
+            events.append(b": OPENROUTER PROCESSING\n\n")  # Keepalive yorumu
+        events.append(
+            b'data: {"id":"gen-1","provider":"Test","model":"test/model","object":"chat.completion.chunk",'
+            b'"created":1700000000,"choices":[{"index":0,"delta":{"role":"assistant","content":"token '
+            + str(i).encode() + b' "},"finish_reason":null,"native_finish_reason":null,"logprobs":null}]}\n\n'
+        )
+    events.append(
+        b'data: {"id":"gen-1","choices":[{"index":0,"delta":{"content":""},"finish_reason":"stop"}],'
+        b'"usage":{"prompt_tokens":10,"completion_tokens":' + str(chunk_count).encode() + b',"total_tokens":1}}\n\n'
+    )
+    events.append(b"data: [DONE]\n\n")
+
+    # TCP segmentlerini taklit et - event sınırlarından bağımsız 512 byte'lık parçalar
+    blob = b"".join(events)
+    return [blob[i:i + 512] for i in range(0, len(blob), 512)]
+
+
+def run_old(raw_chunks: list) -> int:
+    """
+    Eski yol - httpx aiter_lines mantığı + satır başına import json + json.loads + .get zinciri
+    """
+    text_decoder = TextDecoder()
+    line_decoder = LineDecoder()
+    tokens = 0
+    for raw in raw_chunks:
+        for line in line_decoder.decode(text_decoder.decode(raw)):
+            if line.strip():
+                if line.startswith("data: "):
+                    data = line[6:]
+                    if data == "[DONE]":
+                        return tokens
+                    try:
+                        import json
+                        chunk = json.loads(data)
+                        content = chunk.get("choices", [{}])[0].get("delta", {}).get("content", "")
+                        if content:
+                            tokens += 1
+                    except json.JSONDecodeError:
+                        continue
+    return tokens
+
+
+def run_new(raw_chunks: list) -> int:
+    """
+    Yeni yol - SSEParser (bytes) + parse_chunk (orjson varsa)
+    """
+    parser = SSEParser()
+    tokens = 0
+    for raw in raw_chunks:
+        for event in parser.feed(raw):
+            if event.data == DONE_SENTINEL:
+                return tokens
+            delta = parse_chunk(event.data)
+            if delta is not None and delta.content:
+                tokens += 1
+    return tokens
+
+
+def bench(func, raw_chunks: list, token_count: int, rounds: int = 5) -> float:
+    """
+    En iyi round'un token başına süresini (mikrosaniye) döndür
+    """
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = func(raw_chunks)
+        elapsed = time.perf_counter() - start
+        assert result == token_count, f"{func.__name__}: {result} != {token_count}"
+        best = min(best, elapsed)
+    return best / token_count * 1e6
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    raw_chunks = build_stream(count)
+
+    decoder_name = getattr(_json_loads, "__module__", None) or "orjson"  # orjson.loads builtin - module yok
+    print("=" * 60)
+    print("⚡ SSE PARSER MICRO-BENCHMARK")
+    print("=" * 60)
+    print(f"Token sayısı: {count} | Network chunk sayısı: {len(raw_chunks)} | JSON decoder: {decoder_name}")
+
+    old_us = bench(run_old, raw_chunks, count)
+    new_us = bench(run_new, raw_chunks, count)
+
+    print(f"\nEski (aiter_lines + json + .get):   {old_us:6.2f} µs / token")
+    print(f"Yeni (SSEParser + parse_chunk):     {new_us:6.2f} µs / token")
+    print(f"Hızlanma: {old_us / new_us:.2f}x")
+    print("=" * 60)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# bench_turn_setup.py - Tur başlangıcı (sohbet + kullanıcı mesajı + geçmiş) için DB çağrısı benchmark'ı
+# Eski (SELECT / add + commit + refresh, ayrı commit'le kullanıcı mesajı, geçmişin tamamı için SELECT) ve
+# yeni (begin_turn: tek yazma, INSERT ... SELECT ... RETURNING, geçmiş cache'ten) yolun tur başına
+# SQL ifadesi ve commit sayısını karşılaştırır. Geçici bir SQLite dosyası kullanır - uygulama DB'sine dokunmaz.
+# Kullanım: python scripts/bench_turn_setup.py [sohbet_sayısı] [sohbet_başına_tur]
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+# backend/ klasörünü import path'ine ekle - app paketine erişmek için
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings import anında okunur - app'ten önce geçici DB'yi ayarla
+_db_dir = tempfile.mkdtemp(prefix="bench_turn_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/bench.db"
+
+from sqlalchemy import event, select  # Çağrı sayacı + eski yolun sorguları
+from app.config import settings
+from app.database import engine, init_db, AsyncSessionLocal
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.persistence import persistence
+from app.services.turn_setup import begin_turn
+
+
+class Counter:
+    """Engine seviyesinde SQL ifadesi ve commit sayacı - writer'ın bağlantıları dahil"""
+
+    def __init__(self):
+        self.statements = 0
+        self.commits = 0
+        event.listen(engine.sync_engine, "before_cursor_execute", self._statement)
+        event.listen(engine.sync_engine, "commit", self._commit)
+
+    def _statement(self, *args):
+        self.statements += 1
+
+    def _commit(self, *args):
+        self.commits += 1
+
+    def snapshot(self):
+        return self.statements, self.commits
+
+
+async def run_old(conversation_id, content: str) -> int:
+    """
+    Eski yol - request session'ında sırayla: sohbet SELECT'i (veya add + commit + refresh),
+    kullanıcı mesajı add + commit, geçmişin tamamı için SELECT
+    """
+    async with AsyncSessionLocal() as db:
+        if conversation_id:
+            result = await db.execute(select(Conversation).where(Conversation.id == conversation_id))
+            conversation = result.scalar_one_or_none()
+        else:
+            conversation = Conversation(title="Yeni Sohbet", model_name="bench/model")
+            db.add(conversation)
+            await db.commit()
+            await db.refresh(conversation)
+        db.add(Message(conversation_id=conversation.id, role="user", content=content))
+        await db.commit()
+        result = await db.execute(
+            select(Message).where(Message.conversation_id == conversation.id).order_by(Message.id)
+        )
+        history = [{"role": m.role, "content": m.content} for m in result.scalars()]
+        assert history[-1]["content"] == content
+        return conversation.id
+
+
+async def run_new(conversation_id, content: str) -> int:
+    """
+    Yeni yol - begin_turn: sohbet + kullanıcı mesajı writer'da tek yazmada, geçmiş cache'ten
+    """
+    async with AsyncSessionLocal() as db:
+        turn = await begin_turn(db, conversation_id, "bench/model", content)
+        assert turn.history[-1]["content"] == content
+        return turn.conversation_id
+
+
+async def bench(func, counter: Counter, conversations: int, turns: int):
+    """
+    Her sohbette sırayla tur başlat - ilk tur yeni sohbet, sonrakiler mevcut sohbet
+
+    Returns:
+        Dict: Tur tipi başına (ifade, commit) ortalaması ve tur başına süre (ms)
+    """
+    totals = {"new": [0, 0, 0], "existing": [0, 0, 0]}
+    started = time.perf_counter()
+    for c in range(conversations):
+        conversation_id = None
+        for t in range(turns):
+            kind = "existing" if conversation_id else "new"
+            before = counter.snapshot()
+            conversation_id = await func(conversation_id, f"mesaj {c}-{t}")
+            after = counter.snapshot()
+            totals[kind][0] += after[0] - before[0]
+            totals[kind][1] += after[1] - before[1]
+            totals[kind][2] += 1
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    averages = {kind: (s / n, k / n) for kind, (s, k, n) in totals.items() if n}
+    return averages, elapsed_ms / (conversations * turns)
+
+
+async def main(conversations: int, turns: int):
+    await init_db()
+    counter = Counter()
+    old, old_ms = await bench(run_old, counter, conversations, turns)
+    await persistence.start()  # Yeni yol writer'ı kullanır (varsayılan: group)
+    new, new_ms = await bench(run_new, counter, conversations, turns)
+    await persistence.close()
+    await engine.dispose()
+
+    print("=" * 60)
+    print("🗄️ TUR BAŞLANGICI - DB ÇAĞRISI BENCHMARK'I")
+    print("=" * 60)
+    print(f"Sohbet: {conversations} | Sohbet başına tur: {turns} | Dayanıklılık: {persistence.mode}"
+          f" | Group penceresi: {settings.PERSISTENCE_GROUP_WINDOW_MS} ms")
+    for kind, label in (("new", "Yeni sohbet"), ("existing", "Mevcut sohbet")):
+        print(f"\n{label}:")
+        print(f"  Eski: {old[kind][0]:4.1f} SQL ifadesi, {old[kind][1]:4.1f} commit / tur")
+        print(f"  Yeni: {new[kind][0]:4.1f} SQL ifadesi, {new[kind][1]:4.1f} commit / tur")
+    # Turlar sırayla başlatılır - group modunda her commit pencere kadar bekler (eşzamanlı turlar paylaşır)
+    # async modda yazmalar arka planda - sayılar tura değil o anki writer commit'ine düşer
+    print(f"\nTur başına süre: eski {old_ms:.2f} ms | yeni {new_ms:.2f} ms")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    conversation_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    turns_per_conversation = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(main(conversation_count, turns_per_conversation))
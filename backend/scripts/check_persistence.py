@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# check_persistence.py - Persistence writer'ının sıralama, toplu commit ve hata davranışı kontrolü
+# - Sıralama: yazmalar kuyruğa girdikleri sırayla uygulanır, ID'ler artan sırada dağıtılır
+# - Group commit: aynı anda gelen yazmalar az sayıda commit'te toplanır; sync modda her yazma ayrı commit
+# - Hata izolasyonu: toplu commit'te hatalı yazma sadece kendi future'ını düşürür, diğerleri kaydedilir
+#   ve sohbetin hazır geçmişi geçersiz kılınır
+# - async mod: wait() beklemez, flush() sonrası her şey DB'de
+# - Tek writer: aynı veritabanında ikinci bir process'in start()'ı reddedilir
+# Geçici bir SQLite dosyası kullanır - uygulama DB'sine dokunmaz. Başarısızlıkta exit code 1.
+# Kullanım: python scripts/check_persistence.py
+
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# backend/ klasörünü import path'ine ekle - app paketine erişmek için
+sys.path.insert(0, BACKEND_DIR)
+
+# Settings import anında okunur - app'ten önce ayarla
+_db_dir = tempfile.mkdtemp(prefix="check_persistence_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/check.db"
+os.environ["PERSISTENCE_DURABILITY"] = "group"
+os.environ["PERSISTENCE_GROUP_WINDOW_MS"] = "20"  # Eşzamanlı yazmalar kesin aynı pencerede
+
+from sqlalchemy import insert, select
+
+from app.config import settings
+from app.database import AsyncSessionLocal, init_db
+from app.models.conversation import Conversation
+from app.models.message import Message
+from app.services.history_cache import history_cache
+from app.services.persistence import persistence, utcnow
+
+# İkinci process: aynı DB'de writer'ı başlatmayı dener - reddedilmeli
+SECOND_WRITER = """
+import asyncio
+from app.services.persistence import persistence
+try:
+    asyncio.run(persistence.start())
+except RuntimeError as e:
+    print(e)
+    raise SystemExit(3)
+"""
+
+
+def message_op(message_id: int, conversation_id: int, content: str, applied: list):
+    """Mesajı ekleyen yazma - uygulandığı sırayı applied listesine not eder"""
+    async def op(db) -> int:
+        applied.append(message_id)
+        await db.execute(insert(Message).values(
+            id=message_id, conversation_id=conversation_id, role="user",
+            content=content, status="complete", timestamp=utcnow(),
+        ))
+        return message_id
+    return op
+
+
+async def new_conversation() -> int:
+    conversation_id = persistence.next_id(Conversation)
+    await persistence.write(
+        lambda db: db.execute(insert(Conversation).values(
+            id=conversation_id, title="check", model_name="check/model", created_at=utcnow(),
+        )),
+        conversation_id,
+    )
+    return conversation_id
+
+
+async def stored_ids(conversation_id: int) -> list:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Message.id).where(Message.conversation_id == conversation_id).order_by(Message.id)
+        )
+        return list(result.scalars())
+
+
+def check(name: str, ok: bool, detail: str = "") -> int:
+    print(f"{'✅' if ok else '❌'} {name}{f' - {detail}' if detail else ''}")
+    return 0 if ok else 1
+
+
+async def check_ordering_and_batching() -> int:
+    conversation_id = await new_conversation()
+    before = persistence.get_stats()["commits"]
+    applied: list = []
+    ids = [persistence.next_id(Message) for _ in range(50)]
+    futures = [persistence.submit(message_op(i, conversation_id, f"m{i}", applied), conversation_id) for i in ids]
+    results = await asyncio.gather(*(persistence.wait(f) for f in futures))
+    commits = persistence.get_stats()["commits"] - before
+
+    failures = check("ID'ler artan sırada", ids == sorted(ids) and len(set(ids)) == len(ids))
+    failures += check("Yazmalar kuyruk sırasıyla uygulandı", applied == ids)
+    failures += check("Future'lar op'un dönüş değerini taşır", results == ids)
+    failures += check("50 yazma toplu commit edildi", commits <= 2, f"{commits} commit")
+    failures += check("Hepsi DB'de", await stored_ids(conversation_id) == ids)
+    return failures
+
+
+async def check_failure_isolation() -> int:
+    conversation_id = await new_conversation()
+    history_cache.start(conversation_id)  # Hatada geçersiz kılınmalı
+    failures_before = persistence.get_stats()["failures"]
+    applied: list = []
+    first, second = persistence.next_id(Message), persistence.next_id(Message)
+    futures = [
+        persistence.submit(message_op(first, conversation_id, "ilk", applied), conversation_id),
+        persistence.submit(message_op(first, conversation_id, "çakışan", applied), conversation_id),  # Aynı ID
+        persistence.submit(message_op(second, conversation_id, "son", applied), conversation_id),
+    ]
+    outcomes = await asyncio.gather(*futures, return_exceptions=True)
+
+    failures = check("Sadece hatalı yazma düştü", [isinstance(o, Exception) for o in outcomes] == [False, True, False])
+    failures += check("Diğer yazmalar kaydedildi", await stored_ids(conversation_id) == [first, second])
+    failures += check("Hata sayıldı", persistence.get_stats()["failures"] == failures_before + 1)
+    failures += check("Hazır geçmiş geçersiz kılındı", not history_cache.contains(conversation_id))
+    return failures
+
+
+async def check_modes() -> int:
+    conversation_id = await new_conversation()
+    failures = 0
+
+    settings.PERSISTENCE_DURABILITY = "sync"
+    before = persistence.get_stats()["commits"]
+    applied: list = []
+    futures = [
+        persistence.submit(message_op(persistence.next_id(Message), conversation_id, "sync", applied), conversation_id)
+        for _ in range(5)
+    ]
+    await asyncio.gather(*futures)
+    commits = persistence.get_stats()["commits"] - before
+    failures += check("sync: her yazma ayrı commit", commits == 5, f"{commits} commit")
+
+    settings.PERSISTENCE_DURABILITY = "async"
+    message_id = persistence.next_id(Message)
+    result = await persistence.write(message_op(message_id, conversation_id, "async", applied), conversation_id)
+    failures += check("async: write() beklemez", result is None)
+    await persistence.flush()
+    failures += check("async: flush() sonrası DB'de", message_id in await stored_ids(conversation_id))
+
+    settings.PERSISTENCE_DURABILITY = "group"
+    return failures
+
+
+def check_second_writer() -> int:
+    second = subprocess.run(
+        [sys.executable, "-c", SECOND_WRITER],
+        cwd=BACKEND_DIR, env=os.environ.copy(), capture_output=True, text=True, timeout=60,
+    )
+    return check("İkinci process'in writer'ı reddedildi", second.returncode == 3, second.stdout.strip())
+
+
+async def main() -> int:
+    await init_db()
+    await persistence.start()
+    try:
+        failures = await check_ordering_and_batching()
+        failures += await check_failure_isolation()
+        failures += await check_modes()
+        failures += check_second_writer()
+    finally:
+        await persistence.close()
+
+    print("✅ OK" if not failures else f"❌ {failures} kontrol başarısız")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
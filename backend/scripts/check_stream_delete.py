@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# check_stream_delete.py - Stream sürerken sohbet silinirse yetim assistant mesajı kalmamalı
+# Fake OpenRouter ve backend aynı process'te ayağa kalkar; stream başladıktan ve kısmi cevap
+# checkpoint'lendikten sonra DELETE /api/conversations/{id} çağrılır, stream sonuna kadar okunur.
+# Beklenen: messages tablosunda var olmayan bir sohbete bağlı satır yok.
+# Geçici bir SQLite dosyası kullanır - uygulama DB'sine dokunmaz. Başarısızlıkta exit code 1.
+# Kullanım: python scripts/check_stream_delete.py
+
+import asyncio
+import os
+import sys
+import tempfile
+
+# backend/ klasörünü import path'ine ekle - app paketine erişmek için
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FAKE_PORT = 18931
+BACKEND_PORT = 18932
+
+# Settings import anında okunur - app'ten önce ayarla
+_db_dir = tempfile.mkdtemp(prefix="check_stream_delete_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/check.db"
+os.environ["OPENROUTER_BASE_URL"] = f"http://127.0.0.1:{FAKE_PORT}/api/v1"
+os.environ["OPENROUTER_API_KEY"] = "fake"
+os.environ["STREAM_CHECKPOINT_INTERVAL_MS"] = "0"
+os.environ["STREAM_CHECKPOINT_BYTES"] = "16"  # Birkaç token'da bir checkpoint
+
+import httpx
+import uvicorn
+from sqlalchemy import select, func
+
+import fake_openrouter  # Aynı klasördeki taklit sunucu
+from app.main import app
+from app.database import AsyncSessionLocal
+from app.models.conversation import Conversation
+from app.models.message import Message
+
+MODEL = "fake/model"
+
+
+async def orphan_count() -> int:
+    """Var olmayan sohbete bağlı mesaj sayısı"""
+    async with AsyncSessionLocal() as db:
+        existing = select(Conversation.id)
+        result = await db.execute(
+            select(func.count(Message.id)).where(Message.conversation_id.not_in(existing))
+        )
+        return result.scalar()
+
+
+async def stream_and_delete(client: httpx.AsyncClient) -> int:
+    """Stream'i aç, checkpoint'ten sonra sohbeti sil, stream'i sonuna kadar oku"""
+    async with client.stream("POST", "/api/chat/stream", json={"model": MODEL, "message": "merhaba"}) as response:
+        conversation_id = int(response.headers["x-conversation-id"])
+        received = 0
+        deleted = False
+        async for chunk in response.aiter_text():
+            received += len(chunk)
+            if not deleted and received >= 64:  # En az bir checkpoint yazıldı
+                await asyncio.sleep(0.05)
+                delete = await client.delete(f"/api/conversations/{conversation_id}")
+                assert delete.status_code == 200, delete.text
+                deleted = True
+        assert deleted, "Stream silmeden önce bitti"
+    return conversation_id
+
+
+async def main() -> int:
+    fake_openrouter.config = fake_openrouter.FakeConfig(ttft=0.05, inter_token_delay=0.02, tokens=80)
+    fake = uvicorn.Server(uvicorn.Config(fake_openrouter.app, port=FAKE_PORT, log_level="warning"))
+    backend = uvicorn.Server(uvicorn.Config(app, port=BACKEND_PORT, log_level="warning"))
+    servers = [asyncio.create_task(fake.serve()), asyncio.create_task(backend.serve())]
+    while not (fake.started and backend.started):
+        await asyncio.sleep(0.05)
+
+    failures = 0
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{BACKEND_PORT}", timeout=30) as client:
+            conversation_id = await stream_and_delete(client)
+            await asyncio.sleep(0.2)  # Stream'in son kaydı writer'dan geçsin
+            orphans = await orphan_count()
+            print(f"Silinen sohbet #{conversation_id} - yetim mesaj: {orphans}")
+            if orphans:
+                failures += 1
+
+            # Kontrol: silinmeyen sohbette cevap normal kaydediliyor
+            response = await client.post("/api/chat/stream", json={"model": MODEL, "message": "tekrar"})
+            conversation_id = int(response.headers["x-conversation-id"])
+            detail = (await client.get(f"/api/conversations/{conversation_id}")).json()
+            statuses = [(m["role"], m["status"]) for m in detail["messages"]]
+            print(f"Normal sohbet #{conversation_id}: {statuses}")
+            if statuses != [("user", "complete"), ("assistant", "complete")]:
+                failures += 1
+    finally:
+        for server in (backend, fake):
+            server.should_exit = True
+        await asyncio.gather(*servers)
+
+    print("✅ OK" if not failures else f"❌ {failures} kontrol başarısız")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
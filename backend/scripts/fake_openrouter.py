@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# fake_openrouter.py - Yük / gecikme testleri için deterministik yerel OpenRouter taklidi
+# Gerçek kota harcamadan ve network'e bağımlı olmadan backend'i ölçmek için
+# /models ve /chat/completions (streaming + non-streaming) endpoint'lerini taklit eder.
+#
+# Kullanım:
+#   python scripts/fake_openrouter.py --port 8081 --ttft 0.3 --inter-token-delay 0.02 --tokens 200
+#   OPENROUTER_BASE_URL=http://127.0.0.1:8081/api/v1 OPENROUTER_API_KEY=fake uvicorn app.main:app
+#   (API key herhangi bir değer olabilir ama boş olmamalı - Authorization header'ı oluşturulamaz)
+#
+# Davranış iki yoldan seçilir:
+# - Genel ayarlar: CLI argümanları veya çalışırken PUT /_fake/config (hata oranları, gecikmeler)
+# - Özel model ID'leri: her istekte aynı davranış (fallback / timeout testleri için)
+#     fake/error-429, fake/error-503, fake/error-404  -> her zaman o status
+#     fake/disconnect                                 -> stream ortasında bağlantıyı kopar
+#     fake/slowloris                                  -> stream'i byte byte, çok yavaş gönderir
+#     fake/stall                                      -> sadece keep-alive yorumu, hiç token yok
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+
+class FakeConfig(BaseModel):
+    """Taklit sunucunun davranışı - PUT /_fake/config ile çalışırken değiştirilebilir"""
+    ttft: float = Field(default=0.3, ge=0)  # İstekten ilk token'a kadar gecikme (saniye)
+    inter_token_delay: float = Field(default=0.02, ge=0)  # İki token arası gecikme (saniye)
+    jitter: float = Field(default=0.0, ge=0, le=1)  # Gecikmelere eklenen ±oran (0.2 -> ±%20)
+    tokens: int = Field(default=100, ge=0)  # Cevap başına token (chunk) sayısı
+    error_rate_429: float = Field(default=0.0, ge=0, le=1)  # Rastgele 429 oranı
+    error_rate_503: float = Field(default=0.0, ge=0, le=1)  # Rastgele 503 oranı
+    error_rate_404: float = Field(default=0.0, ge=0, le=1)  # Rastgele 404 oranı
+    disconnect_rate: float = Field(default=0.0, ge=0, le=1)  # Stream ortasında bağlantı kopma oranı
+    slowloris_rate: float = Field(default=0.0, ge=0, le=1)  # Slow-loris stream oranı
+    slowloris_interval: float = Field(default=1.0, gt=0)  # Slow-loris'te byte'lar arası bekleme (saniye)
+    keepalive_interval: float = Field(default=0.0, ge=0)  # TTFT sırasında ": OPENROUTER PROCESSING" aralığı (0: kapalı)
+    retry_after: int = Field(default=1, ge=0)  # 429 cevaplarındaki Retry-After (saniye)
+    model_count: int = Field(default=20, ge=1)  # /models'taki sıradan model sayısı
+    seed: int = Field(default=42)  # Rastgelelik tohumu - aynı seed + aynı istek sırası = aynı sonuç
+
+
+# Her zaman aynı davranan özel modeller
+SPECIAL_MODELS = ["fake/error-429", "fake/error-503", "fake/error-404", "fake/disconnect", "fake/slowloris", "fake/stall"]
+
+# Deterministik cevap metni için kelime havuzu
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua ut enim ad minim veniam quis nostrud exercitation ullamco laboris nisi"
+).split()
+
+
+config = FakeConfig()
+rng = random.Random(config.seed)
+stats: Dict[str, int] = {"requests": 0, "streams": 0, "errors": 0, "disconnects": 0, "slowloris": 0, "stalls": 0}
+app = FastAPI(title="Fake OpenRouter")
+
+
+def build_models() -> List[Dict[str, Any]]:
+    """Katalog - ücretsiz / ücretli, vision ve farklı context uzunluklarında modeller"""
+    models = []
+    for i in range(config.model_count):
+        free = i % 2 == 0
+        models.append({
+            "id": f"fake/model-{i}" + (":free" if free else ""),
+            "name": f"Fake Model {i}",
+            "context_length": 4096 * (1 + i % 8),
+            "pricing": {"prompt": "0" if free else "0.000001", "completion": "0" if free else "0.000002"},
+            "architecture": {"input_modalities": ["text", "image"] if i % 5 == 0 else ["text"], "output_modalities": ["text"]},
+        })
+    for model_id in SPECIAL_MODELS:
+        models.append({
+            "id": model_id,
+            "name": model_id,
+            "context_length": 8192,
+            "pricing": {"prompt": "0", "completion": "0"},
+            "architecture": {"input_modalities": ["text"], "output_modalities": ["text"]},
+        })
+    return models
+
+
+def delay(seconds: float) -> float:
+    """Jitter uygulanmış gecikme"""
+    if not config.jitter or not seconds:
+        return seconds
+    return max(0.0, seconds * (1 + rng.uniform(-config.jitter, config.jitter)))
+
+
+def answer_tokens(messages: List[Dict[str, Any]]) -> List[str]:
+    """Prompt'a göre deterministik cevap - aynı mesajlar her zaman aynı token'ları üretir"""
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode()).digest()
+    offset = int.from_bytes(digest[:4], "big")
+    return [WORDS[(offset + i) % len(WORDS)] + " " for i in range(config.tokens)]
+
+
+def prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """~4 karakter = 1 token (backend'deki tahminle aynı)"""
+    return max(1, len(json.dumps([m.get("content") for m in messages], default=str)) // 4)
+
+
+def pick_behavior(model: str) -> str:
+    """İstek davranışı - özel model veya ayarlardaki oranlara göre rastgele (seed'li)"""
+    if model in SPECIAL_MODELS:
+        return model.split("/", 1)[1]
+    roll = rng.random()
+    for behavior, rate in (
+        ("error-429", config.error_rate_429),
+        ("error-503", config.error_rate_503),
+        ("error-404", config.error_rate_404),
+        ("disconnect", config.disconnect_rate),
+        ("slowloris", config.slowloris_rate),
+    ):
+        if roll < rate:
+            return behavior
+        roll -= rate
+    return "ok"
+
+
+def error_response(status_code: int) -> JSONResponse:
+    """OpenRouter formatında hata cevabı"""
+    stats["errors"] += 1
+    messages = {429: "Rate limit exceeded", 503: "Provider unavailable", 404: "Model not found"}
+    headers = {"Retry-After": str(config.retry_after)} if status_code == 429 else None
+    return JSONResponse({"error": {"code": status_code, "message": messages[status_code]}}, status_code=status_code, headers=headers)
+
+
+def sse(payload: Dict[str, Any]) -> bytes:
+    return f"data: {json.dumps(payload)}\n\n".encode()
+
+
+def chunk_payload(generation_id: str, model: str, content: Optional[str], finish_reason: Optional[str] = None,
+                  usage: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+    payload = {
+        "id": generation_id,
+        "provider": "Fake",
+        "model": model,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "choices": [{"index": 0, "delta": {"role": "assistant", "content": content or ""}, "finish_reason": finish_reason}],
+    }
+    if usage:
+        payload["usage"] = usage
+    return payload
+
+
+async def stream_body(model: str, tokens: List[str], usage: Dict[str, int], behavior: str):
+    """SSE body - davranışa göre normal, kopan, slow-loris veya takılan stream"""
+    generation_id = f"gen-{uuid.uuid4().hex[:12]}"
+
+    # TTFT - istenirse arada keep-alive yorumları
+    remaining = delay(config.ttft)
+    while config.keepalive_interval and remaining > config.keepalive_interval:
+        await asyncio.sleep(config.keepalive_interval)
+        remaining -= config.keepalive_interval
+        yield b": OPENROUTER PROCESSING\n\n"
+    await asyncio.sleep(remaining)
+
+    if behavior == "stall":  # Hiç token yok - sadece keep-alive (idle / first-token timeout testi)
+        stats["stalls"] += 1
+        while True:
+            yield b": OPENROUTER PROCESSING\n\n"
+            await asyncio.sleep(max(config.keepalive_interval, 1.0))
+
+    slowloris = behavior == "slowloris"  # Bağlantı açık ama event'ler byte byte, çok yavaş geliyor
+    if slowloris:
+        stats["slowloris"] += 1
+
+    async def emit(data: bytes):
+        if not slowloris:
+            yield data
+            return
+        for byte in data:
+            yield bytes([byte])
+            await asyncio.sleep(config.slowloris_interval)
+
+    cut_at = len(tokens) // 2 if behavior == "disconnect" else None
+    for index, token in enumerate(tokens):
+        if index == cut_at:
+            stats["disconnects"] += 1
+            raise ConnectionAbortedError("fake mid-stream disconnect")  # Uvicorn bağlantıyı yarıda kapatır
+        if index:
+            await asyncio.sleep(delay(config.inter_token_delay))
+        async for part in emit(sse(chunk_payload(generation_id, model, token))):
+            yield part
+    async for part in emit(sse(chunk_payload(generation_id, model, None, finish_reason="stop", usage=usage))):
+        yield part
+    yield b"data: [DONE]\n\n"
+
+
+@app.get("/api/v1/models")
+async def list_models():
+    return {"data": build_models()}
+
+
+@app.post("/api/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    model = body.get("model", "")
+    messages = body.get("messages") or []
+    stats["requests"] += 1
+
+    behavior = pick_behavior(model)
+    if behavior.startswith("error-"):
+        await asyncio.sleep(delay(config.ttft) / 4)  # Hatalar da biraz sürsün
+        return error_response(int(behavior.split("-")[1]))
+
+    tokens = answer_tokens(messages)
+    usage = {
+        "prompt_tokens": prompt_tokens(messages),
+        "completion_tokens": len(tokens),
+        "total_tokens": prompt_tokens(messages) + len(tokens),
+    }
+
+    if body.get("stream"):
+        stats["streams"] += 1
+        return StreamingResponse(stream_body(model, tokens, usage, behavior), media_type="text/event-stream")
+
+    # Non-streaming - tüm cevabın üretilme süresi kadar bekle
+    await asyncio.sleep(delay(config.ttft) + delay(config.inter_token_delay) * max(0, len(tokens) - 1))
+    return {
+        "id": f"gen-{uuid.uuid4().hex[:12]}",
+        "provider": "Fake",
+        "model": model,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+        "usage": usage,
+    }
+
+
+@app.get("/_fake/config")
+async def get_config():
+    return config
+
+
+@app.put("/_fake/config")
+async def update_config(new_config: FakeConfig):
+    """Davranışı çalışırken değiştir - seed değişirse rastgelelik baştan başlar"""
+    global config, rng
+    config = new_config
+    rng = random.Random(config.seed)
+    return config
+
+
+@app.get("/_fake/stats")
+async def get_stats():
+    return stats
+
+
+def main() -> None:
+    global config, rng
+    parser = argparse.ArgumentParser(description="Deterministik yerel OpenRouter taklidi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    # FakeConfig alanları CLI argümanı olarak: --ttft, --inter-token-delay, --error-rate-429 ...
+    for name, field in FakeConfig.model_fields.items():
+        parser.add_argument(f"--{name.replace('_', '-')}", type=type(field.default), default=field.default)
+    args = vars(parser.parse_args())
+    host, port = args.pop("host"), args.pop("port")
+    config = FakeConfig(**args)
+    rng = random.Random(config.seed)
+
+    print(f"🧪 Fake OpenRouter: http://{host}:{port}/api/v1  (OPENROUTER_BASE_URL olarak verin)")
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -35,7 +35,8 @@ function App() {
     isSending, 
     isLoadingMessages,
     sendMessageStream, // Streaming mode - kelime kelime AI cevabı (sendMessage yerine streaming kullanıyoruz)
-    editAndResendMessage // Mesaj düzenleme
+    editAndResendMessage, // Mesaj düzenleme
+    stopGeneration // Stop butonu - süren cevabı durdur
   } = useChat() // Chat işlemleri
   
   // Store'dan direkt state al
@@ -48,6 +49,7 @@ function App() {
   const setActiveConversation = useChatStore((state) => state.setActiveConversation) // Aktif conversation
   const isTemporaryMode = useChatStore((state) => state.isTemporaryMode) // Geçici sohbet modu
   const toggleTemporaryMode = useChatStore((state) => state.toggleTemporaryMode) // Temporary mode toggle
+  const generationId = useChatStore((state) => state.generationId) // Süren stream - varsa stop butonu görünür
   
   // Yeni sohbet başlat - aktif conversation'ı temizle
   const handleNewConversation = () => {
@@ -165,6 +167,7 @@ function App() {
           <ChatInput
             onSend={handleSendMessage} // Mesaj gönderme handler
             disabled={isSending || !selectedModel} // AI cevap beklerken veya model seçilmemişse disabled
+            onStop={generationId ? stopGeneration : undefined} // Stream sürerken gönder butonu yerine stop
             supportsVision={supportsVision} // Seçili model vision destekli mi - resim upload için
             placeholder={
               !selectedModel 
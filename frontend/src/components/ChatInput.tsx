@@ -5,6 +5,7 @@ import { useState, useRef, useEffect } from 'react'
 
 interface ChatInputProps {
   onSend: (message: string, imageBase64?: string) => void
+  onStop?: () => void // Set ise cevap stream ediliyor - gönder yerine stop butonu
   disabled?: boolean
   supportsVision?: boolean
   placeholder?: string
@@ -12,6 +13,7 @@ interface ChatInputProps {
 
 export function ChatInput({ 
   onSend, 
+  onStop,
   disabled = false, 
   supportsVision = false,
   placeholder = 'Type your message...'
@@ -119,7 +121,7 @@ export function ChatInput({
           isFocused 
             ? 'ring-2 ring-blue-500 shadow-lg' 
             : 'ring-1 ring-gray-200 dark:ring-gray-700 shadow-sm hover:shadow-md'
-          } ${disabled ? 'opacity-50' : ''}`}
+          } ${disabled && !onStop ? 'opacity-50' : ''}`}
         >
           
           <div className="flex items-center gap-3 bg-gray-50 dark:bg-gray-900 rounded-2xl p-3">
@@ -168,25 +170,43 @@ export function ChatInput({
                        text-sm leading-relaxed max-h-[200px] scrollbar-thin py-2"
             />
             
-            {/* Send Button */}
-            <button
-              onClick={(e) => {
-                e.stopPropagation()
-                handleSend()
-              }}
-              disabled={disabled || (!message.trim() && !imageBase64)}
-              className={`flex-shrink-0 p-2.5 rounded-xl transition-all duration-200 transform
-                         ${(message.trim() || imageBase64) && !disabled
-                           ? 'bg-gradient-to-r from-blue-600 to-blue-500 text-white shadow-lg hover:shadow-xl hover:from-blue-700 hover:to-blue-600 hover:scale-105 active:scale-95' 
-                           : 'bg-gray-200 dark:bg-gray-700 text-gray-400 cursor-not-allowed'
-                         }`}
-              title="Send message"
-            >
-              <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
-                <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} 
-                      d="M12 19l9 2-9-18-9 18 9-2zm0 0v-8" />
-              </svg>
-            </button>
+            {/* Stop Button - cevap stream edilirken */}
+            {onStop ? (
+              <button
+                onClick={(e) => {
+                  e.stopPropagation()
+                  onStop()
+                }}
+                className="flex-shrink-0 p-2.5 rounded-xl transition-all duration-200 transform
+                           bg-gradient-to-r from-red-600 to-red-500 text-white shadow-lg hover:shadow-xl
+                           hover:from-red-700 hover:to-red-600 hover:scale-105 active:scale-95"
+                title="Stop generating"
+              >
+                <svg className="w-5 h-5" fill="currentColor" viewBox="0 0 24 24">
+                  <rect x="6" y="6" width="12" height="12" rx="2" />
+                </svg>
+              </button>
+            ) : (
+              /* Send Button */
+              <button
+                onClick={(e) => {
+                  e.stopPropagation()
+                  handleSend()
+                }}
+                disabled={disabled || (!message.trim() && !imageBase64)}
+                className={`flex-shrink-0 p-2.5 rounded-xl transition-all duration-200 transform
+                           ${(message.trim() || imageBase64) && !disabled
+                             ? 'bg-gradient-to-r from-blue-600 to-blue-500 text-white shadow-lg hover:shadow-xl hover:from-blue-700 hover:to-blue-600 hover:scale-105 active:scale-95' 
+                             : 'bg-gray-200 dark:bg-gray-700 text-gray-400 cursor-not-allowed'
+                           }`}
+                title="Send message"
+              >
+                <svg className="w-5 h-5" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                  <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} 
+                        d="M12 19l9 2-9-18-9 18 9-2zm0 0v-8" />
+                </svg>
+              </button>
+            )}
           </div>
         </div>
         
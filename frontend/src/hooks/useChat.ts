@@ -24,6 +24,7 @@ export function useChat() {
   const setError = useChatStore((state) => state.setError) // Error state
   const setActiveConversation = useChatStore((state) => state.setActiveConversation) // Aktif conversation set et - YENİ conversation oluşturulduğunda kullanılacak
   const setStreaming = useChatStore((state) => state.setStreaming) // Streaming state - AI cevabı stream olarak gelirken
+  const setGenerationId = useChatStore((state) => state.setGenerationId) // Süren stream'in ID'si - stop butonu için
   
   // Aktif conversation'ın mesajlarını yükle
   const loadMessages = async (conversationId: number) => {
@@ -172,8 +173,10 @@ export function useChat() {
               : m
           )
           setMessages(updatedMessages) // Güncel mesajları set et - UI'da görünür
-        }
+        },
+        setGenerationId // Header gelince stop butonu aktifleşir
       )
+      setGenerationId(null) // Stream bitti - mesajlar yüklenirken stop butonu görünmesin
       
       // Backend'den conversation ID geldi mi kontrol et
       // Not: Backend her zaman conversation ID döner (yeni veya mevcut)
@@ -201,6 +204,19 @@ export function useChat() {
     } finally {
       setSending(false) // Sending bitir
       setStreaming(false) // Streaming bitir
+      setGenerationId(null) // Durdurulacak üretim kalmadı
+    }
+  }
+  
+  // Üretimi durdur (stop butonu) - stream o ana kadarki cevapla normal şekilde biter
+  const stopGeneration = async () => {
+    const generationId = useChatStore.getState().generationId
+    if (!generationId) return
+    setGenerationId(null) // Buton tekrar basılamasın
+    try {
+      await chatService.cancelGeneration(generationId)
+    } catch (err) {
+      console.error('Üretim durdurulamadı:', err) // Stream zaten bitmiş olabilir (404)
     }
   }
   
@@ -277,7 +293,8 @@ export function useChat() {
           setMessages(current.map(m => 
             m.id === tempAiId ? { ...m, content: streamContent } : m
           ))
-        }
+        },
+        setGenerationId
       )
       
       // 4. Stream bitti - Backend sync için loadMessages ÇAĞIRMA
@@ -294,6 +311,7 @@ export function useChat() {
     } finally {
       setSending(false)
       setStreaming(false)
+      setGenerationId(null)
     }
   }
   
@@ -307,6 +325,7 @@ export function useChat() {
     sendMessageStream, // Mesaj gönder fonksiyonu (streaming mode) - kelime kelime
     loadMessages, // Mesajları yükle fonksiyonu (manual refresh için)
     editAndResendMessage, // Mesaj düzenle ve yeniden gönder
+    stopGeneration, // Süren streaming cevabı durdur
   }
 }
 
@@ -4,6 +4,9 @@
 import { api } from './api' // Axios instance
 import type { ChatRequest, ChatResponse } from '@/types'
 
+// Streaming cevabın sonundaki yapılandırılmış hata frame'inin işareti (ASCII record separator)
+const STREAM_ERROR_SEPARATOR = '\x1e'
+
 // Chat Service - mesaj gönderme ve düzenleme işlemleri
 export const chatService = {
   // Mesaj gönder - POST /api/chat/send
@@ -22,7 +25,8 @@ export const chatService = {
   // AI cevabı kelime kelime gelir - gerçek zamanlı typing effect
   async sendMessageStream(
     request: ChatRequest, 
-    onChunk: (chunk: string) => void // Her kelime parçası geldiğinde çağrılır
+    onChunk: (chunk: string) => void, // Her kelime parçası geldiğinde çağrılır
+    onGenerationId?: (generationId: string) => void // Stop butonu için - cancelGeneration'a verilir
   ): Promise<number> { // Conversation ID döndürür
     // Axios streaming desteklemiyor - fetch API kullan
     const API_BASE_URL = import.meta.env.VITE_API_BASE_URL || 'http://localhost:8000'
@@ -58,6 +62,15 @@ export const chatService = {
       conversationId = parseInt(convIdHeader) // Header'dan conversation ID
     }
     
+    // Generation ID - üretimi durdurmak için
+    const generationId = response.headers.get('X-Generation-Id')
+    if (generationId && onGenerationId) {
+      onGenerationId(generationId)
+    }
+    
+    // Stream yarıda kesilirse (timeout) backend sona "\x1e" + JSON hata frame'i ekler
+    let errorFrame: string | null = null // İşaretten sonraki kısım - stream bitince parse edilir
+    
     // Stream'den chunk'ları oku
     while (true) {
       const { done, value } = await reader.read() // Bir chunk oku
@@ -65,13 +78,39 @@ export const chatService = {
       if (done) break // Stream bitti
       
       // Byte array'i string'e çevir
-      const chunk = decoder.decode(value, { stream: true })
+      let chunk = decoder.decode(value, { stream: true })
+      
+      if (errorFrame !== null) {
+        errorFrame += chunk // Frame birden fazla chunk'a bölünmüş olabilir
+        continue
+      }
+      const separatorIndex = chunk.indexOf(STREAM_ERROR_SEPARATOR)
+      if (separatorIndex !== -1) {
+        errorFrame = chunk.slice(separatorIndex + 1)
+        chunk = chunk.slice(0, separatorIndex) // İşaretten önceki kısım normal cevap
+      }
       
       // Her chunk geldiğinde callback çağır - UI güncellensin
-      onChunk(chunk)
+      if (chunk) onChunk(chunk)
+    }
+    
+    // Hata frame'i geldiyse mesajını kısmi cevabın altına ekle
+    if (errorFrame !== null) {
+      try {
+        const { error } = JSON.parse(errorFrame)
+        onChunk(`\n\n${error?.message ?? 'Cevap yarıda kesildi.'}`)
+      } catch (err) {
+        onChunk('\n\nCevap yarıda kesildi.') // Bozuk frame - yine de kullanıcıyı bilgilendir
+      }
     }
     
     return conversationId // Conversation ID döndür
   },
+
+  // Üretimi durdur - POST /api/chat/generations/{id}/cancel
+  // Stream normal şekilde biter, o ana kadarki kısmi cevap "truncated" olarak kaydedilir
+  async cancelGeneration(generationId: string): Promise<void> {
+    await api.post(`/api/chat/generations/${generationId}/cancel`)
+  },
 }
 
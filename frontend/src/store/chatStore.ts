@@ -19,6 +19,7 @@ interface ChatState {
   isLoadingModels: boolean // Modeller yükleniyor mu
   isSendingMessage: boolean // Mesaj gönderiliyor mu
   isStreaming: boolean // AI cevabı stream olarak geliyor mu - kelime kelime
+  generationId: string | null // Süren stream'in generation ID'si - stop butonu bununla durdurur
   
   // === ERROR STATES ===
   error: string | null // Hata mesajı - null ise hata yok
@@ -55,6 +56,7 @@ interface ChatState {
   setLoadingModels: (loading: boolean) => void
   setSendingMessage: (loading: boolean) => void
   setStreaming: (streaming: boolean) => void // Streaming state - AI cevabı kelime kelime gelirken
+  setGenerationId: (generationId: string | null) => void // Stream başlayınca set, bitince null
   
   // Hata state'i
   setError: (error: string | null) => void
@@ -83,6 +85,7 @@ const initialState = {
   isLoadingModels: false,
   isSendingMessage: false,
   isStreaming: false, // Streaming yok
+  generationId: null, // Süren üretim yok
   error: null, // Hata yok
   toast: null, // Toast yok
   isTemporaryMode: false, // Temporary mode kapalı - varsayılan normal mode
@@ -121,6 +124,7 @@ export const useChatStore = create<ChatState>((set) => ({
   setLoadingModels: (loading) => set({ isLoadingModels: loading }),
   setSendingMessage: (loading) => set({ isSendingMessage: loading }),
   setStreaming: (streaming) => set({ isStreaming: streaming }), // Streaming state setter
+  setGenerationId: (generationId) => set({ generationId }), // Stop butonu için generation ID
   
   // Hata state'i set et
   setError: (error) => set({ error }),
@@ -24,6 +24,12 @@ export interface Message {
   content: string // Mesaj içeriği
   model_name?: string // Bu mesajı oluşturan AI model - sadece assistant mesajlarında (opsiyonel)
   image_url?: string // Resim URL'i veya base64 - vision model'ler için (opsiyonel)
+  status?: 'streaming' | 'complete' | 'truncated' | 'error' // Cevap durumu - streaming: üretiliyor (kısmi), truncated: durduruldu, error: timeout / bağlantı koptu
+  prompt_tokens?: number | null // Gönderilen prompt token sayısı - sadece assistant mesajlarında
+  completion_tokens?: number | null // Üretilen token sayısı - sadece assistant mesajlarında
+  cost?: number | null // Maliyet ($) - sadece assistant mesajlarında
+  latency_ms?: number | null // Cevabın tamamlanma süresi (ms)
+  ttft_ms?: number | null // İlk token süresi (ms) - sadece streaming
   timestamp: string // Gönderim zamanı - ISO 8601 formatı
 }
 